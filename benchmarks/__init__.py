@@ -0,0 +1,6 @@
+# 离线基准测试 (Benchmarks)
+# 所有基准均基于合成的 Parquet 数据湖运行，不访问任何远程接口。
+#
+# 用法 (在项目根目录执行):
+#     python -m benchmarks.pipeline --sizes 5 100 --output bench/pipeline.json
+#     python -m benchmarks.compare bench/base.json bench/head.json
@@ -0,0 +1,50 @@
+"""
+对比两次基准测试结果
+
+用法:
+    python -m benchmarks.compare bench/base.json bench/head.json
+    python -m benchmarks.compare bench/base.json bench/head.json --threshold 1.2 --fail
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from tabulate import tabulate
+
+
+def _load(path: Path) -> dict:
+    report = json.loads(Path(path).read_text())
+    return {(r['size'], r['stage'], r['name']): r for r in report['results'] if 'median' in r}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON files")
+    parser.add_argument('base', type=Path)
+    parser.add_argument('head', type=Path)
+    parser.add_argument('--threshold', type=float, default=1.10, help="耗时比值超过该阈值视为退化")
+    parser.add_argument('--fail', action='store_true', help="存在退化时以非零状态码退出")
+    args = parser.parse_args(argv)
+
+    base, head = _load(args.base), _load(args.head)
+    rows, regressions = [], 0
+    for key in sorted(base.keys() & head.keys()):
+        b, h = base[key], head[key]
+        ratio = h['median'] / b['median'] if b['median'] > 0 else float('inf')
+        mem = (f"{b['peak_mb']:.1f} → {h['peak_mb']:.1f}"
+               if b.get('peak_mb') is not None and h.get('peak_mb') is not None else '-')
+        flag = 'REGRESSION' if ratio > args.threshold else ('faster' if ratio < 1 / args.threshold else '')
+        regressions += flag == 'REGRESSION'
+        rows.append([*key, f"{b['median']:.4f}", f"{h['median']:.4f}", f"{ratio:.2f}x", mem, flag])
+
+    print(tabulate(rows, headers=['Size', 'Stage', 'Name', 'Base (s)', 'Head (s)', 'Ratio', 'Peak MB', ''],
+                   tablefmt='simple', stralign='right'))
+    for key in sorted(base.keys() ^ head.keys()):
+        print(f"  (only in {'base' if key in base else 'head'}) {key}")
+
+    if args.fail and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""
+数据 → 因子 → 引擎 全链路基准测试
+
+在合成数据湖上依次计时：
+  - read_data_range         单标的全区间读取
+  - DataLoader.load         全部标的读取（宽表惰性生成）
+  - DataLoader.pivot        load 之后生成全部字段的宽表
+  - factors/*               factors.__all__ 中的每个因子
+  - logics/*                logics.__all__ 中的每个逻辑函数
+  - RealWorldEngine.run     Momentum_Peak_Castle 策略全量回测
+  - run_walk_forward        锚定式 WFA
+
+每项记录多次运行的耗时与峰值内存（tracemalloc），结果写入 JSON，
+可用 `python -m benchmarks.compare` 对比两次提交的结果。
+
+用法 (在项目根目录执行):
+    python -m benchmarks.pipeline                          # 5 / 100 / 1000 / 5000 只标的 × 10 年
+    python -m benchmarks.pipeline --sizes 5 100 --repeat 5 --output bench/head.json
+    python -m benchmarks.pipeline --sizes 100 --only factor
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+DEFAULT_SIZES = [5, 100, 1000, 5000]
+DEFAULT_LAKE_DIR = Path(tempfile.gettempdir()) / 'momentum_rotation_bench_lake'
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmark for the data → factor → engine pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="标的数量列表")
+    parser.add_argument('--years', type=int, default=10, help="合成数据覆盖年数")
+    parser.add_argument('--start-year', type=int, default=2014)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复计时次数")
+    parser.add_argument('--lake-dir', type=Path, default=DEFAULT_LAKE_DIR, help="合成数据湖目录（可复用）")
+    parser.add_argument('--output', type=Path, default=None, help="结果 JSON 路径")
+    parser.add_argument('--only', default=None, help="只运行 stage/name 匹配该正则的项目")
+    parser.add_argument('--no-memory', action='store_true', help="跳过峰值内存测量")
+    parser.add_argument('--verbose', action='store_true', help="保留框架 INFO 日志")
+    return parser.parse_args(argv)
+
+
+def _git_revision() -> Dict[str, object]:
+    try:
+        rev = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                      stderr=subprocess.DEVNULL).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                             text=True, stderr=subprocess.DEVNULL).strip())
+        return {'commit': rev, 'dirty': dirty}
+    except Exception:
+        return {'commit': None, 'dirty': None}
+
+
+def measure(func: Callable[[], object], repeat: int, memory: bool = True) -> Dict[str, object]:
+    """
+    计时 func：先重复 repeat 次测耗时（不开启 tracemalloc，避免干扰），
+    再单独运行一次测峰值内存。
+    """
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        tic = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - tic)
+
+    peak_mb = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mb = peak / 1024 / 1024
+
+    return {
+        'repeat': repeat,
+        'seconds': seconds,
+        'min': min(seconds),
+        'median': statistics.median(seconds),
+        'peak_mb': peak_mb,
+    }
+
+
+def _build_cases(size: int, args: argparse.Namespace, wanted: Callable[[str, str], bool]) -> List[tuple]:
+    """返回 [(stage, name, callable), ...]，数据在此处准备好，不计入计时；未被选中的项目跳过准备"""
+    from benchmarks.synthetic import synthetic_codes
+    from core.data import DataLoader
+    from core.engine import RealWorldEngine
+    from core.strategies import CustomStrategy
+    from infra.repo import read_data_range
+    from utils import DataType, Klt
+    import factors
+    import logics
+    from wfa import run_walk_forward
+
+    codes = synthetic_codes(size)
+    start = f"{args.start_year - 1}-12-31"
+    end = f"{args.start_year + args.years - 1}-12-31"
+    loader = DataLoader(start, end, auto_sync=False)
+    data_dict = loader.load(codes)
+
+    cases = [
+        ('data', 'read_data_range',
+         lambda: read_data_range(codes[0], loader.start_date, loader.end_date, DataType.ETF, Klt.DAY)),
+        ('data', 'DataLoader.load', lambda: loader.load(codes)),
+        ('data', 'DataLoader.pivot', lambda: dict(loader.load(codes))),
+    ]
+
+    for name in factors.__all__:
+        if not wanted('factor', name):
+            continue
+        factor = getattr(factors, name)()
+        cases.append(('factor', name, lambda f=factor: f.calculate(**data_dict)))
+
+    # 逻辑函数的输入因子预先算好，只计时逻辑本身
+    castle_factors = {'Mom_20': factors.Momentum_castle(25), 'Peak_20': factors.Peak(20)}
+    logic_inputs = {
+        'logic_weighted_rotation': ({'mom': factors.Momentum(20), 'vol': factors.Volatility(20)}, {}),
+        'logic_bias_protection': ({'mom': factors.Momentum(20), 'bias': factors.MainLineBias(20)}, {}),
+        'logic_factor_rotation': (castle_factors, {'factor_weights': {'Mom_20': 1.0, 'Peak_20': 1.0},
+                                                   'top_k': 1, 'stg_flag': ['castle_stg1']}),
+    }
+    for name in logics.__all__:
+        if not wanted('logic', name):
+            continue
+        logic_func = getattr(logics, name)
+        factor_defs, kwargs = logic_inputs[name]
+        factor_values = {k: f.calculate(**data_dict) for k, f in factor_defs.items()}
+        cases.append(('logic', name,
+                      lambda fn=logic_func, fv=factor_values, kw=kwargs: fn(fv, data_dict['close'], **kw)))
+
+    def strategy_factory() -> CustomStrategy:
+        return CustomStrategy(
+            name="Momentum_Peak_Castle",
+            factors={'Mom_20': factors.Momentum_castle(25), 'Peak_20': factors.Peak(20)},
+            logic_func=logics.logic_factor_rotation,
+            holding_period=1,
+            factor_weights={'Mom_20': 1.0, 'Peak_20': 1.0},
+            top_k=1,
+            timing_period=0,
+            stg_flag=['castle_stg1'],
+        )
+
+    engine = RealWorldEngine()
+    cases.append(('engine', 'RealWorldEngine.run', lambda: engine.run(strategy_factory(), **data_dict)))
+    cases.append(('engine', 'run_walk_forward',
+                  lambda: run_walk_forward(data_dict, strategy_factory, test_start_year=args.start_year + 3)))
+    return [case for case in cases if wanted(case[0], case[1])]
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, object]:
+    from benchmarks.synthetic import generate_lake
+
+    only = re.compile(args.only) if args.only else None
+
+    def wanted(stage: str, name: str) -> bool:
+        return only is None or bool(only.search(f"{stage}/{name}"))
+
+    lake_dir = generate_lake(args.lake_dir, max(args.sizes), args.years, args.start_year, args.seed)
+
+    results = []
+    for size in args.sizes:
+        for stage, name, func in _build_cases(size, args, wanted):
+            record = {'size': size, 'stage': stage, 'name': name}
+            try:
+                record.update(measure(func, args.repeat, memory=not args.no_memory))
+            except Exception as e:
+                record['error'] = f"{type(e).__name__}: {e}"
+            results.append(record)
+            peak = f"{record['peak_mb']:.1f} MB" if record.get('peak_mb') is not None else '-'
+            status = f"{record['median']:.4f}s  peak {peak}" if 'median' in record else record['error']
+            print(f"[Bench] size={size:<5} {stage:<7} {name:<28} {status}", flush=True)
+
+    return {
+        'meta': {
+            **_git_revision(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'packages': _package_versions(),
+            'lake': {'dir': str(lake_dir), 'years': args.years, 'start_year': args.start_year, 'seed': args.seed},
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+
+def _package_versions() -> Dict[str, str]:
+    versions = {}
+    for pkg in ('numpy', 'pandas', 'pyarrow'):
+        try:
+            versions[pkg] = __import__(pkg).__version__
+        except Exception:
+            versions[pkg] = None
+    return versions
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    # 数据目录必须在导入 infra 之前设置（infra 在导入时读取 DATA_DIR）
+    os.environ['DATA_DIR'] = str(args.lake_dir)
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+
+    from utils import logger
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+
+    report = run_benchmarks(args)
+
+    output = args.output or Path('bench') / f"pipeline_{report['meta']['commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"[Bench] Results saved to: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+共享内存数据服务基准 (Shared-Memory Data Server)
+
+N 个并发工作进程需要同一份宽表：
+  - local   每个工作进程自己 DataLoader.load()（现状）
+  - shared  一个服务进程加载并发布到共享内存 (core.shm)，工作进程 attach() 零拷贝挂载
+
+所有工作进程就绪（已把每个字段完整读过一遍）后，父进程读取各进程的 PSS
+（/proc/<pid>/smaps_rollup，共享页按映射进程数分摊，各进程相加即为真实总占用），
+shared 模式的总量包含服务进程。同时记录每个工作进程从启动到数据就绪的耗时。
+
+用法 (在项目根目录执行，仅 Linux):
+    python -m benchmarks.shm                                   # 1000 只 × 10 年，1 / 2 / 4 / 8 个工作进程
+    python -m benchmarks.shm --codes 500 --workers 1 4 --dtype float32
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+DEFAULT_WORKERS = [1, 2, 4, 8]
+DEFAULT_LAKE_DIR = Path(tempfile.gettempdir()) / 'momentum_rotation_shm_lake'
+MODES = ['local', 'shared']
+SERVER_NAME = 'bench_shm'
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Shared-memory data server benchmark: N concurrent workers")
+    parser.add_argument('--codes', type=int, default=1000, help="标的数量")
+    parser.add_argument('--years', type=int, default=10, help="合成数据覆盖年数")
+    parser.add_argument('--start-year', type=int, default=2014)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dtype', default='float64', help="DataLoader 宽表数值类型")
+    parser.add_argument('--workers', type=int, nargs='+', default=DEFAULT_WORKERS, help="并发工作进程数列表")
+    parser.add_argument('--lake-dir', type=Path, default=DEFAULT_LAKE_DIR, help="合成数据湖目录（可复用）")
+    parser.add_argument('--output', type=Path, default=None, help="结果 JSON 路径")
+    parser.add_argument('--role', choices=['server', *MODES], default=None, help=argparse.SUPPRESS)  # 子进程内部使用
+    return parser.parse_args(argv)
+
+
+def _loader(args: argparse.Namespace):
+    from benchmarks.synthetic import synthetic_codes
+    from core.data import DataLoader
+    from core.universe import CodeList
+    return DataLoader(f"{args.start_year - 1}-12-31", f"{args.start_year + args.years - 1}-12-31",
+                      universe=CodeList(tuple(synthetic_codes(args.codes))), dtype=args.dtype)
+
+
+def _memory_mb(pid: int) -> Dict[str, float]:
+    """进程的 PSS / RSS (MB)"""
+    out = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key = line.split(':')[0]
+            if key in ('Pss', 'Rss'):
+                out[key.lower()] = int(line.split()[1]) / 1024
+    return out
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 子进程：服务端 / 工作进程。就绪后在 stdout 打印一行 JSON，然后阻塞到 stdin 关闭
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _serve(args: argparse.Namespace) -> None:
+    from core.shm import DataServer
+    tic = time.perf_counter()
+    server = DataServer(_loader(args).load(), SERVER_NAME)
+    server.publish()
+    print(json.dumps({'seconds': time.perf_counter() - tic}), flush=True)
+    sys.stdin.read()
+    server.close(timeout=30)
+
+
+def _work(args: argparse.Namespace) -> None:
+    tic = time.perf_counter()
+    if args.role == 'shared':
+        from core.shm import attach
+        shared = attach(SERVER_NAME)
+        data = shared.data
+    else:
+        data = _loader(args).load()
+    # 每个字段完整读一遍（共享页在此时映射进本进程）
+    checksum = float(sum(frame.to_numpy().sum(dtype=float) for frame in data.values() if hasattr(frame, 'to_numpy')))
+    print(json.dumps({'seconds': time.perf_counter() - tic, 'checksum': checksum}), flush=True)
+    sys.stdin.read()
+
+
+def _spawn(role: str, argv: List[str]) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, '-m', 'benchmarks.shm', *argv, '--role', role],
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+
+def _ready(proc: subprocess.Popen) -> dict:
+    line = proc.stdout.readline()
+    if not line:
+        raise RuntimeError(f"benchmark subprocess {proc.pid} exited with code {proc.wait()}")
+    return json.loads(line)
+
+
+def run_case(mode: str, n_workers: int, argv: List[str]) -> Dict[str, object]:
+    """启动（服务端 +）n_workers 个工作进程，全部就绪后采集内存，再统一结束"""
+    procs, server = [], None
+    try:
+        server_seconds = 0.0
+        if mode == 'shared':
+            server = _spawn('server', argv)
+            server_seconds = _ready(server)['seconds']
+        procs = [_spawn(mode, argv) for _ in range(n_workers)]
+        ready = [_ready(p) for p in procs]
+
+        workers_mem = [_memory_mb(p.pid) for p in procs]
+        server_mem = _memory_mb(server.pid) if server else {'pss': 0.0, 'rss': 0.0}
+        return {
+            'mode': mode,
+            'workers': n_workers,
+            'server_seconds': server_seconds,
+            'worker_seconds': max(r['seconds'] for r in ready),
+            'worker_pss_mb': sum(m['pss'] for m in workers_mem) / n_workers,
+            'server_pss_mb': server_mem['pss'],
+            'total_pss_mb': sum(m['pss'] for m in workers_mem) + server_mem['pss'],
+            'checksums_match': len({r['checksum'] for r in ready}) == 1,
+        }
+    finally:
+        for p in procs + ([server] if server else []):
+            p.stdin.close()
+        for p in procs + ([server] if server else []):
+            p.wait()
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    args = _parse_args(argv)
+
+    # 数据目录必须在导入 infra 之前设置（infra 在导入时读取 DATA_DIR）
+    os.environ['DATA_DIR'] = str(args.lake_dir)
+    from utils import logger
+    logger.setLevel(logging.WARNING)
+
+    if args.role == 'server':
+        return _serve(args)
+    if args.role is not None:
+        return _work(args)
+
+    from benchmarks.synthetic import generate_lake
+    print(f"[Bench] Preparing lake: {args.codes} codes × {args.years} years → {args.lake_dir}", flush=True)
+    generate_lake(args.lake_dir, args.codes, args.years, args.start_year, args.seed)
+
+    results = []
+    for n_workers in args.workers:
+        row = {mode: run_case(mode, n_workers, argv) for mode in MODES}
+        local, shared = row['local'], row['shared']
+        saving = 1 - shared['total_pss_mb'] / local['total_pss_mb']
+        print(f"[Bench] workers={n_workers:<3} "
+              f"local {local['total_pss_mb']:7.0f} MB ({local['worker_seconds']:.2f}s/worker)  "
+              f"shared {shared['total_pss_mb']:7.0f} MB (server {shared['server_seconds']:.2f}s, "
+              f"{shared['worker_seconds']:.2f}s/worker)  saving {saving:.0%}"
+              f"{'' if local['checksums_match'] and shared['checksums_match'] else '  CHECKSUM MISMATCH'}",
+              flush=True)
+        results.extend(row.values())
+
+    output = args.output or Path('bench') / 'shm.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({'codes': args.codes, 'years': args.years, 'dtype': args.dtype,
+                                  'results': results}, indent=2))
+    print(f"[Bench] Results saved to: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+同步写入路径基准 (Sync Normalize / Write)
+
+在合成的接口原始数据上计时同步的两段本地开销（不访问网络）：
+  - normalize/stock_spot     ak.stock_zh_a_spot_em 形状的全市场快照 → 统一列
+  - normalize/stock_tick     每只股票 240 行分钟线 → 统一列（逐代码）
+  - save/daily_new           快照写入空目录（每个代码新建 {code}/{year}/{year}.parquet）
+  - save/daily_merge         快照写入已有年度文件（读出 + 合并去重 + 重写）
+  - save/tick                分钟线批量写入 {code}/{year}/tick/{day}.parquet
+  - quality/daily            写入前的数据质量校验：快照（infra.quality 存在时）
+  - quality/tick             写入前的数据质量校验：分钟线
+
+只依赖 infra.repo 的 _stock_spot_frame / _stock_tick_frame / save_date，
+同一脚本可以在不同提交上运行，再用 `python -m benchmarks.compare` 对比。
+
+用法 (在项目根目录执行):
+    python -m benchmarks.sync                                  # 5000 只标的的快照，1000 只的分钟线
+    python -m benchmarks.sync --codes 5000 --tick-codes 500 --output bench/sync_head.json
+"""
+import argparse
+import json
+import logging
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+TRADE_DAY = datetime(2024, 1, 5)
+PREV_DAY = datetime(2024, 1, 4)
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the sync normalize / parquet write path")
+    parser.add_argument('--codes', type=int, default=5000, help="快照中的股票数量")
+    parser.add_argument('--tick-codes', type=int, default=1000, help="分钟线的股票数量（每只 240 行）")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复计时次数")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--work-dir', type=Path, default=None, help="写入目录（默认临时目录，结束后删除）")
+    parser.add_argument('--output', type=Path, default=None, help="结果 JSON 路径")
+    return parser.parse_args(argv)
+
+
+def synthetic_spot(n_codes: int, seed: int = 42) -> pd.DataFrame:
+    """ak.stock_zh_a_spot_em 形状的快照（全部原始列，约 1% 停牌无最新价）"""
+    rng = np.random.default_rng(seed)
+    codes = [f"{i:06d}" for i in range(1, n_codes + 1)]
+    preclose = rng.uniform(3, 100, n_codes).round(2)
+    close = (preclose * (1 + rng.normal(0, 0.02, n_codes))).round(2)
+    close[rng.random(n_codes) < 0.01] = np.nan
+    volume = rng.integers(1_000, 10_000_000, n_codes).astype(float)
+    return pd.DataFrame({
+        '序号': np.arange(1, n_codes + 1), '代码': codes, '名称': [f"股票{c}" for c in codes],
+        '最新价': close, '涨跌幅': ((close / preclose - 1) * 100).round(2), '涨跌额': (close - preclose).round(2),
+        '成交量': volume, '成交额': (volume * 100 * close).round(0), '振幅': rng.uniform(0, 10, n_codes).round(2),
+        '最高': (close * 1.02).round(2), '最低': (close * 0.98).round(2), '今开': (preclose * 1.001).round(2),
+        '昨收': preclose, '量比': rng.uniform(0.5, 3, n_codes).round(2), '换手率': rng.uniform(0, 20, n_codes).round(2),
+        '市盈率-动态': rng.uniform(-50, 200, n_codes).round(2), '市净率': rng.uniform(0.5, 20, n_codes).round(2),
+        '总市值': rng.uniform(1e9, 1e12, n_codes), '流通市值': rng.uniform(1e9, 1e12, n_codes),
+        '涨速': 0.0, '5分钟涨跌': 0.0, '60日涨跌幅': 0.0, '年初至今涨跌幅': 0.0,
+    })
+
+
+def synthetic_ticks(n_codes: int, day: datetime, seed: int = 42) -> List[tuple]:
+    """ak.stock_zh_a_hist_min_em 形状的分钟线：[(code, name, df)]"""
+    rng = np.random.default_rng(seed)
+    times = pd.date_range(day.replace(hour=9, minute=31), periods=240, freq='min').strftime('%Y-%m-%d %H:%M:%S')
+    out = []
+    for i in range(1, n_codes + 1):
+        price = 10 * np.exp(np.cumsum(rng.normal(0, 0.001, 240)))
+        out.append((f"{i:06d}", f"股票{i:06d}", pd.DataFrame({
+            '时间': times, '开盘': price, '收盘': price, '最高': price * 1.001, '最低': price * 0.999,
+            '成交量': rng.integers(1, 10_000, 240).astype(float), '成交额': price * 1000, '最新价': price,
+        })))
+    return out
+
+
+def _concat(frames: list):
+    """分钟线批量写入前的拼接（兼容返回 DataFrame 或 pyarrow.Table 的实现）"""
+    if isinstance(frames[0], pd.DataFrame):
+        return pd.concat(frames, ignore_index=True)
+    import pyarrow as pa
+    return pa.concat_tables(frames)
+
+
+def run_benchmarks(args: argparse.Namespace, work_dir: Path) -> List[Dict[str, object]]:
+    from benchmarks.pipeline import measure
+    from infra.repo import _stock_spot_frame, _stock_tick_frame, save_date
+
+    spot = synthetic_spot(args.codes, args.seed)
+    ticks = synthetic_ticks(args.tick_codes, TRADE_DAY, args.seed)
+    spot_frame = _stock_spot_frame(spot.copy(), TRADE_DAY)
+    tick_frame = _concat([_stock_tick_frame(df.copy(), code, name) for code, name, df in ticks])
+
+    # 合并场景：先写入前一交易日，计时时写入当天（重复运行结果相同）
+    merge_dir = work_dir / 'merge'
+    save_date(_stock_spot_frame(spot.copy(), PREV_DAY), merge_dir, False)
+
+    runs = iter(range(1_000_000))
+    cases = [
+        (args.codes, 'normalize', 'stock_spot', lambda: _stock_spot_frame(spot.copy(), TRADE_DAY)),
+        (args.tick_codes, 'normalize', 'stock_tick',
+         lambda: [_stock_tick_frame(df.copy(), code, name) for code, name, df in ticks]),
+        (args.codes, 'save', 'daily_new', lambda: save_date(spot_frame, work_dir / f'new_{next(runs)}', False)),
+        (args.codes, 'save', 'daily_merge', lambda: save_date(spot_frame, merge_dir, False)),
+        (args.tick_codes, 'save', 'tick', lambda: save_date(tick_frame, work_dir / f'tick_{next(runs)}', True)),
+    ]
+
+    try:
+        from infra.quality import validate
+        from infra.schema import as_table
+        cases += [
+            (args.codes, 'quality', 'daily', lambda: validate(as_table(spot_frame), False)),
+            (args.tick_codes, 'quality', 'tick', lambda: validate(as_table(tick_frame), True)),
+        ]
+    except ImportError:
+        pass
+
+    results = []
+    for size, stage, name, func in cases:
+        record = {'size': size, 'stage': stage, 'name': name}
+        record.update(measure(func, args.repeat))
+        results.append(record)
+        print(f"[Bench] size={size:<5} {stage:<9} {name:<12} {record['median']:.4f}s  "
+              f"peak {record['peak_mb']:.1f} MB", flush=True)
+    return results
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    from utils import logger
+    logger.setLevel(logging.WARNING)
+    from benchmarks.pipeline import _git_revision, _package_versions
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix='momentum_rotation_sync_'))
+    try:
+        results = run_benchmarks(args, work_dir)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'meta': {**_git_revision(), 'timestamp': datetime.now().isoformat(timespec='seconds'),
+                 'packages': _package_versions(), 'repeat': args.repeat},
+        'results': results,
+    }
+    output = args.output or Path('bench') / f"sync_{report['meta']['commit'] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"[Bench] Results saved to: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+合成 OHLCV 数据湖生成器
+
+按照 infra.repo.save_date 的目录布局写出 Parquet：
+    {root}/{data_type.dir_code}/{code}/{year}/{year}.parquet
+
+字段与 utils.const.COLUMNS / COLUMNS_TYPE 完全一致，价格为几何随机游走，
+同一组参数 (n_codes, years, seed) 总是生成相同的数据，保证基准可复现。
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils import DataType
+from utils.const import (
+    DATETIME, CODE, NAME, OPEN, HIGH, LOW, CLOSE, PRECLOSE,
+    VOLUME, AMOUNT, TURN, PRICE_CHG, PE_TTM, PB_TTM,
+    COLUMNS, COLUMNS_TYPE,
+)
+
+LAKE_META_FILE = '_lake.json'
+LAKE_CHUNK_CODES = 250  # 分批生成，避免 5000 只标的一次性占用数 GB 内存
+
+
+def synthetic_codes(n_codes: int, offset: int = 0) -> list:
+    """生成 6 位 ETF 风格代码：510000, 510001, ..."""
+    return [f"{510000 + offset + i:06d}" for i in range(n_codes)]
+
+
+def synthetic_panel(n_codes: int, years: int = 10, start_year: int = 2014, seed: int = 42,
+                    code_offset: int = 0) -> pd.DataFrame:
+    """
+    生成长表格式 (Long Format) 的日线数据，列为 COLUMNS。
+
+    :param n_codes: 标的数量
+    :param years: 覆盖年数（从 start_year-01-01 开始的工作日）
+    :param start_year: 起始年份
+    :param seed: 随机种子
+    :param code_offset: 代码编号起点（分批生成时使用）
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(f"{start_year}-01-01", f"{start_year + years - 1}-12-31")
+    n_days = len(dates)
+
+    # 1. 收盘价：几何随机游走 (Index=Date, Columns=Asset)
+    log_rets = rng.normal(0.0003, 0.015, size=(n_days, n_codes))
+    close = np.exp(np.cumsum(log_rets, axis=0)) * rng.uniform(1.0, 5.0, size=n_codes)
+
+    # 2. 开盘价：在昨收基础上加一个隔夜跳空
+    preclose = np.vstack([close[:1], close[:-1]])
+    open_ = preclose * np.exp(rng.normal(0.0, 0.005, size=(n_days, n_codes)))
+
+    # 3. 高低价：包住开收盘
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0.0, 0.005, size=(n_days, n_codes))))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0.0, 0.005, size=(n_days, n_codes))))
+
+    volume = rng.lognormal(16.0, 0.5, size=(n_days, n_codes)).round(0) * 100
+    amount = volume * close
+
+    codes = synthetic_codes(n_codes, code_offset)
+    df = pd.DataFrame({
+        DATETIME: np.repeat(dates.values, n_codes),
+        CODE: np.tile(codes, n_days),
+        NAME: np.tile([f"ETF{c}" for c in codes], n_days),
+        OPEN: open_.ravel(),
+        HIGH: high.ravel(),
+        LOW: low.ravel(),
+        CLOSE: close.ravel(),
+        PRECLOSE: preclose.ravel(),
+        VOLUME: volume.ravel(),
+        AMOUNT: amount.ravel(),
+        TURN: rng.uniform(0.1, 5.0, size=n_days * n_codes),
+        PRICE_CHG: ((close / preclose - 1) * 100).ravel(),
+        PE_TTM: np.nan,
+        PB_TTM: np.nan,
+    })
+    return df[COLUMNS].astype(COLUMNS_TYPE)
+
+
+def generate_lake(root: Path, n_codes: int, years: int = 10, start_year: int = 2014,
+                  seed: int = 42, data_type: DataType = DataType.ETF) -> Path:
+    """
+    在 root 下生成数据湖并返回 root。
+
+    若 root 下已存在参数相同的数据湖（通过 _lake.json 判断），直接复用，不重复生成。
+    """
+    root = Path(root)
+    meta = {'n_codes': n_codes, 'years': years, 'start_year': start_year, 'seed': seed,
+            'data_type': data_type.dir_code}
+    meta_path = root / LAKE_META_FILE
+    if meta_path.exists() and json.loads(meta_path.read_text()) == meta:
+        return root
+
+    type_dir = root / data_type.dir_code
+    for offset in range(0, n_codes, LAKE_CHUNK_CODES):
+        chunk = min(LAKE_CHUNK_CODES, n_codes - offset)
+        df = synthetic_panel(chunk, years, start_year, seed + offset, code_offset=offset)
+        df['_year'] = df[DATETIME].dt.year
+        for (code, year), group in df.groupby([CODE, '_year'], sort=False):
+            year_dir = type_dir / code / str(year)
+            year_dir.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pandas(group.drop(columns='_year'), preserve_index=False)
+            pq.write_table(table, year_dir / f"{year}.parquet")
+
+    meta_path.write_text(json.dumps(meta))
+    return root
@@ -0,0 +1,165 @@
+"""
+大标的池扩展性基准 (Universe Scaling)
+
+在合成的股票数据湖上跑完整链路，验证 耗时 / 峰值内存 随 标的数 × 交易日 线性增长，
+且 5000 只 × ~3000 交易日 能在固定内存预算内完成：
+  - load     DataLoader(data_type=STOCK, universe=CodeList(前 size 只), fields=OHLC+amount, dtype=float32)
+  - market   MarketReturns.from_data
+  - weights  Momentum_Peak_Castle 目标权重（因子按列分块 + 截面排名）
+  - engine   RealWorldEngine.run_weights
+
+每个规模在独立子进程中运行，记录各阶段耗时与进程峰值常驻内存 (VmHWM / ru_maxrss，不像 tracemalloc 那样拖慢分配)，
+以及每百万 asset-day 的耗时 / 内存（扣除导入后的基线），峰值超过 --budget-mb 时标记为失败。
+
+用法 (在项目根目录执行):
+    python -m benchmarks.universe                                  # 500 / 1000 / 2500 / 5000 只 × 12 年
+    python -m benchmarks.universe --sizes 500 1000 --years 4 --budget-mb 1024
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+DEFAULT_SIZES = [500, 1000, 2500, 5000]
+DEFAULT_LAKE_DIR = Path(tempfile.gettempdir()) / 'momentum_rotation_universe_lake'
+FIELDS = ['open', 'high', 'low', 'close', 'amount']
+STAGES = ['load', 'market', 'weights', 'engine']
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Universe scaling benchmark: load → factors → ranking → engine")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="标的数量列表")
+    parser.add_argument('--years', type=int, default=12, help="合成数据覆盖年数（12 年 ≈ 3100 个交易日）")
+    parser.add_argument('--start-year', type=int, default=2012)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dtype', default='float32', help="DataLoader 宽表数值类型")
+    parser.add_argument('--budget-mb', type=float, default=4096, help="单个规模的峰值内存预算 (MB)")
+    parser.add_argument('--lake-dir', type=Path, default=DEFAULT_LAKE_DIR, help="合成数据湖目录（可复用）")
+    parser.add_argument('--output', type=Path, default=None, help="结果 JSON 路径")
+    parser.add_argument('--size', type=int, default=None, help=argparse.SUPPRESS)  # 子进程内部使用
+    return parser.parse_args(argv)
+
+
+def run_size(size: int, args: argparse.Namespace) -> Dict[str, object]:
+    """在当前进程中跑一个规模的完整链路（调用前需已设置 DATA_DIR）"""
+    from benchmarks.synthetic import synthetic_codes
+    from core.data import DataLoader
+    from core.engine import RealWorldEngine
+    from core.returns import MarketReturns
+    from core.strategies import CustomStrategy
+    from core.universe import CodeList
+    from utils import DataType
+    import factors
+    import logics
+
+    strategy = CustomStrategy(
+        name="Momentum_Peak_Castle",
+        factors={'Mom_20': factors.Momentum_castle(25), 'Peak_20': factors.Peak(20)},
+        logic_func=logics.logic_factor_rotation,
+        factor_weights={'Mom_20': 1.0, 'Peak_20': 1.0},
+        top_k=max(size // 100, 1),
+        stg_flag=['castle_stg1'],
+    )
+    loader = DataLoader(f"{args.start_year - 1}-12-31", f"{args.start_year + args.years - 1}-12-31",
+                        data_type=DataType.STOCK, universe=CodeList(tuple(synthetic_codes(size))),
+                        fields=FIELDS, dtype=args.dtype)
+
+    state = {}
+    steps = {
+        'load':    lambda: state.update(data=loader.load()),
+        'market':  lambda: state.update(market=MarketReturns.from_data(state['data'])),
+        'weights': lambda: state.update(weights=strategy.generate_target_weights(**state['data'])),
+        'engine':  lambda: state.update(rets=RealWorldEngine().run_weights(state['weights'], state['market'])),
+    }
+
+    record = {'size': size, 'seconds': {}, 'baseline_mb': _peak_rss_mb()}
+    for stage in STAGES:
+        tic = time.perf_counter()
+        steps[stage]()
+        record['seconds'][stage] = time.perf_counter() - tic
+
+    close = state['data']['close']
+    asset_days = close.shape[0] * close.shape[1] / 1e6
+    record.update({
+        'days': close.shape[0],
+        'assets': close.shape[1],
+        'total_seconds': sum(record['seconds'].values()),
+        'peak_mb': _peak_rss_mb(),
+    })
+    record['seconds_per_m_asset_days'] = record['total_seconds'] / asset_days
+    record['mb_per_m_asset_days'] = (record['peak_mb'] - record['baseline_mb']) / asset_days
+    record['within_budget'] = record['peak_mb'] <= args.budget_mb
+    return record
+
+
+def _peak_rss_mb() -> float:
+    # Linux 优先读 VmHWM：ru_maxrss 会跨 fork/exec 继承父进程（生成数据湖时）的峰值
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_in_subprocess(size: int, argv: List[str]) -> Dict[str, object]:
+    out = subprocess.run([sys.executable, '-m', 'benchmarks.universe', *argv, '--size', str(size)],
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        return {'size': size, 'error': out.stderr.strip().splitlines()[-1] if out.stderr else 'failed'}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    args = _parse_args(argv)
+
+    # 数据目录必须在导入 infra 之前设置（infra 在导入时读取 DATA_DIR）
+    os.environ['DATA_DIR'] = str(args.lake_dir)
+    from utils import logger
+    logger.setLevel(logging.WARNING)
+
+    if args.size is not None:
+        print(json.dumps(run_size(args.size, args)))
+        return
+
+    from benchmarks.synthetic import generate_lake
+    from utils import DataType
+    print(f"[Bench] Preparing lake: {max(args.sizes)} codes × {args.years} years → {args.lake_dir}", flush=True)
+    generate_lake(args.lake_dir, max(args.sizes), args.years, args.start_year, args.seed, DataType.STOCK)
+
+    results = []
+    for size in args.sizes:
+        record = _run_in_subprocess(size, argv)
+        results.append(record)
+        if 'error' in record:
+            print(f"[Bench] size={size:<5} {record['error']}", flush=True)
+            continue
+        stages = "  ".join(f"{s} {record['seconds'][s]:.2f}s" for s in STAGES)
+        flag = 'OK' if record['within_budget'] else 'OVER BUDGET'
+        print(f"[Bench] size={size:<5} days={record['days']}  {stages}  "
+              f"peak {record['peak_mb']:.0f} MB  "
+              f"({record['seconds_per_m_asset_days']:.2f}s, {record['mb_per_m_asset_days']:.0f} MB per 1M asset-days)  "
+              f"{flag}", flush=True)
+
+    output = args.output or Path('bench') / 'universe.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({'budget_mb': args.budget_mb, 'dtype': args.dtype, 'results': results}, indent=2))
+    print(f"[Bench] Results saved to: {output}")
+    if any(not r.get('within_budget', False) for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
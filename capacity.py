@@ -0,0 +1,153 @@
+"""
+Capacity Analysis — 策略容量分析工具
+
+在一组 AUM 档位上批量回测同一策略（参与率上限 + 冲击成本），
+输出 CAGR / Sharpe 随资金规模衰减的表格与曲线，估计策略还能承载多少资金。
+
+用法:
+    python capacity.py
+    python capacity.py --aum 1e6 1e7 1e8 1e9 --max-participation 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import datetime
+
+import matplotlib.pyplot as plt
+import numpy as np
+from tabulate import tabulate
+
+import config
+from core.capacity import CapacityResult, analyze_capacity
+from core.costs import ParticipationImpact
+from core.data import DataLoader
+from core.engine import RealWorldEngine
+from core.metrics import format_stats
+from core.returns import MarketReturns
+from core.strategies import CustomStrategy
+from factors import Momentum_castle, Peak
+from logics import logic_factor_rotation
+from utils import logger, profiler
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 1. 结果展示
+# ─────────────────────────────────────────────────────────────────────────────
+
+def print_capacity(result: CapacityResult, strategy_name: str = "Strategy",
+                   sharpe_retention: float = 0.5) -> None:
+    """打印各 AUM 档位的指标表与容量估计"""
+    cols = ['CAGR', 'Sharpe', 'Max DD', 'Turnover', 'Fill Rate', 'Avg Part.', 'Max Part.']
+    disp = format_stats(result.stats[cols])
+    for col in ['Fill Rate', 'Avg Part.', 'Max Part.']:
+        disp[col] = result.stats[col].map('{:.2%}'.format)
+
+    print(f"\n{'='*68}")
+    print(f"  Capacity Analysis  ·  {strategy_name}")
+    print(f"{'='*68}")
+    print(tabulate(
+        disp.values.tolist(),
+        headers=['AUM'] + disp.columns.tolist(),
+        showindex=[f"{aum:,.0f}" for aum in result.aum_levels],
+        tablefmt='simple',
+        stralign='right',
+        disable_numparse=True,
+    ))
+
+    capacity = result.capacity(sharpe_retention)
+    print(f"\n{'─'*68}")
+    if capacity is None:
+        print("  Capacity: 最小档位的 Sharpe 已不满足条件")
+    else:
+        print(f"  Capacity (Sharpe ≥ {sharpe_retention:.0%} × 最小档位): {capacity:,.0f}")
+    print()
+
+
+def plot_capacity(result: CapacityResult, strategy_name: str = "Strategy",
+                  output_path: str = "capacity_result.png") -> None:
+    """绘制 CAGR / Sharpe 随 AUM 的衰减曲线"""
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+    aum = result.aum_levels
+
+    ax1.plot(aum, result.stats['CAGR'].values, marker='o', color='#e74c3c')
+    ax1.set_ylabel('CAGR', fontsize=11)
+    ax2.plot(aum, result.stats['Sharpe'].values, marker='o', color='#3498db')
+    ax2.set_ylabel('Sharpe', fontsize=11)
+
+    for ax in (ax1, ax2):
+        ax.set_xscale('log')
+        ax.set_xlabel('AUM', fontsize=11)
+        ax.axhline(0, color='gray', linewidth=0.8, alpha=0.6)
+        ax.grid(linestyle='--', alpha=0.4)
+
+    fig.suptitle(f'Capacity Analysis — {strategy_name}', fontsize=14)
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=150)
+    logger.info(f"[Capacity] 图表已保存 → {output_path}")
+    plt.close(fig)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 2. 主程序
+# ─────────────────────────────────────────────────────────────────────────────
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="策略容量分析：CAGR / Sharpe 随 AUM 的衰减")
+    parser.add_argument('--aum', type=float, nargs='+', default=list(np.logspace(6, 10, 9)),
+                        help="AUM 档位（元），默认 1e6 ~ 1e10 对数等分 9 档")
+    parser.add_argument('--max-participation', type=float, default=0.1,
+                        help="单日成交额 / 日均成交额上限（默认 0.1）")
+    parser.add_argument('--impact-coef', type=float, default=1.0,
+                        help="平方根冲击系数（默认 1.0）")
+    parser.add_argument('--symbols', nargs='+', default=config.ETF_SYMBOLS,
+                        help="标的池（默认 config.ETF_SYMBOLS）")
+    parser.add_argument('--output', default="capacity_result.png", help="衰减曲线输出路径")
+    return parser.parse_args(argv)
+
+
+def main(args: argparse.Namespace = None):
+    args = args or parse_args([])
+
+    # 1. 被测策略（与 live.py 保持一致）
+    STRATEGY_NAME = "Momentum_Peak_Castle"
+    strategy = CustomStrategy(
+        name=STRATEGY_NAME,
+        factors={
+            "Mom_20": Momentum_castle(25),
+            "Peak_20": Peak(20),
+        },
+        logic_func=logic_factor_rotation,
+        holding_period=1,
+        factor_weights={"Mom_20": 1.0, "Peak_20": 1.0},
+        top_k=1,
+        timing_period=0,
+        stg_flag=["castle_stg1"],
+    )
+
+    # 2. 加载数据：策略 + 收益面板 + 冲击模型（amount 计算日均成交额）用到的字段
+    impact    = ParticipationImpact(coef=args.impact_coef)
+    loader    = DataLoader("2013-08-01", datetime.now().strftime("%Y-%m-%d"), auto_sync=True,
+                           fields=RealWorldEngine(cost_model=impact).fields(strategy))
+    data_dict = loader.load(args.symbols)
+    market    = MarketReturns.from_data(data_dict)
+
+    # 3. 目标权重只算一次，所有 AUM 档位共享
+    weights = strategy.generate_target_weights(**data_dict)
+    result  = analyze_capacity(
+        weights, market, args.aum,
+        max_participation = args.max_participation,
+        impact            = impact,
+    )
+
+    # 4. 输出
+    print_capacity(result, STRATEGY_NAME)
+    plot_capacity(result, STRATEGY_NAME, args.output)
+
+
+if __name__ == "__main__":
+    try:
+        main(parse_args())
+    finally:
+        # PROFILE=1 时打印热路径汇总，PROFILE_TRACE=xxx.json 时导出 Chrome trace
+        profiler.report()
@@ -14,6 +14,10 @@ ETF_SYMBOLS = ["510300", "518880", "513100", "159915", "510210"]
 START_DATE = "2013-01-01"
 END_DATE = date.today().strftime('%Y-%m-%d')
 TRANSACTION_COST = 0.0005 # 万分之五
+AUM = 1_000_000 # 资金规模 (元)，冲击成本模型按此计算参与率
+FACTOR_BLOCK_COLS = 512 # columnwise 因子按列分块计算的块宽，限制大标的池下的峰值内存 (0 为不分块)
+PANEL_CACHE_SIZE = 16 # DataLoader.load() 结果中同时保留的宽表数 (按字段 + 日期区间计，LRU 淘汰)，字段在首次访问时才生成
+SHM_DIR = os.getenv("SHM_DIR", "") # 共享内存数据服务 (data_server.py) 的描述符目录，空为系统临时目录
 
 # 钉钉配置 (从环境变量中读取，如果没有则默认为空字符串)
 DINGTALK_WEBHOOK = os.getenv("DINGTALK_WEBHOOK", "")
@@ -1,14 +1,37 @@
+import inspect
 from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple, TYPE_CHECKING
+import numpy as np
 import pandas as pd
 
+if TYPE_CHECKING:
+    from .intermediates import Intermediate
+
+# calculate 的非行情参数（由 CustomStrategy 传入）
+_NON_FIELD_ARGS = ('intermediates', 'membership')
+
+
 class Factor(ABC):
     """
     因子基类：用户专注于实现 calculate
     """
 
+    # 因子只依赖每列自身的时间序列（列之间互不影响、不使用 intermediates）时设为 True，
+    # 大标的池下 CustomStrategy 会按列分块调用 calculate，限制中间数组的峰值内存
+    columnwise: bool = False
+
     def __init__(self, name: str = None):
         self.name = name or self.__class__.__name__
 
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """
+        calculate 需要的行情字段，入口脚本据此只加载 / Pivot 用到的字段 (DataLoader(fields=...))。
+        默认取 calculate 签名中显式列出的参数；通过 **kwargs 读取其他字段的子类请覆盖，e.g. fields = ('close', 'volume')
+        """
+        return tuple(name for name, p in inspect.signature(self.calculate).parameters.items()
+                     if p.kind not in (p.VAR_POSITIONAL, p.VAR_KEYWORD) and name not in _NON_FIELD_ARGS)
+
     @abstractmethod
     def calculate(self, **kwargs) -> pd.DataFrame:
         """
@@ -23,14 +46,59 @@ class Factor(ABC):
                 return closes / volumes
 
         :param kwargs: 包含数据的字典 (e.g., closes=df, volumes=df, opens=df)
+                       若由 CustomStrategy 调用，还会带上 intermediates=IntermediateStore（共享中间结果）
         :return: 因子值宽表 (Index=Date, Columns=Assets)
         """
         pass
 
+    def calculate_blocked(self, block_cols: int, **kwargs) -> pd.DataFrame:
+        """
+        按列分块计算（仅 columnwise 因子），在池位置上的结果与 calculate 完全相同。
+        kwargs 带有 membership 时按上市先后分块，每块只计算块内有代码在池的行区间，其余位置为 NaN。
+
+        :param block_cols: 每块的列数；<= 0 或列数不超过 block_cols 时不按列拆分
+        """
+        closes = kwargs.get('close')
+        if not self.columnwise or closes is None:
+            return self.calculate(**kwargs)
+
+        membership = kwargs.get('membership')
+        if membership is not None and membership.binds(closes):
+            blocks = membership.blocks(block_cols)
+            if len(blocks) == 1 and len(blocks[0][0]) == closes.shape[1] and blocks[0][1] == slice(0, len(closes)):
+                return self.calculate(**kwargs)
+            if not blocks:
+                return pd.DataFrame(np.nan, index=closes.index, columns=closes.columns)
+        elif block_cols <= 0 or closes.shape[1] <= block_cols:
+            return self.calculate(**kwargs)
+        else:
+            membership = None
+            blocks = [(slice(c0, c0 + block_cols), slice(None)) for c0 in range(0, closes.shape[1], block_cols)]
+
+        frames = {k: v for k, v in kwargs.items() if isinstance(v, pd.DataFrame)}
+        parts = [self.calculate(**{k: v.iloc[rows, cols] for k, v in frames.items()}) for cols, rows in blocks]
+        result = pd.concat(parts, axis=1)
+        # 按上市先后分块时列顺序被打乱、且只覆盖部分行，对齐回原始行列
+        return result if membership is None else result.reindex(index=closes.index, columns=closes.columns)
+
+    def requires(self) -> List['Intermediate']:
+        """
+        声明本因子依赖的中间量 (core.intermediates 中的节点)。
+        CustomStrategy 会在计算因子前统一规划，同一数据集上每个中间量只算一次。
+
+        示例:
+            def requires(self):
+                return [log_price('close')]
+        """
+        return []
+
 
 class Strategy(ABC):
     """策略基类：负责将因子值转化为持仓信号"""
 
+    # 生成权重需要的行情字段，None 表示未声明（入口脚本加载全部字段）
+    fields: Optional[Tuple[str, ...]] = None
+
     def __init__(self, name: str):
         self.name = name
 
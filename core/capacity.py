@@ -0,0 +1,116 @@
+"""
+策略容量分析 (Capacity / AUM Scaling)
+
+同一组目标权重在不同资金规模 (AUM) 下的表现：
+  - 参与率上限：单日单资产成交额不超过 max_participation × ADV，超出部分当天无法成交，
+    持仓逐日向目标靠拢（部分成交）
+  - 冲击成本：ParticipationImpact（平方根律）+ 固定费率，按各 AUM 的实际成交计算
+
+所有 AUM 档位放在同一个 (K, T, N) 数组里一次算完，不对每个 AUM 单独跑回测；
+部分成交是路径依赖的，只在时间轴上逐日递推（每步对 K × N 做向量运算）。
+
+收益口径与 RealWorldEngine 一致，并推广到部分成交后的分数持仓：
+    持有部分 min(w_t, w_{t-1}) 吃 daily，加仓部分吃 intraday，减仓部分吃 overnight。
+持仓为 0/1 时与引擎结果完全相同。
+"""
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils import logger, profiler
+from .costs import CostModel, FixedBps, ParticipationImpact
+from .engine import RealWorldEngine
+from .metrics import performance_stats, turnover
+from .returns import MarketReturns
+
+
+@dataclass
+class CapacityResult:
+    """
+    :param aum_levels: AUM 档位 (K,)
+    :param returns: 各档位的日收益，列为 AUM
+    :param stats: 各档位的绩效指标 + 容量指标（行为 AUM）
+    """
+    aum_levels: np.ndarray
+    returns: pd.DataFrame
+    stats: pd.DataFrame
+
+    def capacity(self, sharpe_retention: float = 0.5) -> Optional[float]:
+        """Sharpe 不低于最小档位 sharpe_retention 倍的最大 AUM；最小档位本身不满足时返回 None"""
+        sharpe = self.stats['Sharpe'].to_numpy()
+        ok = sharpe >= sharpe[0] * sharpe_retention if sharpe[0] > 0 else sharpe >= sharpe[0]
+        if not ok[0]:
+            return None
+        # 取第一个跌破阈值之前的档位
+        broken = np.flatnonzero(~ok)
+        last = broken[0] - 1 if len(broken) else len(ok) - 1
+        return float(self.aum_levels[last])
+
+
+def analyze_capacity(weights: pd.DataFrame, market: MarketReturns, aum_levels: Sequence[float],
+                     max_participation: float = 0.1,
+                     impact: Optional[ParticipationImpact] = None,
+                     base_cost: Optional[CostModel] = None) -> CapacityResult:
+    """
+    :param weights: 策略目标权重 (strategy.generate_target_weights 的结果)
+    :param market: MarketReturns（需包含 amount 字段）
+    :param aum_levels: AUM 档位（元），升序
+    :param max_participation: 单日成交额 / ADV 的上限；None 表示不限制
+    :param impact: 冲击模型，默认 ParticipationImpact()
+    :param base_cost: 与规模无关的成本，默认 FixedBps()
+    """
+    aum = np.sort(np.asarray(aum_levels, dtype=float))
+    impact = impact or ParticipationImpact()
+    cost_model = (base_cost or FixedBps()) + impact
+    logger.info(f"[Capacity] {len(aum)} AUM levels from {aum[0]:,.0f} to {aum[-1]:,.0f}, "
+                f"max_participation={max_participation}")
+
+    with profiler.span('capacity', rows=len(weights)):
+        target, row_idx = RealWorldEngine.positions(weights, market)
+        adv = market.cost_panels(impact)['adv'][row_idx]
+
+        # 1. 参与率上限 → 每个 AUM 的实际持仓 (K, T, N)
+        if max_participation is None:
+            held = np.broadcast_to(target, (len(aum),) + target.shape)
+        else:
+            limit = np.nan_to_num(max_participation * adv)[None] / aum[:, None, None]
+            held = _fill(target, limit)
+        prev = np.concatenate([np.zeros_like(held[:, :1]), held[:, :-1]], axis=1)
+
+        # 2. 收益 + 成本（冲击按实际成交额计算）
+        daily, intraday, overnight = market.daily[row_idx], market.intraday[row_idx], market.overnight[row_idx]
+        gross = np.nansum(np.minimum(held, prev) * daily
+                          + np.clip(held - prev, 0, None) * intraday
+                          + np.clip(prev - held, 0, None) * overnight, axis=-1)
+        engine = RealWorldEngine(cost_model)
+        trades = np.abs(held - prev)
+        net = gross - np.nansum(engine.cost_fn(market, row_idx, aum)(trades), axis=-1)
+
+    # 3. 指标
+    returns = pd.DataFrame(net.T, index=market.index[row_idx], columns=aum)
+    stats = performance_stats(returns, turnover=turnover(held))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        desired = np.abs(np.diff(target, axis=0, prepend=0)).sum()
+        participation = impact.participation(trades, {'adv': adv}, aum)
+        traded = trades > 0
+        stats['Fill Rate'] = trades.sum(axis=(1, 2)) / desired if desired > 0 else 1.0
+        stats['Avg Part.'] = np.nansum(np.where(traded, participation, 0), axis=(1, 2)) / traded.sum(axis=(1, 2))
+        stats['Max Part.'] = np.nanmax(np.where(traded, participation, np.nan), axis=(1, 2))
+    stats.index.name = 'AUM'
+    return CapacityResult(aum, returns, stats)
+
+
+def _fill(target: np.ndarray, limit: np.ndarray) -> np.ndarray:
+    """
+    部分成交递推：每天向目标持仓移动，单日变动不超过 limit（权重单位）。
+    target (T, N)，limit (K, T, N) → 实际持仓 (K, T, N)
+    """
+    n_levels, n_rows, n_cols = limit.shape
+    held = np.empty((n_levels, n_rows, n_cols))
+    current = np.zeros((n_levels, n_cols))
+    for t in range(n_rows):
+        current = current + np.clip(target[t] - current, -limit[:, t], limit[:, t])
+        held[:, t] = current
+    return held
@@ -0,0 +1,193 @@
+"""
+交易成本模型 (Cost Models)
+
+RealWorldEngine 在换仓日扣除成本：cost_{t,i} = f(|w_t,i - w_{t-1,i}|, 市场面板, AUM)，
+所有模型都以 (T, N) 面板一次性计算，支持 (..., T, N) 的批量权重（多组参数 / 多个 AUM 同时回测）。
+
+  - FixedBps:            固定费率（默认 config.TRANSACTION_COST）
+  - SpreadProxy:         用 high/low/close 估计买卖价差（Abdi & Ranaldo 2017），成本 = 换手 × 半价差
+  - ParticipationImpact: 平方根冲击模型，成本率 = coef × σ × (成交额 / 日均成交额)^exponent
+  - Composite:           多个模型相加，也可以直接写 FixedBps() + SpreadProxy()
+
+所有依赖行情的估计量都只用 T-1 日收盘前可得的数据（信号 T-1 收盘产生，T 日开盘成交）。
+缺失行情（停牌、未上市）对应的成本为 NaN，引擎按 nansum 忽略。
+
+用法:
+    engine = RealWorldEngine(cost_model=FixedBps(3) + ParticipationImpact(), aum=5e7)
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union, TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+import config
+
+if TYPE_CHECKING:
+    from .returns import MarketReturns
+
+Panels = Dict[str, np.ndarray]
+AumLike = Union[float, np.ndarray]
+
+
+class CostModel(ABC):
+    """
+    成本模型基类。
+
+    子类实现两步：
+      - panels(market): 只依赖行情的 (T, N) 估计量（价差、日均成交额、波动率…），
+                        在同一个 MarketReturns 上只计算一次（见 MarketReturns.cost_panels）
+      - cost(trades, panels, aum): 由换手面板得到成本面板（占组合净值的比例）
+    """
+
+    fields: Tuple[str, ...] = ()  # panels() 需要的行情字段
+
+    def panels(self, market: 'MarketReturns') -> Panels:
+        return {}
+
+    @abstractmethod
+    def cost(self, trades: np.ndarray, panels: Panels, aum: AumLike) -> np.ndarray:
+        """
+        :param trades: |w_t - w_{t-1}|，形状 (..., T, N)
+        :param panels: panels() 的结果，已按回测行对齐，形状 (T, N)
+        :param aum: 组合资金规模（元），标量或可与 trades 前导维度广播的数组
+        :return: 每个资产每天的成本（占净值比例），形状与 trades 一致
+        """
+        pass
+
+    def __add__(self, other: 'CostModel') -> 'Composite':
+        left = self.models if isinstance(self, Composite) else (self,)
+        right = other.models if isinstance(other, Composite) else (other,)
+        return Composite(left + right)
+
+
+@dataclass(frozen=True)
+class FixedBps(CostModel):
+    """
+    固定费率（佣金 + 印花税等），与成交规模无关。
+
+    :param bps: 单边费率（基点），默认取 config.TRANSACTION_COST
+    """
+    bps: Optional[float] = None
+
+    @property
+    def rate(self) -> float:
+        return getattr(config, 'TRANSACTION_COST', 0.0005) if self.bps is None else self.bps / 1e4
+
+    def cost(self, trades: np.ndarray, panels: Panels, aum: AumLike) -> np.ndarray:
+        return trades * self.rate
+
+
+@dataclass(frozen=True)
+class SpreadProxy(CostModel):
+    """
+    高低价差代理：Abdi & Ranaldo (2017) 的 close-high-low 估计量
+        η_t = (ln H_t + ln L_t) / 2,  c_t = ln C_t
+        s²  = 4 · mean[(c_{t-1} - η_{t-1}) · (c_{t-1} - η_t)]   （window 日滚动均值，负值截断为 0）
+    成本 = 换手 × s / 2（吃半个价差）。
+
+    :param window: 滚动估计窗口
+    :param min_periods: 窗口内最少有效样本数
+    """
+    window: int = 21
+    min_periods: int = 5
+    fields = ('high', 'low', 'close')
+
+    def panels(self, market: 'MarketReturns') -> Panels:
+        high, low, close = (market.field(f) for f in self.fields)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            eta = (np.log(high) + np.log(low)) / 2
+            c = np.log(close)
+        s2 = np.full_like(c, np.nan)
+        s2[1:] = 4 * (c[:-1] - eta[:-1]) * (c[:-1] - eta[1:])  # 第 t 行用到 t 日收盘为止的数据
+        s2 = pd.DataFrame(s2).rolling(self.window, min_periods=self.min_periods).mean().to_numpy()
+        spread = np.sqrt(np.clip(s2, 0, None))
+        # T-1 收盘可得 → 用于 T 日开盘成交
+        return {'half_spread': _shift(spread, 1) / 2}
+
+    def cost(self, trades: np.ndarray, panels: Panels, aum: AumLike) -> np.ndarray:
+        return trades * panels['half_spread']
+
+
+@dataclass(frozen=True)
+class ParticipationImpact(CostModel):
+    """
+    平方根冲击模型（参与率越高，冲击越大）：
+        participation = |Δw| × AUM / ADV
+        impact_rate   = coef × σ_daily × participation ^ exponent
+        cost          = |Δw| × impact_rate
+    ADV 为 adv_window 日平均成交额 (amount)，σ_daily 为 vol_window 日收盘收益标准差，均截至 T-1。
+    σ 只用两端都有收盘价、且在上市期间 (membership) 的收益估计，未上市 / 退市的空值不当作 0 收益参与计算。
+
+    :param coef: 冲击系数（经验值 0.5 ~ 1）
+    :param exponent: 参与率指数，0.5 为平方根律，1 为线性冲击
+    :param adv_window: 日均成交额窗口
+    :param vol_window: 波动率窗口
+    :param min_periods: 波动率窗口内最少有效收益数，不足时 σ 为 NaN（成本按缺失处理）
+    """
+    coef: float = 1.0
+    exponent: float = 0.5
+    adv_window: int = 20
+    vol_window: int = 20
+    min_periods: int = 10
+    fields = ('amount', 'close')
+
+    def panels(self, market: 'MarketReturns') -> Panels:
+        amount, close = (market.field(f) for f in self.fields)
+        adv = pd.DataFrame(amount).rolling(self.adv_window, min_periods=1).mean().to_numpy()
+        adv = np.where(adv > 0, adv, np.nan)
+        # market.daily 把缺失收益填成了 0，这里从未填充的收盘价重新计算
+        rets = np.full_like(close, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rets[1:] = close[1:] / close[:-1] - 1
+        if market.membership is not None:
+            # 只按上市区间截断：不在当日可选池 (eligible) 的代码价格仍然有效，卖出时也要估计冲击
+            rets[~market.membership.listed()] = np.nan
+        sigma = pd.DataFrame(rets).rolling(self.vol_window, min_periods=self.min_periods).std().to_numpy()
+        return {'adv': _shift(adv, 1), 'sigma': _shift(sigma, 1)}
+
+    def cost(self, trades: np.ndarray, panels: Panels, aum: AumLike) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            participation = trades * _expand(aum, trades) / panels['adv']
+            return trades * self.coef * panels['sigma'] * participation ** self.exponent
+
+    def participation(self, trades: np.ndarray, panels: Panels, aum: AumLike) -> np.ndarray:
+        """参与率面板 (成交额 / ADV)，容量分析用"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return trades * _expand(aum, trades) / panels['adv']
+
+
+@dataclass(frozen=True)
+class Composite(CostModel):
+    """多个成本模型相加"""
+    models: Tuple[CostModel, ...] = ()
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys(f for m in self.models for f in m.fields))
+
+    def panels(self, market: 'MarketReturns') -> Panels:
+        return {f"{i}.{k}": v for i, m in enumerate(self.models) for k, v in market.cost_panels(m).items()}
+
+    def cost(self, trades: np.ndarray, panels: Panels, aum: AumLike) -> np.ndarray:
+        total = np.zeros(trades.shape)
+        for i, m in enumerate(self.models):
+            prefix = f"{i}."
+            sub = {k[len(prefix):]: v for k, v in panels.items() if k.startswith(prefix)}
+            total = total + m.cost(trades, sub, aum)
+        return total
+
+
+def _shift(arr: np.ndarray, periods: int) -> np.ndarray:
+    out = np.full_like(arr, np.nan)
+    out[periods:] = arr[:-periods]
+    return out
+
+
+def _expand(aum: AumLike, trades: np.ndarray) -> AumLike:
+    """AUM 为一维数组时，补成 (K, 1, ..., 1) 以便与 (K, ..., T, N) 的 trades 广播"""
+    aum = np.asarray(aum, dtype=float)
+    if aum.ndim == 1 and trades.ndim > 2:
+        return aum.reshape((-1,) + (1,) * (trades.ndim - 1))
+    return aum
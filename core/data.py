@@ -1,72 +1,268 @@
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict
-from infra.repo import sync_latest_etf_data, read_data_range
-from utils import DataType, Klt, logger
+from typing import List, Dict, Mapping, Optional, Sequence, Union
+from infra.repo import (sync_latest_etf_data, sync_latest_stock_data, sync_latest_index_data,
+                        sync_latest_industry_data, read_data_range, find_trade_date)
+from utils import DataType, Klt, logger, profiler
 from utils.const import DATETIME, CODE
+from .panels import LazyPanels, PANEL_CACHE_SIZE
+from .universe import Universe, AllCodes, Membership
+
+# 不转成宽表的字段
+_SKIP_FIELDS = [DATETIME, CODE, 'name', 'preclose']
 
 
 class DataLoader:
-    def __init__(self, start_date: str, end_date: str, auto_sync: bool = False):
+    def __init__(self, start_date: str, end_date: str, auto_sync: bool = False,
+                 data_type: DataType = DataType.ETF,
+                 universe: Optional[Universe] = None,
+                 fields: Optional[Sequence[str]] = None,
+                 dtype: str = 'float64',
+                 workers: Optional[int] = None,
+                 point_in_time: bool = True,
+                 max_panels: int = PANEL_CACHE_SIZE):
+        """
+        :param data_type: 数据湖中的数据类型（ETF / 股票 / 指数 / 行业指数）
+        :param universe: 标的池（见 core.universe），默认 AllCodes：load() 未给出 symbols 时读取该类型全部代码
+        :param fields: 只加载这些字段 (e.g. ['open', 'close', 'amount'])，None 为全部字段
+        :param dtype: 宽表数值类型；大标的池可用 'float32' 使内存减半
+        :param workers: 并行读取 Parquet 的线程数（默认 ThreadPoolExecutor 的默认值）
+        :param point_in_time: 为 True 时按各代码首末存储日期生成 Membership（data_dict['membership']），
+                              前向填充不越过最后一个存储日期，退市后的位置保持 NaN；
+                              为 False 时与旧版一致：ffill 到样本末尾，不生成 Membership
+        :param max_panels: load() 结果中最多同时保留的宽表数（按字段 + 日期区间计，LRU 淘汰）
+        """
         self.start_date = datetime.strptime(start_date, "%Y-%m-%d")
         self.end_date = datetime.strptime(end_date, "%Y-%m-%d")
         self.auto_sync = auto_sync
+        self.data_type = data_type
+        self.universe = universe or AllCodes()
+        self.fields = [f.lower() for f in fields] if fields else None
+        self.dtype = np.dtype(dtype)
+        self.workers = workers
+        self.point_in_time = point_in_time
+        self.max_panels = max_panels
 
-    def load(self, symbols: List[str]) -> Dict[str, pd.DataFrame]:
+    def load(self, symbols: Optional[List[str]] = None) -> LazyPanels:
         """
-        加载数据并返回一个字典，包含所有可用的字段。
+        加载数据并返回字段名 → 宽表的映射 (core.panels.LazyPanels)，包含所有可用的字段，
+        point_in_time 时另有 'membership' → Membership。宽表在首次访问时才生成，用法与 dict 一致。
+
+        :param symbols: 代码列表；为空时由 universe 决定（默认数据湖中该类型的全部代码）
         """
+        with profiler.span('load'):
+            return self._load(symbols)
+
+    def _load(self, symbols: Optional[List[str]]) -> LazyPanels:
+        frames = self._read_frames(symbols)
+        if not frames:
+            error_msg = "No data found! Please check your data directory or run sync."
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+
+        # 3. 长表数值化 (Index=Date, Columns=Code)，宽表在字段首次被访问时才填充
+        with profiler.span('pivot', rows=sum(len(df) for df in frames.values())):
+            return self._to_panels(frames)
+
+    def _read_frames(self, symbols: Optional[List[str]]) -> Dict[str, pd.DataFrame]:
+        """同步（auto_sync 时）并读取各代码的长表，跳过没有数据的代码"""
+        symbols = self.universe.candidates(self.data_type, symbols)
+
         # 1. 自动同步
         if self.auto_sync:
             try:
                 logger.info(
                     f"[Data] Syncing data from {self.start_date.date()} to {self.end_date.date()} for {len(symbols)} symbols...")
-
-                # --- 修复：显式传递时间范围，确保同步该段历史数据 ---
-                sync_latest_etf_data(
-                    codes=symbols,
-                    include_tick=False,
-                    beg_date=self.start_date,
-                    end_date=self.end_date
-                )
-                # -----------------------------------------------
-
+                self._sync(symbols)
             except Exception as e:
                 logger.warning(f"[Data] Auto-sync failed: {e}")
 
-        # 2. 读取数据 (Long Format)
-        logger.info(f"[Data] Loading local parquet files...")
-        dfs = []
-        for sym in symbols:
-            try:
-                df = read_data_range(str(sym), self.start_date, self.end_date, DataType.ETF, Klt.DAY)
-                if not df.empty:
-                    dfs.append(df)
-            except Exception as e:
-                logger.warning(f"[Data] Failed to load {sym}: {e}")
+        # 2. 读取数据 (Long Format)：每个代码只读取需要的列，多线程并行
+        logger.info(f"[Data] Loading local parquet files ({self.data_type.dir_code}, {len(symbols)} symbols)...")
+        columns = None
+        if self.fields is not None:
+            columns = [DATETIME] + list(dict.fromkeys(self.fields + list(self.universe.fields)))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            frames = list(pool.map(lambda sym: self._read(str(sym), columns), symbols))
+        return {str(sym): df for sym, df in zip(symbols, frames) if df is not None and not df.empty}
 
-        if not dfs:
+    def _sync(self, symbols: List[str]) -> None:
+        if self.data_type == DataType.ETF:
+            # --- 修复：显式传递时间范围，确保同步该段历史数据 ---
+            sync_latest_etf_data(
+                codes=symbols,
+                include_tick=False,
+                beg_date=self.start_date,
+                end_date=self.end_date
+            )
+            # -----------------------------------------------
+        elif self.data_type == DataType.STOCK:
+            sync_latest_stock_data(codes=symbols, include_tick=False)
+        elif self.data_type == DataType.INDUSTRY_INDEX:
+            sync_latest_industry_data(codes=symbols, include_tick=False)
+        else:
+            sync_latest_index_data(include_tick=False)
+
+    def _read(self, sym: str, columns: Optional[List[str]]) -> Optional[pd.DataFrame]:
+        try:
+            return read_data_range(sym, self.start_date, self.end_date, self.data_type, Klt.DAY, columns)
+        except Exception as e:
+            logger.warning(f"[Data] Failed to load {sym}: {e}")
+            return None
+
+    def _to_panels(self, frames: Dict[str, pd.DataFrame], index: Optional[pd.DatetimeIndex] = None) -> LazyPanels:
+        """
+        各代码的长表 → 惰性宽表映射：只做一次行号定位与 dtype 转换，字段在首次访问时才 Pivot + ffill，
+        结果与 concat + pivot(index=datetime, columns=code) + sort_index().ffill() 一致。
+
+        :param index: 行索引（如 MultiAssetLoader 的主交易日历），默认全部代码存储日期的并集；
+                      不在 index 中的日期丢弃
+        """
+        codes = pd.Index(sorted(frames), name=CODE)
+        if index is None:
+            index = pd.DatetimeIndex(np.unique(np.concatenate([df[DATETIME].to_numpy() for df in frames.values()])),
+                                     name=DATETIME)
+        rows = {code: index.get_indexer(frames[code][DATETIME]) for code in codes}
+        dropped = 0
+        for code in codes:
+            off = rows[code] < 0
+            if off.any():
+                frames[code], rows[code] = frames[code][~off], rows[code][~off]
+                dropped += int(off.sum())
+        if dropped:
+            logger.warning(f"[Data] Dropped {dropped} {self.data_type.dir_code} rows not on the trading calendar")
+
+        # 自动发现除了 datetime 和 code 之外的所有列（保持原始列顺序）
+        first = next(iter(frames.values()))
+        feature_cols = [c for c in first.columns if c not in _SKIP_FIELDS]
+        if self.fields is not None:
+            feature_cols = [c for c in feature_cols if c.lower() in self.fields or c in self.universe.fields]
+        panels = LazyPanels.from_frames(index, codes, frames, rows, feature_cols, self.dtype, self.max_panels)
+
+        # 4. 标的池筛选（在未 ffill 的原始面板上进行），universe 需要但调用方没有请求的字段筛选后丢弃；
+        #    逐日可选掩码 (eligible) 随 Membership 生效，整个样本期都不可选的代码直接丢弃
+        raw = {f: panels.raw(f) for f in self.universe.fields if f in panels.values}
+        keep = self.universe.screen(raw, codes)
+        eligible = self.universe.eligibility(raw, codes)
+        del raw
+        if eligible is not None:
+            keep = keep & eligible.any(axis=0)
+            eligible = eligible[:, keep]
+        wanted = [c for c in panels.values if self.fields is None or c.lower() in self.fields]
+        panels = panels.select(keep, wanted)
+        # 将列名统一转为小写 (e.g. 'CLOSE' -> 'close')
+        panels.values = {c.lower(): v for c, v in panels.values.items()}
+
+        # 5. 逐日成分：首个到最后一个存储日期之间在池（point_in_time=False 时只带逐日可选掩码）
+        if self.point_in_time:
+            panels.membership = Membership.from_rows(index, panels.columns,
+                                                     [rows[code] for code in panels.columns], eligible)
+        elif eligible is not None:
+            panels.membership = Membership.full(index, panels.columns, eligible)
+        if panels.membership is not None:
+            logger.info(f"[Data] {panels.membership}")
+
+        logger.info(f"[Data] {len(panels.values)} fields available (Shape: ({len(index)}, {len(panels.columns)}), "
+                    f"dtype: {self.dtype}), pivoted on first access: {', '.join(panels.values)}")
+        return panels
+
+
+class MultiAssetLoader:
+    """
+    多个数据类型（ETF / 指数 / 行业指数 / 股票）合并为同一组对齐的宽表，例如用指数数据做 ETF 轮动的信号：
+
+        loader = MultiAssetLoader("2014-01-01", "2024-12-31", sources={
+            DataType.ETF: config.ETF_SYMBOLS,
+            DataType.INDEX: ['000300', '000905'],
+        })
+        data = loader.load()
+        signal = data['close'].loc[:, data.sources == DataType.INDEX]    # 每列的来源
+        etf = data.source(DataType.ETF)                                   # 只含 ETF 列，交给引擎回测
+
+    行索引是主交易日历 (trading_calendar)，只构建一次；各来源的每个代码只做一次
+    DatetimeIndex.get_indexer 得到行号数组，之后所有字段都按这组行号填充（不再逐字段 reindex + ffill）。
+    与前面来源重复的代码加上 '.{dir_code}' 后缀（如 sources 中 ETF 在前时，指数 000001 记为 000001.indexes）。
+    """
+
+    def __init__(self, start_date: str, end_date: str,
+                 sources: Mapping[DataType, Union[Sequence[str], Universe, None]],
+                 auto_sync: bool = False,
+                 fields: Optional[Sequence[str]] = None,
+                 dtype: str = 'float64',
+                 workers: Optional[int] = None,
+                 point_in_time: bool = True,
+                 max_panels: int = PANEL_CACHE_SIZE,
+                 calendar: Optional[pd.DatetimeIndex] = None):
+        """
+        :param sources: 数据类型 → 代码列表 / 标的池 (core.universe) / None（该类型的全部代码）
+        :param calendar: 主交易日历，默认 trading_calendar(start_date, end_date)
+        其余参数与 DataLoader 相同，对每个来源生效
+        """
+        if not sources:
+            raise ValueError("MultiAssetLoader requires at least one source.")
+        self.start_date = datetime.strptime(start_date, "%Y-%m-%d")
+        self.end_date = datetime.strptime(end_date, "%Y-%m-%d")
+        self.calendar = calendar
+        self.symbols: Dict[DataType, Optional[List[str]]] = {}
+        self.loaders: Dict[DataType, DataLoader] = {}
+        for data_type, spec in sources.items():
+            universe = spec if isinstance(spec, Universe) else None
+            self.symbols[data_type] = None if spec is None or universe is not None else [str(c) for c in spec]
+            self.loaders[data_type] = DataLoader(start_date, end_date, auto_sync, data_type, universe, fields,
+                                                 dtype, workers, point_in_time, max_panels)
+
+    def load(self) -> LazyPanels:
+        """
+        加载全部来源并按列拼接，返回 LazyPanels（sources 为每列的 DataType）。
+        """
+        with profiler.span('load'):
+            return self._load()
+
+    def _load(self) -> LazyPanels:
+        frames = {}
+        for data_type, loader in self.loaders.items():
+            frames[data_type] = loader._read_frames(self.symbols[data_type])
+            if not frames[data_type]:
+                logger.warning(f"[Data] No {data_type.dir_code} data found, skipped.")
+        frames = {data_type: f for data_type, f in frames.items() if f}
+        if not frames:
             error_msg = "No data found! Please check your data directory or run sync."
             logger.error(error_msg)
             raise ValueError(error_msg)
 
-        all_data = pd.concat(dfs, ignore_index=True)
+        index = self._master_index(frames)
+        with profiler.span('pivot', rows=sum(len(df) for f in frames.values() for df in f.values())):
+            parts = [self.loaders[data_type]._to_panels(f, index) for data_type, f in frames.items()]
+            data = LazyPanels.concat(parts, list(frames))
 
-        # 3. 动态转换为宽表 (Pivot)
-        # 自动发现除了 datetime 和 code 之外的所有列
-        feature_cols = [c for c in all_data.columns if c not in [DATETIME, CODE, 'name', 'preclose']]
+        counts = ', '.join(f"{data_type.dir_code}={len(part.columns)}" for data_type, part in zip(frames, parts))
+        logger.info(f"[Data] Aligned {len(data.columns)} columns ({counts}) on {len(index)} trading days")
+        return data
 
-        data_dict = {}
-        for col in feature_cols:
-            try:
-                # Pivot: Index=Date, Columns=Code, Values=Col
-                wide_df = all_data.pivot(index=DATETIME, columns=CODE, values=col)
-                wide_df = wide_df.sort_index().ffill()
+    def _master_index(self, frames: Dict[DataType, Dict[str, pd.DataFrame]]) -> pd.DatetimeIndex:
+        """主交易日历，截到全部来源存储日期的首末之间（样本末尾没有任何数据的交易日不生成空行）"""
+        stored = [df[DATETIME].to_numpy() for f in frames.values() for df in f.values()]
+        first = min(d.min() for d in stored)
+        last = max(d.max() for d in stored)
+        calendar = self.calendar if self.calendar is not None else trading_calendar(self.start_date, self.end_date)
+        if calendar is None:
+            # 取不到交易日历时退回到各来源存储日期的并集
+            logger.warning("[Data] Trading calendar unavailable, using the union of stored dates.")
+            return pd.DatetimeIndex(np.unique(np.concatenate(stored)), name=DATETIME)
+        calendar = pd.DatetimeIndex(calendar)
+        return pd.DatetimeIndex(calendar[(calendar >= first) & (calendar <= last)], name=DATETIME)
 
-                # 将列名统一转为小写 (e.g. 'CLOSE' -> 'close')
-                data_dict[col.lower()] = wide_df
-                logger.info(f"[Data] Processed field: {col.lower()} (Shape: {wide_df.shape})")
-            except Exception as e:
-                logger.warning(f"[Data] Failed to pivot column {col}: {e}")
 
-        return data_dict
\ No newline at end of file
+def trading_calendar(start_date: datetime, end_date: datetime) -> Optional[pd.DatetimeIndex]:
+    """
+    (start_date, end_date] 内的交易日，取自 infra.repo.find_trade_date（新浪交易日历，响应缓存可离线回放）。
+    获取失败时返回 None。
+    """
+    try:
+        dates = pd.DatetimeIndex(pd.to_datetime(find_trade_date()['trade_date']))
+    except Exception as e:
+        logger.warning(f"[Data] Failed to fetch trading calendar: {e}")
+        return None
+    return pd.DatetimeIndex(dates[(dates > start_date) & (dates <= end_date)], name=DATETIME)
@@ -1,8 +1,13 @@
+from typing import Callable, List, Optional, Sequence, Union
+
+import numpy as np
 import pandas as pd
 
 import config
-from utils import logger
+from utils import logger, profiler
 from .base import Strategy
+from .costs import CostModel, FixedBps
+from .returns import MarketReturns
 
 
 class RealWorldEngine:
@@ -14,41 +19,157 @@ class RealWorldEngine:
     - 持仓日 (Hold): close_t / close_{t-1} - 1   （吃满全天）
     - 买入日 (Buy):  (close - open) / open        （只吃日内，跳空不参与）
     - 卖出日 (Sell): open / prev_close - 1        （只吃隔夜，开盘即卖）
+
+    三种收益面板来自 MarketReturns：多策略回测时传入同一个 market，
+    引擎每次调用只需计算持仓逻辑。
+    market 带有 Membership 时，不在池（未上市 / 已退市）的代码持仓强制为 0：退市后第一天按卖出处理。
+
+    交易成本由 cost_model 计算（见 core.costs），默认 FixedBps() 即 config.TRANSACTION_COST。
     """
 
-    def run(self, strategy: Strategy, **data_dict) -> pd.Series:
+    def __init__(self, cost_model: Optional[CostModel] = None, aum: Optional[float] = None):
+        """
+        :param cost_model: 成本模型，e.g. FixedBps() + SpreadProxy() + ParticipationImpact()
+        :param aum: 资金规模（元），冲击成本用，默认 config.AUM
+        """
+        self.cost_model = cost_model or FixedBps()
+        self.aum = aum if aum is not None else getattr(config, 'AUM', 1_000_000)
+
+    def fields(self, *strategies: Strategy) -> Optional[List[str]]:
+        """
+        回测这些策略需要加载的行情字段（传给 DataLoader(fields=...)，未用到的字段不读取也不 Pivot）：
+        收益面板的 open / close + 成本模型 + 各策略声明的字段。任一策略未声明 fields 时返回 None（全部字段）。
+        """
+        if any(strategy.fields is None for strategy in strategies):
+            return None
+        return list(dict.fromkeys(['open', 'close', *self.cost_model.fields,
+                                   *(f for strategy in strategies for f in strategy.fields)]))
+
+    def run(self, strategy: Strategy, market: Optional[MarketReturns] = None, **data_dict) -> pd.Series:
         logger.info(f"Running strategy: {strategy.name} ...")
+        with profiler.span(f"engine.{strategy.name}", rows=len(data_dict.get('close', ()))):
+            return self._run(strategy, market, **data_dict)
 
+    def _run(self, strategy: Strategy, market: Optional[MarketReturns], **data_dict) -> pd.Series:
         if 'open' not in data_dict or 'close' not in data_dict:
             raise ValueError("RealWorldEngine requires both 'open' and 'close' price data.")
 
-        opens  = data_dict['open']
-        closes = data_dict['close']
+        if market is not None and not market.binds(data_dict):
+            # data_dict 是 market 数据的连续窗口 (PanelWindow) 时直接用收益面板的切片视图
+            market = market.window(data_dict)
+        if market is None:
+            market = MarketReturns.from_data(data_dict, data_dict.get('intermediates'))
+
+        # 相位集成：各相位子组合一次批量回测，组合收益为子组合收益的等权均值
+        # （子组合各自持有 0/1 仓位；均值权重是分数，不能直接交给 0/1 持仓逻辑）
+        if getattr(strategy, 'phase_ensemble', False):
+            with profiler.span('strategy'):
+                raw = strategy.generate_raw_weights(**data_dict)
+                phases = strategy.phase_weights(raw)
+            rets = self.run_weights_batch(phases, market, index=raw.index, columns=raw.columns)
+            return rets.mean(axis=1, skipna=False)
 
         # 1. T 日信号 → T+1 持仓
-        weights       = strategy.generate_target_weights(**data_dict)
-        positions     = weights.shift(1).fillna(0)
-        prev_positions = positions.shift(1).fillna(0)
+        with profiler.span('strategy'):
+            weights = strategy.generate_target_weights(**data_dict)
 
-        # 2. 三种持仓状态的收益
-        base_daily_rets = closes.pct_change().fillna(0)
-        intraday_rets   = (closes - opens) / opens
-        overnight_rets  = (opens / closes.shift(1) - 1).fillna(0)
+        return self.run_weights(weights, market)
 
-        mask_hold = (positions == 1) & (prev_positions == 1)
-        mask_buy  = (positions == 1) & (prev_positions == 0)
-        mask_sell = (positions == 0) & (prev_positions == 1)
+    def run_weights(self, weights: pd.DataFrame, market: MarketReturns) -> pd.Series:
+        """
+        在已有目标权重上回测（不再调用策略）。
+        weights 的行可以少于 market（如逻辑函数 dropna 掉预热期），缺失日期的收益为 NaN。
+        """
+        pos, row_idx = self.positions(weights, market)
+        prev = np.vstack([np.zeros((1, pos.shape[1])), pos[:-1]])
 
-        total_ret = pd.DataFrame(0.0, index=closes.index, columns=closes.columns)
-        total_ret[mask_hold] = base_daily_rets[mask_hold]
-        total_ret[mask_buy]  = intraday_rets[mask_buy]
-        total_ret[mask_sell] = overnight_rets[mask_sell]
+        # 2. 三种持仓状态的收益 + 3. 扣除交易成本（仅在换仓日）
+        rets = _simulate(pos, prev, market.daily[row_idx], market.intraday[row_idx],
+                         market.overnight[row_idx], self.cost_fn(market, row_idx))
 
-        strategy_rets = total_ret.sum(axis=1)
+        strategy_rets = pd.Series(np.nan, index=market.index)
+        strategy_rets.iloc[row_idx] = rets
+        return strategy_rets
 
-        # 3. 扣除交易成本（仅在换仓日）
-        cost     = getattr(config, 'TRANSACTION_COST', 0.0005)
-        turnover = (positions - prev_positions).abs()
-        strategy_rets -= (turnover * cost).sum(axis=1)
+    def run_weights_batch(self, weights: Union[Sequence[pd.DataFrame], np.ndarray], market: MarketReturns,
+                          index: Optional[pd.Index] = None, columns: Optional[pd.Index] = None) -> pd.DataFrame:
+        """
+        多组目标权重（行列必须相同，如同一策略的不同调仓相位）一次性回测。
+        持仓堆叠为 (K, T, N) 交给 _simulate，返回 (T, K) 的收益宽表，列号对应 weights 的顺序。
 
-        return strategy_rets
+        :param weights: DataFrame 列表，或 (K, T, N) 数组（此时需给出 index / columns）
+        """
+        if isinstance(weights, np.ndarray):
+            if index is None or columns is None:
+                raise ValueError("index and columns are required when weights is an ndarray.")
+            stacked = weights
+        else:
+            if not weights:
+                raise ValueError("run_weights_batch requires at least one weights frame.")
+            index, columns = weights[0].index, weights[0].columns
+            if any(not (w.index.equals(index) and w.columns.equals(columns)) for w in weights[1:]):
+                raise ValueError("All weights passed to run_weights_batch must share the same index and columns.")
+            stacked = np.stack([w.to_numpy(dtype=float) for w in weights])
+
+        pos, row_idx = _positions(stacked, index, columns, market)
+        prev = np.concatenate([np.zeros_like(pos[:, :1]), pos[:, :-1]], axis=1)
+
+        rets = _simulate(pos, prev, market.daily[row_idx], market.intraday[row_idx],
+                         market.overnight[row_idx], self.cost_fn(market, row_idx))
+
+        out = np.full((len(market), len(pos)), np.nan)
+        out[row_idx] = rets.T
+        return pd.DataFrame(out, index=market.index)
+
+    @staticmethod
+    def positions(weights: pd.DataFrame, market: MarketReturns):
+        """
+        T 日目标权重 → T+1 实际持仓 (T, N) ndarray，列与 market 对齐；
+        同时返回每行在 market 中的行号 row_idx。
+        """
+        return _positions(weights.to_numpy(dtype=float), weights.index, weights.columns, market)
+
+    def cost_fn(self, market: MarketReturns, row_idx: np.ndarray,
+                aum=None) -> Callable[[np.ndarray], np.ndarray]:
+        """把成本模型绑定到回测行上：trades (..., T, N) → 成本 (..., T, N)"""
+        panels = {k: v[row_idx] for k, v in market.cost_panels(self.cost_model).items()}
+        aum = self.aum if aum is None else aum
+        return lambda trades: self.cost_model.cost(trades, panels, aum)
+
+
+def _positions(weights: np.ndarray, index: pd.Index, columns: pd.Index, market: MarketReturns):
+    """
+    (..., T, N) 目标权重 → 下移一天并对齐 market 列的持仓（缺失为 0），以及行号 row_idx。
+    不在 market 中的列丢弃，market 中多出的列持仓为 0（与 DataFrame.reindex 一致）。
+    持仓日不在 market.membership 中的代码持仓为 0。
+    """
+    row_idx = market.index.get_indexer(index)
+    if (row_idx < 0).any():
+        raise ValueError("Strategy weights contain dates that are not in the market data.")
+
+    shifted = np.zeros(weights.shape[:-1] + (len(market.columns),))
+    col_idx = market.columns.get_indexer(columns)
+    keep = col_idx >= 0
+    shifted[..., 1:, col_idx[keep]] = np.nan_to_num(weights[..., :-1, :][..., keep])
+    if market.membership is not None:
+        shifted = np.where(market.membership.mask(row_idx), shifted, 0.0)
+    return shifted, row_idx
+
+
+def _simulate(pos: np.ndarray, prev: np.ndarray,
+              daily: np.ndarray, intraday: np.ndarray, overnight: np.ndarray,
+              cost_fn: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """
+    持仓逻辑核心：输入 (..., T, N) 的当日/昨日持仓与 (T, N) 收益面板，返回 (..., T) 的组合日收益。
+    cost_fn 把换手面板 |pos - prev| 映射为成本面板（见 RealWorldEngine.cost_fn）。
+    """
+    mask_hold = (pos == 1) & (prev == 1)
+    mask_buy  = (pos == 1) & (prev == 0)
+    mask_sell = (pos == 0) & (prev == 1)
+
+    total_ret = np.where(mask_hold, daily, 0.0)
+    total_ret = np.where(mask_buy, intraday, total_ret)
+    total_ret = np.where(mask_sell, overnight, total_ret)
+
+    turnover = np.abs(pos - prev)
+    return np.nansum(total_ret, axis=-1) - np.nansum(cost_fn(turnover), axis=-1)
@@ -0,0 +1,201 @@
+"""
+因子中间结果依赖图 (Intermediate DAG)
+
+多个因子/逻辑函数经常重复计算同样的中间量，例如：
+  - Volatility 与 MainLineBias 都要 np.log(close)
+  - MeanReversion 与 logic_factor_rotation 的 timing_period 都要 close.rolling(w).mean()
+  - Momentum 与基准收益都要 pct_change
+
+这里把中间量描述为不可变的节点 (Intermediate)，节点之间通过 source 形成 DAG：
+    rolling_std(20, log_returns('close'))  →  diff(log('close'))  →  字段 'close'
+
+IntermediateStore 绑定一份数据集，每个节点在该数据集上只计算一次，
+因子通过 Factor.requires() 声明依赖，CustomStrategy 在调用因子之前统一规划并计算。
+因子面板本身也按 (因子类型, 参数) 缓存：参数网格中窗口相同的候选共享同一份因子值。
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterable, List, Mapping, Optional, Union, TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from utils import logger, profiler
+
+if TYPE_CHECKING:
+    from .base import Factor
+
+
+@dataclass(frozen=True)
+class Intermediate:
+    """
+    中间量节点。
+
+    :param op: 运算名，见 _OPS
+    :param source: 上游字段名 (e.g. 'close') 或上游节点
+    :param window: 窗口/周期参数
+    """
+    op: str
+    source: Union[str, 'Intermediate']
+    window: int = 1
+
+    @property
+    def deps(self) -> tuple:
+        return (self.source,) if isinstance(self.source, Intermediate) else ()
+
+    def __str__(self) -> str:
+        return f"{self.op}({self.source}, {self.window})" if self.window != 1 else f"{self.op}({self.source})"
+
+
+_OPS: Dict[str, Callable[[pd.DataFrame, int], pd.DataFrame]] = {
+    'log':          lambda x, w: np.log(x),
+    'pct_change':   lambda x, w: x.pct_change(w),
+    'diff':         lambda x, w: x.diff(w),
+    'rolling_mean': lambda x, w: x.rolling(w).mean(),
+    'rolling_std':  lambda x, w: x.rolling(w).std(),
+    'rolling_max':  lambda x, w: x.rolling(w).max(),
+    'rolling_min':  lambda x, w: x.rolling(w).min(),
+}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 节点构造函数
+# ─────────────────────────────────────────────────────────────────────────────
+
+def log_price(field: str = 'close') -> Intermediate:
+    """ln(field)"""
+    return Intermediate('log', field)
+
+
+def returns(periods: int = 1, field: str = 'close') -> Intermediate:
+    """field.pct_change(periods)"""
+    return Intermediate('pct_change', field, periods)
+
+
+def log_returns(field: str = 'close') -> Intermediate:
+    """ln(field_t) - ln(field_{t-1})"""
+    return Intermediate('diff', log_price(field), 1)
+
+
+def rolling_mean(window: int, source: Union[str, Intermediate] = 'close') -> Intermediate:
+    return Intermediate('rolling_mean', source, window)
+
+
+def rolling_std(window: int, source: Union[str, Intermediate] = 'close') -> Intermediate:
+    return Intermediate('rolling_std', source, window)
+
+
+def rolling_max(window: int, source: Union[str, Intermediate] = 'close') -> Intermediate:
+    return Intermediate('rolling_max', source, window)
+
+
+def rolling_min(window: int, source: Union[str, Intermediate] = 'close') -> Intermediate:
+    return Intermediate('rolling_min', source, window)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 规划与计算
+# ─────────────────────────────────────────────────────────────────────────────
+
+def plan(nodes: Iterable[Intermediate]) -> List[Intermediate]:
+    """去重并按拓扑序排列（上游在前）"""
+    ordered: List[Intermediate] = []
+    seen = set()
+
+    def visit(node: Intermediate):
+        if node in seen:
+            return
+        for dep in node.deps:
+            visit(dep)
+        seen.add(node)
+        ordered.append(node)
+
+    for node in nodes:
+        visit(node)
+    return ordered
+
+
+class IntermediateStore:
+    """
+    绑定一份数据集 (字段名 → 宽表) 的中间量缓存。
+
+    同一个 store 可以在多个策略之间共享，前提是它们使用同一份数据：
+        store = IntermediateStore(data_dict)
+        engine.run(strategy, intermediates=store, **data_dict)
+    """
+
+    def __init__(self, data: Mapping[str, pd.DataFrame]):
+        self.data = data
+        self._cache: Dict[Intermediate, pd.DataFrame] = {}
+        self._factors: Dict[Hashable, pd.DataFrame] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def ensure(cls, store: Optional['IntermediateStore'], **fields) -> 'IntermediateStore':
+        """
+        因子/逻辑函数内部使用：有共享 store 就用共享的，
+        否则基于当前传入的字段临时建一个（单独调用 calculate 时）。
+        """
+        return store if store is not None else cls(fields)
+
+    def binds(self, data: Mapping[str, pd.DataFrame]) -> bool:
+        """判断 store 是否绑定在同一份数据上（以 close 宽表的对象身份判断）"""
+        return self.data.get('close') is data.get('close')
+
+    def __contains__(self, node: Intermediate) -> bool:
+        return node in self._cache
+
+    def get(self, node: Intermediate) -> pd.DataFrame:
+        """返回节点结果（同一 store 内共享同一对象，调用方不要原地修改）"""
+        cached = self._cache.get(node)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        source = self.get(node.source) if isinstance(node.source, Intermediate) else self._field(node.source)
+        with profiler.span(f"intermediate.{node.op}"):
+            value = _OPS[node.op](source, node.window)
+        self._cache[node] = value
+        return value
+
+    def factor(self, factor: 'Factor', compute: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        因子面板缓存：类型与参数 (实例属性) 都相同的因子在同一 store 上只计算一次。
+        参数不可哈希的因子不缓存，每次直接调用 compute。
+        """
+        key = _factor_key(factor)
+        if key is None:
+            return compute()
+        cached = self._factors.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        value = compute()
+        self._factors[key] = value
+        return value
+
+    def compute(self, nodes: Iterable[Intermediate]) -> None:
+        """按拓扑序一次性计算所有声明的节点（已缓存的跳过）"""
+        for node in plan(nodes):
+            self.get(node)
+
+    def _field(self, name: str) -> pd.DataFrame:
+        if name not in self.data:
+            raise KeyError(f"Intermediate requires field '{name}', which is not in the dataset.")
+        return self.data[name]
+
+    def log_stats(self) -> None:
+        logger.info(f"[Intermediates] {len(self._cache)} nodes + {len(self._factors)} factors cached, "
+                    f"hits={self.hits}, misses={self.misses}")
+
+
+def _factor_key(factor: 'Factor') -> Optional[Hashable]:
+    key = (type(factor), tuple(sorted(vars(factor).items())))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
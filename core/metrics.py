@@ -0,0 +1,168 @@
+"""
+向量化绩效指标 (Performance Metrics)
+
+一次性计算多条日收益序列的指标：每条序列是矩阵的一列，所有指标都是沿时间轴的 NumPy 归约，
+不再对每个窗口 / 每个策略逐个调用 QuantStats（QuantStats 只在生成 HTML 研报时按需导入）。
+
+口径与 quantstats.stats 保持一致（periods=252，rf=0）：
+  - Total Ret:  prod(1 + r) - 1
+  - CAGR:       |1 + Total Ret| ^ (periods / 样本天数) - 1
+  - Sharpe:     mean(r) / std(r, ddof=1) * sqrt(periods)
+  - Sortino:    mean(r) / sqrt(sum(r[r<0]^2) / 样本天数) * sqrt(periods)
+  - Max DD:     净值（起点补 1）相对历史最高点的最大回撤
+  - Calmar:     CAGR / |Max DD|
+  - Win Rate:   r > 0 的天数 / 样本天数（沿用本项目 WFA 的口径，空仓日计入分母）
+  - Turnover:   年化双边换手 mean(sum|w_t - w_{t-1}|) * periods（需要权重，见 turnover()）
+
+NaN 收益按 0 处理（与 QuantStats 的 _prepare_returns 相同）。
+长度不同的序列（如 WFA 各测试期）可以传入 list / dict，内部按 0 补齐并记录各自的样本天数，
+补齐部分不影响任何指标。
+"""
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+PERIODS_PER_YEAR = 252
+
+METRICS = ['Total Ret', 'CAGR', 'Sharpe', 'Sortino', 'Max DD', 'Calmar', 'Win Rate']
+PCT_METRICS = ['Total Ret', 'CAGR', 'Max DD', 'Win Rate']
+
+ReturnsLike = Union[pd.Series, pd.DataFrame, np.ndarray,
+                    Mapping[str, pd.Series], Sequence[pd.Series]]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 矩阵级指标：R 为 (T, K) 且已无 NaN，n 为每列的样本天数 (K,)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def total_return(R: np.ndarray) -> np.ndarray:
+    return np.prod(1.0 + R, axis=0) - 1.0
+
+
+def cagr(R: np.ndarray, n: np.ndarray, periods: int = PERIODS_PER_YEAR) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.abs(total_return(R) + 1.0) ** (periods / n) - 1.0
+
+
+def _mean(R: np.ndarray, n: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return R.sum(axis=0) / n
+
+
+def sharpe(R: np.ndarray, n: np.ndarray, periods: int = PERIODS_PER_YEAR) -> np.ndarray:
+    mean = _mean(R, n)
+    # 补齐的 0 不属于样本：只对前 n 行去均值
+    valid = np.arange(len(R))[:, None] < n
+    with np.errstate(divide='ignore', invalid='ignore'):
+        var = np.where(valid, (R - mean) ** 2, 0.0).sum(axis=0) / (n - 1)
+        return mean / np.sqrt(var) * np.sqrt(periods)
+
+
+def sortino(R: np.ndarray, n: np.ndarray, periods: int = PERIODS_PER_YEAR) -> np.ndarray:
+    downside = np.sqrt(np.where(R < 0, R ** 2, 0.0).sum(axis=0) / n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(downside == 0, np.nan, _mean(R, n) / downside * np.sqrt(periods))
+
+
+def max_drawdown(R: np.ndarray) -> np.ndarray:
+    if len(R) == 0:
+        return np.zeros(R.shape[1])
+    equity = np.cumprod(1.0 + R, axis=0)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=0), 1.0)  # 起点净值 1 作为初始高点
+    return np.minimum((equity / peak).min(axis=0), 1.0) - 1.0
+
+
+def calmar(R: np.ndarray, n: np.ndarray, periods: int = PERIODS_PER_YEAR) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cagr(R, n, periods) / np.abs(max_drawdown(R))
+
+
+def win_rate(R: np.ndarray, n: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (R > 0).sum(axis=0) / n
+
+
+def turnover(weights: Union[pd.DataFrame, np.ndarray], periods: int = PERIODS_PER_YEAR) -> Union[float, np.ndarray]:
+    """
+    年化双边换手率。
+
+    :param weights: 目标权重 (T, N) 宽表，或批量 (..., T, N) 数组
+    :return: 标量（二维输入）或 (...,) 数组
+    """
+    w = np.nan_to_num(np.asarray(weights, dtype=float))
+    if w.shape[-2] == 0:
+        return np.zeros(w.shape[:-2]) if w.ndim > 2 else 0.0
+    prev = np.concatenate([np.zeros_like(w[..., :1, :]), w[..., :-1, :]], axis=-2)
+    daily = np.abs(w - prev).sum(axis=-1)
+    result = daily.mean(axis=-1) * periods
+    return float(result) if np.ndim(result) == 0 else result
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 表格接口
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _to_matrix(returns: ReturnsLike):
+    """统一转成 (R, n, names)：R 为补齐后的 (T, K) 矩阵，n 为每列样本天数"""
+    if isinstance(returns, pd.Series):
+        series = {returns.name: returns}
+    elif isinstance(returns, pd.DataFrame):
+        R = np.nan_to_num(returns.to_numpy(dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+        return R, np.full(R.shape[1], len(R), dtype=float), list(returns.columns)
+    elif isinstance(returns, np.ndarray):
+        arr = returns.reshape(-1, 1) if returns.ndim == 1 else returns
+        R = np.nan_to_num(arr.astype(float), nan=0.0, posinf=0.0, neginf=0.0)
+        return R, np.full(R.shape[1], len(R), dtype=float), list(range(R.shape[1]))
+    elif isinstance(returns, Mapping):
+        series = dict(returns)
+    else:
+        series = {i: s for i, s in enumerate(returns)}
+
+    lengths = np.array([len(s) for s in series.values()], dtype=float)
+    R = np.zeros((int(lengths.max()) if len(lengths) else 0, len(series)))
+    for j, s in enumerate(series.values()):
+        R[:len(s), j] = np.nan_to_num(np.asarray(s, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+    return R, lengths, list(series.keys())
+
+
+def performance_stats(returns: ReturnsLike, periods: int = PERIODS_PER_YEAR,
+                      turnover: Optional[Union[Iterable[float], Dict]] = None) -> Union[pd.Series, pd.DataFrame]:
+    """
+    计算 METRICS 中的全部指标。
+
+    :param returns: 单条 Series → 返回 Series（指标名为索引）；
+                    DataFrame / 二维数组 / list / dict → 返回 DataFrame（每条序列一行，指标为列）
+    :param periods: 年化周期数
+    :param turnover: 可选，每条序列的换手率（与序列顺序一致，或以序列名为键的 dict），追加为 'Turnover' 列
+    """
+    R, n, names = _to_matrix(returns)
+    table = pd.DataFrame({
+        'Total Ret': total_return(R),
+        'CAGR':      cagr(R, n, periods),
+        'Sharpe':    sharpe(R, n, periods),
+        'Sortino':   sortino(R, n, periods),
+        'Max DD':    max_drawdown(R),
+        'Calmar':    calmar(R, n, periods),
+        'Win Rate':  win_rate(R, n),
+    }, index=names)
+
+    if turnover is not None:
+        table['Turnover'] = [turnover[k] for k in names] if isinstance(turnover, dict) else list(turnover)
+
+    if isinstance(returns, pd.Series):
+        return table.iloc[0].rename(returns.name)
+    return table
+
+
+def format_stats(table: pd.DataFrame) -> pd.DataFrame:
+    """转成打印用的字符串表：收益类指标显示为百分比，比率保留两位小数"""
+    disp = table.copy().astype(object)
+    for col in table.columns:
+        if col in PCT_METRICS:
+            disp[col] = table[col].map('{:.2%}'.format)
+        elif pd.api.types.is_float_dtype(table[col]):
+            disp[col] = table[col].map('{:.2f}'.format)
+        else:
+            disp[col] = table[col].map(str)
+    return disp
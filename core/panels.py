@@ -0,0 +1,324 @@
+"""
+惰性宽表 (Lazy Panels)
+
+DataLoader.load() 以前对每个非键字段都立即 Pivot + ffill（包括 ETF 上全为 NaN 的 pe_ttm / pb_ttm）。
+这里只保存各字段的长表数值（每个存储的 (日期, 代码) 一个值，与行号 / 列号数组对应），
+字段第一次被访问时才填充 (T, N) 宽表并前向填充，结果放在按 (字段, 行区间) 为键的有界 LRU 中：
+  - data['close'] / data.get('close') / **data 解包与原来的 dict 用法一致
+  - data.panel('close', start, end) 只填充该日期区间（区间开头沿用之前最后一个有效值，与全量 ffill 后切片一致）
+  - 'in' / keys() 不触发 Pivot；同一字段在淘汰前返回同一对象（IntermediateStore 以 close 的对象身份判断绑定）
+
+    data = loader.load(symbols)       # LazyPanels，此时还没有任何宽表
+    closes = data['close']            # 只 Pivot close
+
+PanelWindow 是任意宽表映射（LazyPanels / dict / 共享内存挂载的 data）在行区间 [start, stop) 上的视图：
+只记录起止行号，宽表按行切片共享底层数组，不复制；可以直接 **window 传给因子、逻辑函数与 RealWorldEngine。
+
+    window = PanelWindow.between(data, '2023-01-01')          # 按日期
+    window = PanelWindow(data, -250)                          # 按行号（最后 250 行）
+    rets = engine.run(strategy, market=market.slice(window.start, window.stop), **window)
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from utils import logger
+from utils.const import CODE
+from .universe import Membership
+
+PANEL_CACHE_SIZE = getattr(config, 'PANEL_CACHE_SIZE', 16)
+
+
+class LazyPanels(Mapping):
+    """
+    字段 → 宽表的只读映射，宽表在首次访问时生成。
+
+    :param index: 日期索引（全部代码存储日期的并集）
+    :param columns: 代码
+    :param rows: 每个长表值所在的行号（按列号、行号升序排列）
+    :param cols: 每个长表值所在的列号
+    :param values: 字段 → 与 rows / cols 对齐的一维数值数组
+    :param membership: 逐日成分；给出时前向填充不越过各代码最后一个存储日期，并作为 'membership' 键返回
+    :param max_panels: LRU 最多保留的宽表数（不同日期区间分别计数）
+
+    多个数据类型拼接 (concat) 后，sources 记录每列的来源（列标签 → 标记，如 DataType.INDEX），
+    source(tag) 取出某个来源的列。
+    """
+
+    def __init__(self, index: pd.DatetimeIndex, columns: pd.Index, rows: np.ndarray, cols: np.ndarray,
+                 values: Dict[str, np.ndarray], membership: Optional[Membership] = None,
+                 max_panels: int = PANEL_CACHE_SIZE):
+        self.index = index
+        self.columns = columns
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+        self.membership = membership
+        self.max_panels = max(int(max_panels), 1)
+        self.sources: Optional[pd.Series] = None
+        self._panels: 'OrderedDict[Tuple[str, int, int], pd.DataFrame]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_frames(cls, index: pd.DatetimeIndex, columns: pd.Index, frames: Mapping[str, pd.DataFrame],
+                    rows: Mapping[str, np.ndarray], fields, dtype: np.dtype,
+                    max_panels: int = PANEL_CACHE_SIZE) -> 'LazyPanels':
+        """
+        各代码的长表 → 长表数值数组（每个字段只做一次 dtype 转换，不分配宽表）。
+
+        :param frames: 代码 → 长表
+        :param rows: 代码 → 该长表各行在 index 中的行号
+        :param fields: 需要的字段（原始列名）；无法转为 dtype 的字段记录警告后跳过
+        """
+        codes = list(columns)
+        row_idx = np.concatenate([rows[code] for code in codes]).astype(np.int32)
+        col_idx = np.repeat(np.arange(len(codes), dtype=np.int32), [len(rows[code]) for code in codes])
+        # 长表一般已按日期升序；否则整体排成 (列号, 行号) 升序，区间开头的沿用值依赖这个顺序
+        order = None
+        if np.any((np.diff(row_idx) < 0) & (col_idx[1:] == col_idx[:-1])):
+            order = np.lexsort((row_idx, col_idx))
+            row_idx, col_idx = row_idx[order], col_idx[order]
+        values = {}
+        for field in fields:
+            try:
+                arr = np.concatenate([frames[code][field].to_numpy(dtype=dtype, na_value=np.nan) for code in codes])
+            except Exception as e:
+                logger.warning(f"[Data] Failed to pivot column {field}: {e}")
+                continue
+            values[field] = arr if order is None else arr[order]
+        return cls(index, columns, row_idx, col_idx, values, max_panels=max_panels)
+
+    @classmethod
+    def concat(cls, parts: Sequence['LazyPanels'], tags: Sequence[Any]) -> 'LazyPanels':
+        """
+        行索引相同的多个映射按列拼接：长表数值直接相接（列号加偏移），不生成宽表。
+
+        :param parts: 各来源的映射（index 必须相同，如 MultiAssetLoader 的主交易日历）
+        :param tags: 各来源的标记，写入 sources；代码与前面来源重复时加上 '.{标记}' 后缀（DataType 取 dir_code）
+        """
+        index = parts[0].index
+        if any(not p.index.equals(index) for p in parts[1:]):
+            raise ValueError("LazyPanels.concat requires parts with the same index.")
+        offsets = np.cumsum([0] + [len(p.columns) for p in parts[:-1]])
+        rows = np.concatenate([p.rows for p in parts])
+        cols = np.concatenate([p.cols + np.int32(offset) for p, offset in zip(parts, offsets)])
+
+        # 字段取并集（保持首次出现的顺序），某来源没有的字段为 NaN
+        fields = list(dict.fromkeys(f for p in parts for f in p.values))
+        dtype = next((v.dtype for p in parts for v in p.values.values()), np.dtype(float))
+        values = {f: np.concatenate([p.values[f] if f in p.values else np.full(len(p.rows), np.nan, dtype=dtype)
+                                     for p in parts]) for f in fields}
+
+        col_tags = [tag for p, tag in zip(parts, tags) for _ in p.columns]
+        labels = pd.Index([str(c) for p in parts for c in p.columns])
+        clash = labels.duplicated(keep='first')
+        columns = pd.Index([f"{label}.{getattr(tag, 'dir_code', tag)}" if dup else label
+                            for label, tag, dup in zip(labels, col_tags, clash)], name=CODE)
+
+        membership = None
+        if any(p.membership is not None for p in parts):
+            membership = Membership.concat([p.membership if p.membership is not None else Membership.full(index, p.columns)
+                                            for p in parts], columns)
+        merged = cls(index, columns, rows, cols, values, membership, max_panels=parts[0].max_panels)
+        merged.sources = pd.Series(col_tags, index=columns, name='source')
+        return merged
+
+    # ── Mapping ─────────────────────────────────────────────────────────────
+
+    def __getitem__(self, key: str):
+        if key == 'membership' and self.membership is not None:
+            return self.membership
+        return self.panel(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.values
+        if self.membership is not None:
+            yield 'membership'
+
+    def __len__(self) -> int:
+        return len(self.values) + (self.membership is not None)
+
+    def __contains__(self, key) -> bool:
+        return key in self.values or (key == 'membership' and self.membership is not None)
+
+    def __repr__(self) -> str:
+        cached = sorted({field for field, _, _ in self._panels})
+        return (f"LazyPanels({len(self.index)} days × {len(self.columns)} codes, "
+                f"fields={list(self.values)}, pivoted={cached})")
+
+    # ── 宽表 ────────────────────────────────────────────────────────────────
+
+    def panel(self, field: str, start=None, end=None) -> pd.DataFrame:
+        """
+        字段宽表（已前向填充）。
+
+        :param start: 起始日期（含），默认第一行
+        :param end: 结束日期（含），默认最后一行
+        """
+        if field not in self.values:
+            raise KeyError(field)
+        lo = 0 if start is None else int(self.index.searchsorted(pd.Timestamp(start), side='left'))
+        hi = len(self.index) if end is None else int(self.index.searchsorted(pd.Timestamp(end), side='right'))
+        key = (field, lo, hi)
+
+        cached = self._panels.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._panels.move_to_end(key)
+            return cached
+
+        self.misses += 1
+        frame = pd.DataFrame(self._pivot(field, lo, hi), index=self.index[lo:hi], columns=self.columns)
+        self._panels[key] = frame
+        if len(self._panels) > self.max_panels:
+            evicted, _ = self._panels.popitem(last=False)
+            logger.debug(f"[Data] Evicted panel {evicted}")
+        logger.debug(f"[Data] Pivoted field: {field} (Shape: {frame.shape}, dtype: {self.values[field].dtype})")
+        return frame
+
+    def raw(self, field: str) -> np.ndarray:
+        """未前向填充的 (T, N) 数组（标的池筛选用，不缓存）"""
+        values = self.values[field]
+        panel = np.full((len(self.index), len(self.columns)), np.nan, dtype=values.dtype)
+        panel[self.rows, self.cols] = values
+        return panel
+
+    def _pivot(self, field: str, lo: int, hi: int) -> np.ndarray:
+        values = self.values[field]
+        n = len(self.columns)
+        # 第 0 行放区间之前每列最后一个有效值，前向填充后丢弃
+        panel = np.full((hi - lo + 1, n), np.nan, dtype=values.dtype)
+        inside = (self.rows >= lo) & (self.rows < hi)
+        panel[self.rows[inside] - lo + 1, self.cols[inside]] = values[inside]
+        if lo > 0:
+            before = np.flatnonzero((self.rows < lo) & ~np.isnan(values))
+            if len(before):
+                # 长表按 (列号, 行号) 升序，每列取最后一个
+                c = self.cols[before]
+                last = before[np.r_[c[1:] != c[:-1], True]]
+                panel[0, self.cols[last]] = values[last]
+        filled = ffill(panel)[1:]
+        if self.membership is not None:
+            # 退市（最后一个存储日期）之后不再沿用旧价格
+            filled[~self.membership.listed(slice(lo, hi))] = np.nan
+        return filled
+
+    def select(self, columns: np.ndarray, fields=None) -> 'LazyPanels':
+        """
+        筛选后的新映射（不带已生成的宽表；membership 与 sources 按列筛选）。
+
+        :param columns: 布尔掩码，只保留为 True 的代码（长表数值按列号重新编号）
+        :param fields: 只保留这些字段，None 为全部
+        """
+        columns = np.asarray(columns, dtype=bool)
+        fields = list(self.values) if fields is None else [f for f in self.values if f in fields]
+        membership = self.membership
+        if columns.all():
+            selected = LazyPanels(self.index, self.columns, self.rows, self.cols,
+                                  {k: self.values[k] for k in fields}, membership, self.max_panels)
+        else:
+            keep = columns[self.cols]
+            remap = np.cumsum(columns, dtype=np.int32) - 1
+            if membership is not None:
+                membership = membership.take(columns)
+            selected = LazyPanels(self.index, self.columns[columns], self.rows[keep], remap[self.cols[keep]],
+                                  {k: self.values[k][keep] for k in fields}, membership, self.max_panels)
+        if self.sources is not None:
+            selected.sources = self.sources[columns]
+        return selected
+
+    def source(self, tag: Any) -> 'LazyPanels':
+        """只含某个来源（concat 时的标记，如 DataType.ETF）的列"""
+        if self.sources is None:
+            raise ValueError("LazyPanels has no sources; build it with LazyPanels.concat / MultiAssetLoader.")
+        return self.select((self.sources == tag).to_numpy())
+
+    def clear(self) -> None:
+        """丢弃已生成的宽表（长表数值保留，之后访问时重新生成）"""
+        self._panels.clear()
+
+
+class PanelWindow(Mapping):
+    """
+    宽表映射在行区间 [start, stop) 上的只读视图。
+
+    宽表在首次访问时按行号切片（同一窗口内返回同一对象，底层数组与原宽表共享），
+    'membership' 同步切片，其他值原样返回。窗口的窗口折算回同一份数据上的行号，不会层层嵌套。
+
+    :param data: 字段 → 宽表的映射（所有宽表行对齐，如 DataLoader.load() / attach().data 的结果）
+    :param start: 起始行号（含），可为负数，默认第一行
+    :param stop: 结束行号（不含），可为负数，默认最后一行之后
+    """
+
+    def __init__(self, data: Mapping[str, Any], start: Optional[int] = None, stop: Optional[int] = None):
+        start, stop, _ = slice(start, stop).indices(len(_index(data)))
+        offset = 0
+        if isinstance(data, PanelWindow):
+            offset, data = data.start, data.data
+        self.data = data
+        self.start = offset + start
+        self.stop = offset + max(stop, start)
+        self._values: Dict[str, Any] = {}
+
+    @classmethod
+    def between(cls, data: Mapping[str, Any], start=None, end=None) -> 'PanelWindow':
+        """
+        按日期取窗口。
+
+        :param start: 起始日期（含），默认第一行
+        :param end: 结束日期（含），默认最后一行
+        """
+        index = _index(data)
+        lo = None if start is None else int(index.searchsorted(pd.Timestamp(start), side='left'))
+        hi = None if end is None else int(index.searchsorted(pd.Timestamp(end), side='right'))
+        return cls(data, lo, hi)
+
+    @property
+    def index(self) -> pd.Index:
+        return _index(self.data)[self.start:self.stop]
+
+    def __getitem__(self, key: str):
+        value = self._values.get(key)
+        if value is None:
+            value = self.data[key]
+            if isinstance(value, pd.DataFrame):
+                value = value.iloc[self.start:self.stop]
+            elif isinstance(value, Membership):
+                value = value.slice(self.start, self.stop)
+            self._values[key] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __contains__(self, key) -> bool:
+        return key in self.data
+
+    def __repr__(self) -> str:
+        index = self.index
+        span = f"{index[0].date()} ~ {index[-1].date()}" if len(index) else "empty"
+        return f"PanelWindow(rows [{self.start}, {self.stop}), {span})"
+
+
+def _index(data: Mapping[str, Any]) -> pd.Index:
+    """宽表映射的行索引（各字段行对齐，取 close 或第一个宽表）"""
+    if isinstance(data, (LazyPanels, PanelWindow)):
+        return data.index
+    if 'close' in data:
+        return data['close'].index
+    return next(v for v in data.values() if isinstance(v, pd.DataFrame)).index
+
+
+def ffill(panel: np.ndarray) -> np.ndarray:
+    """沿时间轴前向填充 (等价于 DataFrame.ffill)，一次向量化完成"""
+    valid = ~np.isnan(panel)
+    last = np.maximum.accumulate(np.where(valid, np.arange(len(panel))[:, None], 0), axis=0)
+    # 第一条有效值之前 last 为 0，取到的仍是 NaN
+    return np.take_along_axis(panel, last, axis=0)
@@ -0,0 +1,176 @@
+"""
+重采样稳健性检验 (Bootstrap / Monte Carlo)
+
+单条回测 / WFA 样本外路径只是一次实现。这里在已经算好的日收益上批量生成上千条重采样路径，
+给出 Sharpe / MaxDD 等指标的置信区间，不重新计算任何因子：
+
+  - 平稳块自助法 (Stationary Block Bootstrap, Politis & Romano 1994)：
+    块长服从均值为 mean_block 的几何分布，保留收益的短期自相关
+  - 随机起点：每条路径从随机日期开始，到样本末尾结束（至少 min_length 天）
+  - 随机调仓相位：holding_period > 1 时，调仓日落在第几天带有偶然性；
+    phase_returns() 用同一份原始权重批量回测全部相位，重采样时每条路径随机抽一个相位
+
+路径按固定大小分块，每块使用 SeedSequence.spawn 派生的独立随机流，可以放进进程池并行；
+结果只取决于 seed 与 n_paths，与进程数无关。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from utils import logger, profiler
+from . import metrics
+from .engine import RealWorldEngine
+from .returns import MarketReturns
+
+if TYPE_CHECKING:
+    from .strategies import CustomStrategy
+
+CHUNK_PATHS = 250  # 每个任务块的路径数（决定随机流划分，修改会改变结果）
+PATH_METRICS = ['CAGR', 'Sharpe', 'Sortino', 'Max DD', 'Calmar']
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 路径生成
+# ─────────────────────────────────────────────────────────────────────────────
+
+def stationary_bootstrap_indices(rng: np.random.Generator, lengths: np.ndarray, n_rows: int,
+                                 mean_block: Optional[float]) -> np.ndarray:
+    """
+    为每条路径生成 [0, length) 内的行号序列，形状 (n_rows, P)。
+
+    :param lengths: 每条路径的有效长度 (P,)，第 t >= length 行的结果无意义（调用方置零）
+    :param mean_block: 平均块长；None 表示不重采样（顺序 0, 1, 2, ...）
+    """
+    n_paths = len(lengths)
+    t = np.arange(n_rows)[:, None]
+    if not mean_block:
+        return np.broadcast_to(t, (n_rows, n_paths)).copy()
+
+    # 每天以 1/mean_block 的概率开启新块，新块起点均匀分布
+    new_block = rng.random((n_rows, n_paths)) < 1.0 / mean_block
+    new_block[0] = True
+    starts = np.floor(rng.random((n_rows, n_paths)) * lengths).astype(np.int64)
+    block_row = np.maximum.accumulate(np.where(new_block, t, 0), axis=0)
+    block_start = np.take_along_axis(starts, block_row, axis=0)
+    return (block_start + (t - block_row)) % lengths
+
+
+def sample_paths(rng: np.random.Generator, returns: np.ndarray, n_paths: int,
+                 mean_block: Optional[float] = None, random_start: bool = False,
+                 min_length: int = 252):
+    """
+    :param returns: (H, T) 收益矩阵，H 为可选的相位 / 变体个数（每条路径随机抽一行）
+    :return: (R, n)：R 为 (T, P) 路径矩阵（超出有效长度的部分为 0），n 为每条路径的天数
+    """
+    n_variants, n_rows = returns.shape
+    variant = rng.integers(0, n_variants, n_paths)
+    if random_start:
+        latest = max(n_rows - min_length, 0)
+        start = rng.integers(0, latest + 1, n_paths)
+    else:
+        start = np.zeros(n_paths, dtype=np.int64)
+    lengths = n_rows - start
+
+    idx = stationary_bootstrap_indices(rng, lengths, n_rows, mean_block) + start
+    valid = np.arange(n_rows)[:, None] < lengths
+    R = returns[variant[None, :], np.where(valid, idx, 0)]
+    return np.where(valid, R, 0.0), lengths.astype(float)
+
+
+def _path_stats(R: np.ndarray, n: np.ndarray, periods: int) -> np.ndarray:
+    return np.column_stack([
+        metrics.cagr(R, n, periods),
+        metrics.sharpe(R, n, periods),
+        metrics.sortino(R, n, periods),
+        metrics.max_drawdown(R),
+        metrics.calmar(R, n, periods),
+    ])
+
+
+def _resample_chunk(returns: np.ndarray, n_paths: int, seed: np.random.SeedSequence,
+                    mean_block: Optional[float], random_start: bool, min_length: int,
+                    periods: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    R, n = sample_paths(rng, returns, n_paths, mean_block, random_start, min_length)
+    return _path_stats(R, n, periods)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 对外接口
+# ─────────────────────────────────────────────────────────────────────────────
+
+def resample(returns, n_paths: int = 1000, mean_block: Optional[float] = 20,
+             random_start: bool = False, min_length: int = 252, seed: int = 42,
+             workers: Optional[int] = None, periods: int = metrics.PERIODS_PER_YEAR) -> pd.DataFrame:
+    """
+    批量生成重采样路径并计算每条路径的指标。
+
+    :param returns: 日收益 Series / 一维数组，或 (T, H) 的 DataFrame（如 phase_returns 的结果，每条路径随机抽一列）
+    :param n_paths: 路径数
+    :param mean_block: 平稳块自助法的平均块长（天）；None 表示不打乱顺序（只做随机起点 / 相位）
+    :param random_start: 是否随机起点
+    :param min_length: 随机起点时每条路径的最少天数
+    :param seed: 根种子，决定全部随机流
+    :param workers: 进程数，默认 CPU 核数；<= 1 时在当前进程计算
+    :return: 每条路径一行，列为 PATH_METRICS
+    """
+    arr = np.asarray(returns, dtype=float)
+    arr = arr.reshape(1, -1) if arr.ndim == 1 else arr.T
+    arr = np.nan_to_num(arr, nan=0.0, posinf=0.0, neginf=0.0)
+
+    sizes = [min(CHUNK_PATHS, n_paths - i) for i in range(0, n_paths, CHUNK_PATHS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    workers = min(workers or os.cpu_count() or 1, len(sizes))
+    args = [(arr, size, s, mean_block, random_start, min_length, periods) for size, s in zip(sizes, seeds)]
+    logger.info(f"[Resample] {n_paths} paths ({len(sizes)} chunks, {workers} worker(s)), "
+                f"mean_block={mean_block}, random_start={random_start}, variants={arr.shape[0]}")
+
+    with profiler.span('resample', rows=n_paths):
+        if workers <= 1:
+            results = [_resample_chunk(*a) for a in args]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_resample_chunk, *zip(*args)))
+
+    return pd.DataFrame(np.vstack(results), columns=PATH_METRICS)
+
+
+def confidence_intervals(paths: pd.DataFrame, level: float = 0.95) -> pd.DataFrame:
+    """各指标的分位数区间：行为指标，列为 Low / Median / High"""
+    tail = (1 - level) / 2
+    q = paths.quantile([tail, 0.5, 1 - tail]).T
+    q.columns = ['Low', 'Median', 'High']
+    return q
+
+
+def phase_returns(strategy: 'CustomStrategy', market: MarketReturns,
+                  engine: Optional[RealWorldEngine] = None, raw: Optional[pd.DataFrame] = None,
+                  **data_dict) -> pd.DataFrame:
+    """
+    同一策略全部调仓相位的日收益 (T, holding_period)。
+    因子与逻辑函数只计算一次，各相位的持仓堆叠后批量回测。
+
+    :param raw: 已有的 strategy.generate_raw_weights 结果（与全量回测共用时传入），None 时在 data_dict 上计算
+    """
+    engine = engine or RealWorldEngine()
+    if raw is None:
+        raw = strategy.generate_raw_weights(**data_dict)
+    rets = engine.run_weights_batch(strategy.phase_weights(raw), market, index=raw.index, columns=raw.columns)
+    rets.columns.name = 'phase'
+    return rets
+
+
+def summarize(intervals: Dict[str, pd.DataFrame], level: float = 0.95) -> str:
+    """把若干组置信区间格式化为 print_summary 风格的文本行"""
+    lines = []
+    for label, ci in intervals.items():
+        sharpe, mdd = ci.loc['Sharpe'], ci.loc['Max DD']
+        lines.append(
+            f"  {label:<24}"
+            f"  Sharpe {sharpe['Median']:.2f} [{sharpe['Low']:.2f}, {sharpe['High']:.2f}]"
+            f"  MaxDD {mdd['Median']:.2%} [{mdd['Low']:.2%}, {mdd['High']:.2%}]"
+        )
+    return f"  {level:.0%} CI (median [low, high])\n" + "\n".join(lines)
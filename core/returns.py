@@ -0,0 +1,162 @@
+"""
+预计算的逐资产收益面板 (MarketReturns)
+
+RealWorldEngine 每次回测都需要三种收益：
+  - 持仓日 daily:     close_t / close_{t-1} - 1
+  - 买入日 intraday:  (close - open) / open
+  - 卖出日 overnight: open / prev_close - 1
+基准 (等权 Open-to-Open) 还需要 open.pct_change()。
+
+这些面板只依赖数据，不依赖策略：在同一份 data_dict 上构建一次，
+所有策略回测、WFA 每个窗口、基准构造都复用同一份 NumPy 数组。
+成本模型需要的行情字段 (high/low/amount...) 与估计面板 (价差、ADV...) 也按需缓存在这里。
+data_dict 带有 'membership' (core.universe.Membership) 时一并保存，引擎据此不持有不在池的代码。
+"""
+from typing import TYPE_CHECKING, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .intermediates import IntermediateStore, returns
+from .universe import Membership
+
+if TYPE_CHECKING:
+    from .costs import CostModel
+
+
+class MarketReturns:
+    """
+    对齐的收益面板（ndarray，形状均为 (T, N)，行列与 close 宽表一致）。
+
+    用法:
+        market = MarketReturns.from_data(data_dict)
+        benchmark_rets = market.benchmark()
+        for strat in strategies:
+            engine.run(strat, market=market, **data_dict)
+    """
+
+    def __init__(self, index: pd.Index, columns: pd.Index,
+                 daily: np.ndarray, intraday: np.ndarray, overnight: np.ndarray,
+                 open_to_open: np.ndarray, close: Optional[pd.DataFrame] = None,
+                 data: Optional[Mapping[str, pd.DataFrame]] = None,
+                 membership: Optional[Membership] = None):
+        self.index = index
+        self.columns = columns
+        self.daily = daily
+        self.intraday = intraday
+        self.overnight = overnight
+        self.open_to_open = open_to_open
+        self.membership = membership  # 逐日成分，None 表示全部在池
+        self._close = close  # 仅用于判断是否绑定同一份数据
+        self._data = data or {}
+        self._fields: Dict[str, np.ndarray] = {}
+        self._cost_panels: Dict['CostModel', Dict[str, np.ndarray]] = {}
+        self._parent: Optional[Tuple['MarketReturns', int, int]] = None  # slice() 的来源 (market, start, stop)
+
+    @classmethod
+    def from_data(cls, data: Mapping[str, pd.DataFrame],
+                  intermediates: Optional[IntermediateStore] = None) -> 'MarketReturns':
+        """
+        从 DataLoader 的宽表字典构建。传入 intermediates 时，close/open 的 pct_change 与因子共享。
+        """
+        if 'open' not in data or 'close' not in data:
+            raise ValueError("MarketReturns requires both 'open' and 'close' price data.")
+        opens, closes = data['open'], data['close']
+        store = IntermediateStore.ensure(intermediates, open=opens, close=closes)
+
+        daily = store.get(returns(1, 'close')).fillna(0)
+        intraday = (closes - opens) / opens
+        overnight = (opens / closes.shift(1) - 1).fillna(0)
+        open_to_open = store.get(returns(1, 'open'))
+
+        membership = data.get('membership')
+        if membership is not None and not membership.binds(closes):
+            membership = membership.reindex(closes.index, closes.columns)
+
+        return cls(closes.index, closes.columns,
+                   daily.to_numpy(dtype=float), intraday.to_numpy(dtype=float),
+                   overnight.to_numpy(dtype=float), open_to_open.to_numpy(dtype=float),
+                   close=closes, data=data, membership=membership)
+
+    def binds(self, data: Mapping[str, pd.DataFrame]) -> bool:
+        """
+        是否由同一份数据构建：close 宽表是同一对象，或行列一致且与构建时的 close 共享同一块数组
+        （如同一 PanelWindow 区间的切片）。行列相同但数值不同的数据（如另一种复权口径）不算绑定。
+        """
+        closes = data.get('close')
+        if closes is None or self._close is None:
+            return False
+        return closes is self._close or _same_values(closes, self._close)
+
+    def window(self, data: Mapping[str, pd.DataFrame]) -> Optional['MarketReturns']:
+        """
+        data 是本数据的连续行区间（如 core.panels.PanelWindow）时返回对应的 slice() 视图，否则 None。
+        区间的 close 必须与本数据共享同一块数组，行列相同但数值不同时返回 None。
+        """
+        closes = data.get('close')
+        if self._close is None or closes is None or len(closes) == 0 or not closes.columns.equals(self.columns):
+            return None
+        start = self.index.searchsorted(closes.index[0])
+        stop = start + len(closes)
+        if stop > len(self) or not _same_values(closes, self._close.iloc[start:stop]):
+            return None
+        return self.slice(start, stop)
+
+    def slice(self, start: int, stop: int) -> 'MarketReturns':
+        """
+        按整数行号切片，面板为原数组的视图（不复制）。
+        行情字段与成本面板仍在全量数据上计算后再切片，滚动估计量不会因切片丢失预热期。
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        sliced = MarketReturns(
+            self.index[start:stop], self.columns,
+            self.daily[start:stop], self.intraday[start:stop], self.overnight[start:stop],
+            self.open_to_open[start:stop],
+            close=self._close.iloc[start:stop] if self._close is not None else None,
+            membership=self.membership.slice(start, stop) if self.membership is not None else None,
+        )
+        sliced._parent = (self, start, stop)
+        return sliced
+
+    def field(self, name: str) -> np.ndarray:
+        """原始行情字段 (T, N)，与收益面板行列对齐"""
+        if self._parent is not None:
+            parent, start, stop = self._parent
+            return parent.field(name)[start:stop]
+        arr = self._fields.get(name)
+        if arr is None:
+            if name not in self._data:
+                raise KeyError(f"MarketReturns has no field '{name}'. Build it with MarketReturns.from_data(data_dict).")
+            arr = self._data[name].reindex(index=self.index, columns=self.columns).to_numpy(dtype=float)
+            self._fields[name] = arr
+        return arr
+
+    def cost_panels(self, model: 'CostModel') -> Dict[str, np.ndarray]:
+        """成本模型的 (T, N) 估计面板，每个模型在同一份数据上只计算一次"""
+        if self._parent is not None:
+            parent, start, stop = self._parent
+            return {k: v[start:stop] for k, v in parent.cost_panels(model).items()}
+        panels = self._cost_panels.get(model)
+        if panels is None:
+            panels = self._cost_panels[model] = model.panels(self)
+        return panels
+
+    def benchmark(self, name: str = "Equal_Weighted_Benchmark") -> pd.Series:
+        """等权组合基准（Open-to-Open），与策略的 T+1 开盘执行口径一致"""
+        with np.errstate(invalid='ignore'):
+            rets = pd.DataFrame(self.open_to_open, index=self.index, columns=self.columns).mean(axis=1)
+        rets = rets.fillna(0)
+        rets.name = name
+        return rets
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+def _same_values(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    """两张宽表行列一致，且数值是同一块内存上的同一区间（O(1) 指纹，不逐元素比较）"""
+    if not (a.index.equals(b.index) and a.columns.equals(b.columns)):
+        return False
+    x, y = a.to_numpy(), b.to_numpy()
+    return (x.__array_interface__['data'][0] == y.__array_interface__['data'][0]
+            and x.strides == y.strides and x.dtype == y.dtype)
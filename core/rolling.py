@@ -0,0 +1,183 @@
+"""
+滚动极值原语 (Rolling Extrema)
+
+对 (T, N) 的 NumPy 宽表一次性计算所有列，不在 Python 层逐窗口循环：
+
+  - rolling_max / rolling_min         固定窗口极值 + 位置（van Herk / Gil-Werman 分块算法，O(T·N)）
+  - rolling_argmax / rolling_argmin   只取位置
+  - RangeExtrema                      任意区间 [left, right] 的极值 + 位置（稀疏表，O(T·N·log w) 预处理）
+                                      用于 "窗口内、最高点之前的最低点" 这类变长区间
+
+约定：
+  - 输入可以是 ndarray 或 DataFrame，输出均为 ndarray（与输入同形状）
+  - NaN 不参与比较；位置 (pos) 为原数组的绝对行号，平局时取最靠前的位置（与 Series.argmax 一致）
+  - 有效值个数 < min_periods 的窗口，极值为 NaN、位置为 -1
+"""
+from typing import Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+ArrayLike = Union[np.ndarray, pd.DataFrame, pd.Series]
+
+_POS_NONE = -1
+_CHUNK_BYTES = 64 * 1024 * 1024  # RangeExtrema 单批次稀疏表内存上限
+
+
+def _as_2d(values: ArrayLike) -> np.ndarray:
+    arr = np.asarray(values, dtype=float)
+    return arr.reshape(-1, 1) if arr.ndim == 1 else arr
+
+
+def _restore_shape(arr: np.ndarray, values: ArrayLike) -> np.ndarray:
+    return arr.ravel() if np.ndim(values) == 1 else arr
+
+
+def rolling_valid_count(values: ArrayLike, window: int) -> np.ndarray:
+    """每个窗口内的非 NaN 个数（窗口起点不足时按实际长度计）"""
+    valid = (~np.isnan(_as_2d(values))).astype(np.int64)
+    csum = np.vstack([np.zeros((1, valid.shape[1]), dtype=np.int64), np.cumsum(valid, axis=0)])
+    count = csum[1:] - csum[np.maximum(np.arange(1, len(valid) + 1) - window, 0)]
+    return _restore_shape(count, values)
+
+
+def _rolling_argextreme(values: ArrayLike, window: int, find_max: bool,
+                        min_periods: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    if window < 1:
+        raise ValueError(f"window must be >= 1, got {window}")
+    x = _as_2d(values)
+    n_rows, n_cols = x.shape
+    min_periods = window if min_periods is None else min_periods
+
+    # 统一转成 "求最大值"：最小值取负；NaN 视为 -inf
+    a = x if find_max else -x
+    a = np.where(np.isnan(a), -np.inf, a)
+
+    # 前面补 window-1 行 -inf（起点窗口不足），后面补齐到 window 的整数倍
+    n_blocks = -(-(n_rows + window - 1) // window)
+    padded_len = n_blocks * window
+    padded = np.full((padded_len, n_cols), -np.inf)
+    padded[window - 1:window - 1 + n_rows] = a
+    idx = np.arange(padded_len) - (window - 1)  # 原数组行号
+
+    blocks = padded.reshape(n_blocks, window, n_cols)
+    block_idx = np.broadcast_to(idx.reshape(n_blocks, window, 1), blocks.shape)
+
+    # 块内前缀最大值：严格大于才更新位置 → 保留第一次出现
+    prefix = np.maximum.accumulate(blocks, axis=1)
+    is_new = np.ones_like(blocks, dtype=bool)
+    is_new[:, 1:] = blocks[:, 1:] > prefix[:, :-1]
+    prefix_pos = np.maximum.accumulate(np.where(is_new, block_idx, np.iinfo(np.int64).min), axis=1)
+
+    # 块内后缀最大值：大于等于即更新位置 → 平局取更靠前的位置
+    rev = blocks[:, ::-1]
+    suffix = np.maximum.accumulate(rev, axis=1)
+    is_new_rev = np.ones_like(rev, dtype=bool)
+    is_new_rev[:, 1:] = rev[:, 1:] >= suffix[:, :-1]
+    suffix_pos = np.minimum.accumulate(np.where(is_new_rev, block_idx[:, ::-1], np.iinfo(np.int64).max), axis=1)
+    suffix, suffix_pos = suffix[:, ::-1], suffix_pos[:, ::-1]
+
+    prefix, prefix_pos = prefix.reshape(padded_len, n_cols), prefix_pos.reshape(padded_len, n_cols)
+    suffix, suffix_pos = suffix.reshape(padded_len, n_cols), suffix_pos.reshape(padded_len, n_cols)
+
+    # 以 t 结尾的窗口 = 左侧块的后缀 [t, 块尾] ∪ 右侧块的前缀 [块首, t+window-1]（补齐后坐标）
+    left_val, left_pos = suffix[:n_rows], suffix_pos[:n_rows]
+    right_val, right_pos = prefix[window - 1:window - 1 + n_rows], prefix_pos[window - 1:window - 1 + n_rows]
+    take_left = left_val >= right_val
+    val = np.where(take_left, left_val, right_val)
+    pos = np.where(take_left, left_pos, right_pos)
+
+    invalid = rolling_valid_count(x, window) < max(min_periods, 1)
+    val = np.where(invalid, np.nan, val if find_max else -val)
+    pos = np.where(invalid, _POS_NONE, pos)
+    return _restore_shape(val, values), _restore_shape(pos, values)
+
+
+def rolling_max(values: ArrayLike, window: int, min_periods: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    """滚动最大值及其位置 (values, positions)"""
+    return _rolling_argextreme(values, window, True, min_periods)
+
+
+def rolling_min(values: ArrayLike, window: int, min_periods: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    """滚动最小值及其位置 (values, positions)"""
+    return _rolling_argextreme(values, window, False, min_periods)
+
+
+def rolling_argmax(values: ArrayLike, window: int, min_periods: int = None) -> np.ndarray:
+    """滚动最大值所在的绝对行号，无效窗口为 -1"""
+    return rolling_max(values, window, min_periods)[1]
+
+
+def rolling_argmin(values: ArrayLike, window: int, min_periods: int = None) -> np.ndarray:
+    """滚动最小值所在的绝对行号，无效窗口为 -1"""
+    return rolling_min(values, window, min_periods)[1]
+
+
+class RangeExtrema:
+    """
+    任意区间极值查询（稀疏表 / Sparse Table）。
+
+    对每一列预处理 2^k 长度区间的极值，查询 [left, right] 时用两段重叠区间拼出结果，
+    所有 (行, 列) 的查询一次性完成。max_span 为查询区间的最大长度（通常就是滚动窗口），
+    只建到 log2(max_span) 层，内存为 O(T·N·log max_span)。
+
+    示例（窗口内最高点之前的最低点）:
+        hi, hi_pos = rolling_max(close, 20)
+        lo, lo_pos = RangeExtrema(close, 20, find_max=False).query(window_start, hi_pos - 1)
+    """
+
+    def __init__(self, values: ArrayLike, max_span: int, find_max: bool = False):
+        self._values = values
+        self.find_max = find_max
+        x = _as_2d(values)
+        a = x if find_max else -x
+        self._a = np.where(np.isnan(a), -np.inf, a)
+        self.n_levels = max(int(np.floor(np.log2(max(max_span, 1)))) + 1, 1)
+
+    def _build(self, a: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        n_rows, n_cols = a.shape
+        vals = np.empty((self.n_levels, n_rows, n_cols))
+        poss = np.empty((self.n_levels, n_rows, n_cols), dtype=np.int64)
+        vals[0] = a
+        poss[0] = np.arange(n_rows)[:, None]
+        for k in range(1, self.n_levels):
+            half = 1 << (k - 1)
+            vals[k], poss[k] = vals[k - 1], poss[k - 1]
+            lv, rv = vals[k - 1][:-half], vals[k - 1][half:]
+            take_left = lv >= rv
+            vals[k][:-half] = np.where(take_left, lv, rv)
+            poss[k][:-half] = np.where(take_left, poss[k - 1][:-half], poss[k - 1][half:])
+        return vals, poss
+
+    def query(self, left: np.ndarray, right: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        查询每个 (行, 列) 对应区间 [left, right]（闭区间，绝对行号）的极值与位置。
+        区间长度不能超过构造时的 max_span；right < left 的空区间、全 NaN 区间返回 NaN / -1。
+        """
+        a = self._a
+        left, right = _as_2d(left).astype(np.int64), _as_2d(right).astype(np.int64)
+        n_rows, n_cols = a.shape
+        out_val = np.full((n_rows, n_cols), np.nan)
+        out_pos = np.full((n_rows, n_cols), _POS_NONE, dtype=np.int64)
+
+        # 按列分批，限制稀疏表内存
+        chunk = max(1, _CHUNK_BYTES // max(1, self.n_levels * n_rows * 16))
+        for c0 in range(0, n_cols, chunk):
+            c1 = min(n_cols, c0 + chunk)
+            vals, poss = self._build(a[:, c0:c1])
+            lo, hi = left[:, c0:c1], right[:, c0:c1]
+            empty = hi < lo
+            length = np.where(empty, 1, hi - lo + 1)
+            k = np.minimum(np.floor(np.log2(length)).astype(np.int64), self.n_levels - 1)
+            lo_c = np.where(empty, 0, lo)
+            hi_c = np.where(empty, 0, hi - (1 << k) + 1)
+            cols = np.broadcast_to(np.arange(c1 - c0), lo.shape)
+            v1, p1 = vals[k, lo_c, cols], poss[k, lo_c, cols]
+            v2, p2 = vals[k, hi_c, cols], poss[k, hi_c, cols]
+            take_left = v1 >= v2
+            val = np.where(take_left, v1, v2)
+            pos = np.where(take_left, p1, p2)
+            missing = empty | np.isneginf(val)
+            out_val[:, c0:c1] = np.where(missing, np.nan, val if self.find_max else -val)
+            out_pos[:, c0:c1] = np.where(missing, _POS_NONE, pos)
+        return _restore_shape(out_val, self._values), _restore_shape(out_pos, self._values)
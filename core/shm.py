@@ -0,0 +1,288 @@
+"""
+跨进程共享内存数据服务 (Shared-Memory Data Server)
+
+同时跑多个 run.py / wfa.py 变体时，每个进程都会各自读取 Parquet、填充同一份宽表。
+这里让一个服务进程加载一次，把每个字段的 (T, N) 数组放进 multiprocessing.shared_memory，
+再写一份很小的 JSON 描述符（块名、dtype、形状、行列标签、Membership）：
+  - DataServer.publish():  创建共享块并写描述符
+  - attach(name):          工作进程按描述符挂载，得到零拷贝（只读）的宽表 data_dict
+  - 引用计数：每次 attach 在 {name}.refs/ 下登记一个文件 (pid.序号)，detach 时删除；
+    已退出进程留下的登记在计数时清理，DataServer.close() 等到引用归零后才 unlink 共享块
+
+用法:
+    # 服务进程
+    with DataServer(loader.load(symbols), name='etf') as server:
+        server.serve_forever()
+
+    # 工作进程
+    with attach('etf') as shared:
+        data_dict = shared.data
+"""
+import json
+import os
+import secrets
+import signal
+import sys
+import tempfile
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from utils import logger
+from .universe import Membership
+
+SHM_DIR = Path(getattr(config, 'SHM_DIR', '') or Path(tempfile.gettempdir()) / 'momentum_rotation_shm')
+
+# 注销引用时仍有视图存活的共享块：保持引用，避免 SharedMemory.__del__ 再次 close 时报 BufferError
+_LINGERING = []
+
+
+def _descriptor_path(name: str) -> Path:
+    return SHM_DIR / f"{name}.json"
+
+
+def _refs_dir(name: str) -> Path:
+    return SHM_DIR / f"{name}.refs"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def refcount(name: str) -> int:
+    """当前挂载 name 的引用数（顺带清理已退出进程留下的登记）"""
+    refs = _refs_dir(name)
+    if not refs.exists():
+        return 0
+    count = 0
+    for entry in refs.iterdir():
+        pid = int(entry.name.split('.')[0])
+        if _pid_alive(pid):
+            count += 1
+        else:
+            entry.unlink(missing_ok=True)
+    return count
+
+
+def _raise_interrupt(*_):
+    raise KeyboardInterrupt
+
+
+def _open_block(block: str) -> shared_memory.SharedMemory:
+    """
+    挂载已有共享块，且不登记到本进程的 resource_tracker：
+    Python < 3.13 会把挂载方也当作所有者，进程退出时 unlink 掉服务端的块。
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=block, track=False)
+    shm = shared_memory.SharedMemory(name=block)
+    from multiprocessing import resource_tracker
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+class DataServer:
+    """
+    把 DataLoader 的宽表字典发布到共享内存。
+
+    :param data: DataLoader.load() 的结果（字段 → 宽表，可带 'membership'）；所有字段的行列须与 close 一致
+    :param name: 服务名，工作进程用 attach(name) 挂载
+    """
+
+    def __init__(self, data: Mapping[str, pd.DataFrame], name: str):
+        self.data = data
+        self.name = name
+        self._blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.descriptor: Optional[dict] = None
+
+    def publish(self) -> Path:
+        """创建共享块、复制数据并写出描述符（原子替换），返回描述符路径。只能调用一次"""
+        path = _descriptor_path(self.name)
+        if path.exists():
+            existing = json.loads(path.read_text())
+            if _pid_alive(existing['server_pid']):
+                raise FileExistsError(f"Data server '{self.name}' is already running (pid {existing['server_pid']}).")
+            logger.warning(f"[SHM] Replacing stale descriptor of '{self.name}' (pid {existing['server_pid']} exited)")
+
+        closes = self.data['close']
+        panels = {k: v for k, v in self.data.items() if isinstance(v, pd.DataFrame)}
+        for field, frame in panels.items():
+            if not (frame.index.equals(closes.index) and frame.columns.equals(closes.columns)):
+                raise ValueError(f"Field '{field}' is not aligned with 'close'; cannot publish to shared memory.")
+
+        token = secrets.token_hex(4)
+        fields = {}
+        for i, (field, frame) in enumerate(panels.items()):
+            values = frame.to_numpy()
+            shm = shared_memory.SharedMemory(name=f"mr_{token}_{i}", create=True, size=max(values.nbytes, 1))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+            self._blocks[field] = shm
+            fields[field] = {'block': shm.name, 'dtype': values.dtype.str}
+
+        membership = self.data.get('membership')
+        eligible = None
+        if membership is not None and membership.eligible is not None:
+            # 逐日可选掩码 (T, N) 与宽表同样大小量级，也放进共享块
+            shm = shared_memory.SharedMemory(name=f"mr_{token}_eligible", create=True,
+                                             size=max(membership.eligible.nbytes, 1))
+            np.ndarray(membership.eligible.shape, dtype=bool, buffer=shm.buf)[:] = membership.eligible
+            self._blocks['membership.eligible'] = shm
+            eligible = shm.name
+        self.descriptor = {
+            'name': self.name,
+            'server_pid': os.getpid(),
+            'created': time.time(),
+            'shape': list(closes.shape),
+            'index': closes.index.asi8.tolist(),
+            'index_name': closes.index.name,
+            'columns': [str(c) for c in closes.columns],
+            'columns_name': closes.columns.name,
+            'fields': fields,
+            'membership': None if membership is None else {
+                'first': membership.first.tolist(), 'last': membership.last.tolist(), 'eligible': eligible},
+        }
+
+        self.data = None  # 共享块已有完整副本，不再持有原宽表（调用方删掉自己的引用后即可回收）
+
+        SHM_DIR.mkdir(parents=True, exist_ok=True)
+        _refs_dir(self.name).mkdir(exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.descriptor))
+        os.replace(tmp, path)
+
+        nbytes = sum(shm.size for shm in self._blocks.values())
+        logger.info(f"[SHM] Published '{self.name}': {len(fields)} fields × {closes.shape}, "
+                    f"{nbytes / 1024 ** 2:.1f} MB → {path}")
+        return path
+
+    def serve_forever(self, poll: float = 5.0) -> None:
+        """阻塞直到 KeyboardInterrupt / SIGTERM，期间引用数变化时打日志"""
+        signal.signal(signal.SIGTERM, _raise_interrupt)
+        last = None
+        try:
+            while True:
+                count = refcount(self.name)
+                if count != last:
+                    logger.info(f"[SHM] '{self.name}' attached by {count} process(es)")
+                    last = count
+                time.sleep(poll)
+        except KeyboardInterrupt:
+            logger.info(f"[SHM] Stopping '{self.name}' ...")
+
+    def close(self, timeout: Optional[float] = None, poll: float = 0.5) -> None:
+        """
+        撤下描述符（不再接受新的 attach），等待引用归零后释放共享块。
+
+        :param timeout: 最长等待秒数，None 为一直等；超时后仍然 unlink（已挂载的进程映射保持有效，直到其退出）
+        """
+        if not self._blocks:
+            return
+        _descriptor_path(self.name).unlink(missing_ok=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while (count := refcount(self.name)) > 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning(f"[SHM] '{self.name}' still attached by {count} process(es); unlinking anyway")
+                break
+            time.sleep(poll)
+
+        for shm in self._blocks.values():
+            shm.close()
+            shm.unlink()
+        self._blocks.clear()
+        refs = _refs_dir(self.name)
+        if refs.exists():
+            for entry in refs.iterdir():
+                entry.unlink(missing_ok=True)
+            refs.rmdir()
+        logger.info(f"[SHM] Released '{self.name}'")
+
+    def __enter__(self) -> 'DataServer':
+        self.publish()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class SharedData:
+    """
+    attach() 的结果：data 为零拷贝宽表字典（底层数组只读，修改请先 copy()）。
+    close() / 退出 with 时注销引用；仍被引用的视图不会失效，映射在进程退出时释放。
+    """
+
+    _seq = 0
+
+    def __init__(self, name: str):
+        self.name = name
+        path = _descriptor_path(name)
+        if not path.exists():
+            raise FileNotFoundError(f"No data server named '{name}' ({path}). Start one with data_server.py.")
+        desc = json.loads(path.read_text())
+        if not _pid_alive(desc['server_pid']):
+            raise FileNotFoundError(f"Data server '{name}' (pid {desc['server_pid']}) is no longer running.")
+
+        # 先登记引用，再挂载：服务端 close() 看到引用后会等待
+        SharedData._seq += 1
+        self._ref = _refs_dir(name) / f"{os.getpid()}.{SharedData._seq}"
+        self._ref.touch()
+
+        index = pd.DatetimeIndex(np.asarray(desc['index'], dtype='datetime64[ns]'), name=desc['index_name'])
+        columns = pd.Index(desc['columns'], name=desc['columns_name'])
+        shape = tuple(desc['shape'])
+
+        self._blocks = []
+        self.data: Dict[str, pd.DataFrame] = {}
+        try:
+            for field, spec in desc['fields'].items():
+                shm = _open_block(spec['block'])
+                self._blocks.append(shm)
+                values = np.ndarray(shape, dtype=np.dtype(spec['dtype']), buffer=shm.buf)
+                values.flags.writeable = False
+                self.data[field] = pd.DataFrame(values, index=index, columns=columns, copy=False)
+            eligible = None
+            if desc['membership'] is not None and desc['membership'].get('eligible'):
+                shm = _open_block(desc['membership']['eligible'])
+                self._blocks.append(shm)
+                eligible = np.ndarray(shape, dtype=bool, buffer=shm.buf)
+                eligible.flags.writeable = False
+        except FileNotFoundError:
+            self.close()
+            raise FileNotFoundError(f"Shared blocks of '{name}' are gone; the data server has stopped.")
+
+        if desc['membership'] is not None:
+            self.data['membership'] = Membership(index, columns, desc['membership']['first'],
+                                                 desc['membership']['last'], eligible)
+        logger.info(f"[SHM] Attached '{name}': {len(desc['fields'])} fields × {shape} (zero-copy)")
+
+    def close(self) -> None:
+        self.data = {}
+        for shm in self._blocks:
+            try:
+                shm.close()
+            except BufferError:
+                # 调用方仍持有宽表视图：保留映射，进程退出时释放
+                _LINGERING.append(shm)
+        self._blocks = []
+        self._ref.unlink(missing_ok=True)
+
+    def __enter__(self) -> 'SharedData':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def attach(name: str) -> SharedData:
+    """挂载名为 name 的数据服务"""
+    return SharedData(name)
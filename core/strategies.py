@@ -1,6 +1,11 @@
+import inspect
+import numpy as np
 import pandas as pd
 from .base import Strategy, Factor
+from .intermediates import IntermediateStore
 from typing import Dict, Callable, Any
+import config
+from utils import profiler
 
 
 class CustomStrategy(Strategy):
@@ -11,6 +16,8 @@ class CustomStrategy(Strategy):
     2. 传入一个 python 函数 (logic_func) 来编写你的选股/择时逻辑。
     3. 支持 holding_period 参数，实现定期调仓。
     4. [New] 支持 **logic_kwargs，可以将策略参数（如 top_k, weights 等）透传给 logic_func。
+    5. 支持 phase_ensemble：holding_period 个调仓相位各分 1/holding_period 资金，消除调仓日选择的偶然性。
+    6. 数据带有 membership (逐日成分) 时，不在池的因子值置为 NaN 后再交给逻辑函数，不参与排名。
     """
 
     def __init__(self,
@@ -18,6 +25,7 @@ class CustomStrategy(Strategy):
                  logic_func: Callable[..., pd.DataFrame],
                  name: str = "Custom",
                  holding_period: int = 1,
+                 phase_ensemble: bool = False,
                  **logic_kwargs):
         """
         :param factors: 因子字典, e.g. {'mom': Momentum(20), 'bias': Bias(20)}
@@ -25,6 +33,9 @@ class CustomStrategy(Strategy):
                            签名建议: def my_logic(factor_values, closes, **kwargs) -> weights
         :param name: 策略名称
         :param holding_period: 调仓周期 (天)。默认为 1 (每日调仓)。
+        :param phase_ensemble: 为 True 时，策略由 holding_period 个相位错开的子组合等权组成：
+                               generate_target_weights 返回各相位权重的均值，
+                               RealWorldEngine 一次批量回测全部相位，收益取各子组合收益的均值。
         :param logic_kwargs: 额外的参数，会直接传递给 logic_func。
                              例如: top_k=2, weights={'mom': 1.0, 'bias': 0.5}
         """
@@ -32,27 +43,106 @@ class CustomStrategy(Strategy):
         self.factors = factors
         self.logic_func = logic_func
         self.holding_period = holding_period
+        self.phase_ensemble = phase_ensemble
         self.logic_kwargs = logic_kwargs  # 存储额外的策略参数
+        # 逻辑函数若声明了 intermediates 参数，则把共享中间结果传给它
+        self._logic_accepts_intermediates = _accepts_kwarg(logic_func, 'intermediates')
+
+    @property
+    def fields(self):
+        """close（逻辑函数使用）+ 各因子需要的字段"""
+        return tuple(dict.fromkeys(['close', *(f for factor in self.factors.values() for f in factor.fields)]))
 
     def generate_target_weights(self, **kwargs) -> pd.DataFrame:
+        raw_weights = self.generate_raw_weights(**kwargs)
+        if self.phase_ensemble:
+            return self.ensemble_weights(raw_weights)
+        return self.apply_holding_period(raw_weights)
+
+    def generate_raw_weights(self, **kwargs) -> pd.DataFrame:
+        """因子 + 逻辑函数得到的每日目标权重（尚未按 holding_period 抽样）"""
         if 'close' not in kwargs:
             raise ValueError("Strategy requires 'close' price data.")
         closes = kwargs['close']
 
-        # 1. 计算所有因子值
+        # 0. 规划共享中间结果：调用方传入且绑定同一份数据的 store 直接复用，否则本次新建
+        store = kwargs.get('intermediates')
+        if store is None or not store.binds(kwargs):
+            store = IntermediateStore(kwargs)
+            kwargs = {**kwargs, 'intermediates': store}
+        with profiler.span('intermediates'):
+            store.compute(node for factor in self.factors.values() for node in factor.requires())
+
+        # 1. 计算所有因子值（参数相同的因子在同一 store 上只算一次；columnwise 因子按列分块）
+        block_cols = getattr(config, 'FACTOR_BLOCK_COLS', 0)
+        membership = kwargs.get('membership')
         factor_values = {}
         for name, factor in self.factors.items():
             # calculate 可能会用到 open, high, low 等，直接传 kwargs
-            factor_values[name] = factor.calculate(**kwargs)
+            with profiler.span(f"factor.{factor.name}", rows=len(closes)):
+                value = store.factor(factor, lambda: factor.calculate_blocked(block_cols, **kwargs))
+            # 未上市 / 已退市的位置不参与截面排名（不修改 store 中缓存的因子面板）
+            factor_values[name] = membership.apply(value) if membership is not None else value
 
         # 2. 调用用户传入的逻辑函数
         # 将 factor_values, closes 以及初始化时传入的 logic_kwargs 一并传给逻辑函数
-        raw_weights = self.logic_func(factor_values, closes, **self.logic_kwargs)
+        with profiler.span(f"logic.{getattr(self.logic_func, '__name__', 'logic')}", rows=len(closes)):
+            logic_kwargs = dict(self.logic_kwargs)
+            if self._logic_accepts_intermediates:
+                logic_kwargs.setdefault('intermediates', store)
+            return self.logic_func(factor_values, closes, **logic_kwargs)
 
-        # 3. 处理调仓周期 (Holding Period)
+    def apply_holding_period(self, raw_weights: pd.DataFrame, phase: int = 0) -> pd.DataFrame:
+        """
+        处理调仓周期 (Holding Period)：每 holding_period 天取一次权重，其余日期沿用。
+
+        :param raw_weights: generate_raw_weights 的结果
+        :param phase: 调仓日相位，0 <= phase < holding_period（第 phase 行起每 holding_period 行调仓一次），
+                      不同相位复用同一份 raw_weights，用于评估调仓日选择的偶然性
+        """
         if self.holding_period > 1:
-            sampled_weights = raw_weights.iloc[::self.holding_period]
+            if not 0 <= phase < self.holding_period:
+                raise ValueError(f"phase must be in [0, {self.holding_period}), got {phase}")
+            sampled_weights = raw_weights.iloc[phase::self.holding_period]
             target_weights = sampled_weights.reindex(raw_weights.index).ffill()
             return target_weights
         else:
-            return raw_weights
\ No newline at end of file
+            return raw_weights
+
+    def phase_weights(self, raw_weights: pd.DataFrame) -> np.ndarray:
+        """
+        全部调仓相位的目标权重，一次向量化得到 (holding_period, T, N)：
+        第 p 层与 apply_holding_period(raw_weights, p) 相同。
+        """
+        hp = self.holding_period
+        values = raw_weights.to_numpy(dtype=float)
+        if hp <= 1:
+            return values[None]
+
+        # 每个相位、每一天对应的最近调仓行号；第一个调仓日之前为 -1
+        t = np.arange(len(values))
+        phase = np.arange(hp)[:, None]
+        src = phase + (t - phase) // hp * hp
+        src = np.where(t >= phase, src, -1)
+        stacked = np.where((src >= 0)[..., None], values[np.maximum(src, 0)], np.nan)
+
+        # 调仓日权重缺失时沿用上一次调仓的权重（与 reindex + ffill 一致）
+        valid = ~np.isnan(stacked)
+        last = np.maximum.accumulate(np.where(valid, t[None, :, None], -1), axis=1)
+        filled = np.take_along_axis(stacked, np.maximum(last, 0), axis=1)
+        return np.where(last >= 0, filled, np.nan)
+
+    def ensemble_weights(self, raw_weights: pd.DataFrame) -> pd.DataFrame:
+        """各相位子组合等权合成后的目标权重（尚未开始调仓的子组合视为空仓）"""
+        stacked = self.phase_weights(raw_weights)
+        empty = np.isnan(stacked).all(axis=0)
+        mean = np.nan_to_num(stacked).mean(axis=0)
+        return pd.DataFrame(np.where(empty, np.nan, mean), index=raw_weights.index, columns=raw_weights.columns)
+
+
+def _accepts_kwarg(func: Callable, name: str) -> bool:
+    try:
+        params = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+    return name in params
@@ -0,0 +1,290 @@
+"""
+标的池 (Universe)
+
+DataLoader 不再只接受一份固定代码列表，而是由 Universe 决定"读哪些代码、保留哪些列"：
+  - candidates(data_type): 读取前的候选代码（默认为数据湖中该类型的全部代码）
+  - screen(panels):        读取后按原始面板（尚未 ffill）筛选列
+  - eligibility(panels):   读取后按原始面板生成逐日可选掩码 (T, N)，只能使用当日之前的数据，e.g. 流动性筛选
+
+内置：
+  - AllCodes:        数据湖中某类型的全部代码（全部股票 / 全部行业指数 …）
+  - CodeList:        显式代码列表（等价于旧的 symbols 参数）
+  - LiquidityScreen: 按前 window 日的日均成交额逐日筛选，可设下限和 / 或每日只取前 top_n
+
+Membership 是逐日 (point-in-time) 的成分：每个代码只在其首个到最后一个存储日期之间"在池"。
+只存每列的起止行号 (2 × N 个整数)，需要时再广播成 (T, N) 掩码；标的池给出逐日可选掩码时一并保存
+(eligible)。DataLoader 把它放在 data_dict['membership'] 中，因子排名、回测引擎和分块因子计算据此排除
+未上市 / 已退市 / 当日不满足筛选条件的位置。
+
+用法:
+    loader = DataLoader("2014-01-01", "2024-12-31", data_type=DataType.STOCK,
+                        universe=LiquidityScreen(min_amount=5e7, top_n=2000),
+                        fields=['open', 'high', 'low', 'close', 'amount'], dtype='float32')
+    data_dict = loader.load()
+"""
+import os
+from abc import ABC
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils import DataType, logger
+
+
+def list_codes(data_type: DataType) -> List[str]:
+    """数据湖中某类型已存储的全部代码（按 infra.repo 的目录布局：{DATA_DIR}/{type}/{code}/{year}/）"""
+    from infra import ROOT_DATA_DIR
+
+    root = ROOT_DATA_DIR / data_type.dir_code
+    if not root.exists():
+        return []
+    return sorted(entry.name for entry in os.scandir(root) if entry.is_dir() and not entry.name.startswith(('.', '_')))
+
+
+class Universe(ABC):
+    """标的池基类：子类按需覆盖 candidates / screen"""
+
+    fields: Tuple[str, ...] = ()  # screen() 需要的字段（即使调用方没有请求也会读取，筛选后丢弃）
+
+    def candidates(self, data_type: DataType, symbols: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        :param symbols: 调用方显式给出的代码；为空时取数据湖中该类型的全部代码
+        """
+        return list(symbols) if symbols else list_codes(data_type)
+
+    def screen(self, panels: Dict[str, np.ndarray], columns: pd.Index) -> np.ndarray:
+        """
+        :param panels: 字段 → (T, N) 原始面板（未 ffill，停牌 / 未上市为 NaN）
+        :param columns: 面板列对应的代码
+        :return: 保留列的布尔掩码 (N,)
+        """
+        return np.ones(len(columns), dtype=bool)
+
+    def eligibility(self, panels: Dict[str, np.ndarray], columns: pd.Index) -> Optional[np.ndarray]:
+        """
+        :param panels: 同 screen()
+        :return: 逐日可选掩码 (T, N)，第 t 行只能由 t 之前的数据决定；None 表示不按日筛选
+        """
+        return None
+
+
+class Membership:
+    """
+    逐日成分：第 j 列在行号 [first[j], last[j]] 之间在池（闭区间；从未出现的代码 first > last），
+    给出 eligible 时还须当日可选。
+
+    用法:
+        membership = data_dict['membership']
+        factor = membership.apply(factor)        # 不在池的位置置为 NaN，不参与截面排名
+        active = membership.mask(row_idx)        # (len(row_idx), N) 布尔掩码
+    """
+
+    def __init__(self, index: pd.Index, columns: pd.Index, first: np.ndarray, last: np.ndarray,
+                 eligible: Optional[np.ndarray] = None):
+        self.index = index
+        self.columns = columns
+        self.first = np.asarray(first, dtype=np.int32)
+        self.last = np.asarray(last, dtype=np.int32)
+        self.eligible = eligible  # (T, N) 逐日可选掩码（Universe.eligibility），None 为上市期间全部可选
+
+    @classmethod
+    def from_rows(cls, index: pd.Index, columns: pd.Index, rows: Sequence[np.ndarray],
+                  eligible: Optional[np.ndarray] = None) -> 'Membership':
+        """
+        :param rows: 每个代码已存储日期在 index 中的行号（与 columns 一一对应）
+        """
+        first = np.array([r.min() if len(r) else len(index) for r in rows], dtype=np.int32)
+        last = np.array([r.max() if len(r) else -1 for r in rows], dtype=np.int32)
+        return cls(index, columns, first, last, eligible)
+
+    @classmethod
+    def full(cls, index: pd.Index, columns: pd.Index, eligible: Optional[np.ndarray] = None) -> 'Membership':
+        """全部代码在整个区间内都在池"""
+        return cls(index, columns, np.zeros(len(columns)), np.full(len(columns), len(index) - 1), eligible)
+
+    def binds(self, frame: pd.DataFrame) -> bool:
+        """frame 的行列是否与本成分完全一致（可以直接按行号使用）"""
+        return frame.index.equals(self.index) and frame.columns.equals(self.columns)
+
+    def mask(self, rows=None) -> np.ndarray:
+        """
+        :param rows: 行号数组 / slice，默认全部行
+        :return: (len(rows), N) 布尔掩码：上市期间且当日可选
+        """
+        listed = self.listed(rows)
+        if self.eligible is None:
+            return listed
+        return listed & (self.eligible if rows is None else self.eligible[rows])
+
+    def listed(self, rows=None) -> np.ndarray:
+        """只看首末存储日期的 (len(rows), N) 掩码（不含 eligible；前向填充据此截断）"""
+        t = np.arange(len(self.index))
+        if rows is not None:
+            t = t[rows]
+        t = t[:, None]
+        return (t >= self.first) & (t <= self.last)
+
+    def reindex(self, index: pd.Index, columns: pd.Index) -> 'Membership':
+        """对齐到另一组行列：起止日期映射到新 index，新增列视为从未在池"""
+        first_dates = self.index[np.clip(self.first, 0, len(self.index) - 1)]
+        last_dates = self.index[np.clip(self.last, 0, len(self.index) - 1)]
+        first = index.searchsorted(first_dates, side='left')
+        last = index.searchsorted(last_dates, side='right') - 1
+        # 从未在池的代码保持 first > last
+        never = self.first > self.last
+        first, last = np.where(never, len(index), first), np.where(never, -1, last)
+
+        col_idx = self.columns.get_indexer(columns)
+        found = col_idx >= 0
+        eligible = None
+        if self.eligible is not None:
+            # 新 index 中原来没有的日期、新增列均不可选
+            row_idx = self.index.get_indexer(index)
+            eligible = self.eligible[row_idx][:, col_idx] & (row_idx >= 0)[:, None] & found
+        return Membership(index, columns,
+                          np.where(found, first[col_idx], len(index)),
+                          np.where(found, last[col_idx], -1), eligible)
+
+    def take(self, columns: np.ndarray) -> 'Membership':
+        """按列筛选（布尔掩码或列号数组）"""
+        return Membership(self.index, self.columns[columns], self.first[columns], self.last[columns],
+                          None if self.eligible is None else self.eligible[:, columns])
+
+    @classmethod
+    def concat(cls, parts: Sequence['Membership'], columns: pd.Index) -> 'Membership':
+        """行索引相同的多个成分按列拼接（与 LazyPanels.concat 对应），部分来源没有 eligible 时视为全部可选"""
+        eligible = None
+        if any(p.eligible is not None for p in parts):
+            eligible = np.concatenate([p.eligible if p.eligible is not None
+                                       else np.ones((len(p.index), len(p.columns)), dtype=bool) for p in parts], axis=1)
+        return cls(parts[0].index, columns, np.concatenate([p.first for p in parts]),
+                   np.concatenate([p.last for p in parts]), eligible)
+
+    def slice(self, start: int, stop: int) -> 'Membership':
+        """按整数行号切片（与 MarketReturns.slice 对应）"""
+        start, stop, _ = slice(start, stop).indices(len(self.index))
+        # 切片之前已上市的代码从第 0 行开始在池；之前已退市的代码 last < first，仍视为不在池
+        return Membership(self.index[start:stop], self.columns, np.maximum(self.first - start, 0),
+                          np.minimum(self.last, stop - 1) - start,
+                          None if self.eligible is None else self.eligible[start:stop])
+
+    def apply(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """不在池的位置置为 NaN（frame 的行列可以是本成分的子集）"""
+        membership = self if self.binds(frame) else self.reindex(frame.index, frame.columns)
+        return frame.where(membership.mask())
+
+    def blocks(self, block_cols: int) -> List[Tuple[np.ndarray, slice]]:
+        """
+        按上市先后把列分成若干块，每块只覆盖块内至少一列在池的行区间：
+        计算量与内存随在池的 asset-days 增长，而不是 T × N。
+
+        :param block_cols: 每块列数；<= 0 为所有列一块
+        :return: [(列号数组, 行 slice)]，全部不在池的块被省略
+        """
+        order = np.argsort(self.first, kind='stable')
+        size = block_cols if block_cols > 0 else max(len(order), 1)
+        out = []
+        for c0 in range(0, len(order), size):
+            cols = order[c0:c0 + size]
+            lo = max(int(self.first[cols].min()), 0)
+            hi = min(int(self.last[cols].max()) + 1, len(self.index))
+            if hi > lo:
+                out.append((cols, slice(lo, hi)))
+        return out
+
+    @property
+    def active_asset_days(self) -> int:
+        return int(np.clip(self.last - self.first + 1, 0, None).sum())
+
+    def __repr__(self) -> str:
+        total = len(self.index) * len(self.columns)
+        density = self.active_asset_days / total if total else 0.0
+        eligible = '' if self.eligible is None else f", eligible {self.mask().sum() / total if total else 0.0:.1%}"
+        return f"Membership({len(self.index)} days × {len(self.columns)} codes, active {density:.1%}{eligible})"
+
+
+@dataclass(frozen=True)
+class AllCodes(Universe):
+    """数据湖中该类型的全部代码"""
+
+
+@dataclass(frozen=True)
+class CodeList(Universe):
+    """显式代码列表"""
+    codes: Tuple[str, ...] = ()
+
+    def candidates(self, data_type: DataType, symbols: Optional[Sequence[str]] = None) -> List[str]:
+        return list(self.codes)
+
+
+@dataclass(frozen=True)
+class LiquidityScreen(Universe):
+    """
+    流动性筛选：按日均成交额 (amount，只计有效交易日)。
+
+    默认逐日 (point-in-time)：第 t 日只看 t 之前 window 个交易日（不含当日）的日均成交额，
+    结果作为 Membership.eligible 逐日生效，因子排名与引擎持仓只在当日满足条件的代码中进行；
+    整个样本期都不满足条件的代码直接丢弃。样本开头回看不足 min_days 的日期没有可选代码，起始日期需留出预热期。
+
+    point_in_time=False 为全样本静态筛选：用到了样本期内（含未来）的成交额，
+    留下的是"后来变得活跃"的代码，回测有前视偏差，仅供研究（如先粗筛一遍数据湖）。
+
+    :param min_amount: 日均成交额下限（元）
+    :param top_n: 只保留日均成交额最高的 top_n 只（None 为不限；逐日筛选时每日取前 top_n，并列时可能略多）
+    :param min_days: 计算日均成交额所需的最少有效交易日数
+    :param window: 逐日筛选的回看交易日数
+    :param point_in_time: False 为全样本静态筛选（见上）
+    """
+    min_amount: float = 0.0
+    top_n: Optional[int] = None
+    min_days: int = 0
+    window: int = 60
+    point_in_time: bool = True
+    fields = ('amount',)
+
+    def screen(self, panels: Dict[str, np.ndarray], columns: pd.Index) -> np.ndarray:
+        if self.point_in_time:
+            return np.ones(len(columns), dtype=bool)
+        amount = panels['amount']
+        valid = ~np.isnan(amount)
+        days = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg = np.where(valid, amount, 0.0).sum(axis=0) / days
+        avg = np.nan_to_num(avg, nan=0.0)
+
+        keep = (avg >= self.min_amount) & (days >= max(self.min_days, 1))
+        if self.top_n is not None and keep.sum() > self.top_n:
+            ranked = np.argsort(np.where(keep, -avg, np.inf), kind='stable')
+            keep = np.zeros_like(keep)
+            keep[ranked[:self.top_n]] = True
+        logger.warning(f"[Universe] LiquidityScreen (full-sample, look-ahead) kept {int(keep.sum())}/{len(columns)} "
+                       f"codes (min_amount={self.min_amount:,.0f}, top_n={self.top_n}, min_days={self.min_days})")
+        return keep
+
+    def eligibility(self, panels: Dict[str, np.ndarray], columns: pd.Index) -> Optional[np.ndarray]:
+        if not self.point_in_time:
+            return None
+        amount = panels['amount']
+        valid = ~np.isnan(amount)
+        # 累计和相减得到滚动窗口和：第 t 行取 [t - window, t) 行，不含当日
+        total = np.zeros((len(amount) + 1, amount.shape[1]))
+        np.cumsum(np.where(valid, amount, 0.0), axis=0, out=total[1:])
+        count = np.zeros(total.shape, dtype=np.int64)
+        np.cumsum(valid, axis=0, out=count[1:])
+        hi = np.arange(len(amount))
+        lo = np.maximum(hi - self.window, 0)
+        days = count[hi] - count[lo]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            adv = (total[hi] - total[lo]) / days
+
+        eligible = (days >= max(self.min_days, 1)) & (adv >= self.min_amount)
+        if self.top_n is not None and amount.shape[1] > self.top_n:
+            score = np.where(eligible, adv, -np.inf)
+            kth = np.partition(score, -self.top_n, axis=1)[:, -self.top_n]
+            eligible &= score >= kth[:, None]
+        logger.info(f"[Universe] LiquidityScreen: {eligible.sum(axis=1).mean():.0f}/{len(columns)} codes eligible "
+                    f"per day (trailing {self.window}d ADV, min_amount={self.min_amount:,.0f}, top_n={self.top_n}, "
+                    f"min_days={self.min_days})")
+        return eligible
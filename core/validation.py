@@ -0,0 +1,323 @@
+"""
+样本外验证方案 (Walk-Forward / Combinatorial Purged CV)
+
+折 (Fold) 只是行号集合：train / test 都是 close 宽表上的整数行号。支持三种划分：
+
+  - anchored:  训练期从数据起点开始不断扩大，测试期按 Y / Q / M 步进
+  - rolling:   训练期为测试期之前固定 train_periods 个周期
+  - cpcv:      组合清洗交叉验证（López de Prado）：按时间等分 n_groups 组，
+               任取 n_test_groups 组作测试，训练集去掉测试组之前 purge 行、之后 embargo 行
+
+所有折共享 BacktestCache：策略的因子 / 逻辑函数 / 目标权重在全量历史上只计算一次，
+每个折只做切片 + 引擎持仓逻辑 (_simulate)，增加折数不会重复计算因子。
+
+样本内寻优 (optimize_folds)：BacktestCache.from_grid 为参数网格中每个候选预先算好全量持仓，
+每个折在训练行上对全部候选做一次批量 _simulate，选出最优候选后只在测试行上评估它。
+折之间互不依赖，evaluate_folds 用线程池并行（NumPy 运算期间释放 GIL，切片共享同一份内存）。
+"""
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from math import comb
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils import logger, profiler
+from .engine import RealWorldEngine, _positions, _simulate
+from .intermediates import IntermediateStore
+from .metrics import METRICS, performance_stats
+from .returns import MarketReturns
+from .strategies import CustomStrategy
+
+SCHEMES = ('anchored', 'rolling', 'cpcv')
+FREQS = ('Y', 'Q', 'M')
+
+
+@dataclass(frozen=True)
+class Fold:
+    """
+    :param label: 展示用标签 (e.g. '2017', '2017Q1', '2017-01~2017-03', 'G0+G3')
+    :param train: 训练期行号（升序）
+    :param test: 测试期行号（升序，CPCV 下可以不连续）
+    :param groups: CPCV 的测试组编号，其他方案为空
+    """
+    label: str
+    train: np.ndarray
+    test: np.ndarray
+    groups: Tuple[int, ...] = ()
+
+    def test_segments(self) -> List[Tuple[int, int]]:
+        """测试行号拆成连续区间 [start, stop)"""
+        return _segments(self.test)
+
+
+def _segments(rows: np.ndarray) -> List[Tuple[int, int]]:
+    if len(rows) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    starts = np.r_[rows[0], rows[breaks]]
+    stops = np.r_[rows[breaks - 1] + 1, rows[-1] + 1]
+    return list(zip(starts.tolist(), stops.tolist()))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 划分方案
+# ─────────────────────────────────────────────────────────────────────────────
+
+def walk_forward_folds(index: pd.DatetimeIndex, scheme: str = 'anchored', freq: str = 'Y',
+                       test_periods: int = 1, train_periods: Optional[int] = None,
+                       start: Union[int, str, pd.Timestamp, None] = None, purge: int = 0) -> List[Fold]:
+    """
+    前向滚动划分。
+
+    :param index: 交易日索引
+    :param scheme: 'anchored'（扩张训练窗口）或 'rolling'（固定长度训练窗口）
+    :param freq: 测试期步长：'Y' 年 / 'Q' 季 / 'M' 月
+    :param test_periods: 每个测试期包含的周期数
+    :param train_periods: rolling 方案的训练期周期数
+    :param start: 第一个测试期的起点（年份或日期），默认数据起点 + 3 年
+    :param purge: 训练期末尾去掉的行数（避免标签跨入测试期）
+    """
+    if scheme not in ('anchored', 'rolling'):
+        raise ValueError(f"walk_forward_folds supports 'anchored' or 'rolling', got '{scheme}'")
+    if freq not in FREQS:
+        raise ValueError(f"freq must be one of {FREQS}, got '{freq}'")
+    if scheme == 'rolling' and not train_periods:
+        raise ValueError("rolling scheme requires train_periods")
+
+    periods = pd.DatetimeIndex(index).to_period(freq)
+    change = np.r_[True, periods[1:] != periods[:-1]]
+    group_starts = np.flatnonzero(change)
+    bounds = np.r_[group_starts, len(index)]
+    labels = [str(p) for p in periods[group_starts]]
+
+    if start is None:
+        start = pd.Timestamp(index[0]) + pd.DateOffset(years=3)
+    elif isinstance(start, (int, np.integer)):
+        start = pd.Timestamp(year=int(start), month=1, day=1)
+    first = int(np.searchsorted(np.asarray(index[group_starts]), np.datetime64(pd.Timestamp(start))))
+
+    folds = []
+    i = first
+    while i < len(group_starts):
+        j = min(i + test_periods, len(group_starts))
+        test = np.arange(bounds[i], bounds[j])
+        train_stop = max(bounds[i] - purge, 0)
+        train_start = 0 if scheme == 'anchored' else min(bounds[max(i - train_periods, 0)], train_stop)
+        label = labels[i] if j - i == 1 else f"{labels[i]}~{labels[j - 1]}"
+        folds.append(Fold(label, np.arange(train_start, train_stop), test))
+        i = j
+    return folds
+
+
+def cpcv_folds(n_rows: int, n_groups: int = 6, n_test_groups: int = 2,
+               purge: int = 0, embargo: Union[int, float] = 0.0) -> List[Fold]:
+    """
+    组合清洗交叉验证 (Combinatorial Purged CV)。
+
+    :param n_rows: 样本行数
+    :param n_groups: 按时间等分的组数 N
+    :param n_test_groups: 每折的测试组数 k，共 C(N, k) 折、C(N-1, k-1) 条完整回测路径
+    :param purge: 每个测试组之前从训练集去掉的行数
+    :param embargo: 每个测试组之后从训练集去掉的行数（< 1 时视为占总行数的比例）
+    """
+    if not 0 < n_test_groups < n_groups:
+        raise ValueError(f"n_test_groups must be in (0, {n_groups}), got {n_test_groups}")
+    embargo_rows = int(np.ceil(embargo * n_rows)) if 0 < embargo < 1 else int(embargo)
+    bounds = _group_bounds(n_rows, n_groups)
+
+    folds = []
+    for combo in itertools.combinations(range(n_groups), n_test_groups):
+        test = np.concatenate([np.arange(bounds[g], bounds[g + 1]) for g in combo])
+        keep = np.ones(n_rows, dtype=bool)
+        for g in combo:
+            keep[max(bounds[g] - purge, 0):min(bounds[g + 1] + embargo_rows, n_rows)] = False
+        label = '+'.join(f"G{g}" for g in combo)
+        folds.append(Fold(label, np.flatnonzero(keep), test, combo))
+    return folds
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 共享计算
+# ─────────────────────────────────────────────────────────────────────────────
+
+class BacktestCache:
+    """
+    全量历史上只计算一次的持仓 (C, K, T, N)，与 market 行列对齐。
+      - C 为候选参数组个数（单个策略时为 1，参数网格见 from_grid）
+      - K 为 phase_ensemble 策略的相位个数（收益取各相位均值，与 RealWorldEngine.run 一致）；
+        各候选的相位数不同时按最大值补零，补齐的相位不计入均值
+
+    任意行号集合的收益 = 逐个连续区间切片 + _simulate（全部候选一次批量计算），
+    区间首日的昨日持仓取自全量持仓，与全量回测在同一天的结果完全相同。
+    """
+
+    def __init__(self, strategy: Optional[CustomStrategy], market: MarketReturns,
+                 engine: Optional[RealWorldEngine] = None, **data_dict):
+        self.market = market
+        self.engine = engine or RealWorldEngine()
+        self.candidates: List[Dict[str, Any]] = [{}]
+        if strategy is not None:
+            with profiler.span('cache.strategy'):
+                self.set_positions(*_stacked_weights(strategy, data_dict))
+
+    @classmethod
+    def from_grid(cls, strategy_factory: Callable[..., CustomStrategy], candidates: Sequence[Dict[str, Any]],
+                  market: MarketReturns, engine: Optional[RealWorldEngine] = None, **data_dict) -> 'BacktestCache':
+        """
+        参数网格：每组参数调用一次 strategy_factory(**params)，各候选共享同一个 IntermediateStore，
+        因子面板按参数缓存（窗口相同的候选只算一次因子），逻辑函数每个候选在全量历史上只跑一次。
+        """
+        cache = cls(None, market, engine)
+        cache.candidates = [dict(c) for c in candidates]
+        if not cache.candidates:
+            raise ValueError("from_grid requires at least one candidate.")
+
+        store = data_dict.get('intermediates')
+        if store is None or not store.binds(data_dict):
+            data_dict = {**data_dict, 'intermediates': IntermediateStore(data_dict)}
+        logger.info(f"[Validation] Computing {len(cache.candidates)} candidates on the full history...")
+        with profiler.span('cache.grid', rows=len(cache.candidates)):
+            stacks = [_stacked_weights(strategy_factory(**params), data_dict) for params in cache.candidates]
+        cache.set_positions(*zip(*stacks))
+        data_dict['intermediates'].log_stats()
+        return cache
+
+    def set_positions(self, stacked, index, columns) -> None:
+        """
+        用目标权重覆盖缓存持仓（行列可以是 market 的子集）。
+
+        :param stacked: 单个 (K, T', N') 数组，或每个候选一个的序列（此时 index / columns 也是序列）
+        """
+        if isinstance(stacked, np.ndarray):
+            stacked, index, columns = [stacked], [index], [columns]
+        n_phases = max(w.shape[0] for w in stacked)
+        shape = (len(stacked), n_phases, len(self.market), len(self.market.columns))
+        self.positions = np.zeros(shape)
+        self.covered = np.zeros((len(stacked), len(self.market)), dtype=bool)
+        self.phases = np.array([w.shape[0] for w in stacked])
+        for c, (w, idx, cols) in enumerate(zip(stacked, index, columns)):
+            pos, row_idx = _positions(w, idx, cols, self.market)
+            self.positions[c, :len(pos)][:, row_idx] = pos
+            self.covered[c, row_idx] = True
+
+    def candidate_returns(self, rows: np.ndarray, candidates: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        指定行号（升序）上各候选的组合日收益 (C', len(rows))，一次批量 _simulate；
+        权重未覆盖的日期为 NaN（与 RealWorldEngine 一致）。
+        """
+        sel = np.arange(len(self.positions)) if candidates is None else np.asarray(candidates)
+        market = self.market
+        out = np.full((len(sel), len(rows)), np.nan)
+        padded = np.arange(self.positions.shape[1])[None, :, None] >= self.phases[sel][:, None, None]
+        offset = 0
+        for start, stop in _segments(np.asarray(rows)):
+            pos = self.positions[sel, :, start:stop]
+            prev = self.positions[sel, :, start - 1:stop - 1] if start > 0 else \
+                np.concatenate([np.zeros_like(pos[:, :, :1]), pos[:, :, :-1]], axis=2)
+            rows_seg = np.arange(start, stop)
+            rets = _simulate(pos, prev, market.daily[start:stop], market.intraday[start:stop],
+                             market.overnight[start:stop], self.engine.cost_fn(market, rows_seg))
+            rets = np.nanmean(np.where(padded, np.nan, rets), axis=1)
+            rets[~self.covered[sel, start:stop]] = np.nan
+            out[:, offset:offset + rets.shape[1]] = rets
+            offset += rets.shape[1]
+        return out
+
+    def returns(self, rows: np.ndarray, candidate: int = 0) -> pd.Series:
+        """单个候选在指定行号上的日收益"""
+        return pd.Series(self.candidate_returns(rows, [candidate])[0], index=self.market.index[rows])
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+
+def _stacked_weights(strategy: CustomStrategy, data_dict) -> Tuple[np.ndarray, pd.Index, pd.Index]:
+    """策略目标权重 → (K, T, N)；phase_ensemble 时 K 为相位个数"""
+    if getattr(strategy, 'phase_ensemble', False):
+        raw = strategy.generate_raw_weights(**data_dict)
+        return strategy.phase_weights(raw), raw.index, raw.columns
+    weights = strategy.generate_target_weights(**data_dict)
+    return weights.to_numpy(dtype=float)[None], weights.index, weights.columns
+
+
+def expand_grid(grid: Mapping[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """参数网格 → 候选参数组列表（笛卡尔积，顺序与 grid 的键一致）"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def evaluate_folds(cache: BacktestCache, folds: Sequence[Fold], workers: Optional[int] = None) -> List[pd.Series]:
+    """
+    并行计算每个折的测试期收益（结果顺序与 folds 一致）。
+
+    :param workers: 线程数，默认 CPU 核数；<= 1 时串行
+    """
+    return _map_folds(lambda fold: cache.returns(fold.test), folds, workers)
+
+
+def optimize_folds(cache: BacktestCache, folds: Sequence[Fold], objective: str = 'Sharpe',
+                   workers: Optional[int] = None) -> Tuple[List[pd.Series], List[int]]:
+    """
+    样本内寻优 + 样本外评估：每个折在训练行上批量回测全部候选，取 objective 最高的候选，
+    再用该候选计算测试期收益。
+
+    :param objective: performance_stats 中的指标列（越大越好），e.g. 'Sharpe' / 'Calmar' / 'CAGR'
+    :return: (各折测试期收益, 各折选中的候选序号)
+    """
+    if objective not in METRICS:
+        raise ValueError(f"objective must be one of {METRICS}, got '{objective}'")
+
+    def run(fold: Fold):
+        in_sample = cache.candidate_returns(fold.train)
+        score = performance_stats(in_sample.T)[objective].to_numpy()
+        best = int(np.argmax(np.nan_to_num(score, nan=-np.inf)))
+        return cache.returns(fold.test, best), best
+
+    pairs = _map_folds(run, folds, workers)
+    return [p[0] for p in pairs], [p[1] for p in pairs]
+
+
+def _map_folds(func: Callable[[Fold], Any], folds: Sequence[Fold], workers: Optional[int]) -> List[Any]:
+    workers = min(workers or os.cpu_count() or 1, max(len(folds), 1))
+    logger.info(f"[Validation] Evaluating {len(folds)} folds with {workers} worker(s)...")
+    with profiler.span('folds', rows=len(folds)):
+        if workers <= 1:
+            return [func(fold) for fold in folds]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(func, folds))
+
+
+def fold_summary(folds: Sequence[Fold], results: Sequence[pd.Series]) -> pd.DataFrame:
+    """每个折一行：Period / Days + 全部绩效指标（一次向量化计算）"""
+    head = pd.DataFrame({'Period': [f.label for f in folds], 'Days': [len(f.test) for f in folds]})
+    stats = performance_stats(list(results))
+    return pd.concat([head, stats.reset_index(drop=True)], axis=1)
+
+
+def cpcv_paths(folds: Sequence[Fold], results: Sequence[pd.Series]) -> pd.DataFrame:
+    """
+    把 CPCV 各折的测试收益拼成 C(N-1, k-1) 条完整回测路径：
+    每个组出现在若干折中，第 p 条路径使用该组第 p 次出现时的收益。
+    """
+    groups = sorted({g for f in folds for g in f.groups})
+    if not groups:
+        raise ValueError("cpcv_paths requires folds produced by cpcv_folds.")
+    n_rows = max(int(f.test[-1]) for f in folds) + 1
+    bounds = _group_bounds(n_rows, len(groups))
+    n_paths = comb(len(groups) - 1, len(folds[0].groups) - 1)
+
+    pieces = {g: [] for g in groups}
+    for fold, rets in zip(folds, results):
+        for g in fold.groups:
+            lo, hi = np.searchsorted(fold.test, [bounds[g], bounds[g + 1]])
+            pieces[g].append(rets.iloc[lo:hi])
+
+    return pd.DataFrame({f"path_{p}": pd.concat([pieces[g][p] for g in groups]) for p in range(n_paths)})
+
+
+def _group_bounds(n_rows: int, n_groups: int) -> np.ndarray:
+    return np.linspace(0, n_rows, n_groups + 1).astype(int)
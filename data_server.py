@@ -0,0 +1,70 @@
+"""
+共享内存数据服务：加载一次宽表，供多个 run.py / wfa.py 进程零拷贝挂载
+
+用法 (在项目根目录执行):
+    python data_server.py --name etf                                   # ETF 池 (config.ETF_SYMBOLS)
+    python data_server.py --name stock --data-type stock --top-liquid 2000 \\
+                          --fields open high low close amount --dtype float32
+
+    python run.py --shm etf --no-report                                # 另开终端，直接挂载
+    python wfa.py --shm etf --optimize
+
+Ctrl-C / SIGTERM 停止：撤下描述符，等待已挂载的进程全部退出后释放共享内存。
+"""
+import argparse
+from datetime import datetime
+
+import config
+from core.data import DataLoader
+from core.shm import DataServer
+from core.universe import LiquidityScreen
+from utils import DataType, logger
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="把 DataLoader 的宽表发布到共享内存，供多个回测进程挂载")
+    parser.add_argument('--name', default='etf', help="服务名，回测脚本用 --shm NAME 挂载（默认 etf）")
+    parser.add_argument('--start', default="2013-08-01", help="数据起始日期（默认 2013-08-01）")
+    parser.add_argument('--end', default=datetime.now().strftime("%Y-%m-%d"), help="数据结束日期（默认今天）")
+    parser.add_argument('--no-sync', action='store_true', help="不在加载前同步数据")
+    parser.add_argument('--data-type', choices=[t.name.lower() for t in DataType], default='etf',
+                        help="数据类型（默认 etf）")
+    parser.add_argument('--symbols', nargs='+', default=None,
+                        help="标的代码（默认：etf 为 config.ETF_SYMBOLS，其他类型为数据湖中的全部代码）")
+    parser.add_argument('--min-amount', type=float, default=None,
+                        help="流动性筛选：逐日按前 60 个交易日的日均成交额下限（元）")
+    parser.add_argument('--top-liquid', type=int, default=None,
+                        help="流动性筛选：每日只保留前 60 日日均成交额最高的 N 只")
+    parser.add_argument('--fields', nargs='+', default=None, help="只加载这些字段（默认全部）")
+    parser.add_argument('--dtype', default='float64', help="宽表数值类型，大标的池可用 float32 使内存减半")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="停止时等待挂载进程退出的最长秒数（默认一直等）")
+    return parser.parse_args(argv)
+
+
+def main(args: argparse.Namespace = None):
+    args = args or parse_args([])
+
+    # 1. 加载数据（与 run.py 相同的参数）
+    data_type = DataType[args.data_type.upper()]
+    universe = None
+    if args.min_amount is not None or args.top_liquid is not None:
+        universe = LiquidityScreen(min_amount=args.min_amount or 0.0, top_n=args.top_liquid)
+    loader = DataLoader(args.start, args.end, auto_sync=not args.no_sync,
+                        data_type=data_type, universe=universe, fields=args.fields, dtype=args.dtype)
+    symbols = args.symbols or (config.ETF_SYMBOLS if data_type == DataType.ETF else None)
+    data_dict = loader.load(symbols)
+
+    # 2. 发布到共享内存并阻塞，直到 Ctrl-C / SIGTERM
+    server = DataServer(data_dict, args.name)
+    server.publish()
+    del data_dict  # 共享块已有完整副本，释放本进程的宽表
+    try:
+        logger.info(f"[SHM] Serving '{args.name}'. Attach with: python run.py --shm {args.name}")
+        server.serve_forever()
+    finally:
+        server.close(timeout=args.timeout)
+
+
+if __name__ == "__main__":
+    main(parse_args())
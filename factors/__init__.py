@@ -7,6 +7,7 @@ from .volatility import Volatility, IntradayVolatility
 from .reversion import MeanReversion
 from .bias import MainLineBias
 from .peak import Peak  # 新增 Peak 因子导出
+from .drawdown import Drawdown, DaysSincePeak, Breakout
 
 # 方便使用 import *
 __all__ = [
@@ -16,5 +17,8 @@ __all__ = [
     'IntradayVolatility',
     'MeanReversion',
     'MainLineBias',
-    'Peak'
+    'Peak',
+    'Drawdown',
+    'DaysSincePeak',
+    'Breakout'
 ]
\ No newline at end of file
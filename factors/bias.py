@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 from core.base import Factor
+from core.intermediates import IntermediateStore, log_price
 
 
 class MainLineBias(Factor):
@@ -25,10 +26,13 @@ class MainLineBias(Factor):
         super().__init__(f"LiuBias_{window}d")
         self.window = window
 
-    def calculate(self, close: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    def requires(self):
+        return [log_price('close')]
+
+    def calculate(self, close: pd.DataFrame, intermediates: IntermediateStore = None, **kwargs) -> pd.DataFrame:
         # 1. 取对数价格 (Log Price)
         # 使用对数是为了消除高价股和低价股的波动率差异，使指标更具横向可比性
-        ln_close = np.log(close)
+        ln_close = IntermediateStore.ensure(intermediates, close=close).get(log_price('close'))
 
         # 2. 计算指数移动平均 (EMA)
         # 广发原文使用的是 EMA20 (span=20)
@@ -0,0 +1,54 @@
+import pandas as pd
+import numpy as np
+from core.base import Factor
+from core.rolling import rolling_max
+
+
+class Drawdown(Factor):
+    """
+    滚动回撤因子 (Drawdown)
+    计算公式: Close_t / Max(Close_{t-N+1..t}) - 1   (<= 0，越接近 0 越强)
+    """
+    columnwise = True
+
+    def __init__(self, window: int = 60):
+        super().__init__(f"DD_{window}d")
+        self.window = window
+
+    def calculate(self, close: pd.DataFrame, **kwargs) -> pd.DataFrame:
+        peak, _ = rolling_max(close, self.window)
+        return close / peak - 1
+
+
+class DaysSincePeak(Factor):
+    """
+    距窗口最高点的天数 (Days Since Peak)
+    计算公式: t - argmax(Close_{t-N+1..t})，0 表示今天就是窗口新高
+    """
+    columnwise = True
+
+    def __init__(self, window: int = 60):
+        super().__init__(f"DaysSincePeak_{window}d")
+        self.window = window
+
+    def calculate(self, close: pd.DataFrame, **kwargs) -> pd.DataFrame:
+        _, peak_pos = rolling_max(close, self.window)
+        days = np.arange(len(close))[:, None] - peak_pos
+        return pd.DataFrame(np.where(peak_pos < 0, np.nan, days), index=close.index, columns=close.columns)
+
+
+class Breakout(Factor):
+    """
+    突破因子 (Breakout)
+    计算公式: Close_t / Max(Close_{t-N..t-1}) - 1   (> 0 表示突破前 N 日高点)
+    """
+    columnwise = True
+
+    def __init__(self, window: int = 20):
+        super().__init__(f"Breakout_{window}d")
+        self.window = window
+
+    def calculate(self, close: pd.DataFrame, **kwargs) -> pd.DataFrame:
+        prior_high, _ = rolling_max(close, self.window)
+        prior_high = np.vstack([np.full((1, close.shape[1]), np.nan), prior_high[:-1]])
+        return close / prior_high - 1
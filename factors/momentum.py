@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from core.base import Factor
+from core.intermediates import IntermediateStore, returns
 
 class Momentum(Factor):
     """
@@ -12,8 +13,12 @@ class Momentum(Factor):
         super().__init__(f"Mom_{window}d")
         self.window = window
 
-    def calculate(self, close: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    def requires(self):
+        return [returns(self.window, 'close')]
+
+    def calculate(self, close: pd.DataFrame, intermediates: IntermediateStore = None, **kwargs) -> pd.DataFrame:
         """
         :param close: 收盘价宽表 (Index=Date, Columns=Assets)
+        :param intermediates: 共享中间结果 (可选)
         """
-        return close.pct_change(self.window)
\ No newline at end of file
+        return IntermediateStore.ensure(intermediates, close=close).get(returns(self.window, 'close'))
\ No newline at end of file
@@ -1,12 +1,15 @@
 import pandas as pd
 import numpy as np
 from core.base import Factor
+from core.rolling import rolling_min, rolling_valid_count
 
 class Momentum_castle(Factor):
     """
     经典动量因子 (Momentum)
     计算公式: (Close_t / Close_{t-N}) - 1
     """
+    columnwise = True
+
     def __init__(self, window: int = 20):
         # 这里的 name 会在回测报告中显示
         super().__init__(f"Mom_{window}d")
@@ -15,15 +18,31 @@ class Momentum_castle(Factor):
     def calculate(self, close: pd.DataFrame, **kwargs) -> pd.DataFrame:
         """
         :param close: 收盘价宽表 (Index=Date, Columns=Assets)
+
+        因子 = 最新价 / 窗口前 3 根的最低价 - 1，窗口内有 NaN 时为 NaN。
+        基于 core.rolling 一次性计算所有列，等价于逐窗口调用 calculate_k。
         """
-        return close.rolling(window=self.window).apply(self.calculate_k, raw=False) #.fillna(0.0),min_periods=20
+        values = close.to_numpy(dtype=float)
+        res = np.full(values.shape, np.nan)
+        if self.window >= 20:  # 与 calculate_k 一致：不足 20 个数据返回 NaN
+            # 窗口 [t-w+1, t] 的前 3 根 = 以 t-w+3 结尾的 3 日窗口
+            head = min(3, self.window)
+            head_min, _ = rolling_min(values, head)
+            shift = self.window - head
+            min_value = np.full(values.shape, np.nan)
+            if shift < len(values):
+                min_value[shift:] = head_min[:len(values) - shift]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                res = np.where(min_value != 0, values / min_value, 0.0) - 1
+            res = np.where(rolling_valid_count(values, self.window) < self.window, np.nan, res)
+        return pd.DataFrame(res, index=close.index, columns=close.columns)
     
     def calculate_k(self, series):
-        """计算滚动窗口内最大值与第一个值的斜率"""
+        """计算滚动窗口内最大值与第一个值的斜率（单窗口参考实现，保留用于核对）"""
         if len(series) < 20:  # 不足20个数据返回NaN
             return np.nan
 
         min_value = series.iloc[:3].min()
         last_value = series.iloc[-1]
 
-        return (last_value/min_value if min_value != 0 else 0.0) - 1
\ No newline at end of file
+        return (last_value/min_value if min_value != 0 else 0.0) - 1
@@ -1,20 +1,51 @@
 import pandas as pd
 import numpy as np
 from core.base import Factor
+from core.rolling import rolling_max, rolling_valid_count, RangeExtrema
 
 
 class Peak(Factor):
+    columnwise = True
+
     def __init__(self, window: int = 20):
         # 这里的 name 会在回测报告中显示
         super().__init__(f"Peak_{window}d")
         self.window = window
 
     def calculate(self, close: pd.DataFrame, **kwargs) -> pd.DataFrame:
-        res = close.rolling(window=self.window, min_periods=2).apply(self.calculate_k).fillna(0.0)
-        return res
+        """
+        对每个滚动窗口 (min_periods=2)：
+          - 找到窗口内最高点 (max_value, max_pos)，最高点在窗口首/尾时因子为 0
+          - 找到最高点之前的最低点 (min_value, min_pos)
+          - k1 = 最低点 → 最高点 的斜率，k2 = 最低点 → 最新价 的斜率
+          - 因子 = (k2 - k1) * k1 * k1 * 450
+
+        基于 core.rolling 一次性计算所有列，等价于逐窗口调用 calculate_k。
+        """
+        values = close.to_numpy(dtype=float)
+        n_rows = len(values)
+        t = np.arange(n_rows)[:, None]
+        win_start = np.maximum(t - self.window + 1, 0)
+        win_len = t - win_start + 1
+
+        max_value, max_pos = rolling_max(values, self.window, min_periods=2)
+        min_value, min_pos = RangeExtrema(values, self.window, find_max=False).query(
+            np.broadcast_to(win_start, values.shape), max_pos - 1)
+
+        max_rel = max_pos - win_start
+        min_rel = min_pos - win_start
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k1 = (max_value - min_value) / (max_rel - min_rel)
+            k2 = (values - min_value) / (win_len - 1 - min_rel)
+            res = (k2 - k1) * k1 * k1 * 450
+
+        # 最高点在窗口首/尾 → 0；有效值不足 2 个的窗口 → NaN → 0
+        res = np.where((max_rel == 0) | (max_rel == win_len - 1), 0.0, res)
+        res = np.where(rolling_valid_count(values, self.window) < 2, np.nan, res)
+        return pd.DataFrame(res, index=close.index, columns=close.columns).fillna(0.0)
 
     def calculate_k(self, series):
-        """计算滚动窗口内最大值与第一个值的斜率"""
+        """计算滚动窗口内最大值与第一个值的斜率（单窗口参考实现，保留用于核对）"""
         max_value = series.max()
         max_pos = series.argmax()
 
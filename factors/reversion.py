@@ -1,5 +1,6 @@
 import pandas as pd
 from core.base import Factor
+from core.intermediates import IntermediateStore, rolling_mean
 
 class MeanReversion(Factor):
     """
@@ -11,8 +12,11 @@ class MeanReversion(Factor):
         super().__init__(f"Rev_{window}d")
         self.window = window
 
-    def calculate(self, close: pd.DataFrame, **kwargs) -> pd.DataFrame:
-        ma = close.rolling(self.window).mean()
+    def requires(self):
+        return [rolling_mean(self.window, 'close')]
+
+    def calculate(self, close: pd.DataFrame, intermediates: IntermediateStore = None, **kwargs) -> pd.DataFrame:
+        ma = IntermediateStore.ensure(intermediates, close=close).get(rolling_mean(self.window, 'close'))
         # 计算当前价格偏离均线的幅度
         bias = (close - ma) / ma
         return bias
\ No newline at end of file
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 from core.base import Factor
+from core.intermediates import IntermediateStore, log_returns, rolling_std
 
 
 class Volatility(Factor):
@@ -13,11 +14,14 @@ class Volatility(Factor):
         super().__init__(f"Vol_{window}d")
         self.window = window
 
-    def calculate(self, close: pd.DataFrame, **kwargs) -> pd.DataFrame:
-        # 1. 计算对数收益率
-        log_ret = np.log(close / close.shift(1))
-        # 2. 计算滚动标准差
-        return log_ret.rolling(self.window).std()
+    def requires(self):
+        return [rolling_std(self.window, log_returns('close'))]
+
+    def calculate(self, close: pd.DataFrame, intermediates: IntermediateStore = None, **kwargs) -> pd.DataFrame:
+        store = IntermediateStore.ensure(intermediates, close=close)
+        # Log 收益率 = ln(close_t) - ln(close_{t-1})，与 MainLineBias 共享 ln(close)
+        # 再计算滚动标准差
+        return store.get(rolling_std(self.window, log_returns('close')))
 
 
 class IntradayVolatility(Factor):
@@ -25,6 +29,7 @@ class IntradayVolatility(Factor):
     日内波动率因子 (Intraday Volatility)
     计算公式: (High - Low) / Low 的 N 日均值
     """
+    columnwise = True
 
     def __init__(self, window: int = 14):
         super().__init__(f"IntradayVol_{window}d")
@@ -6,7 +6,13 @@ from pathlib import Path
 dotenv.load_dotenv()
 ROOT_DATA_DIR = Path(str(os.getenv("DATA_DIR")))
 TICK_INTERVAL = float(os.getenv("TICK_INTERVAL", "0.2"))
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "8"))  # 异步同步 (async_sync) 中分钟线接口的默认并发数
 DATA_FETCHER = os.getenv("DATA_FETCHER", "akshare")
+# 远程响应缓存 (infra/cache.py)：off / on / record / replay
+FETCH_CACHE = os.getenv("FETCH_CACHE", "off")
+FETCH_CACHE_DIR = os.getenv("FETCH_CACHE_DIR", "")  # 默认 {DATA_DIR}/_cache
+FETCH_CACHE_TTL = float(os.getenv("FETCH_CACHE_TTL", str(12 * 3600)))  # 秒
+FETCH_CACHE_MAX_MB = float(os.getenv("FETCH_CACHE_MAX_MB", "1024"))
 
 from .repo import (
     sync_latest_industry_data,
@@ -18,5 +24,8 @@ from .repo import (
     get_latest_trade_date,
     find_last_trade_date
 )
+from .async_sync import SyncPipeline, sync_latest_all_data_async
 from .fetchers import get_fetcher
-__all__ = ['sync_latest_industry_data','sync_latest_index_data','sync_latest_stock_data','sync_latest_all_data','get_latest_sync_date','get_latest_trade_date', 'find_last_trade_date','sync_latest_etf_data','get_fetcher','DATA_FETCHER']
\ No newline at end of file
+from .cache import ResponseCache, CacheMiss, get_cache, set_cache
+from .quality import QualityReport, quality
+__all__ = ['sync_latest_industry_data','sync_latest_index_data','sync_latest_stock_data','sync_latest_all_data','get_latest_sync_date','get_latest_trade_date', 'find_last_trade_date','sync_latest_etf_data','get_fetcher','DATA_FETCHER','SyncPipeline','sync_latest_all_data_async','ResponseCache','CacheMiss','get_cache','set_cache','QualityReport','quality']
\ No newline at end of file
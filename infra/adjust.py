@@ -0,0 +1,199 @@
+"""
+复权因子表 (Adjustment Factors)
+
+BaoStock 对 ETF 只提供不复权价格，而本地早期数据来自 AkShare 后复权 (hfq)。这里为每个代码持久化一张复权因子表：
+  - {DATA_DIR}/{类型}/{代码}/adjust.parquet：(datetime, factor) 阶梯序列，某日的因子 = 不晚于该日的最后一行；
+    首行固定为 1970-01-01 的基准因子
+  - 数据湖中存的是数据源原样的价格（BaoStock 为不复权价），读取时按日期取因子、整列乘一次得到连续的复权价
+  - 同步时由新数据的昨收 (preclose) 与上一根的存储收盘价逐日算出除权比例，只在比例偏离 1 时追加一行，
+    不再对价格四舍五入，因子不会随同步次数漂移
+  - 文件元数据里记录锚点（最后一根日线的日期 / 存储收盘价 / 名称），增量同步只读这个小文件，不再读价格文件
+  - 整段历史换基准 (rebase) 只改因子表，不重写价格文件
+
+    factors = AdjustFactors.load(code_dir) or AdjustFactors.bootstrap(code_dir)
+    new = factors.extend(raw_df, raw=True)       # 追加新数据对应的因子
+    save_date(raw_df, data_dir, False, adjust={code: new})
+    new.save(code_dir)
+
+    df = AdjustFactors.load(code_dir).apply(df)  # 读取时复权
+"""
+import json
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils import logger
+from utils.const import DATETIME, CODE, NAME, OPEN, HIGH, LOW, CLOSE, PRECLOSE, PRICE_CHG
+
+ADJUST_FILE = 'adjust.parquet'
+FACTOR = 'factor'
+PRICE_COLUMNS = (OPEN, HIGH, LOW, CLOSE, PRECLOSE)
+STEP_TOLERANCE = 1e-4  # 昨收与上一根收盘的相对偏差小于该值视为没有除权（吸收数据源的舍入误差）
+
+_ORIGIN = np.datetime64('1970-01-01', 'ns')
+_SCHEMA = pa.schema([(DATETIME, pa.timestamp('ns')), (FACTOR, pa.float64())])
+
+
+@dataclass
+class Anchor:
+    """本地最后一根日线"""
+    datetime: str   # ISO 格式
+    close: float    # 存储价（未乘因子）
+    name: str = ''
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromisoformat(self.datetime)
+
+
+class AdjustFactors:
+    """
+    单个代码的复权因子阶梯序列。
+
+    :param dates: 各阶梯的起始日期（升序，首个为 1970-01-01）
+    :param factors: 对应的累计因子
+    :param anchor: 本地最后一根日线，None 表示本地还没有数据
+    """
+
+    def __init__(self, dates: Optional[np.ndarray] = None, factors: Optional[np.ndarray] = None,
+                 anchor: Optional[Anchor] = None):
+        self.dates = np.array([_ORIGIN] if dates is None else dates, dtype='datetime64[ns]')
+        self.factors = np.array([1.0] if factors is None else factors, dtype=float)
+        self.anchor = anchor
+
+    # ── 读写 ────────────────────────────────────────────────────────────────
+
+    @classmethod
+    def load(cls, code_dir: Path) -> Optional['AdjustFactors']:
+        """读取 {code_dir}/adjust.parquet，不存在时返回 None"""
+        path = Path(code_dir) / ADJUST_FILE
+        if not path.exists():
+            return None
+        table = pq.read_table(path)
+        meta = (table.schema.metadata or {}).get(b'anchor')
+        anchor = Anchor(**json.loads(meta)) if meta else None
+        return cls(table[DATETIME].to_numpy(), table[FACTOR].to_numpy(), anchor)
+
+    def save(self, code_dir: Path) -> None:
+        """原子写入（先写临时文件再替换）"""
+        path = Path(code_dir) / ADJUST_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.table([pa.array(self.dates, pa.timestamp('ns')), pa.array(self.factors)], schema=_SCHEMA)
+        if self.anchor is not None:
+            table = table.replace_schema_metadata({'anchor': json.dumps(asdict(self.anchor), ensure_ascii=False)})
+        tmp = path.with_suffix('.tmp')
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def bootstrap(cls, code_dir: Path) -> 'AdjustFactors':
+        """
+        还没有因子表的代码：基准因子 1（已存储的价格视为已复权），锚点取自最新年度文件的最后一行。
+        每个代码只会执行一次，之后的同步只读因子表。
+        """
+        code_dir = Path(code_dir)
+        years = sorted((y for y in os.listdir(code_dir) if y.isdigit()), key=int) if code_dir.exists() else []
+        for year in reversed(years):
+            daily_file = code_dir / year / f'{year}.parquet'
+            if not daily_file.exists():
+                continue
+            columns = [c for c in (DATETIME, CLOSE, NAME) if c in pq.read_schema(daily_file).names]
+            df = pq.read_table(daily_file, columns=columns).to_pandas()
+            df[DATETIME] = pd.to_datetime(df[DATETIME])
+            df = df.dropna(subset=[DATETIME])
+            if df.empty:
+                continue
+            last = df.loc[df[DATETIME].idxmax()]
+            if pd.isna(last[CLOSE]):
+                continue
+            name = str(last[NAME]) if NAME in df.columns and pd.notna(last[NAME]) else ''
+            return cls(anchor=Anchor(last[DATETIME].isoformat(), float(last[CLOSE]), name))
+        return cls()
+
+    # ── 查询 ────────────────────────────────────────────────────────────────
+
+    def at(self, datetimes: Sequence) -> np.ndarray:
+        """各日期对应的因子（不晚于该日的最后一个阶梯）"""
+        values = np.asarray(pd.to_datetime(datetimes), dtype='datetime64[ns]')
+        idx = np.searchsorted(self.dates, values, side='right') - 1
+        return self.factors[np.clip(idx, 0, None)]
+
+    @property
+    def is_identity(self) -> bool:
+        return bool(np.all(self.factors == 1.0))
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """存储价 → 复权价：价格列整列乘以按日期取得的因子（原地修改并返回 df）"""
+        if self.is_identity or df.empty:
+            return df
+        factor = self.at(df[DATETIME])
+        for col in PRICE_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].to_numpy(dtype=float) * factor
+        return df
+
+    # ── 更新 ────────────────────────────────────────────────────────────────
+
+    def extend(self, df: pd.DataFrame, raw: bool) -> 'AdjustFactors':
+        """
+        追加一批新日线后的因子表（返回新对象，原对象不变）。
+
+        :param df: 即将写入的日线（存储价）
+        :param raw: True 表示数据源为不复权价（BaoStock）：由昨收与上一根存储收盘价算除权比例；
+                    False 表示数据源已复权（AkShare hfq）：新数据的因子为 1
+        """
+        anchor_ts = np.datetime64(self.anchor.timestamp, 'ns') if self.anchor else None
+        df = df.sort_values(DATETIME)
+        dates = np.asarray(pd.to_datetime(df[DATETIME]), dtype='datetime64[ns]')
+        new = dates > anchor_ts if anchor_ts is not None else np.ones(len(df), dtype=bool)
+        if not new.any():
+            return self
+        df, dates = df[new], dates[new]
+
+        # 重跑同一区间时先丢弃锚点之后的旧阶梯，结果与第一次相同
+        keep = self.dates <= anchor_ts if anchor_ts is not None else np.ones(len(self.dates), dtype=bool)
+        keep[0] = True
+        steps_dates, steps_factors = self.dates[keep], self.factors[keep]
+        base = float(steps_factors[-1])
+
+        close = df[CLOSE].to_numpy(dtype=float)
+        if raw:
+            preclose = df[PRECLOSE].to_numpy(dtype=float) if PRECLOSE in df.columns else np.full(len(df), np.nan)
+            if PRICE_CHG in df.columns:
+                # 昨收缺失时由涨跌幅反推：preclose = close / (1 + pct_chg / 100)
+                implied = close / (1 + df[PRICE_CHG].to_numpy(dtype=float) / 100)
+                preclose = np.where(np.isfinite(preclose) & (preclose > 0), preclose, implied)
+            prev = np.concatenate([[self.anchor.close if self.anchor else np.nan], close[:-1]])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = prev / preclose
+            ratio = np.where(np.isfinite(ratio) & (ratio > 0) & (np.abs(ratio - 1) >= STEP_TOLERANCE), ratio, 1.0)
+            factors = base * np.cumprod(ratio)
+        else:
+            factors = np.ones(len(df))
+
+        changed = np.flatnonzero(factors != np.concatenate([[base], factors[:-1]]))
+        if len(changed):
+            code = df[CODE].iloc[0] if CODE in df.columns else ''
+            for i in changed:
+                logger.info(f"[Adjust] {code}: factor {factors[i]:.6f} from {pd.Timestamp(dates[i]).date()}")
+            steps_dates = np.concatenate([steps_dates, dates[changed]])
+            steps_factors = np.concatenate([steps_factors, factors[changed]])
+
+        name = str(df[NAME].iloc[-1]) if NAME in df.columns else (self.anchor.name if self.anchor else '')
+        anchor = Anchor(pd.Timestamp(dates[-1]).isoformat(), float(close[-1]), name)
+        return AdjustFactors(steps_dates, steps_factors, anchor)
+
+    def rebase(self, at: Optional[datetime] = None) -> 'AdjustFactors':
+        """换基准：使 at（默认锚点日期）的因子为 1，即以该日的存储价为复权基准；只改因子表"""
+        when = at or (self.anchor.timestamp if self.anchor else None)
+        if when is None:
+            return self
+        pivot = float(self.at([when])[0])
+        return AdjustFactors(self.dates.copy(), self.factors / pivot, self.anchor)
@@ -0,0 +1,406 @@
+"""
+异步同步管线 (Async Sync Pipeline)
+
+sync_latest_all_data 依次同步行业 / 指数 / 股票 / ETF，分钟线更是逐个代码串行请求 + sleep(TICK_INTERVAL)，
+全市场一天的分钟线要跑几个小时。这里用 asyncio 调度，akshare 的阻塞调用放进线程池执行：
+  - 每个接口 (endpoint) 独立的并发上限 (ENDPOINT_LIMITS) 与最小请求间隔 (TICK_INTERVAL)
+  - 自适应退避 (AIMD)：出错时该接口并发减半、请求间隔加上翻倍的退避时间；每成功一轮并发 +1、退避减半
+  - 结果先在内存中攒批，再由单线程写入器一次 save_date：每个分区 (代码/年 或 代码/年/tick/日) 只写一次
+    （同一次同步中每个代码只请求一次，分批写出时分区也不会重复）
+  - 股票分钟线与串行版共用 SyncJob 进度 (infra.checkpoint)：代码在所在批次写盘后才记为完成，
+    中断 / 失败后重跑只请求未完成与待重试的代码
+  - 启用 FETCH_CACHE (infra.cache) 时，命中缓存的请求不占用接口并发额度
+
+akshare 的函数在调用时才按名字从 client 上获取，传入桩模块即可离线测试：
+    pipeline = SyncPipeline(client=fake_akshare, trade_date=date(2024, 1, 5), min_interval=0)
+    asyncio.run(pipeline.sync_all(include_tick=True))
+"""
+import asyncio
+import functools
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from tqdm import tqdm
+
+from utils import DataType, logger
+from utils.const import CODE, NAME
+from . import TICK_INTERVAL, SYNC_CONCURRENCY
+from .cache import CacheMiss, get_cache
+from .checkpoint import SyncJob
+from .quality import quality
+from .repo import (
+    INDEX_SPOT_SYMBOLS, INDEX_TICK_CODES,
+    _stock_spot_frame, _stock_tick_frame, _index_spot_frame, _combine_index_spots, _index_tick_frame,
+    _industry_daily_frame, _industry_tick_frame,
+    get_data_dir, get_latest_trade_date, save_date, sync_latest_etf_data,
+)
+
+# 各接口的初始（也是最大）并发数，未列出的接口使用 SYNC_CONCURRENCY
+ENDPOINT_LIMITS: Dict[str, int] = {
+    'stock_zh_a_spot_em': 1,
+    'stock_zh_index_spot_em': 2,
+    'stock_board_industry_name_em': 1,
+    'stock_zh_a_hist_min_em': SYNC_CONCURRENCY,
+    'index_zh_a_hist_min_em': 2,
+    'stock_board_industry_hist_em': 4,
+    'stock_board_industry_hist_min_em': 4,
+}
+BACKOFF_BASE = 1.0   # 首次出错后的退避秒数
+MAX_BACKOFF = 30.0   # 退避上限
+FLUSH_ROWS = 200_000  # 攒够这么多行就写一次盘
+SYNC_MARKER_CODE = '000001'  # get_latest_sync_date 以该股票的分钟线作为"当天已同步"标识，必须最后写入
+
+
+@dataclass
+class EndpointStats:
+    calls: int = 0
+    errors: int = 0
+    failures: int = 0  # 重试耗尽仍失败的请求数
+
+
+class Endpoint:
+    """
+    单个接口的调度器：并发上限 + 最小请求间隔 + AIMD 自适应退避。
+
+    :param name: 接口名（akshare 函数名）
+    :param max_concurrency: 最大并发数，也是初始并发数
+    :param min_interval: 同一接口相邻两次请求的最小间隔（秒）
+    :param retries: 出错后的重试次数
+    """
+
+    def __init__(self, name: str, max_concurrency: int, min_interval: float = TICK_INTERVAL,
+                 retries: int = 3, backoff_base: float = BACKOFF_BASE, max_backoff: float = MAX_BACKOFF):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_interval = min_interval
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+
+        self.limit = self.max_concurrency  # 当前允许的并发数
+        self.backoff = 0.0                 # 当前附加在请求间隔上的退避时间
+        self.stats = EndpointStats()
+        self._in_flight = 0
+        self._successes = 0
+        self._next_start = 0.0
+        self._cond = asyncio.Condition()
+
+    async def call(self, executor: ThreadPoolExecutor, func: Callable[..., Any], **kwargs) -> Any:
+        """在 executor 中执行 func(**kwargs)；重试耗尽后记录错误并返回 None（与 _execute_with_retry 一致）"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            await self._acquire()
+            self.stats.calls += 1
+            try:
+                result = await loop.run_in_executor(executor, functools.partial(func, **kwargs))
+            except Exception as e:
+                self.stats.errors += 1
+                await self._release(ok=False)
+                logger.warning(f"[Sync] {self.name}({kwargs}) attempt {attempt + 1}/{self.retries + 1} failed: {e} "
+                               f"(limit={self.limit}, backoff={self.backoff:.1f}s)")
+                continue
+            await self._release(ok=True)
+            return result
+
+        self.stats.failures += 1
+        logger.error(f"[Sync] {self.name}({kwargs}) failed after {self.retries + 1} attempts")
+        return None
+
+    async def _acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+            now = loop.time()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval + self.backoff
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _release(self, ok: bool) -> None:
+        async with self._cond:
+            self._in_flight -= 1
+            if ok:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    # 一整轮成功：加性恢复并发，退避减半
+                    self._successes = 0
+                    self.limit = min(self.limit + 1, self.max_concurrency)
+                    self.backoff = self.backoff / 2 if self.backoff > self.backoff_base / 8 else 0.0
+            else:
+                # 出错：并发乘性减半，退避翻倍
+                self._successes = 0
+                self.limit = max(1, self.limit // 2)
+                self.backoff = min(max(self.backoff * 2, self.backoff_base), self.max_backoff)
+            self._cond.notify_all()
+
+
+class SyncPipeline:
+    """
+    行业 / 指数 / 股票的日线与分钟线并发同步（ETF 仍走 sync_latest_etf_data，在线程池中与其余部分并行）。
+
+    :param client: 提供 akshare 同名函数的对象，默认 akshare 模块本身（离线测试时传入桩）
+    :param limits: 覆盖 ENDPOINT_LIMITS 中的并发上限
+    :param trade_date: 同步的交易日，默认 get_latest_trade_date()
+    :param min_interval: 同一接口的最小请求间隔，默认 TICK_INTERVAL
+    :param workers: 执行阻塞请求的线程数，默认所有接口并发上限之和
+    :param resume: False 时丢弃当天已记录的同步进度，从头开始
+    """
+
+    def __init__(self, client: Any = None, limits: Optional[Dict[str, int]] = None,
+                 trade_date: Optional[date] = None, min_interval: float = TICK_INTERVAL,
+                 retries: int = 3, backoff_base: float = BACKOFF_BASE, max_backoff: float = MAX_BACKOFF,
+                 workers: Optional[int] = None, flush_rows: int = FLUSH_ROWS, resume: bool = True):
+        self.client = client if client is not None else importlib.import_module('akshare')
+        self.limits = {**ENDPOINT_LIMITS, **(limits or {})}
+        self.trade_date = trade_date
+        self.min_interval = min_interval
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.flush_rows = flush_rows
+        self.resume = resume
+        self.endpoints: Dict[str, Endpoint] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers or sum(self.limits.values()),
+                                            thread_name_prefix='sync')
+        # 写盘串行化：不同任务不会同时写同一目录，也不与网络请求争抢线程
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sync-writer')
+        self._beg_date: Optional[asyncio.Task] = None
+
+    # ── 基础设施 ────────────────────────────────────────────────────────────
+
+    def endpoint(self, name: str) -> Endpoint:
+        ep = self.endpoints.get(name)
+        if ep is None:
+            ep = self.endpoints[name] = Endpoint(name, self.limits.get(name, SYNC_CONCURRENCY), self.min_interval,
+                                                 self.retries, self.backoff_base, self.max_backoff)
+        return ep
+
+    async def fetch(self, name: str, **kwargs) -> Any:
+        """按接口名调用 client 上的函数（受该接口的并发 / 退避约束）；启用响应缓存时先查缓存"""
+        func = getattr(self.client, name)
+        cache = get_cache()
+        if cache is None:
+            return await self.endpoint(name).call(self._executor, func, **kwargs)
+
+        # 与串行版的 _execute_with_retry 共用键（接口名 + 参数），两条路径录制的会话可以互相回放
+        loop = asyncio.get_running_loop()
+        try:
+            hit, value = await loop.run_in_executor(self._executor, cache.lookup, name, kwargs)
+        except CacheMiss as e:
+            logger.error(f"[Sync] {e}")
+            return None
+        if hit:
+            return value
+        value = await self.endpoint(name).call(self._executor, func, **kwargs)
+        await loop.run_in_executor(self._executor, cache.put, name, kwargs, value)
+        return value
+
+    async def beg_date(self) -> datetime:
+        """同步交易日的 00:00（各任务共享一次查询）"""
+        if self._beg_date is None:
+            async def resolve():
+                if self.trade_date is not None:
+                    return self.trade_date
+                return await asyncio.get_running_loop().run_in_executor(self._executor, get_latest_trade_date)
+            self._beg_date = asyncio.ensure_future(resolve())
+        return datetime.combine(await self._beg_date, time())
+
+    async def _write(self, df: pa.Table, data_dir: Path, is_tick: bool) -> None:
+        if df is None or len(df) == 0:
+            return
+        await asyncio.get_running_loop().run_in_executor(self._writer, save_date, df, data_dir, is_tick)
+
+    async def _fetch_batch(self, endpoint: str, jobs: Iterable[Tuple[str, str, Dict[str, Any]]],
+                           transform: Callable[[pd.DataFrame, str, str], pa.Table],
+                           data_dir: Path, is_tick: bool, desc: str, checkpoint: Optional[SyncJob] = None) -> int:
+        """
+        并发请求 jobs = [(code, name, kwargs)]，结果经 transform 后攒批写盘。
+
+        :param checkpoint: 记录逐代码进度；只请求 checkpoint.plan() 给出的代码，写盘后才记为完成
+        :return: 写入的行数
+        """
+        jobs = list(jobs)
+        if checkpoint is not None:
+            todo = set(checkpoint.plan(job[0] for job in jobs))
+            jobs = [job for job in jobs if job[0] in todo]
+        buffer: List[pa.Table] = []
+        buffered: List[str] = []
+        pending = [0]
+        written = [0]
+        progress = tqdm(total=len(jobs), desc=desc)
+
+        async def flush():
+            frames, buffer[:] = list(buffer), []
+            codes, buffered[:] = list(buffered), []
+            pending[0] = 0
+            if frames:
+                table = pa.concat_tables(frames)
+                await self._write(table, data_dir, is_tick)
+                written[0] += len(table)
+            if checkpoint is not None:
+                for code in codes:
+                    checkpoint.done(code)
+
+        async def one(code: str, name: str, kwargs: Dict[str, Any]):
+            try:
+                df = await self.fetch(endpoint, **kwargs)
+                if df is None:
+                    if checkpoint is not None:
+                        checkpoint.failed(code, f'{endpoint} failed after retries')
+                    return
+                if df.empty:
+                    logger.info(f'No data for {code}')
+                    if checkpoint is not None:
+                        checkpoint.done(code)
+                    return
+                frame = transform(df, code, name)
+                buffer.append(frame)
+                buffered.append(code)
+                pending[0] += len(frame)
+                if pending[0] >= self.flush_rows:
+                    await flush()
+            finally:
+                progress.update(1)
+
+        try:
+            await asyncio.gather(*(one(*job) for job in jobs))
+            await flush()
+        finally:
+            progress.close()
+        return written[0]
+
+    # ── 各类数据 ────────────────────────────────────────────────────────────
+
+    async def sync_stock(self, codes: List[str] = (), include_tick: bool = True) -> None:
+        beg_date = await self.beg_date()
+        end_date = beg_date + timedelta(days=1)
+        stock_root_dir = get_data_dir(DataType.STOCK)
+        stock_root_dir.mkdir(parents=True, exist_ok=True)
+
+        logger.info('[Sync] Start to synchronize stock data')
+        latest_df = await self.fetch('stock_zh_a_spot_em')
+        if latest_df is None:
+            return
+        stock_df = _stock_spot_frame(latest_df, beg_date)
+        if codes:
+            stock_df = stock_df.filter(pc.is_in(stock_df[CODE], value_set=pa.array(list(set(codes)), pa.string())))
+        await self._write(stock_df, stock_root_dir, False)
+        logger.info(f'[Sync] Finish synchronizing stock data ({len(stock_df)} rows)')
+
+        if not include_tick:
+            return
+        stock_df = stock_df.sort_by([(CODE, 'descending')])
+        jobs = [(code, name, {'symbol': code,
+                              'start_date': beg_date.strftime('%Y-%m-%d %H:%M:%S'),
+                              'end_date': end_date.strftime('%Y-%m-%d %H:%M:%S'),
+                              'period': '1', 'adjust': 'qfq'})
+                for code, name in zip(stock_df[CODE].to_pylist(), stock_df[NAME].to_pylist())]
+        # 标识代码在其余代码全部写盘后单独同步：中途失败时不会把当天误判为已同步
+        marker = [job for job in jobs if job[0] == SYNC_MARKER_CODE]
+        # 与 sync_latest_stock_data 同名的进度：串行 / 异步两种方式可以互相续传
+        with SyncJob.open(f"stock_tick_{beg_date:%Y%m%d}", resume=self.resume) as checkpoint:
+            rows = await self._fetch_batch('stock_zh_a_hist_min_em',
+                                           [job for job in jobs if job[0] != SYNC_MARKER_CODE],
+                                           _stock_tick_frame, stock_root_dir, True, 'stock tick', checkpoint)
+            rows += await self._fetch_batch('stock_zh_a_hist_min_em', marker, _stock_tick_frame,
+                                            stock_root_dir, True, 'stock tick marker', checkpoint)
+        logger.info(f'[Sync] Finish synchronizing stock tick data ({rows} rows)')
+
+    async def sync_index(self, include_tick: bool = True) -> None:
+        beg_date = await self.beg_date()
+        end_date = beg_date + timedelta(days=1)
+        index_root_dir = get_data_dir(DataType.INDEX)
+
+        logger.info('[Sync] Start to synchronize indexes data')
+        raws = await asyncio.gather(*(self.fetch('stock_zh_index_spot_em', symbol=s) for s in INDEX_SPOT_SYMBOLS))
+        all_index = _combine_index_spots([_index_spot_frame(df, beg_date) for df in raws if df is not None])
+        await self._write(all_index, index_root_dir, False)
+        logger.info(f'[Sync] Finish synchronizing indexes data ({len(all_index)} rows)')
+
+        if not include_tick:
+            return
+        tick_index = all_index.filter(pc.is_in(all_index[CODE], value_set=pa.array(INDEX_TICK_CODES)))
+        jobs = [(code, name, {'symbol': code,
+                              'start_date': beg_date.strftime('%Y-%m-%d %H:%M:%S'),
+                              'end_date': end_date.strftime('%Y-%m-%d %H:%M:%S'), 'period': '1'})
+                for code, name in zip(tick_index[CODE].to_pylist(), tick_index[NAME].to_pylist())]
+        rows = await self._fetch_batch('index_zh_a_hist_min_em', jobs, _index_tick_frame,
+                                       index_root_dir, True, 'index tick')
+        logger.info(f'[Sync] Finish synchronizing indexes tick data ({rows} rows)')
+
+    async def sync_industry(self, codes: List[str] = (), include_tick: bool = True) -> None:
+        beg_date = await self.beg_date()
+        end_date = beg_date + timedelta(days=1)
+        index_root_dir = get_data_dir(DataType.INDUSTRY_INDEX)
+
+        industries = await self.fetch('stock_board_industry_name_em')
+        if industries is None:
+            return
+        industries = industries[['板块名称', '板块代码']].rename(columns={'板块名称': NAME, '板块代码': CODE})
+        if codes:
+            industries = industries[industries[CODE].isin(set(codes))]
+
+        logger.info('[Sync] Start to synchronize industry indexes data')
+        jobs = [(code, name, {'symbol': name, 'period': '日k',
+                              'start_date': beg_date.strftime('%Y%m%d'),
+                              'end_date': end_date.strftime('%Y%m%d'), 'adjust': ''})
+                for code, name in zip(industries[CODE], industries[NAME])]
+        rows = await self._fetch_batch('stock_board_industry_hist_em', jobs, _industry_daily_frame,
+                                       index_root_dir, False, 'industry')
+        logger.info(f'[Sync] Finish synchronizing industry indexes data ({rows} rows)')
+
+        if not include_tick:
+            return
+        jobs = [(code, name, {'symbol': name, 'period': '1'}) for code, name in zip(industries[CODE], industries[NAME])]
+        rows = await self._fetch_batch('stock_board_industry_hist_min_em', jobs, _industry_tick_frame,
+                                       index_root_dir, True, 'industry tick')
+        logger.info(f'[Sync] Finish synchronizing industry indexes tick data ({rows} rows)')
+
+    async def sync_etf(self, include_tick: bool = True) -> None:
+        """ETF 走数据源抽象 (get_fetcher) 与价格归一化，整体放进线程池，与其余同步并行"""
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(sync_latest_etf_data, include_tick=include_tick, resume=self.resume))
+
+    async def sync_all(self, include_tick: bool = True, include_etf: bool = True) -> None:
+        """行业 / 指数 / 股票 (/ ETF) 并行同步；单个任务失败不影响其他任务"""
+        logger.info('[Sync] Start to synchronize the data (async).')
+        tasks = {
+            'industry': self.sync_industry(include_tick=include_tick),
+            'index': self.sync_index(include_tick=include_tick),
+            'stock': self.sync_stock(include_tick=include_tick),
+        }
+        if include_etf:
+            tasks['etf'] = self.sync_etf(include_tick=include_tick)
+        try:
+            results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+            for name, result in zip(tasks, results):
+                if isinstance(result, BaseException):
+                    logger.error(f"[Sync] {name} sync failed: {result!r}")
+        finally:
+            self.log_stats()
+            self.close()
+            quality.log_summary()
+            quality.save()
+        logger.info('[Sync] Complete synchronizing the data (async).')
+
+    def log_stats(self) -> None:
+        for name, ep in sorted(self.endpoints.items()):
+            logger.info(f"[Sync] {name}: calls={ep.stats.calls}, errors={ep.stats.errors}, "
+                        f"failures={ep.stats.failures}, limit={ep.limit}/{ep.max_concurrency}")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+
+
+def sync_latest_all_data_async(include_tick: bool = True, **kwargs) -> None:
+    """sync_latest_all_data 的并发版本；kwargs 传给 SyncPipeline"""
+    asyncio.run(SyncPipeline(**kwargs).sync_all(include_tick=include_tick))
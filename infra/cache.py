@@ -0,0 +1,239 @@
+"""
+远程调用的本地响应缓存 (Record / Replay)
+
+开发时每次 run.py (auto_sync=True) 都会重新请求 akshare / BaoStock。这里在数据源边界缓存响应：
+  - 键：接口名 + 参数（JSON 序列化后取 SHA1），文件位于 {FETCH_CACHE_DIR}/{接口名}/{key}.parquet
+    （DataFrame 存 Parquet，Arrow 无法表示的对象或非 DataFrame 结果存 .pkl）
+  - 过期：写入超过 FETCH_CACHE_TTL 秒，或写于今天之前（快照 / 最新交易日等接口不带日期参数）视为过期；
+    总大小超过 FETCH_CACHE_MAX_MB 时按最近访问时间淘汰
+  - None 与空 DataFrame 不缓存（数据源在失败时也会返回它们）
+
+模式由环境变量 FETCH_CACHE 决定：
+  off     不缓存（默认）
+  on      读穿：命中且未过期直接返回，否则请求远程并写入
+  record  总是请求远程并覆盖写入（录制一次完整会话）
+  replay  只读缓存，忽略过期，未命中抛 CacheMiss（离线集成测试回放录制的会话）
+
+    df = cached_call(ak.fund_etf_spot_em, {})                    # 函数调用
+
+    @cached_fetch('AkShareFetcher.fetch_daily')                  # 方法 / 函数装饰器，按绑定后的参数做键
+    def fetch_daily(self, code, name, start_date, end_date): ...
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from utils import logger
+from . import FETCH_CACHE, FETCH_CACHE_DIR, FETCH_CACHE_TTL, FETCH_CACHE_MAX_MB, ROOT_DATA_DIR
+
+MODES = ('off', 'on', 'record', 'replay')
+
+
+class CacheMiss(LookupError):
+    """replay 模式下缓存中没有该调用"""
+
+
+class ResponseCache:
+    """
+    磁盘响应缓存。
+
+    :param root: 缓存目录
+    :param mode: 'on' / 'record' / 'replay'（见模块说明）
+    :param ttl: 过期秒数，跨自然日的条目同样过期（replay 模式均忽略）
+    :param max_bytes: 总大小上限，超过后按最近访问时间淘汰到上限的 90%
+    """
+
+    def __init__(self, root: Path, mode: str = 'on', ttl: float = FETCH_CACHE_TTL,
+                 max_bytes: int = int(FETCH_CACHE_MAX_MB * 1024 ** 2)):
+        if mode not in MODES or mode == 'off':
+            raise ValueError(f"Invalid cache mode '{mode}', expected one of {MODES[1:]}")
+        self.root = Path(root)
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes: Optional[int] = None  # 首次写入时统计
+        self._lock = threading.Lock()
+
+    # ── 键与文件 ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def key(name: str, params: Dict[str, Any]) -> str:
+        payload = json.dumps([name, params], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:24]
+
+    def _paths(self, name: str, params: Dict[str, Any]) -> Tuple[Path, Path]:
+        base = self.root / name / self.key(name, params)
+        return base.with_suffix('.parquet'), base.with_suffix('.pkl')
+
+    # ── 读写 ────────────────────────────────────────────────────────────────
+
+    def _fresh(self, written: float) -> bool:
+        now = time.time()
+        return now - written <= self.ttl and date.fromtimestamp(written) == date.fromtimestamp(now)
+
+    def get(self, name: str, params: Dict[str, Any]) -> Tuple[bool, Any]:
+        """返回 (是否命中, 值)；过期视为未命中（replay 除外）"""
+        for path in self._paths(name, params):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if self.mode != 'replay' and not self._fresh(stat.st_mtime):
+                return False, None
+            try:
+                value = pd.read_parquet(path) if path.suffix == '.parquet' else pickle.loads(path.read_bytes())
+            except Exception as e:
+                logger.warning(f"[Cache] Dropping unreadable entry {path}: {e}")
+                path.unlink(missing_ok=True)
+                return False, None
+            # 只更新访问时间 (LRU)，保留写入时间 (TTL)
+            os.utime(path, (time.time(), stat.st_mtime))
+            return True, value
+        return False, None
+
+    def put(self, name: str, params: Dict[str, Any], value: Any) -> None:
+        if value is None or (isinstance(value, pd.DataFrame) and value.empty):
+            return
+        parquet_path, pickle_path = self._paths(name, params)
+        parquet_path.parent.mkdir(parents=True, exist_ok=True)
+        path, tmp = parquet_path, parquet_path.with_name(f"{parquet_path.name}.{threading.get_ident()}.tmp")
+        try:
+            if not isinstance(value, pd.DataFrame):
+                raise TypeError
+            value.to_parquet(tmp)
+        except Exception:
+            # Arrow 无法表示的混合类型列 / 非 DataFrame 结果
+            path, tmp = pickle_path, pickle_path.with_name(f"{pickle_path.name}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp, path)
+        # 同一调用只保留一种格式
+        (pickle_path if path == parquet_path else parquet_path).unlink(missing_ok=True)
+
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self.size()
+            else:
+                self._bytes += path.stat().st_size
+            over = self._bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def lookup(self, name: str, params: Dict[str, Any]) -> Tuple[bool, Any]:
+        """按模式查缓存：record 总是未命中，replay 未命中抛 CacheMiss"""
+        if self.mode != 'record':
+            hit, value = self.get(name, params)
+            if hit:
+                self.hits += 1
+                logger.debug(f"[Cache] hit {name}({params})")
+                return True, value
+            if self.mode == 'replay':
+                raise CacheMiss(f"{name}({params}) is not in the cache {self.root}")
+        self.misses += 1
+        return False, None
+
+    def call(self, name: str, func: Callable[[], Any], params: Dict[str, Any]) -> Any:
+        """按模式读穿 / 录制 / 回放 func() 的结果"""
+        hit, value = self.lookup(name, params)
+        if hit:
+            return value
+        value = func()
+        self.put(name, params, value)
+        return value
+
+    # ── 维护 ────────────────────────────────────────────────────────────────
+
+    def _entries(self):
+        if not self.root.exists():
+            return []
+        return [p for p in self.root.rglob('*') if p.suffix in ('.parquet', '.pkl') and p.is_file()]
+
+    def size(self) -> int:
+        return sum(p.stat().st_size for p in self._entries())
+
+    def evict(self) -> None:
+        """按最近访问时间淘汰，直到总大小降到上限的 90%"""
+        with self._lock:
+            entries = sorted(((p.stat(), p) for p in self._entries()), key=lambda e: e[0].st_atime)
+            total = sum(stat.st_size for stat, _ in entries)
+            target = int(self.max_bytes * 0.9)
+            removed = 0
+            for stat, path in entries:
+                if total <= target:
+                    break
+                path.unlink(missing_ok=True)
+                total -= stat.st_size
+                removed += 1
+            self._bytes = total
+        if removed:
+            logger.info(f"[Cache] Evicted {removed} entries, {total / 1024 ** 2:.1f} MB left")
+
+    def clear(self) -> None:
+        for path in self._entries():
+            path.unlink(missing_ok=True)
+        self._bytes = 0
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 进程级缓存与调用入口
+# ─────────────────────────────────────────────────────────────────────────────
+
+_cache: Optional[ResponseCache] = None
+_configured = False
+
+
+def get_cache() -> Optional[ResponseCache]:
+    """按 FETCH_CACHE 创建的进程级缓存，未启用时为 None"""
+    global _cache, _configured
+    if not _configured:
+        _configured = True
+        mode = (FETCH_CACHE or 'off').lower()
+        if mode != 'off':
+            root = Path(FETCH_CACHE_DIR) if FETCH_CACHE_DIR else ROOT_DATA_DIR / '_cache'
+            _cache = ResponseCache(root, mode)
+            logger.info(f"[Cache] Fetch cache enabled: mode={mode}, dir={root}, "
+                        f"ttl={FETCH_CACHE_TTL:.0f}s, max={FETCH_CACHE_MAX_MB:.0f} MB")
+    return _cache
+
+
+def set_cache(cache: Optional[ResponseCache]) -> None:
+    """替换进程级缓存（None 关闭），测试时使用"""
+    global _cache, _configured
+    _cache, _configured = cache, True
+
+
+def cached_call(func: Callable[..., Any], params: Dict[str, Any]) -> Any:
+    """func(**params)，启用缓存时按函数名 + 参数缓存"""
+    cache = get_cache()
+    if cache is None:
+        return func(**params)
+    return cache.call(func.__name__, lambda: func(**params), params)
+
+
+def cached_fetch(name: str) -> Callable:
+    """函数 / 方法装饰器：按绑定后的参数（不含 self）缓存返回值"""
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k != 'self'}
+            return cache.call(name, lambda: func(*args, **kwargs), params)
+        return wrapper
+    return decorator
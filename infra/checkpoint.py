@@ -0,0 +1,192 @@
+"""
+可续传的同步任务 (Resumable Sync Jobs)
+
+全市场同步中途失败或进程被杀时，重跑会从头遍历整个代码列表，失败的代码也只打一行日志。
+SyncJob 把每个代码的进度记录在本地状态文件里：
+  - 状态文件 {DATA_DIR}/_sync_state/{job}.jsonl 是只追加的日志，每完成 / 失败一个代码追加一行并 fsync，
+    进程随时被杀也最多丢失正在处理的那一个代码；退出 with 时压缩为每个代码一行
+  - plan(codes) 返回本次需要处理的代码：从未处理过的 + 已到重试时间的失败代码；
+    已完成的跳过，仍在退避期内 / 超过最大尝试次数的失败代码本次不处理
+  - 失败代码的重试间隔按尝试次数指数增长：backoff_base × 2^(attempts-1)，不超过 max_backoff
+
+任务名由同步类型与交易日 (或日期区间) 决定，同一天重跑复用同一份状态：
+    with SyncJob.open(f"stock_tick_{day:%Y%m%d}") as job:
+        for code in job.plan(codes):
+            ...
+            job.done(code)            # 或 job.failed(code, error)
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from utils import logger
+from . import ROOT_DATA_DIR
+
+STATE_DIR = ROOT_DATA_DIR / '_sync_state'
+STATE_TTL_DAYS = 14        # 超过这么多天未更新的状态文件在打开新任务时清理
+MAX_ATTEMPTS = 5           # 单个代码最多尝试次数（含首次）
+BACKOFF_BASE = 5 * 60.0    # 首次失败后的重试间隔（秒）
+MAX_BACKOFF = 6 * 3600.0   # 重试间隔上限（秒）
+
+DONE = 'done'
+FAILED = 'failed'
+
+
+@dataclass
+class CodeState:
+    status: str
+    attempts: int = 0
+    next_retry: float = 0.0  # 失败代码最早的重试时间 (unix 时间戳)
+    error: str = ''
+
+
+class SyncJob:
+    """
+    单个同步任务的逐代码进度。
+
+    :param name: 任务名（状态文件名），e.g. 'stock_tick_20240105'
+    :param state_dir: 状态目录，默认 {DATA_DIR}/_sync_state
+    """
+
+    def __init__(self, name: str, state_dir: Optional[Path] = None, max_attempts: int = MAX_ATTEMPTS,
+                 backoff_base: float = BACKOFF_BASE, max_backoff: float = MAX_BACKOFF):
+        self.name = name
+        self.path = Path(state_dir or STATE_DIR) / f"{name}.jsonl"
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.codes: Dict[str, CodeState] = {}
+        self._fh = None
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def open(cls, name: str, resume: bool = True, **kwargs) -> 'SyncJob':
+        """
+        打开（或新建）任务，顺带清理过期的状态文件。
+
+        :param resume: False 时丢弃已有进度，从头开始
+        """
+        prune(kwargs.get('state_dir') or STATE_DIR)
+        job = cls(name, **kwargs)
+        if not resume:
+            job.reset()
+        return job
+
+    # ── 状态读写 ────────────────────────────────────────────────────────────
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程在写最后一行时被杀：忽略残行
+                    continue
+                code = record.pop('code')
+                self.codes[code] = CodeState(**record)
+
+    def _append(self, code: str, state: CodeState) -> None:
+        with self._lock:
+            self.codes[code] = state
+            if self._fh is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fh = open(self.path, 'a', encoding='utf-8')
+            self._fh.write(json.dumps({'code': code, **asdict(state)}, ensure_ascii=False) + '\n')
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+
+    def compact(self) -> None:
+        """把追加日志压缩为每个代码一行（原子替换）"""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if not self.codes:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for code, state in self.codes.items():
+                    f.write(json.dumps({'code': code, **asdict(state)}, ensure_ascii=False) + '\n')
+            os.replace(tmp, self.path)
+
+    def reset(self) -> None:
+        """丢弃全部进度"""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            self.codes.clear()
+            self.path.unlink(missing_ok=True)
+
+    # ── 进度 ────────────────────────────────────────────────────────────────
+
+    def plan(self, codes: Iterable[str]) -> List[str]:
+        """本次需要处理的代码（保持输入顺序）"""
+        now = time.time()
+        todo, done, waiting, exhausted, retries = [], 0, 0, 0, 0
+        for code in codes:
+            state = self.codes.get(code)
+            if state is None:
+                todo.append(code)
+            elif state.status == DONE:
+                done += 1
+            elif state.attempts >= self.max_attempts:
+                exhausted += 1
+            elif state.next_retry > now:
+                waiting += 1
+            else:
+                todo.append(code)
+                retries += 1
+        logger.info(f"[Checkpoint] {self.name}: {len(todo)} to sync ({retries} retries), {done} done, "
+                    f"{waiting} waiting for backoff, {exhausted} gave up after {self.max_attempts} attempts")
+        return todo
+
+    def done(self, code: str) -> None:
+        state = self.codes.get(code)
+        self._append(code, CodeState(DONE, attempts=(state.attempts if state else 0) + 1))
+
+    def failed(self, code: str, error: object = '') -> None:
+        state = self.codes.get(code)
+        attempts = (state.attempts if state else 0) + 1
+        delay = min(self.backoff_base * 2 ** (attempts - 1), self.max_backoff)
+        self._append(code, CodeState(FAILED, attempts=attempts, next_retry=time.time() + delay,
+                                     error=str(error)[:200]))
+
+    def failures(self) -> Dict[str, CodeState]:
+        return {code: state for code, state in self.codes.items() if state.status == FAILED}
+
+    def summary(self) -> Dict[str, int]:
+        failed = self.failures()
+        return {'done': len(self.codes) - len(failed), 'failed': len(failed)}
+
+    def __enter__(self) -> 'SyncJob':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.compact()
+        summary = self.summary()
+        if summary['failed']:
+            logger.warning(f"[Checkpoint] {self.name}: {summary['failed']} code(s) failed, "
+                           f"re-run to retry them ({self.path})")
+
+
+def prune(state_dir: Path = STATE_DIR, max_age_days: float = STATE_TTL_DAYS) -> None:
+    """删除超过 max_age_days 未更新的状态文件"""
+    state_dir = Path(state_dir)
+    if not state_dir.exists():
+        return
+    cutoff = time.time() - max_age_days * 86400
+    for path in state_dir.glob('*.jsonl'):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
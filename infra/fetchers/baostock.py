@@ -6,6 +6,7 @@ from utils.const import (
     VOLUME, AMOUNT, PRECLOSE, PRICE_CHG, PE_TTM, PB_TTM, TURN,
     COLUMNS, COLUMNS_TYPE,
 )
+from ..cache import cached_fetch
 from .base import AbstractETFFetcher
 from utils import logger
 
@@ -23,27 +24,36 @@ def _to_bs_code(code: str) -> str:
 class BaoStockFetcher(AbstractETFFetcher):
     supports_tick = False
     supports_full_list = False  # 不支持自动拉取全量列表，需用户指定 codes
-    needs_price_normalization = True  # BaoStock 对 ETF 不支持复权，需在 repo 层做价格归一化
+    needs_price_normalization = True  # BaoStock 对 ETF 不支持复权：存不复权价，由复权因子表 (infra.adjust) 在读取时复权
 
     def __init__(self):
         import baostock as bs
         self._bs = bs
-        result = bs.login()
-        if result.error_code != '0':
-            raise RuntimeError(f"BaoStock login failed: {result.error_msg}")
+        self._logged_in = False  # 首次真正查询时才登录：响应缓存命中时不产生任何网络往返
+
+    def _session(self):
+        if not self._logged_in:
+            result = self._bs.login()
+            if result.error_code != '0':
+                raise RuntimeError(f"BaoStock login failed: {result.error_msg}")
+            self._logged_in = True
+        return self._bs
 
     def __del__(self):
+        if not getattr(self, '_logged_in', False):
+            return
         try:
             self._bs.logout()
         except Exception:
             pass
 
+    @cached_fetch('BaoStockFetcher.fetch_daily')
     def fetch_daily(self, code: str, name: str,
                     start_date: datetime, end_date: datetime) -> pd.DataFrame:
         bs_code = _to_bs_code(code)
         fields = 'date,open,high,low,close,preclose,volume,amount,turn,pctChg'
         # adjustflag='1' = 后复权，对应 AkShare 的 hfq
-        rs = self._bs.query_history_k_data_plus(
+        rs = self._session().query_history_k_data_plus(
             bs_code, fields,
             start_date=start_date.strftime('%Y-%m-%d'),
             end_date=end_date.strftime('%Y-%m-%d'),
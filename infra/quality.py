@@ -0,0 +1,286 @@
+"""
+写入时的数据质量校验 (Data Quality)
+
+save_date 写入前对整批数据做一次向量化检查（按 代码 / 时间 排序后整列比较，不逐行循环）：
+
+  拒绝（不写入数据湖，进入隔离区）：
+    invalid_price   收盘价为空，或开高低收任一 <= 0
+    ohlc_bounds     最高价低于开 / 收 / 低，或最低价高于开 / 收 / 高（相对容差 OHLC_TOLERANCE）
+    duplicate_date  同一代码同一交易日（分钟线为同一时刻）出现多行，保留最后一行
+  标记（照常写入，同时记录到隔离区）：
+    price_jump      与上一根 K 线收盘价相比涨跌幅超过 MAX_MOVE
+    scale_break     昨收与上一根 K 线收盘价偏差超过 SCALE_TOLERANCE（复权尺度断裂，e.g. AkShare → BaoStock 边界）
+    volume_unit     成交量是上一根的约 100 倍或 1/100（手 / 股 单位错误，仅日线）
+
+连续性检查的"上一根"优先取批内同一代码的前一行；批内第一行取本地已存储的最后一行（由 repo 在合并年度文件时提供，
+不额外读盘）。与上一根相隔超过 MAX_GAP_DAYS 天时不做连续性检查。存储不复权价的代码（infra.adjust）在复权价上比较。
+
+违规行写入 {DATA_DIR}/_quarantine/{类型}/{日期}/*.parquet（原始列 + rule / action），
+逐代码的统计累计在进程级的 quality 报告中，同步结束时由 quality.log_summary() / quality.save() 输出。
+"""
+import os
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from utils import logger
+from utils.const import DATETIME, CODE, OPEN, HIGH, LOW, CLOSE, PRECLOSE, VOLUME
+from . import ROOT_DATA_DIR
+
+QUARANTINE_DIR = ROOT_DATA_DIR / '_quarantine'
+MAX_MOVE = 0.35           # 相邻两根 K 线的最大涨跌幅（A 股涨跌停最高 30%，新股上市初期除外）
+SCALE_TOLERANCE = 0.02    # 昨收与上一根收盘价的最大相对偏差
+OHLC_TOLERANCE = 1e-3     # OHLC 边界的相对容差（价格四舍五入）
+VOLUME_UNIT_BAND = 0.5    # |log10(成交量 / 上一根成交量)| 与 2 的距离小于该值视为单位错误
+MAX_GAP_DAYS = 10         # 与上一根相隔超过该天数时不做连续性检查
+
+REJECT = 'reject'
+FLAG = 'flag'
+RULES: Dict[str, str] = {
+    'invalid_price': REJECT,
+    'ohlc_bounds': REJECT,
+    'duplicate_date': REJECT,
+    'price_jump': FLAG,
+    'scale_break': FLAG,
+    'volume_unit': FLAG,
+}
+
+_NS_PER_DAY = 86_400 * 10 ** 9
+
+
+@dataclass
+class Validation:
+    clean: pa.Table   # 去掉被拒绝行后的数据（保持原有行序）
+    issues: pa.Table  # 违规行（原始列 + rule / action），一行违反多条规则时出现多次
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 向量化检查
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _floats(table: pa.Table, col: str) -> np.ndarray:
+    if col not in table.column_names:
+        return np.full(table.num_rows, np.nan)
+    return pc.cast(table[col], pa.float64()).to_numpy(zero_copy_only=False)
+
+
+def _nanos(column: pa.ChunkedArray) -> np.ndarray:
+    return pc.cast(pc.cast(column, pa.timestamp('ns')), pa.int64()).to_numpy(zero_copy_only=False)
+
+
+def _continuity(close: np.ndarray, preclose: np.ndarray, volume: np.ndarray, ts: np.ndarray,
+                prev_close: np.ndarray, prev_volume: np.ndarray, prev_ts: np.ndarray,
+                is_tick: bool) -> Dict[str, np.ndarray]:
+    """当前行与"上一根"逐元素比较（prev_ts 为 NaN 表示没有上一根）"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        near = (ts - prev_ts) <= MAX_GAP_DAYS * _NS_PER_DAY
+        near &= prev_close > 0
+        masks = {
+            'price_jump': near & (np.abs(close / prev_close - 1) > MAX_MOVE),
+            'scale_break': near & (preclose > 0) & (np.abs(preclose / prev_close - 1) > SCALE_TOLERANCE),
+        }
+        if not is_tick:
+            ratio = np.abs(np.log10(volume / prev_volume))
+            masks['volume_unit'] = near & (volume > 0) & (prev_volume > 0) & \
+                (np.abs(ratio - 2) < VOLUME_UNIT_BAND)
+    return masks
+
+
+def _issues(table: pa.Table, masks: Dict[str, np.ndarray]) -> pa.Table:
+    parts = []
+    for rule, mask in masks.items():
+        rows = np.flatnonzero(mask)
+        if len(rows):
+            part = table.take(rows)
+            part = part.append_column('rule', pa.repeat(pa.scalar(rule), len(rows)))
+            parts.append(part.append_column('action', pa.repeat(pa.scalar(RULES[rule]), len(rows))))
+    if not parts:
+        return empty_issues(table.schema)
+    return pa.concat_tables(parts)
+
+
+def empty_issues(schema: pa.Schema) -> pa.Table:
+    return schema.append(pa.field('rule', pa.string())).append(pa.field('action', pa.string())).empty_table()
+
+
+def validate(table: pa.Table, is_tick: bool, factors: Optional[np.ndarray] = None) -> Validation:
+    """
+    整批校验：拒绝规则 + 批内连续性。
+
+    :param table: 统一列的数据（DATETIME / CODE 非空）
+    :param is_tick: 分钟线（重复按时刻判断，不检查成交量单位）
+    :param factors: 每行的复权因子（infra.adjust），连续性在复权价上比较；None 为全 1
+    """
+    n = table.num_rows
+    if n == 0:
+        return Validation(table, empty_issues(table.schema))
+
+    # 按 (代码, 时间) 稳定排序，同一代码的相邻行即前后两根 K 线
+    order = pc.sort_indices(table, sort_keys=[(CODE, 'ascending'), (DATETIME, 'ascending')]).to_numpy()
+    ordered = table.select([c for c in (DATETIME, CODE, OPEN, HIGH, LOW, CLOSE, PRECLOSE, VOLUME)
+                            if c in table.column_names]).take(order)
+    o, h, l, c = (_floats(ordered, col) for col in (OPEN, HIGH, LOW, CLOSE))
+    adj = np.ones(n) if factors is None else np.asarray(factors, dtype=float)[order]
+    ts = _nanos(ordered[DATETIME])
+    codes = ordered[CODE]
+    same = np.zeros(n, dtype=bool)  # 与前一行同一代码
+    if n > 1:
+        same[1:] = pc.equal(codes.slice(1), codes.slice(0, n - 1)).to_numpy(zero_copy_only=False)
+
+    with np.errstate(invalid='ignore'):
+        invalid = np.isnan(c) | (c <= 0) | (o <= 0) | (h <= 0) | (l <= 0)
+        ohlc = (h < np.fmax(np.fmax(o, c), l) * (1 - OHLC_TOLERANCE)) | \
+               (l > np.fmin(np.fmin(o, c), h) * (1 + OHLC_TOLERANCE))
+    key = ts if is_tick else ts // _NS_PER_DAY
+    duplicate = np.zeros(n, dtype=bool)
+    duplicate[:-1] = same[1:] & (key[1:] == key[:-1])  # 保留同组最后一行
+    reject = invalid | ohlc | duplicate
+
+    # 连续性只在保留下来的行之间比较
+    kept = np.flatnonzero(~reject)
+    kept_same = np.zeros(len(kept), dtype=bool)
+    if len(kept) > 1:
+        # 相邻保留行之间没有换代码（排序后同一代码连续）
+        change = np.cumsum(~same)
+        kept_same[1:] = change[kept[1:]] == change[kept[:-1]]
+    prev = lambda arr: np.where(kept_same, np.roll(arr[kept], 1), np.nan)
+    volume = _floats(ordered, VOLUME)
+    close, preclose = c * adj, _floats(ordered, PRECLOSE) * adj
+    flags = _continuity(close[kept], preclose[kept], volume[kept], ts[kept].astype(float),
+                        prev(close), prev(volume), prev(ts.astype(float)), is_tick)
+
+    masks = {'invalid_price': invalid, 'ohlc_bounds': ohlc & ~invalid, 'duplicate_date': duplicate & ~invalid & ~ohlc}
+    for rule, mask in flags.items():
+        full = np.zeros(n, dtype=bool)
+        full[kept] = mask
+        masks[rule] = full
+
+    # 排序空间 → 原始行序
+    issues = _issues(table, {rule: _unsort(mask, order) for rule, mask in masks.items()})
+    clean = table if not reject.any() else table.filter(pa.array(~_unsort(reject, order)))
+    return Validation(clean, issues)
+
+
+def _unsort(mask: np.ndarray, order: np.ndarray) -> np.ndarray:
+    out = np.empty_like(mask)
+    out[order] = mask
+    return out
+
+
+def check_boundary(first: pa.Table, stored: pa.Table, is_tick: bool = False,
+                   factors: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> pa.Table:
+    """
+    新数据与本地已存储数据的衔接：first 为每个代码本批最早的一行，stored 为对应代码在此之前存储的最后一行
+    （DATETIME / CODE / CLOSE / VOLUME，与 first 逐行对应）。只产出标记类问题。
+
+    :param factors: (first 各行的复权因子, stored 各行的复权因子)，None 为全 1
+    """
+    if first.num_rows == 0:
+        return empty_issues(first.schema)
+    first_adj, stored_adj = factors if factors is not None else (1.0, 1.0)
+    flags = _continuity(_floats(first, CLOSE) * first_adj, _floats(first, PRECLOSE) * first_adj,
+                        _floats(first, VOLUME), _nanos(first[DATETIME]).astype(float),
+                        _floats(stored, CLOSE) * stored_adj, _floats(stored, VOLUME),
+                        _nanos(stored[DATETIME]).astype(float), is_tick)
+    return _issues(first, flags)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 隔离区与报告
+# ─────────────────────────────────────────────────────────────────────────────
+
+def quarantine(issues: pa.Table, kind: str, root: Optional[Path] = None) -> Optional[Path]:
+    """把违规行写入 {root}/{kind}/{日期}/ 下的新文件（root 默认 QUARANTINE_DIR），返回文件路径"""
+    if issues.num_rows == 0:
+        return None
+    now = datetime.now()
+    day_dir = Path(root or QUARANTINE_DIR) / kind / f'{now:%Y-%m-%d}'
+    day_dir.mkdir(parents=True, exist_ok=True)
+    path = day_dir / f'{now:%H%M%S_%f}_{os.getpid()}_{threading.get_ident()}.parquet'
+    pq.write_table(issues.replace_schema_metadata(None), path)
+    return path
+
+
+class QualityReport:
+    """逐代码的校验统计（进程级累计）"""
+
+    def __init__(self):
+        self._rows: Dict[Tuple[str, str], int] = Counter()
+        self._issues: Dict[Tuple[str, str], Counter] = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, codes: pa.ChunkedArray, issues: pa.Table) -> None:
+        counts = pc.value_counts(codes)
+        checked = zip(counts.field('values').to_pylist(), counts.field('counts').to_pylist())
+        found = []
+        if issues.num_rows:
+            grouped = issues.group_by([CODE, 'rule'], use_threads=False).aggregate([([], 'count_all')])
+            found = zip(grouped[CODE].to_pylist(), grouped['rule'].to_pylist(), grouped['count_all'].to_pylist())
+        with self._lock:
+            for code, rows in checked:
+                self._rows[kind, code] += rows
+            for code, rule, rows in found:
+                self._issues[kind, code][rule] += rows
+
+    def frame(self) -> pd.DataFrame:
+        """每个 (类型, 代码) 一行：检查行数 + 各规则的违规行数"""
+        with self._lock:
+            records = [{'kind': kind, 'code': code, 'rows': rows,
+                        **{rule: self._issues.get((kind, code), {}).get(rule, 0) for rule in RULES}}
+                       for (kind, code), rows in self._rows.items()]
+        return pd.DataFrame(records, columns=['kind', 'code', 'rows', *RULES])
+
+    def log_summary(self, top: int = 10) -> None:
+        df = self.frame()
+        if df.empty:
+            return
+        for kind, group in df.groupby('kind'):
+            totals = group[list(RULES)].sum()
+            found = ', '.join(f'{rule}={int(n)}' for rule, n in totals.items() if n)
+            if not found:
+                logger.info(f"[Quality] {kind}: {int(group['rows'].sum())} rows of {len(group)} codes passed")
+                continue
+            worst = group.assign(issues=group[list(RULES)].sum(axis=1)).nlargest(top, 'issues')
+            worst = ', '.join(f'{code}({int(n)})' for code, n in zip(worst['code'], worst['issues']) if n)
+            logger.warning(f"[Quality] {kind}: {int(group['rows'].sum())} rows of {len(group)} codes, {found}; "
+                           f"top codes: {worst} (details in {QUARANTINE_DIR / kind})")
+
+    def save(self, path: Optional[Path] = None) -> Optional[Path]:
+        """写出逐代码统计 CSV（默认 {DATA_DIR}/_quarantine/report_{时间}.csv）"""
+        df = self.frame()
+        if df.empty:
+            return None
+        path = Path(path or QUARANTINE_DIR / f'report_{datetime.now():%Y%m%d_%H%M%S}.csv')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(path, index=False)
+        return path
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rows.clear()
+            self._issues.clear()
+
+
+quality = QualityReport()
+
+
+def record(kind: str, codes: pa.ChunkedArray, issues: List[pa.Table]) -> None:
+    """累计统计并把违规行写入隔离区（save_date 调用）"""
+    issues = [t for t in issues if t.num_rows]
+    table = pa.concat_tables(issues, promote_options='permissive') if issues else None
+    quality.add(kind, codes, table if table is not None else empty_issues(pa.schema([(CODE, pa.string())])))
+    if table is None:
+        return
+    path = quarantine(table, kind)
+    actions = Counter(table['action'].to_pylist())
+    logger.warning(f"[Quality] {kind}: {actions.get(REJECT, 0)} row(s) rejected, {actions.get(FLAG, 0)} flagged "
+                   f"({dict(Counter(table['rule'].to_pylist()))}) -> {path}")
@@ -1,14 +1,23 @@
 import os
 import time as time_module
 import pandas as pd
-from utils import logger, Klt, DataType
+from utils import logger, Klt, DataType, profiler, profiled
 from utils.const import *
 from cachetools import TTLCache, cached
 from . import ROOT_DATA_DIR, TICK_INTERVAL
 from .fetchers import get_fetcher
+from .checkpoint import SyncJob
+from .cache import CacheMiss, cached_call, cached_fetch
+from .adjust import AdjustFactors
+from .quality import validate, check_boundary, record, quality
+from .schema import (
+    STOCK_SPOT, STOCK_TICK, INDEX_SPOT, INDEX_TICK, INDUSTRY_DAILY, INDUSTRY_TICK,
+    arrow_schema, as_table, dedupe, normalize,
+)
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Iterator, Tuple, Union
 from pathlib import Path
 from cachetools import TTLCache, cached
 from datetime import datetime, timedelta, date, time
@@ -18,13 +27,13 @@ import numpy as np
 
 
 def get_all_index_df() -> pd.DataFrame:
-    index_stock_info = ak.index_stock_info()
+    index_stock_info = cached_call(ak.index_stock_info, {})
     index_stock_info.rename(columns={'index_code': CODE, 'display_name': NAME}, inplace=True)
     return index_stock_info[[CODE, NAME]]
 
 
 def get_all_stock_df() -> pd.DataFrame:
-    stock_qoute = ak.stock_zh_a_spot_em()
+    stock_qoute = cached_call(ak.stock_zh_a_spot_em, {})
     stock_qoute.rename(columns={'代码': CODE, '名称': NAME}, inplace=True)
     return stock_qoute[[CODE, NAME]]
 
@@ -37,7 +46,11 @@ def _execute_with_retry(func: Callable, context: Dict, retry_times: int = 0, sil
     retried = -1
     while (retried < retry_times):
         try:
-            return func(**context)
+            return cached_call(func, context)
+        except CacheMiss as e:
+            # 回放模式：缓存里没有就是没有，重试无意义
+            logger.error(f'func={func.__name__},context={context},Error:{e}')
+            break
         except Exception as e:
             logger.error(f'func={func.__name__},context={context},Error:{e}')
             if (retry_times > 0):
@@ -51,6 +64,7 @@ def _execute_with_retry(func: Callable, context: Dict, retry_times: int = 0, sil
         raise Exception(f'Failed to execute func={func},context={context}.')
 
 
+@cached_fetch('baostock.latest_trade_date')
 def _get_latest_trade_date_baostock() -> date:
     """使用 BaoStock 获取最新交易日（DATA_FETCHER=baostock 时使用）"""
     import baostock as bs
@@ -82,67 +96,210 @@ def get_latest_trade_date() -> date:
     return date(trade_time.year, trade_time.month, trade_time.day)
 
 
-def save_date(df: pd.DataFrame, data_dir: Path, is_tick: bool):
+def save_date(df: Union[pd.DataFrame, pa.Table], data_dir: Path, is_tick: bool,
+              adjust: Optional[Dict[str, AdjustFactors]] = None):
     """
-    保存数据到 Parquet 文件
-    修复：增加空值过滤和年份强制取整，防止出现 '2026.0' 这样的文件夹
+    保存数据到 Parquet 文件（DataFrame 或 pyarrow.Table 均可）
+    日线按 {code}/{year}/{year}.parquet 与已有文件合并去重；分钟线按 {code}/{year}/tick/{day}.parquet 覆盖写
+
+    :param adjust: 存储不复权价的代码的复权因子表（已包含本批数据），质量校验在复权价上比较连续性
     """
-    if (df.empty): return
+    if len(df) == 0: return
+    with profiler.span('save', rows=len(df)):
+        _save_date(as_table(df), data_dir, is_tick, adjust or {})
+
 
-    # 1. 确保日期列没有 NaT (脏数据会导致年份变成 float)
-    df = df.dropna(subset=[DATETIME])
-    if df.empty: return
+def _partitions(table: pa.Table, is_tick: bool) -> Iterator[Tuple[str, str, str, pa.Table]]:
+    """
+    按 (代码, 年) 或 (代码, 日) 切分：一次稳定排序后由相邻行的键变化得到各分区的行区间，分区为零拷贝切片，
+    分区内保持原有行序。产出 (code, year_str, day_str, 分区)，日线的 day_str 为空串。
+    """
+    keys = {CODE: table[CODE], '_year': pc.year(table[DATETIME])}
+    if is_tick:
+        keys['_day'] = pc.cast(table[DATETIME], pa.date32())
+    keys = pa.table(keys)
+    order = pc.sort_indices(keys, sort_keys=[(k, 'ascending') for k in keys.column_names])
+    table, keys = table.take(order), keys.take(order)
+
+    n = table.num_rows
+    changed = np.zeros(n - 1, dtype=bool)
+    for name in keys.column_names:
+        col = keys[name]
+        changed |= pc.not_equal(col.slice(1), col.slice(0, n - 1)).to_numpy(zero_copy_only=False)
+    bounds = [0, *(np.flatnonzero(changed) + 1).tolist(), n]
+
+    codes, years = keys[CODE].to_pylist(), keys['_year'].to_pylist()
+    days = keys['_day'].to_pylist() if is_tick else None
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        day_str = days[start].strftime('%Y-%m-%d') if is_tick else ''
+        yield codes[start], str(years[start]), day_str, table.slice(start, stop - start)
+
+
+def _read_existing(path: Path, columns: Optional[List[str]] = None) -> Optional[pa.Table]:
+    try:
+        return pq.read_table(path, columns=columns)
+    except Exception as e:
+        logger.error(f"Failed to read existing parquet {path}: {e}")
+        return None
 
-    # 2. 去重，保留最新的
-    df = df.drop_duplicates(subset=[DATETIME, CODE], keep='last')
 
-    code_df = df.groupby(df[CODE])
-    for code, code_group in code_df:
-        # 注意：这里如果 Series 含有浮点数，dt.year 可能是 float
-        grouped_df = code_group.groupby(df[DATETIME].dt.year)
+def _last_stored(existing: pa.Table, part: pa.Table) -> Optional[pa.Table]:
+    """已存储数据中早于本批最早一行的最后一行（DATETIME / CODE / CLOSE / VOLUME），用于衔接校验"""
+    try:
+        first = pc.min(part[DATETIME])
+        ts = pc.cast(existing[DATETIME], first.type)
+        earlier = existing.filter(pc.less(ts, first))
+        if earlier.num_rows == 0:
+            return None
+        row = earlier.take([pc.index(earlier[DATETIME], pc.max(earlier[DATETIME])).as_py()])
+        return pa.table({
+            DATETIME: pc.cast(row[DATETIME], pa.timestamp('ns')),
+            CODE: pc.cast(row[CODE], pa.string()),
+            CLOSE: pc.cast(row[CLOSE], pa.float64()),
+            VOLUME: pc.cast(row[VOLUME], pa.float64()) if VOLUME in row.column_names else pa.nulls(1, pa.float64()),
+        })
+    except (pa.ArrowException, KeyError):
+        # 早期写入的文件列类型不规范：跳过衔接校验
+        return None
 
-        for year, group in grouped_df:
-            # --- 修复核心：强制转 int 再转 str，避免 '2026.0' ---
-            try:
-                year_str = str(int(year))
-            except Exception:
-                # 兜底：如果 year 真是无法转换的怪东西，直接跳过
-                logger.warning(f"Invalid year detected for {code}: {year}, skipping...")
-                continue
-            # -----------------------------------------------
-
-            if is_tick:
-                index_year_dir = data_dir / code / year_str / 'tick'
-                index_year_dir.mkdir(parents=True, exist_ok=True)
-                day_grouped_df = group.groupby(df[DATETIME].dt.date)
-                for day, day_group in day_grouped_df:
-                    day_str = day.strftime('%Y-%m-%d')
-                    table = pa.Table.from_pandas(day_group, preserve_index=False)
-                    pq.write_table(table, index_year_dir / f'{day_str}.parquet')
-            else:
-                index_year_dir = data_dir / code / year_str
-                index_year_dir.mkdir(parents=True, exist_ok=True)
-                data_path = index_year_dir / f'{year_str}.parquet'
-
-                dfs = []
-                if data_path.exists():
-                    try:
-                        temp_table = pq.read_table(data_path)
-                        dfs.append(temp_table.to_pandas())
-                    except Exception as e:
-                        logger.error(f"Failed to read existing parquet {data_path}: {e}")
-
-                dfs.append(group)
-
-                # 合并并再次去重
-                full_df = pd.concat(dfs, ignore_index=True, sort=False)
-                full_df = full_df.drop_duplicates(subset=[DATETIME, CODE], keep='last')
-
-                table = pa.Table.from_pandas(full_df, preserve_index=False)
-                pq.write_table(table, data_path)
-
-
-def sync_latest_stock_data(codes: List[str] = [], include_tick: bool = True) -> None:
+
+def _merge_existing(existing: pa.Table, part: pa.Table) -> pa.Table:
+    """已有的年度文件与新数据合并去重（新数据优先）"""
+    try:
+        merged = pa.concat_tables([existing.replace_schema_metadata(None), part], promote_options='permissive')
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # 旧文件的列类型无法统一（如早期写入的字符串数值）：退回 pandas 合并
+        merged = pa.Table.from_pandas(pd.concat([existing.to_pandas(), part.to_pandas()], ignore_index=True, sort=False),
+                                      preserve_index=False)
+    return dedupe(merged, [DATETIME, CODE], keep='last')
+
+
+def _row_factors(table: pa.Table, adjust: Dict[str, AdjustFactors]) -> Optional[np.ndarray]:
+    if not adjust:
+        return None
+    factors = np.ones(table.num_rows)
+    datetimes = table[DATETIME].to_numpy()
+    for code, adj in adjust.items():
+        rows = pc.equal(table[CODE], code).to_numpy(zero_copy_only=False)
+        factors[rows] = adj.at(datetimes[rows])
+    return factors
+
+
+def _save_date(table: pa.Table, data_dir: Path, is_tick: bool, adjust: Dict[str, AdjustFactors]):
+    # 1. 确保日期 / 代码没有空值 (脏数据无法确定分区)
+    table = table.filter(pc.and_(pc.is_valid(table[DATETIME]), pc.is_valid(table[CODE])))
+    if table.num_rows == 0: return
+    kind, codes = f"{data_dir.name}_tick" if is_tick else data_dir.name, table[CODE]
+
+    # 2. 数据质量校验：被拒绝的行（非正价格 / OHLC 越界 / 重复日期）进入隔离区，不写入
+    with profiler.span('validate'):
+        checked = validate(table, is_tick, _row_factors(table, adjust))
+    table, issues = checked.clean, [checked.issues]
+    if table.num_rows == 0:
+        record(kind, codes, issues)
+        return
+
+    # 3. 去重，保留最新的
+    table = dedupe(table.replace_schema_metadata(None), [DATETIME, CODE], keep='last')
+
+    boundary = []  # [(本批该代码最早的一行, 本地存储的上一行, 两者的复权因子)]：合并时顺带取出，写完后统一校验衔接
+    seen = set()
+    for code, year_str, day_str, part in _partitions(table, is_tick):
+        if is_tick:
+            index_year_dir = data_dir / code / year_str / 'tick'
+            index_year_dir.mkdir(parents=True, exist_ok=True)
+            data_path = index_year_dir / f'{day_str}.parquet'
+        else:
+            index_year_dir = data_dir / code / year_str
+            index_year_dir.mkdir(parents=True, exist_ok=True)
+            data_path = index_year_dir / f'{year_str}.parquet'
+            existing = _read_existing(data_path) if data_path.exists() else None
+            if code not in seen:
+                # 分区按 (代码, 年) 升序：第一个分区即该代码本批最早的数据；年初没有当年文件时看上一年
+                seen.add(code)
+                stored = existing
+                if stored is None:
+                    last_year = data_dir / code / str(int(year_str) - 1) / f'{int(year_str) - 1}.parquet'
+                    if last_year.exists():
+                        stored = _read_existing(last_year, [DATETIME, CODE, CLOSE, VOLUME])
+                last = _last_stored(stored, part) if stored is not None else None
+                if last is not None:
+                    first = part.take([pc.index(part[DATETIME], pc.min(part[DATETIME])).as_py()])
+                    adj = adjust.get(code)
+                    factors = (adj.at(first[DATETIME].to_numpy())[0], adj.at(last[DATETIME].to_numpy())[0]) \
+                        if adj is not None else (1.0, 1.0)
+                    boundary.append((first, last, factors))
+            if existing is not None:
+                part = _merge_existing(existing, part)
+        pq.write_table(part, data_path)
+        _count_written(data_path)
+
+    with profiler.span('validate'):
+        if boundary:
+            first, stored, factors = zip(*boundary)
+            issues.append(check_boundary(pa.concat_tables(first), pa.concat_tables(stored), is_tick,
+                                         tuple(np.array(f) for f in zip(*factors))))
+        record(kind, codes, issues)
+
+
+def _count_written(path: Path) -> None:
+    if profiler.enabled:
+        profiler.add(bytes_written=path.stat().st_size)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 接口原始返回 → 统一列格式（串行同步与 infra.async_sync 共用）
+# ─────────────────────────────────────────────────────────────────────────────
+
+INDEX_SPOT_SYMBOLS = ["沪深重要指数", "上证系列指数", "深证系列指数", "指数成份", "中证系列指数"]
+INDEX_TICK_CODES = ['000001']  # 只同步上证指数的分钟线
+
+
+def _stock_spot_frame(latest_df: pd.DataFrame, beg_date: datetime) -> pa.Table:
+    """ak.stock_zh_a_spot_em → COLUMNS（去掉无收盘价的代码）"""
+    return normalize(latest_df, STOCK_SPOT, **{DATETIME: beg_date})
+
+
+def _stock_tick_frame(df: pd.DataFrame, code: str, name: str) -> pa.Table:
+    """ak.stock_zh_a_hist_min_em → TICK_COLUMNS"""
+    return normalize(df, STOCK_TICK, code=code, name=name)
+
+
+def _index_spot_frame(df: pd.DataFrame, beg_date: datetime) -> pa.Table:
+    """ak.stock_zh_index_spot_em(symbol) → COLUMNS"""
+    return normalize(df, INDEX_SPOT, **{DATETIME: beg_date})
+
+
+def _combine_index_spots(tables: List[pa.Table]) -> pa.Table:
+    """多个指数系列的行情合并去重（同一指数会出现在多个系列中）"""
+    all_index = pa.concat_tables(tables) if tables else arrow_schema(COLUMNS).empty_table()
+    all_index = dedupe(all_index, [DATETIME, CODE], keep='first')
+    return all_index.filter(pc.is_valid(all_index[CLOSE]))
+
+
+def _index_tick_frame(df: pd.DataFrame, code: str, name: str) -> pa.Table:
+    """ak.index_zh_a_hist_min_em → TICK_COLUMNS"""
+    return normalize(df, INDEX_TICK, code=code, name=name)
+
+
+def _industry_daily_frame(df: pd.DataFrame, code: str, name: str) -> pa.Table:
+    """ak.stock_board_industry_hist_em → COLUMNS"""
+    return normalize(df, INDUSTRY_DAILY, code=code, name=name)
+
+
+def _industry_tick_frame(df: pd.DataFrame, code: str, name: str) -> pa.Table:
+    """ak.stock_board_industry_hist_min_em → TICK_COLUMNS"""
+    return normalize(df, INDUSTRY_TICK, code=code, name=name)
+
+
+def get_industry_df() -> pd.DataFrame:
+    """行业板块列表：CODE / NAME"""
+    industries = cached_call(ak.stock_board_industry_name_em, {})[['板块名称', '板块代码']]
+    return industries.rename(columns={'板块名称': NAME, '板块代码': CODE})
+
+
+@profiled('sync.stock')
+def sync_latest_stock_data(codes: List[str] = [], include_tick: bool = True, resume: bool = True) -> None:
     beg_date = datetime.combine(get_latest_trade_date(), time())
     end_date = beg_date + timedelta(days=1)
     codes = list(set(codes))
@@ -150,214 +307,129 @@ def sync_latest_stock_data(codes: List[str] = [], include_tick: bool = True) ->
     stock_root_dir = get_data_dir(DataType.STOCK)
     stock_root_dir.mkdir(parents=True, exist_ok=True)
     logger.info(f'Start to synchronize stock data')
-    latest_df = _execute_with_retry(ak.stock_zh_a_spot_em, {})
-    stock_columns_map = {'代码': CODE, '名称': NAME, '今开': OPEN, '昨收': PRECLOSE, '最新价': CLOSE, '最高': HIGH,
-                         '最低': LOW, '成交量': VOLUME, '成交额': AMOUNT, '涨跌幅': PRICE_CHG, '换手率': TURN,
-                         '市盈率-动态': PE_TTM, '市净率': PB_TTM}
-    latest_df.rename(columns=stock_columns_map, inplace=True)
-    latest_df[DATETIME] = beg_date
-    latest_df[VOLUME] *= 100
-    latest_df = latest_df[COLUMNS]
-    latest_df.astype(COLUMNS_TYPE)
-    stock_df = latest_df[~latest_df[CLOSE].isna()]
+    with profiler.span('fetch') as sp:
+        latest_df = _execute_with_retry(ak.stock_zh_a_spot_em, {})
+        sp.add(rows=0 if latest_df is None else len(latest_df))
+    stock_df = _stock_spot_frame(latest_df, beg_date)
     if (len(codes) != 0):
-        stock_df = stock_df[stock_df[CODE].isin(codes)]
+        stock_df = stock_df.filter(pc.is_in(stock_df[CODE], value_set=pa.array(codes, pa.string())))
     save_date(stock_df, stock_root_dir, False)
     logger.info(f'Finish synchronizing stock data')
 
     if not include_tick: return
     logger.info(f'Start to synchronize stock tick data')
     # 降序排列，使用000001作为当天同步的标识
-    stock_df = stock_df.sort_values(by=CODE, ascending=False)
-    for _, row in tqdm(stock_df.iterrows(), total=stock_df.shape[0]):
-        code = row[CODE]
-        name = row[NAME]
-        context = {'symbol': code, 'start_date': beg_date.strftime('%Y-%m-%d %H:%M:%S'),
-                   'end_date': end_date.strftime('%Y-%m-%d %H:%M:%S'), 'period': '1', 'adjust': 'qfq'}
-        df = _execute_with_retry(ak.stock_zh_a_hist_min_em, context, retry_times=3)
-        if (df is None or df.empty):
-            logger.info(f'No data for {code}')
-            continue
-        df.rename(columns={'时间': DATETIME, '开盘': OPEN, '收盘': CLOSE, '最高': HIGH, '最低': LOW, '成交量': VOLUME,
-                           '成交额': AMOUNT, '换手率': TURN}, inplace=True)
-        df[CODE] = code
-        df[NAME] = name
-        df[DATETIME] = pd.to_datetime(df[DATETIME])
-        df[VOLUME] *= 100
-        df = df[TICK_COLUMNS]
-        save_date(df, stock_root_dir, True)
-        time_module.sleep(TICK_INTERVAL)
+    stock_df = stock_df.sort_by([(CODE, 'descending')])
+    # 逐代码记录进度：中断 / 失败后重跑只处理未完成与待重试的代码
+    with SyncJob.open(f"stock_tick_{beg_date:%Y%m%d}", resume=resume) as job:
+        todo = set(job.plan(stock_df[CODE].to_pylist()))
+        work = [(code, name) for code, name in zip(stock_df[CODE].to_pylist(), stock_df[NAME].to_pylist())
+                if code in todo]
+        for code, name in tqdm(work):
+            context = {'symbol': code, 'start_date': beg_date.strftime('%Y-%m-%d %H:%M:%S'),
+                       'end_date': end_date.strftime('%Y-%m-%d %H:%M:%S'), 'period': '1', 'adjust': 'qfq'}
+            with profiler.span('fetch'):
+                df = _execute_with_retry(ak.stock_zh_a_hist_min_em, context, retry_times=3)
+            if df is None:
+                job.failed(code, 'fetch failed after retries')
+                continue
+            if df.empty:
+                logger.info(f'No data for {code}')
+                job.done(code)
+                continue
+            save_date(_stock_tick_frame(df, code, name), stock_root_dir, True)
+            job.done(code)
+            time_module.sleep(TICK_INTERVAL)
     logger.info(f'Finish synchronizing stock tick data')
 
 
+@profiled('sync.index')
 def sync_latest_index_data(include_tick: bool = True) -> None:
     beg_date = datetime.combine(get_latest_trade_date(), time())
     end_date = beg_date + timedelta(days=1)
     index_root_dir = get_data_dir(DataType.INDEX)
-    symbols = ["沪深重要指数", "上证系列指数", "深证系列指数", "指数成份", "中证系列指数"]
 
     logger.info(f'Start to synchronize indexes data')
-    dfs = []
-    for symbol in tqdm(symbols):
-        df = ak.stock_zh_index_spot_em(symbol=symbol)
+    tables = []
+    for symbol in tqdm(INDEX_SPOT_SYMBOLS):
+        with profiler.span('fetch'):
+            df = cached_call(ak.stock_zh_index_spot_em, {'symbol': symbol})
         if (df is not None):
-            df.rename(
-                columns={'代码': CODE, '名称': NAME, '今开': OPEN, '昨收': PRECLOSE, '最新价': CLOSE, '最高': HIGH,
-                         '最低': LOW, '成交量': VOLUME, '成交额': AMOUNT, '涨跌幅': PRICE_CHG}, inplace=True)
-            df[DATETIME] = beg_date
-            df[DATETIME] = pd.to_datetime(df[DATETIME])
-            df[TURN] = np.nan
-            df[PE_TTM] = np.nan
-            df[PB_TTM] = np.nan
-            df[VOLUME] *= 100
-            df = df[COLUMNS]
-            df = df.astype(COLUMNS_TYPE)
-            dfs.append(df)
-    all_index = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
-    all_index = all_index.drop_duplicates(subset=[DATETIME, CODE])
-    all_index = all_index[~all_index[CLOSE].isna()]
+            tables.append(_index_spot_frame(df, beg_date))
+    all_index = _combine_index_spots(tables)
     save_date(all_index, index_root_dir, False)
     logger.info(f'Finish synchronizing indexes data')
 
     if not include_tick: return
     logger.info(f'Start to synchronize indexes tick data')
-    tick_index = all_index[all_index[CODE] == '000001']
-    for _, row in tqdm(tick_index.iterrows(), total=tick_index.shape[0]):
-        code = row[CODE]
-        name = row[NAME]
+    tick_index = all_index.filter(pc.is_in(all_index[CODE], value_set=pa.array(INDEX_TICK_CODES)))
+    for code, name in tqdm(list(zip(tick_index[CODE].to_pylist(), tick_index[NAME].to_pylist()))):
         context = {'symbol': code, 'start_date': beg_date.strftime('%Y-%m-%d %H:%M:%S'),
                    'end_date': end_date.strftime('%Y-%m-%d %H:%M:%S'), 'period': '1'}
-        df = _execute_with_retry(ak.index_zh_a_hist_min_em, context)
+        with profiler.span('fetch'):
+            df = _execute_with_retry(ak.index_zh_a_hist_min_em, context)
         if (df is None or df.empty):
             logger.info(f'No data for {code}')
             continue
-        df.rename(columns={'时间': DATETIME, '开盘': OPEN, '收盘': CLOSE, '最高': HIGH, '最低': LOW, '成交量': VOLUME,
-                           '成交额': AMOUNT}, inplace=True)
-        df[CODE] = code
-        df[NAME] = name
-        df[DATETIME] = pd.to_datetime(df[DATETIME])
-        df[VOLUME] *= 100
-        df = df[TICK_COLUMNS]
-        save_date(df, index_root_dir, True)
+        save_date(_index_tick_frame(df, code, name), index_root_dir, True)
         time_module.sleep(TICK_INTERVAL)
     logger.info(f'Finish synchronizing indexes tick data')
 
 
+@profiled('sync.industry')
 def sync_latest_industry_data(codes: List[str] = [], include_tick: bool = True) -> None:
     codes = list(set(codes))
-    industries = ak.stock_board_industry_name_em()[['板块名称', '板块代码']]
-    industries.rename(columns={'板块名称': NAME, '板块代码': CODE}, inplace=True)
+    industries = get_industry_df()
     if (len(codes) > 0):
         industries = industries[industries[CODE].isin(codes)]
     index_root_dir = get_data_dir(DataType.INDUSTRY_INDEX)
 
     beg_date = datetime.combine(get_latest_trade_date(), time())
     end_date = beg_date + timedelta(days=1)
-    dfs = []
+    tables = []
     logger.info(f'Start to synchronize industry indexes data')
-    for _, row in tqdm(industries.iterrows(), total=industries.shape[0]):
-        code = row[CODE]
-        name = row[NAME]
+    for code, name in tqdm(list(zip(industries[CODE], industries[NAME]))):
         context = {'symbol': name, 'period': '日k', 'start_date': beg_date.strftime('%Y%m%d'),
                    'end_date': end_date.strftime('%Y%m%d'), 'adjust': ''}
-        df = _execute_with_retry(ak.stock_board_industry_hist_em, context, 3)
-        df.rename(columns={'日期': DATETIME, '开盘': OPEN, '收盘': CLOSE, '最高': HIGH, '最低': LOW, '成交量': VOLUME,
-                           '成交额': AMOUNT, '涨跌幅': PRICE_CHG, '换手率': TURN}, inplace=True)
-        df[DATETIME] = pd.to_datetime(df[DATETIME])
-        df[CODE] = code
-        df[NAME] = name
-        df[VOLUME] *= 100
-        df[PE_TTM] = np.nan
-        df[PB_TTM] = np.nan
-        df[PRECLOSE] = np.nan
-        df = df[COLUMNS]
-        df = df.astype(COLUMNS_TYPE)
-        dfs.append(df)
-    save_date(pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame(), index_root_dir, False)
+        with profiler.span('fetch'):
+            df = _execute_with_retry(ak.stock_board_industry_hist_em, context, 3)
+        tables.append(_industry_daily_frame(df, code, name))
+    save_date(pa.concat_tables(tables) if tables else arrow_schema(COLUMNS).empty_table(), index_root_dir, False)
     logger.info(f'Finish synchronizing industry indexes data')
 
     if not include_tick: return
-    dfs = []
+    tables = []
     logger.info(f'Start to synchronize industry indexes tick data')
-    for _, row in tqdm(industries.iterrows(), total=industries.shape[0]):
-        code = row[CODE]
-        name = row[NAME]
+    for code, name in tqdm(list(zip(industries[CODE], industries[NAME]))):
         context = {'symbol': name, 'period': '1'}
-        df = _execute_with_retry(ak.stock_board_industry_hist_min_em, context, 3)
-        df.rename(
-            columns={'日期时间': DATETIME, '开盘': OPEN, '收盘': CLOSE, '最高': HIGH, '最低': LOW, '成交量': VOLUME,
-                     '成交额': AMOUNT}, inplace=True)
-        df[DATETIME] = pd.to_datetime(df[DATETIME])
-        df[CODE] = code
-        df[NAME] = name
-        df[VOLUME] *= 100
-        df = df[TICK_COLUMNS]
-        dfs.append(df)
+        with profiler.span('fetch'):
+            df = _execute_with_retry(ak.stock_board_industry_hist_min_em, context, 3)
+        tables.append(_industry_tick_frame(df, code, name))
         time_module.sleep(TICK_INTERVAL)
-    save_date(pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame(), index_root_dir, True)
+    save_date(pa.concat_tables(tables) if tables else arrow_schema(TICK_COLUMNS).empty_table(), index_root_dir, True)
     logger.info(f'Finish synchronizing industry indexes tick data')
 
 
-def _apply_baostock_price_normalization(df: pd.DataFrame, code: str, local_last_close: float) -> None:
-    """
-    将 BaoStock 不复权价格归一化到与本地已存储数据（AkShare 后复权）相同的尺度。
-
-    BaoStock 对 ETF 不支持复权，返回的是实际市价（不复权）。
-    而本地已存储的 AkShare 数据是后复权价格，两者差距约等于累计分红复权系数（约 10~20%）。
-    若直接拼接，动量因子在新旧数据边界会出现虚假的大幅涨跌，导致回测失真。
-
-    算法：
-      scale = 本地最新收盘价 / BaoStock 首行的 preclose（昨收 = 前一交易日实际市价）
-
-    原理：
-      - preclose 是 BaoStock 返回的前一交易日收盘价（不复权真实市价）
-      - local_last_close 是本地存储的前一交易日后复权收盘价
-      - 两者之比即为累计复权系数，将新数据整体等比缩放后价格连续
-      - 由于每次增量同步时 preclose 始终等于上次存储的 close/scale，
-        该 scale 值在历次同步中自动保持稳定，无需持久化
-
-    注意：
-      - 此操作直接修改传入的 df（in-place）
-      - 若 preclose 缺失，退而使用 price_chg 反推，若均无法获取则跳过归一化并警告
-    """
-    df_sorted = df.sort_values(DATETIME)
-    first_row = df_sorted.iloc[0]
-
-    # 优先使用 preclose 字段
-    preclose_val = first_row.get(PRECLOSE, None)
-    if pd.isna(preclose_val) or preclose_val == 0:
-        # 退而使用 pctChg（涨跌幅）反推昨收：preclose = close / (1 + pct_chg/100)
-        pct_chg = first_row.get(PRICE_CHG, None)
-        close_val = first_row.get(CLOSE, None)
-        if not (pd.isna(pct_chg) or pd.isna(close_val) or pct_chg == -100):
-            preclose_val = float(close_val) / (1 + float(pct_chg) / 100)
-
-    if pd.isna(preclose_val) or preclose_val == 0:
-        logger.warning(f"[NormPrice] {code}: preclose 无法获取，跳过价格归一化。"
-                       f"BaoStock 数据将以原始价格写入，可能导致价格跳变。")
-        return
-
-    scale = local_last_close / preclose_val
-
-    # 差距小于 0.1% 时无需调整（两数据源价格本就一致）
-    if abs(scale - 1.0) < 0.001:
-        return
-
-    logger.info(f"[NormPrice] {code}: 价格归一化 scale={scale:.4f} "
-                f"(本地最新后复权收盘={local_last_close:.4f}, "
-                f"BaoStock首行昨收={preclose_val:.4f})")
-
-    price_cols = [OPEN, HIGH, LOW, CLOSE, PRECLOSE]
-    for col in price_cols:
-        if col in df.columns:
-            df[col] = (df[col] * scale).round(4)
+@profiled('sync.etf')
+def _covers(factors: AdjustFactors, last_day: date) -> bool:
+    """复权因子表的锚点（本地最后一根日线）是否已到 last_day"""
+    return factors.anchor is not None and factors.anchor.timestamp.date() >= last_day
 
 
 def sync_latest_etf_data(codes: List[str] = [],
                          include_tick: bool = True,
-                         beg_date: datetime = datetime.combine(get_latest_trade_date(), time()),
-                         end_date: datetime = datetime.combine(get_latest_trade_date(), time()) + timedelta(days=1)
+                         beg_date: Optional[datetime] = None,
+                         end_date: Optional[datetime] = None,
+                         resume: bool = True
                          ) -> None:
+    # 默认区间在调用时才解析：避免 import 本模块时就访问网络获取最新交易日
+    latest_trade = get_latest_trade_date()
+    if beg_date is None:
+        beg_date = datetime.combine(latest_trade, time())
+    if end_date is None:
+        end_date = datetime.combine(latest_trade, time()) + timedelta(days=1)
+    # 请求区间实际覆盖的最后一个交易日：默认 end_date 是最新交易日 + 1 天，本地数据到最新交易日即已完整
+    last_day = min(latest_trade, end_date.date())
     codes = list(set(codes))
     etf_root_dir = get_data_dir(DataType.ETF)
     fetcher = get_fetcher()
@@ -375,7 +447,7 @@ def sync_latest_etf_data(codes: List[str] = [],
         # Case A: 用户未指定代码 -> 拉取全量列表
         try:
             logger.info("Fetching full ETF list from AkShare (no codes provided)...")
-            etf_info = ak.fund_etf_spot_em()
+            etf_info = cached_call(ak.fund_etf_spot_em, {})
             etf_info = etf_info[['代码', '名称']]
             etf_info.rename(columns={'名称': NAME, '代码': CODE}, inplace=True)
             etf_info[CODE] = etf_info[CODE].astype(str).str.strip()
@@ -391,10 +463,13 @@ def sync_latest_etf_data(codes: List[str] = [],
             code = str(code).strip()
             name = code  # 默认名字为代码，之后尝试从本地恢复
 
-            # 尝试从本地 Parquet 文件读取真实名称 (Name)
+            # 尝试从本地复权因子表 / Parquet 文件读取真实名称 (Name)
             try:
                 target_code_dir = etf_root_dir / code
-                if target_code_dir.exists():
+                factors = AdjustFactors.load(target_code_dir)
+                if factors is not None and factors.anchor is not None and factors.anchor.name:
+                    name = factors.anchor.name
+                elif target_code_dir.exists():
                     # 找到最近的年份文件夹
                     years = [y for y in os.listdir(target_code_dir) if y.isdigit()]
                     if years:
@@ -418,72 +493,70 @@ def sync_latest_etf_data(codes: List[str] = [],
     # 移除 dfs 列表，改为 loop 内直接 save
     logger.info(f'Start to synchronize ETF data (Count: {len(target_df)})')
 
-    for _, row in tqdm(target_df.iterrows(), total=target_df.shape[0]):
-        code = row[CODE]
-        name = row[NAME]
-
-        # --- 优化：每只 ETF 单独处理，互不影响 ---
-        try:
-            # 默认下载范围
-            fetch_start = beg_date
+    # 逐代码记录进度：中断 / 失败后重跑只处理未完成与待重试的代码
+    job_name = f"etf_daily_{beg_date:%Y%m%d}_{end_date:%Y%m%d}"
+    with SyncJob.open(job_name, resume=resume) as job:
+        todo = set(job.plan(target_df[CODE]))
+        for code, name in tqdm([(c, n) for c, n in zip(target_df[CODE], target_df[NAME]) if c in todo]):
 
-            # 1. 检查本地已有数据的最新日期 (实现真正的增量更新)
-            local_latest_date = None
-            local_last_close = None  # 用于 BaoStock 价格归一化
+            # --- 优化：每只 ETF 单独处理，互不影响 ---
             try:
-                target_code_dir = etf_root_dir / code
-                if target_code_dir.exists():
-                    # 寻找年份最大的文件夹
-                    years = [y for y in os.listdir(target_code_dir) if y.isdigit()]
-                    if years:
-                        max_year = max(years, key=int)
-                        # 读取该年 daily parquet
-                        daily_file = target_code_dir / max_year / f"{max_year}.parquet"
-                        if daily_file.exists():
-                            # 同时读取 datetime 和 close，供增量检查和价格归一化使用
-                            table = pq.read_table(daily_file, columns=[DATETIME, CLOSE])
-                            if table.num_rows > 0:
-                                local_df = table.to_pandas()
-                                local_df[DATETIME] = pd.to_datetime(local_df[DATETIME])
-                                last_row = local_df.loc[local_df[DATETIME].idxmax()]
-                                max_ts = last_row[DATETIME]
-                                if pd.notna(max_ts):
-                                    local_latest_date = max_ts.to_pydatetime()
-                                    local_last_close = float(last_row[CLOSE]) if pd.notna(last_row[CLOSE]) else None
-            except Exception as check_err:
-                # 检查出错不影响下载，降级为全量
-                logger.warning(f"Failed to check local history for {code}: {check_err}")
-
-            # 2. 动态调整下载开始时间
-            if local_latest_date:
-                # 如果本地最新日期 >= 请求开始日期，说明前面都已经有了
-                if local_latest_date >= fetch_start:
-                    # 从本地最新的下一天开始下
-                    fetch_start = local_latest_date + timedelta(days=1)
-
-            # 3. 判断是否需要下载
-            if fetch_start > end_date:
-                logger.info(f"Skipping {code}: Local data ({local_latest_date.date()}) covers request.")
-                continue
+                # 默认下载范围
+                fetch_start = beg_date
 
-            logger.info(f"Syncing {code} from {fetch_start.date()} to {end_date.date()}...")
-
-            df = fetcher.fetch_daily(code, name, fetch_start, end_date)
-
-            if not df.empty:
-                # 4. 价格归一化：BaoStock 返回不复权实际市价，需对齐到本地已存储的复权价格尺度
-                #    算法：scale = 本地最新后复权收盘 / BaoStock首行的昨收(preclose，即实际市价前日收盘)
-                #    由于 scale 因子等于"累计复权系数"，此后每次增量同步该值自动保持稳定
-                if fetcher.needs_price_normalization and local_last_close is not None:
-                    _apply_baostock_price_normalization(df, code, local_last_close)
-
-                save_date(df, etf_root_dir, False)
-            else:
-                logger.warning(f"No daily data fetched for {code}")
-
-        except Exception as e:
-            logger.error(f"Failed to sync ETF {code}: {e}")
-            continue  # 关键：出错后继续下一个，不中断
+                # 1. 检查本地已有数据的最新日期 (实现真正的增量更新)
+                #    复权因子表的锚点记录了最后一根日线，只读这个小文件；没有因子表的代码首次从最新年度文件初始化
+                target_code_dir = etf_root_dir / code
+                try:
+                    factors = AdjustFactors.load(target_code_dir) or AdjustFactors.bootstrap(target_code_dir)
+                except Exception as check_err:
+                    # 检查出错不影响下载，降级为全量
+                    logger.warning(f"Failed to check local history for {code}: {check_err}")
+                    factors = AdjustFactors()
+                local_latest_date = factors.anchor.timestamp if factors.anchor else None
+
+                # 2. 动态调整下载开始时间
+                if local_latest_date:
+                    # 如果本地最新日期 >= 请求开始日期，说明前面都已经有了
+                    if local_latest_date >= fetch_start:
+                        # 从本地最新的下一天开始下
+                        fetch_start = local_latest_date + timedelta(days=1)
+
+                # 3. 判断是否需要下载
+                if fetch_start > end_date or _covers(factors, last_day):
+                    logger.info(f"Skipping {code}: Local data ({local_latest_date.date()}) covers request.")
+                    job.done(code)
+                    continue
+
+                logger.info(f"Syncing {code} from {fetch_start.date()} to {end_date.date()}...")
+
+                with profiler.span('fetch') as sp:
+                    df = fetcher.fetch_daily(code, name, fetch_start, end_date)
+                    sp.add(rows=len(df))
+
+                if not df.empty:
+                    # 4. 复权因子：BaoStock 返回不复权实际市价，原样存储；由昨收与本地上一根收盘价算出除权比例，
+                    #    追加到因子表，读取时再乘回与本地已存储数据（AkShare 后复权）相同的尺度
+                    factors = factors.extend(df, raw=fetcher.needs_price_normalization)
+                    save_date(df, etf_root_dir, False, adjust={code: factors})
+                    # 价格写入成功后才推进锚点：中途失败时重跑会从同一位置重新下载
+                    factors.save(target_code_dir)
+                else:
+                    logger.warning(f"No daily data fetched for {code}")
+
+                # 只有本地数据已覆盖到区间内最后一个交易日才记为完成；空结果 / 只到前一交易日（当天数据尚未发布）不记录，
+                # 下次运行从锚点重新增量探测（只请求锚点之后的区间，代价很小）
+                if _covers(factors, last_day):
+                    job.done(code)
+                else:
+                    latest = factors.anchor.timestamp.date() if factors.anchor is not None else None
+                    logger.info(f"{code}: local data ends at {latest}, before {last_day}; "
+                                f"will re-check on the next run")
+
+            except Exception as e:
+                logger.error(f"Failed to sync ETF {code}: {e}")
+                job.failed(code, e)
+                continue  # 关键：出错后继续下一个，不中断
 
     logger.info(f'Finish synchronizing etf data')
 
@@ -494,25 +567,30 @@ def sync_latest_etf_data(codes: List[str] = [],
         return
 
     logger.info(f'Start to synchronize etf tick data')
-    for _, row in tqdm(target_df.iterrows(), total=target_df.shape[0]):
-        code = row[CODE]
-        name = row[NAME]
+    with SyncJob.open(f"etf_tick_{beg_date:%Y%m%d}", resume=resume) as job:
+        todo = set(job.plan(target_df[CODE]))
+        for code, name in tqdm([(c, n) for c, n in zip(target_df[CODE], target_df[NAME]) if c in todo]):
 
-        try:
-            target_tick_file = etf_root_dir / code / str(
-                beg_date.year) / 'tick' / f'{beg_date.strftime("%Y-%m-%d")}.parquet'
-            if target_tick_file.exists():
+            try:
+                target_tick_file = etf_root_dir / code / str(
+                    beg_date.year) / 'tick' / f'{beg_date.strftime("%Y-%m-%d")}.parquet'
+                if target_tick_file.exists():
+                    job.done(code)
+                    continue
+
+                with profiler.span('fetch') as sp:
+                    df = fetcher.fetch_tick(code, name, beg_date)
+                    sp.add(rows=len(df))
+                if not df.empty:
+                    save_date(df, etf_root_dir, True)
+                job.done(code)
+
+                time_module.sleep(TICK_INTERVAL)
+            except Exception as e:
+                logger.error(f"Failed to sync ETF tick {code}: {e}")
+                job.failed(code, e)
                 continue
 
-            df = fetcher.fetch_tick(code, name, beg_date)
-            if not df.empty:
-                save_date(df, etf_root_dir, True)
-
-            time_module.sleep(TICK_INTERVAL)
-        except Exception as e:
-            logger.error(f"Failed to sync ETF tick {code}: {e}")
-            continue
-
     logger.info(f'Finish synchronizing etf tick data')
 
 
@@ -522,6 +600,8 @@ def sync_latest_all_data(include_tick: bool = True) -> None:
     sync_latest_index_data(include_tick=include_tick)
     sync_latest_stock_data(include_tick=include_tick)
     sync_latest_etf_data(include_tick=include_tick)
+    quality.log_summary()
+    quality.save()
     logger.info(f'Complete synchronizing the data.')
 
 
@@ -529,13 +609,15 @@ def read_data_range(code: str,
                     trade_beg: datetime,
                     trade_end: datetime,
                     data_type: DataType,
-                    klt: Klt) -> pd.DataFrame:
+                    klt: Klt,
+                    columns: Optional[List[str]] = None) -> pd.DataFrame:
     """查询时间范围内的k线图数据,(trade_beg,trade_end]
 
     Args:
         code: 代码
         trade_beg (str): %Y-%m-%d
         trade_end (str): %Y-%m-%d
+        columns: 只读取这些列（None 为全部列），大标的池时减少 IO 与内存
 
     Raises:
         RuntimeError: _description_
@@ -544,6 +626,18 @@ def read_data_range(code: str,
         pd.DataFrame: _description_
     """
     """读取指定日期范围数据（自动合并季度文件）"""
+    with profiler.span('read') as sp:
+        df = _read_data_range(code, trade_beg, trade_end, data_type, klt, columns)
+        sp.add(rows=len(df))
+        return df
+
+
+def _read_data_range(code: str,
+                     trade_beg: datetime,
+                     trade_end: datetime,
+                     data_type: DataType,
+                     klt: Klt,
+                     columns: Optional[List[str]] = None) -> pd.DataFrame:
     dataset_path = ROOT_DATA_DIR / data_type.dir_code / code
     start_dt = pd.to_datetime(trade_beg)
     end_dt = pd.to_datetime(trade_end)
@@ -567,10 +661,19 @@ def read_data_range(code: str,
                     (DATETIME, '<=', end_dt)
                 ]
             )
-            return dataset.read().to_pandas().astype(TICK_COLUMNS_TYPE)
+            _count_read(dataset.files)
+            df = dataset.read(columns=columns).to_pandas()
+            return df.astype({k: v for k, v in TICK_COLUMNS_TYPE.items() if k in df.columns})
         else:
             return pd.DataFrame()
     elif (klt == Klt.DAY):
+        # 存储不复权价的代码（BaoStock）有复权因子表：读出后整列乘以因子，需要 datetime 列定位因子
+        factors = AdjustFactors.load(dataset_path)
+        if factors is not None and factors.is_identity:
+            factors = None
+        read_columns = columns
+        if factors is not None and columns is not None and DATETIME not in columns:
+            read_columns = [DATETIME, *columns]
         dfs = []
         for year in years:
             data_path = dataset_path / str(year)
@@ -584,12 +687,25 @@ def read_data_range(code: str,
                 ],
                 ignore_prefixes=['tick']  # 排除tick分时数据
             )
-            dfs.append(dataset.read().to_pandas())
-        return pd.concat(dfs, ignore_index=True).astype(COLUMNS_TYPE) if dfs else pd.DataFrame()
+            _count_read(dataset.files)
+            dfs.append(dataset.read(columns=read_columns).to_pandas())
+        if not dfs:
+            return pd.DataFrame()
+        df = pd.concat(dfs, ignore_index=True)
+        if factors is not None:
+            df = factors.apply(df)
+            if read_columns is not columns:
+                df = df[columns]
+        return df.astype({k: v for k, v in COLUMNS_TYPE.items() if k in df.columns})
     else:
         raise Exception(f'unsupported klt={klt}')
 
 
+def _count_read(files: List[str]) -> None:
+    if profiler.enabled:
+        profiler.add(bytes_read=sum(os.path.getsize(f) for f in files))
+
+
 def get_latest_sync_date() -> date:
     """find_latest_sync_date
     """
@@ -628,7 +744,7 @@ def find_trade_date() -> pd.DataFrame:
         8552  2025-12-29
         8553  2025-12-30
     """
-    df = ak.tool_trade_date_hist_sina()
+    df = cached_call(ak.tool_trade_date_hist_sina, {})
     return df.sort_values('trade_date').reset_index(drop=True)
 
 
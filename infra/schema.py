@@ -0,0 +1,168 @@
+"""
+声明式列映射 (Source Schemas)
+
+各接口返回的中文列 → 统一列 (COLUMNS / TICK_COLUMNS) 的规则集中声明在这里，
+normalize() 把原始 DataFrame 转成 pyarrow.Table，一次完成：选列 → 改名 → 转型 → 缩放 → 补常量 / 空列。
+输出的 Arrow 类型由 COLUMNS_TYPE 推出（str → string，float → float64），DATETIME 统一为 timestamp[ns]。
+
+    table = normalize(raw_df, STOCK_TICK, code='000001', name='平安银行')
+    save_date(table, data_dir, is_tick=True)
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Mapping, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from utils.const import (
+    DATETIME, CODE, NAME, OPEN, HIGH, LOW, CLOSE, PRECLOSE,
+    VOLUME, AMOUNT, TURN, PRICE_CHG, PE_TTM, PB_TTM,
+    COLUMNS, COLUMNS_TYPE, TICK_COLUMNS, TICK_COLUMNS_TYPE,
+)
+
+_ARROW_TYPES = {'str': pa.string(), 'float': pa.float64()}
+ARROW_TYPES: Dict[str, pa.DataType] = {
+    DATETIME: pa.timestamp('ns'),
+    **{col: _ARROW_TYPES[t] for col, t in {**COLUMNS_TYPE, **TICK_COLUMNS_TYPE}.items()},
+}
+
+
+def arrow_schema(columns: Sequence[str]) -> pa.Schema:
+    """统一列的 Arrow schema"""
+    return pa.schema([(col, ARROW_TYPES[col]) for col in columns])
+
+
+@dataclass(frozen=True)
+class SourceSchema:
+    """
+    单个接口的列映射。
+
+    :param rename: 原始列名 → 统一列名（只有这些列会被读取）
+    :param columns: 输出列及顺序（COLUMNS 或 TICK_COLUMNS）
+    :param constants: 由调用方在 normalize() 时传入的常量列（如分钟线的 code / name）
+    :param fill: 接口不提供、填空值的列
+    :param scale: 乘数，e.g. 成交量 手 → 股
+    :param required: 这些列为空的行丢弃
+    """
+    rename: Mapping[str, str]
+    columns: Sequence[str]
+    constants: Sequence[str] = ()
+    fill: Sequence[str] = ()
+    scale: Mapping[str, float] = field(default_factory=lambda: {VOLUME: 100})
+    required: Sequence[str] = ()
+
+    def __post_init__(self):
+        provided = [*self.rename.values(), *self.constants, *self.fill]
+        missing = set(self.columns) - set(provided)
+        if missing:
+            raise ValueError(f"Schema does not provide columns {sorted(missing)}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 各接口的映射
+# ─────────────────────────────────────────────────────────────────────────────
+
+_KLINE = {'开盘': OPEN, '收盘': CLOSE, '最高': HIGH, '最低': LOW, '成交量': VOLUME, '成交额': AMOUNT}
+
+# ak.stock_zh_a_spot_em：当天全市场快照，datetime 为同步交易日
+STOCK_SPOT = SourceSchema(
+    rename={'代码': CODE, '名称': NAME, '今开': OPEN, '昨收': PRECLOSE, '最新价': CLOSE, '最高': HIGH, '最低': LOW,
+            '成交量': VOLUME, '成交额': AMOUNT, '涨跌幅': PRICE_CHG, '换手率': TURN,
+            '市盈率-动态': PE_TTM, '市净率': PB_TTM},
+    columns=COLUMNS, constants=(DATETIME,), required=(CLOSE,))
+
+# ak.stock_zh_a_hist_min_em
+STOCK_TICK = SourceSchema(
+    rename={'时间': DATETIME, **_KLINE}, columns=TICK_COLUMNS, constants=(CODE, NAME))
+
+# ak.stock_zh_index_spot_em(symbol)
+INDEX_SPOT = SourceSchema(
+    rename={'代码': CODE, '名称': NAME, '今开': OPEN, '昨收': PRECLOSE, '最新价': CLOSE, '最高': HIGH, '最低': LOW,
+            '成交量': VOLUME, '成交额': AMOUNT, '涨跌幅': PRICE_CHG},
+    columns=COLUMNS, constants=(DATETIME,), fill=(TURN, PE_TTM, PB_TTM))
+
+# ak.index_zh_a_hist_min_em
+INDEX_TICK = SourceSchema(
+    rename={'时间': DATETIME, **_KLINE}, columns=TICK_COLUMNS, constants=(CODE, NAME))
+
+# ak.stock_board_industry_hist_em
+INDUSTRY_DAILY = SourceSchema(
+    rename={'日期': DATETIME, **_KLINE, '涨跌幅': PRICE_CHG, '换手率': TURN},
+    columns=COLUMNS, constants=(CODE, NAME), fill=(PRECLOSE, PE_TTM, PB_TTM))
+
+# ak.stock_board_industry_hist_min_em
+INDUSTRY_TICK = SourceSchema(
+    rename={'日期时间': DATETIME, **_KLINE}, columns=TICK_COLUMNS, constants=(CODE, NAME))
+
+# ak.fund_etf_hist_em (后复权日线)
+ETF_DAILY = SourceSchema(
+    rename={'日期': DATETIME, **_KLINE, '涨跌幅': PRICE_CHG, '换手率': TURN},
+    columns=COLUMNS, constants=(CODE, NAME), fill=(PRECLOSE, PE_TTM, PB_TTM))
+
+# ak.fund_etf_hist_min_em
+ETF_TICK = SourceSchema(
+    rename={'日期时间': DATETIME, **_KLINE}, columns=TICK_COLUMNS, constants=(CODE, NAME))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 转换
+# ─────────────────────────────────────────────────────────────────────────────
+
+def normalize(df: pd.DataFrame, schema: SourceSchema, **constants: Any) -> pa.Table:
+    """
+    原始 DataFrame → 统一列的 pyarrow.Table。
+
+    :param df: 接口返回的原始数据（不会被修改）
+    :param schema: 该接口的 SourceSchema
+    :param constants: schema.constants 中每一列的值，e.g. code='000001', name='平安银行'
+    """
+    missing = [col for col in schema.rename if col not in df.columns]
+    if missing:
+        raise KeyError(f"Source frame is missing columns {missing}")
+    unknown = set(constants) ^ set(schema.constants)
+    if unknown:
+        raise TypeError(f"normalize() expects constants {list(schema.constants)}, got {list(constants)}")
+
+    raw = pa.Table.from_pandas(df, columns=list(schema.rename), preserve_index=False)
+    n = raw.num_rows
+    arrays = {}
+    for src, col in schema.rename.items():
+        # 日期字符串 ('2024-01-05' / '2024-01-05 09:31[:00]') 均为 ISO8601，可直接 cast 为 timestamp
+        arrays[col] = pc.cast(raw[src], ARROW_TYPES[col])
+    for col, factor in schema.scale.items():
+        if col in arrays:
+            arrays[col] = pc.multiply(arrays[col], pa.scalar(float(factor)))
+    for col in schema.constants:
+        arrays[col] = pa.repeat(pa.scalar(constants[col], ARROW_TYPES[col]), n)
+    for col in schema.fill:
+        arrays[col] = pa.nulls(n, ARROW_TYPES[col])
+
+    table = pa.table([arrays[col] for col in schema.columns], schema=arrow_schema(schema.columns))
+    for col in schema.required:
+        table = table.filter(pc.is_valid(table[col]))
+    return table
+
+
+def as_table(df: Union[pd.DataFrame, pa.Table]) -> pa.Table:
+    """DataFrame / Table → Table（已是 Table 时原样返回）"""
+    if isinstance(df, pa.Table):
+        return df
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def dedupe(table: pa.Table, keys: Iterable[str], keep: str = 'last') -> pa.Table:
+    """
+    按 keys 去重，与 DataFrame.drop_duplicates(subset=keys, keep=keep) 一致：保留的行维持原有顺序。
+    """
+    if table.num_rows == 0:
+        return table
+    keys = list(keys)
+    agg = 'max' if keep == 'last' else 'min'
+    rows = (pa.table({**{k: table[k] for k in keys}, '_row': np.arange(table.num_rows)})
+            .group_by(keys, use_threads=False)
+            .aggregate([('_row', agg)]))[f'_row_{agg}'].to_numpy()
+    if len(rows) == table.num_rows:
+        return table
+    return table.take(np.sort(rows))
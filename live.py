@@ -1,13 +1,17 @@
+import argparse
 from datetime import datetime, timedelta
+from typing import Any, Mapping, Optional
 
 import config
 from core.data import DataLoader
+from core.panels import PanelWindow
+from core.shm import attach
 from core.strategies import CustomStrategy
 # 导入因子
 from factors import Peak, Momentum_castle, Momentum, MainLineBias
 from logics import logic_factor_rotation, logic_bias_protection
 from notifier import send_to_dingtalk, send_at_all_nudge
-from utils import logger
+from utils import logger, profiler
 
 
 def get_production_strategy():
@@ -32,7 +36,11 @@ def get_production_strategy():
     return strategy
 
 
-def run_live_signal():
+def run_live_signal(data: Optional[Mapping[str, Any]] = None):
+    """
+    :param data: 已加载的完整宽表映射（如共享内存数据服务挂载的 data），给出时只取最近 365 天的窗口视图，
+                 不再同步与读取 Parquet；None 时按窗口从本地数据湖加载（先同步最新行情）
+    """
     logger.info("Starting Live Signal Generation...")
 
     # 1. 动态计算数据窗口
@@ -44,20 +52,27 @@ def run_live_signal():
     start_str = start_date.strftime("%Y-%m-%d")
     end_str = today.strftime("%Y-%m-%d")
 
-    # 2. 强制同步最新行情
+    # 2. 初始化策略（先于加载：只读取策略用到的字段）
+    strategy = get_production_strategy()
+
+    # 强制同步最新行情
     # auto_sync=True 保证脚本运行时先去爬取今天的最新收盘价
     try:
-        loader = DataLoader(start_str, end_str, auto_sync=True)
-        data_dict = loader.load(config.ETF_SYMBOLS)
+        if data is not None:
+            # 已加载的数据：窗口只记录起止行号，宽表与原数据共享内存
+            data_dict = PanelWindow.between(data, start_str, end_str)
+            logger.info(f"Using preloaded data: {data_dict}")
+        else:
+            # 只读取策略用到的字段
+            loader = DataLoader(start_str, end_str, auto_sync=True, fields=strategy.fields)
+            data_dict = loader.load(config.ETF_SYMBOLS)
     except Exception as e:
         msg = f"数据同步失败: {str(e)}"
         logger.error(msg)
         send_to_dingtalk(config.DINGTALK_WEBHOOK, config.DINGTALK_SECRET, "策略报警", msg)
         return
 
-    # 3. 初始化策略并计算
-    strategy = get_production_strategy()
-
+    # 3. 计算信号
     try:
         # 获取所有历史日期的权重
         weights_df = strategy.generate_target_weights(**data_dict)
@@ -106,5 +121,21 @@ def run_live_signal():
     send_at_all_nudge(config.DINGTALK_WEBHOOK, config.DINGTALK_SECRET)
 
 
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="生成最新交易信号并推送到钉钉")
+    parser.add_argument('--shm', default=None, metavar='NAME',
+                        help="挂载 data_server.py 发布的共享内存数据（取最近 365 天窗口），不再自行同步与加载")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    run_live_signal()
\ No newline at end of file
+    args = parse_args()
+    try:
+        if args.shm:
+            with attach(args.shm) as shared:
+                run_live_signal(shared.data)
+        else:
+            run_live_signal()
+    finally:
+        # PROFILE=1 时打印热路径汇总，PROFILE_TRACE=xxx.json 时导出 Chrome trace
+        profiler.report()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import pandas as pd
 from typing import Dict, List, Optional
+from core.intermediates import IntermediateStore, rolling_mean
 from utils import logger
 
 
@@ -8,13 +9,16 @@ def logic_factor_rotation(factor_values: Dict[str, pd.DataFrame],
                           factor_weights: Dict[str, float] = {},
                           top_k: int = 1,
                           stg_flag: List[str] = [],
-                          timing_period: int = 0) -> pd.DataFrame:
+                          timing_period: int = 0,
+                          intermediates: Optional[IntermediateStore] = None) -> pd.DataFrame:
     """
     【逻辑函数】通用因子轮动逻辑
 
     复刻用户原始逻辑：
     1. 默认使用因子的【原始值 (Raw Score)】进行合成（非标准化）。
     2. 仅在 castle_stg1 开启且因子为 Mom_20 时，使用 Rank(pct=True) 并计算风控掩码。
+
+    intermediates 由 CustomStrategy 自动传入，timing_period 的均线与 MeanReversion 等因子共享。
     """
 
     # 0. 初始化
@@ -75,7 +79,7 @@ def logic_factor_rotation(factor_values: Dict[str, pd.DataFrame],
 
     # 5. (可选) 均线择时 (Absolute Momentum / Trend Filter)
     if timing_period > 0:
-        ma = closes.rolling(window=timing_period).mean()
+        ma = IntermediateStore.ensure(intermediates, close=closes).get(rolling_mean(timing_period, 'close'))
         # 只有价格 > 均线 才持有
         trend_filter = (closes > ma).astype(int)
         target_weights = target_weights * trend_filter
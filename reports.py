@@ -0,0 +1,94 @@
+"""
+HTML 研报生成 (QuantStats)
+
+回测与出报告分两个阶段：所有策略先回测完，再把报告任务交给进程池并行渲染。
+每份 QuantStats 报告主要耗时在 matplotlib 绘图（单进程串行 ~数秒/份），
+并行后总耗时随 CPU 核数而不是策略个数增长。
+
+子进程统一使用非交互式的 Agg 后端，QuantStats 只在渲染进程中按需导入。
+
+用法:
+    jobs = [ReportJob(name, rets, benchmark_rets, f"report_{name}.html") for name, rets in ...]
+    generate_reports(jobs, workers=4)
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import List, Optional
+
+import pandas as pd
+
+from utils import logger
+
+
+@dataclass
+class ReportJob:
+    """
+    一份报告任务（需可 pickle，传给子进程）
+
+    :param name: 策略名（日志用）
+    :param returns: 策略日收益
+    :param benchmark: 基准日收益
+    :param output: 输出 HTML 路径
+    :param title: 报告标题，默认 "{name} Performance Report"
+    """
+    name: str
+    returns: pd.Series
+    benchmark: Optional[pd.Series]
+    output: str
+    title: Optional[str] = None
+
+
+def _use_agg_backend() -> None:
+    """子进程初始化：在导入 pyplot 之前切到非交互式后端"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def render_report(job: ReportJob) -> str:
+    """渲染单份报告，返回输出路径（在子进程中执行）"""
+    _use_agg_backend()
+    import quantstats as qs
+
+    qs.reports.html(
+        job.returns,
+        benchmark=job.benchmark,
+        output=job.output,
+        title=job.title or f"{job.name} Performance Report",
+    )
+    return job.output
+
+
+def generate_reports(jobs: List[ReportJob], workers: Optional[int] = None) -> List[str]:
+    """
+    并行渲染多份报告，单份失败不影响其他报告。
+
+    :param jobs: 报告任务列表
+    :param workers: 进程数，默认 min(CPU 核数, 任务数)；<= 1 时在当前进程串行渲染
+    :return: 成功生成的报告路径
+    """
+    if not jobs:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    logger.info(f"[Report] Rendering {len(jobs)} report(s) with {workers} worker(s)...")
+
+    done: List[str] = []
+    if workers <= 1:
+        for job in jobs:
+            try:
+                done.append(render_report(job))
+                logger.info(f"[Report] {job.name} saved to: {job.output}")
+            except Exception as e:
+                logger.error(f"[Report] {job.name} failed: {e}", exc_info=True)
+        return done
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_use_agg_backend) as pool:
+        futures = {pool.submit(render_report, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                done.append(future.result())
+                logger.info(f"[Report] {job.name} saved to: {job.output}")
+            except Exception as e:
+                logger.error(f"[Report] {job.name} failed: {e}", exc_info=True)
+    return done
@@ -1,35 +1,55 @@
+import argparse
 from datetime import datetime
 
 import pandas as pd
-import quantstats as qs
+from tabulate import tabulate
 
 import config
 from core.data import DataLoader
 from core.engine import RealWorldEngine
+from core.intermediates import IntermediateStore
+from core.metrics import performance_stats, format_stats
+from core.returns import MarketReturns
+from core.shm import attach
 from core.strategies import CustomStrategy
+from core.universe import LiquidityScreen
 # 导入需要的因子
 from factors import Momentum, Momentum_castle, MainLineBias, Peak
 # 导入抽离出来的策略逻辑
 from logics import logic_bias_protection, logic_factor_rotation
-from utils import logger
+from reports import ReportJob, generate_reports
+from utils import DataType, logger, profiler
 
 
 # ==========================================
 # 主程序
 # ==========================================
 
-def main():
-    # 1. 加载数据
-    loader = DataLoader("2013-08-01", datetime.now().strftime("%Y-%m-%d"), auto_sync=True)
-    symbols = config.ETF_SYMBOLS
-    data_dict = loader.load(symbols)
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="同步数据 → 回测 → 生成 HTML 研报")
+    parser.add_argument('--no-report', action='store_true',
+                        help="跳过 HTML 研报（无界面批量回测时使用）")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="并行渲染研报的进程数（默认 CPU 核数，1 为串行）")
+    parser.add_argument('--data-type', choices=[t.name.lower() for t in DataType], default='etf',
+                        help="轮动的数据类型（默认 etf）")
+    parser.add_argument('--symbols', nargs='+', default=None,
+                        help="标的代码（默认：etf 为 config.ETF_SYMBOLS，其他类型为数据湖中的全部代码）")
+    parser.add_argument('--min-amount', type=float, default=None,
+                        help="流动性筛选：逐日按前 60 个交易日的日均成交额下限（元）")
+    parser.add_argument('--top-liquid', type=int, default=None,
+                        help="流动性筛选：每日只保留前 60 日日均成交额最高的 N 只")
+    parser.add_argument('--dtype', default='float64',
+                        help="宽表数值类型，大标的池可用 float32 使内存减半")
+    parser.add_argument('--shm', default=None, metavar='NAME',
+                        help="挂载 data_server.py 发布的共享内存数据，不再自行加载")
+    return parser.parse_args(argv)
 
-    # 准备基准 (修正为 Open-to-Open 以保持公平对比)
-    logger.info("Using average return of all assets as benchmark (Open-to-Open).")
-    benchmark_rets = data_dict['open'].pct_change().mean(axis=1).fillna(0)
-    benchmark_rets.name = "Equal_Weighted_Benchmark"
 
-    # 2. 组装策略
+def main(args: argparse.Namespace = None):
+    args = args or parse_args([])
+
+    # 1. 组装策略（先于加载：只读取策略与引擎用到的字段）
     strategies = [
         CustomStrategy(
             factors={
@@ -58,34 +78,78 @@ def main():
         )
     ]
 
-    # 3. 执行回测
     engine = RealWorldEngine()
 
+    # 2. 加载数据（默认 ETF 池；--data-type stock / industry_index 等可在全市场上做截面轮动）
+    if args.shm:
+        # 数据服务已加载好的宽表（零拷贝挂载，进程退出时自动注销引用）
+        shared = attach(args.shm)
+        data_dict = shared.data
+    else:
+        data_type = DataType[args.data_type.upper()]
+        universe = None
+        if args.min_amount is not None or args.top_liquid is not None:
+            universe = LiquidityScreen(min_amount=args.min_amount or 0.0, top_n=args.top_liquid)
+        loader = DataLoader("2013-08-01", datetime.now().strftime("%Y-%m-%d"), auto_sync=True,
+                            data_type=data_type, universe=universe, fields=engine.fields(*strategies),
+                            dtype=args.dtype)
+        symbols = args.symbols or (config.ETF_SYMBOLS if data_type == DataType.ETF else None)
+        data_dict = loader.load(symbols)
+
+    # 同一份数据上的中间结果 (log price / returns / rolling ...) 与收益面板在所有策略之间共享
+    store = IntermediateStore(data_dict)
+    market = MarketReturns.from_data(data_dict, store)
+
+    # 准备基准 (修正为 Open-to-Open 以保持公平对比)
+    logger.info("Using average return of all assets as benchmark (Open-to-Open).")
+    benchmark_rets = market.benchmark()
+
+    # 3. 执行回测（先跑完全部策略，再统一出报告）
+    all_rets = {}
+    jobs = []
+
     for strat in strategies:
         try:
-            rets = engine.run(strat, **data_dict)
+            rets = engine.run(strat, market=market, intermediates=store, **data_dict)
             rets.index = pd.to_datetime(rets.index)
+            all_rets[strat.name] = rets
 
-            # 生成报告
-            report_filename = f"report_{strat.name}.html"
-            logger.info(f"Generating full HTML report for {strat.name}...")
             common_idx = rets.index.intersection(benchmark_rets.index)
 
             # 简单的对齐检查
             if rets[common_idx].sum() == 0:
                 logger.warning(f"Strategy {strat.name} has 0 returns. Please check if data is sufficient for shift(2).")
 
-            qs.reports.html(
-                rets.loc[common_idx],
+            jobs.append(ReportJob(
+                name=strat.name,
+                returns=rets.loc[common_idx],
                 benchmark=benchmark_rets.loc[common_idx],
-                output=report_filename,
-                title=f"{strat.name} Performance Report"
-            )
-            logger.info(f"Report successfully saved to: {report_filename}")
+                output=f"report_{strat.name}.html",
+            ))
 
         except Exception as e:
             logger.error(f"Strategy {strat.name} failed: {e}", exc_info=True)
 
+    # 4. 所有策略 + 基准的指标汇总（一次向量化计算）
+    if all_rets:
+        panel = pd.DataFrame(all_rets).reindex(benchmark_rets.index)
+        panel[benchmark_rets.name] = benchmark_rets
+        stats = performance_stats(panel)
+        disp  = format_stats(stats)
+        print(tabulate(disp.values.tolist(), headers=disp.columns.tolist(),
+                       showindex=disp.index.tolist(), tablefmt='simple', stralign='right',
+                       disable_numparse=True))
+
+    # 5. 生成报告（进程池并行渲染）
+    if args.no_report:
+        logger.info("Skipping HTML reports (--no-report).")
+    else:
+        generate_reports(jobs, workers=args.workers)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main(parse_args())
+    finally:
+        # PROFILE=1 时打印热路径汇总，PROFILE_TRACE=xxx.json 时导出 Chrome trace
+        profiler.report()
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""
+测试公共设置。
+
+infra 在导入时读取 DATA_DIR，这里先于任何项目模块指向一个临时目录，测试不会读写真实数据湖。
+同步相关的测试再用 data_root 夹具把数据 / 状态目录重定向到每个测试自己的 tmp_path。
+"""
+import importlib
+import os
+import tempfile
+
+os.environ['DATA_DIR'] = tempfile.mkdtemp(prefix='tests_lake_')
+os.environ.setdefault('FETCH_CACHE', 'off')
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    """同步写入的根目录（日线 / 分钟线、_sync_state、_quarantine）指向本测试的 tmp_path"""
+    import infra.checkpoint
+    import infra.repo
+    # infra 包导出了同名的 quality 报告对象，infra.quality 属性不是模块
+    quality_module = importlib.import_module('infra.quality')
+
+    monkeypatch.setattr(infra.repo, 'ROOT_DATA_DIR', tmp_path)
+    monkeypatch.setattr(infra.checkpoint, 'STATE_DIR', tmp_path / '_sync_state')
+    monkeypatch.setattr(quality_module, 'QUARANTINE_DIR', tmp_path / '_quarantine')
+    return tmp_path
+
+
+@pytest.fixture
+def offline(data_root, monkeypatch):
+    """离线同步：交易日固定为 fake_akshare.TRADE_DATE，串行同步的请求间隔为 0"""
+    import infra.async_sync
+    import infra.repo
+    from fake_akshare import TRADE_DATE
+
+    monkeypatch.setattr(infra.repo, 'get_latest_trade_date', lambda: TRADE_DATE)
+    monkeypatch.setattr(infra.async_sync, 'get_latest_trade_date', lambda: TRADE_DATE)
+    monkeypatch.setattr(infra.repo, 'TICK_INTERVAL', 0)
+    return data_root
@@ -0,0 +1,122 @@
+"""
+离线的 akshare 桩：同步用到的接口按 akshare 的原始列名返回确定性的合成数据，不访问网络。
+
+同一个 FakeAkShare 实例既可以替换 infra.repo.ak（串行同步），也可以作为 SyncPipeline(client=...)（异步同步）。
+相同参数的调用总是返回相同的数据，两条路径写出的文件应逐行一致。
+
+    fake = FakeAkShare(TRADE_DATE, fail_every=3)   # 每 3 个不同请求中有 1 个首次调用失败
+    monkeypatch.setattr(infra.repo, 'ak', fake)
+"""
+import hashlib
+import threading
+from collections import Counter
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.sync import synthetic_spot
+
+TRADE_DATE = date(2024, 1, 5)
+
+
+def _seed(*key) -> int:
+    """与进程无关的种子（内置 hash 对字符串加盐，不能用）"""
+    return int.from_bytes(hashlib.sha1(repr(key).encode()).digest()[:4], 'little')
+
+
+class FakeAkShare:
+    """
+    :param trade_date: 分钟线 / 行业日线所在的交易日
+    :param n_stocks: 全市场快照的股票数量（代码 000001 起）
+    :param n_industries: 行业板块数量
+    :param fail_every: 大于 0 时，按 (接口, 参数) 的哈希约每 fail_every 个不同请求中有一个首次调用抛 ConnectionError，
+                       重试即成功（模拟限流）
+    """
+
+    def __init__(self, trade_date: date, n_stocks: int = 12, n_industries: int = 4, fail_every: int = 0):
+        self.trade_date = trade_date
+        self.n_stocks = n_stocks
+        self.n_industries = n_industries
+        self.fail_every = fail_every
+        self.calls = Counter()   # (接口, 参数) → 调用次数
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _call(self, name: str, **params) -> None:
+        key = (name, tuple(sorted(params.items())))
+        with self._lock:
+            self.calls[key] += 1
+            first = self.calls[key] == 1
+        if first and self.fail_every > 0 and _seed(*key) % self.fail_every == 0:
+            with self._lock:
+                self.errors += 1
+            raise ConnectionError(f"{name}({params}): connection reset by peer")
+
+    def _minutes(self, fmt: str = '%Y-%m-%d %H:%M:%S') -> pd.Index:
+        day = datetime.combine(self.trade_date, datetime.min.time())
+        return pd.date_range(day.replace(hour=9, minute=31), periods=240, freq='min').strftime(fmt)
+
+    def _kline(self, *key, n: int = 240, base: float = 10.0) -> dict:
+        rng = np.random.default_rng(_seed(self.trade_date, *key))
+        price = (base * np.exp(np.cumsum(rng.normal(0, 0.001, n)))).round(2)
+        return {'开盘': price, '收盘': price, '最高': (price * 1.001).round(2), '最低': (price * 0.999).round(2),
+                '成交量': rng.integers(1, 10_000, n).astype(float), '成交额': (price * 1000).round(0)}
+
+    # ── 股票 ────────────────────────────────────────────────────────────────
+
+    def stock_zh_a_spot_em(self) -> pd.DataFrame:
+        self._call('stock_zh_a_spot_em')
+        return synthetic_spot(self.n_stocks, seed=_seed(self.trade_date) % 2 ** 31)
+
+    def stock_zh_a_hist_min_em(self, symbol: str, start_date: str, end_date: str,
+                               period: str = '1', adjust: str = '') -> pd.DataFrame:
+        self._call('stock_zh_a_hist_min_em', symbol=symbol, start_date=start_date, end_date=end_date,
+                   period=period, adjust=adjust)
+        return pd.DataFrame({'时间': self._minutes(), **self._kline('stock', symbol)})
+
+    # ── 指数 ────────────────────────────────────────────────────────────────
+
+    def stock_zh_index_spot_em(self, symbol: str) -> pd.DataFrame:
+        self._call('stock_zh_index_spot_em', symbol=symbol)
+        # 各系列有重叠（000001 同时出现在多个系列中），由 _combine_index_spots 去重
+        codes = ['000001', '000300', f"{_seed(symbol) % 900 + 100:06d}"]
+        close = np.array([3000.0, 3500.0, 1000.0 + _seed(symbol) % 1000])
+        return pd.DataFrame({
+            '序号': np.arange(1, 4), '代码': codes, '名称': [f"指数{c}" for c in codes],
+            '最新价': close, '涨跌幅': 0.5, '涨跌额': (close * 0.005).round(2), '成交量': 1e8, '成交额': 1e11,
+            '振幅': 1.0, '最高': (close * 1.01).round(2), '最低': (close * 0.99).round(2),
+            '今开': close, '昨收': (close / 1.005).round(2), '量比': 1.0,
+        })
+
+    def index_zh_a_hist_min_em(self, symbol: str, start_date: str, end_date: str, period: str = '1') -> pd.DataFrame:
+        self._call('index_zh_a_hist_min_em', symbol=symbol, start_date=start_date, end_date=end_date, period=period)
+        return pd.DataFrame({'时间': self._minutes(), **self._kline('index', symbol, base=3000.0)})
+
+    # ── 行业板块 ────────────────────────────────────────────────────────────
+
+    def _industries(self):
+        return [(f"BK{1000 + i:04d}", f"行业{i}") for i in range(self.n_industries)]
+
+    def stock_board_industry_name_em(self) -> pd.DataFrame:
+        self._call('stock_board_industry_name_em')
+        codes, names = zip(*self._industries()) if self.n_industries else ((), ())
+        return pd.DataFrame({'排名': np.arange(1, self.n_industries + 1), '板块名称': names, '板块代码': codes,
+                             '最新价': 1000.0, '涨跌幅': 0.1})
+
+    def stock_board_industry_hist_em(self, symbol: str, period: str = '日k', start_date: str = '',
+                                     end_date: str = '', adjust: str = '') -> pd.DataFrame:
+        self._call('stock_board_industry_hist_em', symbol=symbol, period=period, start_date=start_date,
+                   end_date=end_date, adjust=adjust)
+        return pd.DataFrame({'日期': [self.trade_date.strftime('%Y-%m-%d')], **self._kline('industry', symbol, n=1),
+                             '涨跌幅': 0.1, '涨跌额': 1.0, '振幅': 1.0, '换手率': 1.5})
+
+    def stock_board_industry_hist_min_em(self, symbol: str, period: str = '1') -> pd.DataFrame:
+        self._call('stock_board_industry_hist_min_em', symbol=symbol, period=period)
+        return pd.DataFrame({'日期时间': self._minutes('%Y-%m-%d %H:%M'),
+                             **self._kline('industry_tick', symbol, base=1000.0), '最新价': 1000.0})
+
+    def attempts(self, name: Optional[str] = None) -> int:
+        """某个接口（默认全部）的调用总次数"""
+        return sum(n for (func, _), n in self.calls.items() if name is None or func == name)
@@ -0,0 +1,83 @@
+"""
+复权因子表：跨除权日的增量同步后，读出的复权价连续，锚点随本地最后一根日线前移。
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import infra.repo as repo
+from infra.adjust import AdjustFactors
+
+EX_DATE = datetime(2024, 1, 4)  # 10 送 10：昨收由 10.2 调整为 5.1
+
+
+def _raw_bars(published: datetime) -> pd.DataFrame:
+    """BaoStock 形状的不复权日线（2024-01-02 起），EX_DATE 当天除权"""
+    days = pd.bdate_range('2024-01-02', published)
+    close = np.array([10.0, 10.2, 5.2, 5.3, 5.25, 5.4])[:len(days)]
+    preclose = np.concatenate([[9.9], close[:-1]])
+    preclose[days == EX_DATE] /= 2
+    return pd.DataFrame({'datetime': days, 'code': '510300', 'name': '沪深300ETF', 'open': preclose,
+                         'high': np.maximum(close, preclose) * 1.01, 'low': np.minimum(close, preclose) * 0.99,
+                         'close': close, 'preclose': preclose, 'volume': 1000.0, 'amount': 1000.0 * close,
+                         'turn': 0.1, 'price_chg': (close / preclose - 1) * 100})
+
+
+class RawFetcher:
+    """只返回 published 之前（含）的不复权日线"""
+    supports_full_list = False
+    supports_tick = False
+    needs_price_normalization = True
+
+    def __init__(self, published: datetime):
+        self.published = published
+
+    def fetch_daily(self, code, name, start_date, end_date):
+        df = _raw_bars(min(end_date, self.published))
+        return df[df['datetime'] >= start_date].reset_index(drop=True)
+
+
+def test_extend_steps_on_the_ex_date():
+    df = _raw_bars(datetime(2024, 1, 9))
+    factors = AdjustFactors().extend(df, raw=True)
+
+    assert list(factors.dates[1:]) == [np.datetime64(EX_DATE, 'ns')]
+    assert factors.factors.tolist() == [1.0, 2.0]
+    assert factors.anchor.timestamp == datetime(2024, 1, 9) and factors.anchor.close == 5.4
+
+    # 分两批（锚点落在除权日之前）与一次性追加结果相同；重跑同一批不变
+    first, rest = df[df['datetime'] < EX_DATE], df[df['datetime'] >= EX_DATE]
+    stepwise = AdjustFactors().extend(first, raw=True).extend(rest, raw=True)
+    assert stepwise.factors.tolist() == factors.factors.tolist()
+    assert stepwise.extend(rest, raw=True).factors.tolist() == factors.factors.tolist()
+
+    adjusted = factors.apply(df.copy())
+    returns = adjusted['close'].pct_change().iloc[1:].to_numpy()
+    expected = (df['close'] / df['preclose'] - 1).iloc[1:].to_numpy()
+    np.testing.assert_allclose(returns, expected)
+
+
+@pytest.fixture
+def fetcher(data_root, monkeypatch):
+    fetcher = RawFetcher(datetime(2024, 1, 3))
+    monkeypatch.setattr(repo, 'get_fetcher', lambda: fetcher)
+    return fetcher
+
+
+def test_sync_across_the_ex_date_reads_continuous_prices(fetcher, data_root, monkeypatch):
+    for published in (datetime(2024, 1, 3), datetime(2024, 1, 5), datetime(2024, 1, 9)):
+        fetcher.published = published
+        monkeypatch.setattr(repo, 'get_latest_trade_date', lambda: published.date())
+        repo.sync_latest_etf_data(codes=['510300'], include_tick=False, beg_date=datetime(2024, 1, 1))
+        assert AdjustFactors.load(data_root / 'etf' / '510300').anchor.timestamp == published
+
+    df = repo.read_data_range('510300', datetime(2024, 1, 1), datetime(2024, 1, 10), repo.DataType.ETF, repo.Klt.DAY)
+    raw = _raw_bars(datetime(2024, 1, 9))
+    np.testing.assert_allclose(df['close'].pct_change().iloc[1:], (raw['close'] / raw['preclose'] - 1).iloc[1:])
+    # 以最早的数据为基准：除权日之前为数据源原价，除权日起乘以因子 2
+    np.testing.assert_allclose(df['close'], raw['close'] * np.where(raw['datetime'] < EX_DATE, 1.0, 2.0))
+
+    # 除权不是尺度断裂：复权价上的连续性检查不产生标记
+    assert not list((data_root / '_quarantine').rglob('*.parquet'))
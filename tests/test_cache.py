@@ -0,0 +1,79 @@
+"""
+响应缓存 (infra.cache)：读穿 / 过期、录制 / 回放，以及串行同步录制的会话可以由异步同步离线回放。
+"""
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import infra.repo as repo
+from fake_akshare import TRADE_DATE, FakeAkShare
+from infra.cache import CacheMiss, ResponseCache, set_cache
+from test_sync import _assert_same, _lake, _sync_async, _sync_serial, _use
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    yield tmp_path / '_cache'
+    set_cache(None)
+
+
+def test_read_through_and_expiry(cache_dir):
+    fake = FakeAkShare(TRADE_DATE)
+    cache = ResponseCache(cache_dir, 'on')
+    first = cache.call('stock_zh_a_spot_em', fake.stock_zh_a_spot_em, {})
+    again = cache.call('stock_zh_a_spot_em', fake.stock_zh_a_spot_em, {})
+    assert fake.attempts() == 1 and (cache.hits, cache.misses) == (1, 1)
+    pd.testing.assert_frame_equal(first, again)
+
+    # 写于前一天的条目过期（快照类接口不带日期参数），回放模式仍然使用
+    for path in cache_dir.rglob('*.parquet'):
+        os.utime(path, (time.time(), time.time() - 86400))
+    cache.call('stock_zh_a_spot_em', fake.stock_zh_a_spot_em, {})
+    assert fake.attempts() == 2
+    for path in cache_dir.rglob('*.parquet'):
+        os.utime(path, (time.time(), time.time() - 86400))
+    pd.testing.assert_frame_equal(ResponseCache(cache_dir, 'replay').call('stock_zh_a_spot_em', None, {}), first)
+
+
+def test_record_overwrites_and_replay_misses(cache_dir):
+    fake = FakeAkShare(TRADE_DATE)
+    recorder = ResponseCache(cache_dir, 'record')
+    params = {'symbol': '沪深重要指数'}
+    recorder.call('stock_zh_index_spot_em', lambda: fake.stock_zh_index_spot_em(**params), params)
+    recorder.call('stock_zh_index_spot_em', lambda: fake.stock_zh_index_spot_em(**params), params)
+    assert fake.attempts() == 2 and recorder.hits == 0
+
+    replay = ResponseCache(cache_dir, 'replay')
+    replay.call('stock_zh_index_spot_em', lambda: pytest.fail('replay must not call the source'), params)
+    with pytest.raises(CacheMiss):
+        replay.call('stock_zh_index_spot_em', fake.stock_zh_index_spot_em, {'symbol': '上证系列指数'})
+    assert fake.attempts() == 2
+
+
+def test_serial_recording_replays_offline_in_async(offline, cache_dir, monkeypatch):
+    recorded_root, replayed_root = offline / 'recorded', offline / 'replayed'
+
+    _use(recorded_root, monkeypatch)
+    set_cache(ResponseCache(cache_dir, 'record'))
+    _sync_serial(FakeAkShare(TRADE_DATE), monkeypatch)
+
+    _use(replayed_root, monkeypatch)
+    set_cache(ResponseCache(cache_dir, 'replay'))
+    offline_source = FakeAkShare(TRADE_DATE)
+    _sync_async(offline_source)
+
+    assert offline_source.attempts() == 0
+    _assert_same(_lake(recorded_root), _lake(replayed_root))
+
+
+def test_replay_miss_is_not_retried(offline, cache_dir, monkeypatch):
+    """回放时缓存中没有的请求直接放弃，不重试、不访问数据源"""
+    set_cache(ResponseCache(cache_dir, 'replay'))
+    fake = FakeAkShare(TRADE_DATE)
+    monkeypatch.setattr(repo, 'ak', fake)
+    context = {'symbol': '000001', 'start_date': '2024-01-05 00:00:00', 'end_date': '2024-01-06 00:00:00',
+               'period': '1', 'adjust': 'qfq'}
+    assert repo._execute_with_retry(fake.stock_zh_a_hist_min_em, context, retry_times=3) is None
+    assert fake.attempts() == 0
@@ -0,0 +1,105 @@
+"""
+可续传同步任务：SyncJob 的续传 / 退避，以及 ETF 日线同步只在本地数据完整后记为完成。
+"""
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+import infra.checkpoint
+import infra.repo as repo
+from infra.adjust import AdjustFactors
+from infra.checkpoint import DONE, FAILED, SyncJob
+
+
+class StubFetcher:
+    """只返回 published 之前（含）的工作日日线，记录每次请求的区间"""
+    supports_full_list = False
+    supports_tick = False
+    needs_price_normalization = False
+
+    def __init__(self, published: datetime):
+        self.published = published
+        self.calls = []
+
+    def fetch_daily(self, code, name, start_date, end_date):
+        self.calls.append((start_date.date(), end_date.date()))
+        days = pd.bdate_range(start_date, min(end_date, self.published))
+        if len(days) == 0:
+            return pd.DataFrame()
+        return pd.DataFrame({'datetime': days, 'code': code, 'name': name, 'open': 1.0, 'high': 1.1,
+                             'low': 0.9, 'close': 1.0, 'preclose': 1.0, 'volume': 100.0, 'amount': 100.0,
+                             'turn': 0.1, 'price_chg': 0.0})
+
+
+@pytest.fixture
+def stub(data_root, monkeypatch):
+    fetcher = StubFetcher(datetime(2024, 1, 5))
+    monkeypatch.setattr(repo, 'get_fetcher', lambda: fetcher)
+    monkeypatch.setattr(repo, 'get_latest_trade_date', lambda: date(2024, 1, 5))
+    return fetcher
+
+
+def test_resume_skips_done_and_waits_for_backoff(data_root):
+    with SyncJob.open('job', backoff_base=60) as job:
+        assert job.plan(['a', 'b', 'c']) == ['a', 'b', 'c']
+        job.done('a')
+        job.failed('b', 'timeout')
+        # 'c' 未处理：进程在这里被杀
+
+    job = SyncJob('job', backoff_base=60)
+    assert job.codes['a'].status == DONE and job.codes['b'].status == FAILED
+    assert job.plan(['a', 'b', 'c']) == ['c']
+
+    job.codes['b'].next_retry = 0  # 退避期已过
+    assert job.plan(['a', 'b', 'c']) == ['b', 'c']
+
+
+def test_backoff_doubles_and_gives_up(data_root, monkeypatch):
+    monkeypatch.setattr(infra.checkpoint.time, 'time', lambda: 1000.0)
+    job = SyncJob('job', backoff_base=10, max_backoff=25, max_attempts=4)
+    delays = []
+    for _ in range(3):
+        job.failed('x')
+        delays.append(job.codes['x'].next_retry - 1000.0)
+    assert delays == [10, 20, 25]
+
+    job.codes['x'].next_retry = 0
+    assert job.plan(['x']) == ['x']
+    job.failed('x')
+    job.codes['x'].next_retry = 0
+    assert job.plan(['x']) == []  # 已达最大尝试次数
+
+
+def test_default_range_marks_complete_codes_done(stub):
+    """默认区间 [最新交易日, 最新交易日 + 1 天)：数据到最新交易日即完成，重跑不再请求"""
+    for _ in range(3):
+        repo.sync_latest_etf_data(codes=['510300'], include_tick=False,
+                                  beg_date=datetime(2024, 1, 1))
+    assert stub.calls == [(date(2024, 1, 1), date(2024, 1, 6))]
+
+    job = SyncJob('etf_daily_20240101_20240106')
+    assert job.codes['510300'].status == DONE
+
+
+def test_default_end_date_marks_done(stub):
+    repo.sync_latest_etf_data(codes=['510300'], include_tick=False)
+    repo.sync_latest_etf_data(codes=['510300'], include_tick=False)
+    assert stub.calls == [(date(2024, 1, 5), date(2024, 1, 6))]
+    assert SyncJob('etf_daily_20240105_20240106').codes['510300'].status == DONE
+
+
+def test_unpublished_bar_is_rechecked(stub, data_root):
+    """当天日线尚未发布：不记为完成，下次从锚点之后重新探测，发布后补齐"""
+    stub.published = datetime(2024, 1, 4)
+    repo.sync_latest_etf_data(codes=['510300'], include_tick=False, beg_date=datetime(2024, 1, 1))
+    repo.sync_latest_etf_data(codes=['510300'], include_tick=False, beg_date=datetime(2024, 1, 1))
+    stub.published = datetime(2024, 1, 5)
+    repo.sync_latest_etf_data(codes=['510300'], include_tick=False, beg_date=datetime(2024, 1, 1))
+    repo.sync_latest_etf_data(codes=['510300'], include_tick=False, beg_date=datetime(2024, 1, 1))
+
+    assert stub.calls == [(date(2024, 1, 1), date(2024, 1, 6)),
+                          (date(2024, 1, 5), date(2024, 1, 6)),
+                          (date(2024, 1, 5), date(2024, 1, 6))]
+    anchor = AdjustFactors.load(data_root / 'etf' / '510300').anchor
+    assert anchor.timestamp.date() == date(2024, 1, 5)
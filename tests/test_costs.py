@@ -0,0 +1,51 @@
+"""
+成本模型的行情估计量：ParticipationImpact 的 σ 不把缺失收益当作 0，只用上市期间的收益，且截至 T-1。
+"""
+import numpy as np
+import pandas as pd
+
+from core.costs import ParticipationImpact
+from core.returns import MarketReturns
+from core.universe import Membership
+
+T, LISTED, DELISTED = 90, 30, 60
+
+
+def _market(membership: bool) -> MarketReturns:
+    """A 全程交易；B 第 LISTED 行上市、第 DELISTED 行之后退市（之后的价格为沿用的旧值）"""
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range('2020-01-01', periods=T)
+    columns = pd.Index(['A', 'B'])
+    close = 10 * np.cumprod(1 + rng.normal(0, 0.02, (T, 2)), axis=0)
+    close[:LISTED, 1] = np.nan
+    close[DELISTED + 1:, 1] = close[DELISTED, 1]
+    close = pd.DataFrame(close, index, columns)
+    data = {'open': close, 'close': close, 'amount': close * 1e6}
+    if membership:
+        data['membership'] = Membership(index, columns, np.array([0, LISTED]), np.array([T - 1, DELISTED]))
+    return MarketReturns.from_data(data)
+
+
+def test_sigma_ignores_missing_returns():
+    model = ParticipationImpact(vol_window=20, min_periods=10)
+    market = _market(membership=True)
+    sigma = model.panels(market)['sigma']
+    close = market.field('close')
+
+    # 上市后第一个收益在 LISTED + 1 行；凑够 min_periods 个收益后的下一行（T-1 可得）才有 σ
+    first = LISTED + model.min_periods + 1
+    assert np.isnan(sigma[:first, 1]).all() and not np.isnan(sigma[first, 1])
+    rets = close[1:, 1] / close[:-1, 1] - 1
+    np.testing.assert_allclose(sigma[first, 1], np.std(rets[LISTED:first - 1], ddof=1))
+
+    # 退市后沿用的旧价格（收益为 0）不进入窗口：退市次日用到退市日为止的收益，之后有效收益不足时为 NaN
+    np.testing.assert_allclose(sigma[DELISTED + 1, 1], np.std(rets[DELISTED - model.vol_window:DELISTED], ddof=1))
+    assert np.isnan(sigma[-1, 1])
+    # 全程交易的代码：第 t 行等于截至 t-1 的 vol_window 日收益标准差
+    np.testing.assert_allclose(sigma[-1, 0], np.std((close[1:, 0] / close[:-1, 0] - 1)[-21:-1], ddof=1))
+
+
+def test_sigma_without_membership_uses_available_prices():
+    sigma = ParticipationImpact(min_periods=10).panels(_market(membership=False))['sigma']
+    assert np.isnan(sigma[:LISTED + 11, 1]).all()
+    assert sigma[-1, 1] == 0.0  # 没有成分信息时无法区分退市后沿用的价格与真实的不变价格
@@ -0,0 +1,70 @@
+"""
+PanelWindow 回归测试：窗口上的回测与直接加载同一区间的结果一致。
+
+在项目根目录执行（logging.conf 按相对路径加载）：
+    python -m pytest -q tests
+"""
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import generate_lake, synthetic_codes
+from core.data import DataLoader
+from core.engine import RealWorldEngine
+from core.panels import PanelWindow
+from core.strategies import CustomStrategy
+from factors import Momentum_castle, Peak
+from infra import ROOT_DATA_DIR
+from logics import logic_factor_rotation
+
+CODES = synthetic_codes(12)
+
+
+def _strategy() -> CustomStrategy:
+    return CustomStrategy(
+        name="Momentum_Peak_Castle",
+        factors={"Mom_20": Momentum_castle(25), "Peak_20": Peak(20)},
+        logic_func=logic_factor_rotation,
+        holding_period=1,
+        factor_weights={"Mom_20": 1.0, "Peak_20": 1.0},
+        top_k=1,
+        timing_period=0,
+        stg_flag=["castle_stg1"],
+    )
+
+
+@pytest.fixture(scope='module')
+def full():
+    generate_lake(ROOT_DATA_DIR, n_codes=len(CODES), years=6, start_year=2014)
+    return DataLoader('2013-12-31', '2019-12-31').load(CODES)
+
+
+@pytest.mark.parametrize('start', ['2015-01-01', '2017-03-01', '2019-06-03'])
+def test_window_matches_fresh_load(full, start):
+    window = PanelWindow.between(full, start)
+    fresh = DataLoader((np.datetime64(start) - np.timedelta64(1, 'D')).astype(str), '2019-12-31').load(CODES)
+
+    membership = window['membership']
+    assert membership.first.min() >= 0 and membership.last.max() < len(window.index)
+    assert np.array_equal(membership.first, fresh['membership'].first)
+    assert np.array_equal(membership.last, fresh['membership'].last)
+
+    for factor in (Momentum_castle(25), Peak(20)):
+        expected = factor.calculate_blocked(4, **fresh)
+        assert factor.calculate_blocked(4, **window).equals(expected)
+
+    expected = RealWorldEngine().run(_strategy(), **fresh)
+    assert RealWorldEngine().run(_strategy(), **window).equals(expected)
+
+
+def test_only_used_fields_are_pivoted(full):
+    """入口脚本按 engine.fields(strategy) 加载：未用到的字段（volume / pe_ttm …）既不读取也不 Pivot"""
+    engine, strategy = RealWorldEngine(), _strategy()
+    fields = engine.fields(strategy)
+    assert set(fields) == {'open', 'close'}
+    assert 'volume' in full and 'amount' in full  # 数据湖中还有其他字段
+
+    data = DataLoader('2013-12-31', '2019-12-31', fields=fields).load(CODES)
+    assert set(data) == {'open', 'close', 'membership'}
+    rets = engine.run(strategy, **data)
+    assert {key[0] for key in data._panels} == {'open', 'close'}
+    assert rets.equals(engine.run(_strategy(), **full))
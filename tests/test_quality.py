@@ -0,0 +1,85 @@
+"""
+写入时的数据质量校验：拒绝 / 标记规则、隔离区文件，以及与本地已存储数据的衔接检查。
+"""
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import infra.repo as repo
+from infra.quality import FLAG, REJECT, quality, validate
+
+
+def _bars(rows):
+    """[(日期, 代码, 开, 高, 低, 收, 昨收, 成交量)] → 统一列的日线"""
+    df = pd.DataFrame(rows, columns=['datetime', 'code', 'open', 'high', 'low', 'close', 'preclose', 'volume'])
+    df['datetime'] = pd.to_datetime(df['datetime'])
+    return df.assign(name=df['code'], amount=df['volume'] * df['close'], turn=0.1, price_chg=0.0)
+
+
+@pytest.fixture
+def report():
+    quality.reset()
+    yield quality
+    quality.reset()
+
+
+def test_validate_rejects_and_flags():
+    table = pa.Table.from_pandas(_bars([
+        ('2024-01-02', 'a', 10, 10.5, 9.5, 10.0, 10.0, 1000),
+        ('2024-01-03', 'a', 10, 10.5, 9.5, float('nan'), 10.0, 1000),   # invalid_price
+        ('2024-01-04', 'a', 10, 10.5, 9.5, 11.0, 10.0, 1000),           # ohlc_bounds：收盘高于最高
+        ('2024-01-05', 'a', 10, 10.5, 9.5, 10.2, 10.0, 1000),           # duplicate_date：被下一行覆盖
+        ('2024-01-05', 'a', 10, 10.5, 9.5, 10.1, 10.0, 1000),
+        ('2024-01-08', 'a', 14, 14.5, 13.5, 14.0, 10.1, 100_000),       # price_jump + volume_unit
+        ('2024-01-09', 'a', 14, 14.5, 13.5, 14.0, 7.0, 100_000),        # scale_break：昨收与上一根收盘对不上
+        ('2024-01-02', 'b', 0, 5.5, 4.5, 5.0, 5.0, 1000),               # invalid_price：开盘为 0
+    ]), preserve_index=False)
+    checked = validate(table, is_tick=False)
+
+    assert checked.clean['close'].to_pylist() == [10.0, 10.1, 14.0, 14.0]
+    issues = sorted(zip(checked.issues['code'].to_pylist(), checked.issues['datetime'].to_pylist(),
+                        checked.issues['rule'].to_pylist(), checked.issues['action'].to_pylist()))
+    day = lambda d: datetime.fromisoformat(d)
+    assert issues == sorted([
+        ('a', day('2024-01-03'), 'invalid_price', REJECT),
+        ('a', day('2024-01-04'), 'ohlc_bounds', REJECT),
+        ('a', day('2024-01-05'), 'duplicate_date', REJECT),
+        ('a', day('2024-01-08'), 'price_jump', FLAG),
+        ('a', day('2024-01-08'), 'volume_unit', FLAG),
+        ('a', day('2024-01-09'), 'scale_break', FLAG),
+        ('b', day('2024-01-02'), 'invalid_price', REJECT),
+    ])
+
+
+def test_save_quarantines_rejected_rows(data_root, report):
+    stock_dir = data_root / 'stocks'
+    repo.save_date(_bars([
+        ('2024-01-02', 'a', 10, 10.5, 9.5, 10.0, 10.0, 1000),
+        ('2024-01-03', 'a', 10, 9.0, 9.5, 10.0, 10.0, 1000),            # ohlc_bounds：最高低于最低
+        ('2024-01-02', 'b', 5, 5.5, 4.5, 5.0, 5.0, 1000),
+    ]), stock_dir, False)
+
+    stored = pq.read_table(stock_dir / 'a' / '2024' / '2024.parquet')
+    assert stored['datetime'].to_pylist() == [datetime(2024, 1, 2)]
+    (path,) = (data_root / '_quarantine' / 'stocks').rglob('*.parquet')
+    quarantined = pq.read_table(path)
+    assert quarantined['code'].to_pylist() == ['a'] and quarantined['rule'].to_pylist() == ['ohlc_bounds']
+
+    counts = report.frame().set_index('code')
+    assert counts.loc['a', 'rows'] == 2 and counts.loc['a', 'ohlc_bounds'] == 1
+    assert counts.loc['b', 'rows'] == 1 and counts.loc['b', list(counts.columns[3:])].sum() == 0
+    assert report.save().parent == data_root / '_quarantine'
+
+
+def test_boundary_with_stored_data_is_flagged_not_rejected(data_root, report):
+    stock_dir = data_root / 'stocks'
+    repo.save_date(_bars([('2023-12-29', 'a', 10, 10.5, 9.5, 10.0, 10.0, 1000)]), stock_dir, False)
+    # 新的一年、新的一批：第一行与上一年文件的最后一行比较（昨收 5.0 对 10.0：尺度断裂）
+    repo.save_date(_bars([('2024-01-02', 'a', 5, 5.2, 4.8, 5.0, 5.0, 1000)]), stock_dir, False)
+
+    assert pq.read_table(stock_dir / 'a' / '2024' / '2024.parquet').num_rows == 1
+    flagged = pd.concat(pq.read_table(p).to_pandas() for p in (data_root / '_quarantine').rglob('*.parquet'))
+    assert set(zip(flagged['rule'], flagged['action'])) == {('price_jump', FLAG), ('scale_break', FLAG)}
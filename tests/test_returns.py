@@ -0,0 +1,39 @@
+"""
+MarketReturns 绑定判断：只复用由同一份数据构建的收益面板。
+
+在项目根目录执行（logging.conf 按相对路径加载）：
+    python -m pytest -q tests
+"""
+import numpy as np
+import pandas as pd
+
+from core.panels import PanelWindow
+from core.returns import MarketReturns
+
+
+def _data(seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2020-01-01', periods=60)
+    columns = pd.Index(['A', 'B', 'C'])
+    close = pd.DataFrame(100 * np.cumprod(1 + rng.normal(0, 0.01, (60, 3)), axis=0), index, columns)
+    return {'open': close.shift(1).bfill(), 'close': close}
+
+
+def test_binds_requires_same_values():
+    data = _data(0)
+    market = MarketReturns.from_data(data)
+    assert market.binds(data)
+    # 行列相同、数值不同（如另一种复权口径）必须重建
+    other = _data(1)
+    assert not market.binds(other)
+    assert market.window(other) is None
+    assert not market.binds({**data, 'close': data['close'].copy()})
+
+
+def test_window_binds_sliced_market():
+    data = _data(0)
+    market = MarketReturns.from_data(data)
+    window = PanelWindow(data, 10, 40)
+    sliced = market.window(window)
+    assert sliced is not None and sliced.binds(window)
+    assert np.array_equal(sliced.daily, market.daily[10:40])
@@ -0,0 +1,100 @@
+"""
+行业 / 指数 / 股票同步：串行 (infra.repo) 与异步 (infra.async_sync) 两条路径在离线桩上写出相同的文件，
+异步路径在请求出错时重试 / 退避后结果不变。
+"""
+import asyncio
+
+import pyarrow.parquet as pq
+
+import infra.async_sync
+import infra.checkpoint
+import infra.repo as repo
+from fake_akshare import TRADE_DATE, FakeAkShare
+from infra.async_sync import SyncPipeline
+from infra.checkpoint import SyncJob
+
+
+def _use(root, monkeypatch):
+    """把数据目录与同步进度一起切到 root（两次同步互不影响）"""
+    monkeypatch.setattr(repo, 'ROOT_DATA_DIR', root)
+    monkeypatch.setattr(infra.checkpoint, 'STATE_DIR', root / '_sync_state')
+
+
+def _lake(root):
+    """{相对路径: 表}，不含同步进度与隔离区"""
+    return {str(p.relative_to(root)): pq.read_table(p) for p in sorted(root.rglob('*.parquet'))
+            if not p.relative_to(root).parts[0].startswith('_')}
+
+
+def _sync_serial(fake, monkeypatch):
+    monkeypatch.setattr(repo, 'ak', fake)
+    repo.sync_latest_industry_data()
+    repo.sync_latest_index_data()
+    repo.sync_latest_stock_data()
+
+
+def _sync_async(fake, **kwargs):
+    pipeline = SyncPipeline(client=fake, trade_date=TRADE_DATE, min_interval=0, backoff_base=0, **kwargs)
+    asyncio.run(pipeline.sync_all(include_tick=True, include_etf=False))
+    return pipeline
+
+
+def _assert_same(left, right):
+    assert left.keys() == right.keys()
+    for path in left:
+        assert left[path].equals(right[path]), path
+
+
+def test_serial_and_async_write_the_same_files(offline, monkeypatch):
+    serial_root, async_root = offline / 'serial', offline / 'async'
+
+    _use(serial_root, monkeypatch)
+    _sync_serial(FakeAkShare(TRADE_DATE), monkeypatch)
+    _use(async_root, monkeypatch)
+    _sync_async(FakeAkShare(TRADE_DATE), flush_rows=500)
+
+    serial, parallel = _lake(serial_root), _lake(async_root)
+    kinds = {(path.split('/')[0], '/tick/' in path) for path in serial}
+    assert kinds == {(kind, tick) for kind in ('industry_indexes', 'indexes', 'stocks') for tick in (False, True)}
+    _assert_same(serial, parallel)
+
+
+def test_async_retries_failed_requests(offline, monkeypatch):
+    clean_root, flaky_root = offline / 'clean', offline / 'flaky'
+
+    _use(clean_root, monkeypatch)
+    _sync_async(FakeAkShare(TRADE_DATE))
+    _use(flaky_root, monkeypatch)
+    flaky = FakeAkShare(TRADE_DATE, fail_every=3)
+    pipeline = _sync_async(flaky)
+
+    assert flaky.errors > 0
+    assert sum(ep.stats.errors for ep in pipeline.endpoints.values()) == flaky.errors
+    assert sum(ep.stats.failures for ep in pipeline.endpoints.values()) == 0
+    _assert_same(_lake(clean_root), _lake(flaky_root))
+
+
+def test_failed_codes_resume_after_backoff(offline, monkeypatch):
+    """重试耗尽的分钟线记为失败；退避期内重跑不再请求，过期后只补这些代码（串行 / 异步共用进度）"""
+    clean_root, flaky_root = offline / 'clean', offline / 'flaky'
+    _use(clean_root, monkeypatch)
+    _sync_async(FakeAkShare(TRADE_DATE))
+
+    _use(flaky_root, monkeypatch)
+    flaky = FakeAkShare(TRADE_DATE, fail_every=3)
+    _sync_async(flaky, retries=0)
+    job = SyncJob(f"stock_tick_{TRADE_DATE:%Y%m%d}")
+    failed = set(job.failures())
+    assert failed and all(state.attempts == 1 for state in job.failures().values())
+
+    requested = flaky.attempts('stock_zh_a_hist_min_em')
+    _sync_async(flaky, retries=0)
+    assert flaky.attempts('stock_zh_a_hist_min_em') == requested  # 仍在退避期
+
+    for code in failed:
+        job.codes[code].next_retry = 0
+    job.compact()
+    _sync_serial(flaky, monkeypatch)
+    assert flaky.attempts('stock_zh_a_hist_min_em') == requested + len(failed)
+    assert not SyncJob(f"stock_tick_{TRADE_DATE:%Y%m%d}").failures()
+    _assert_same(_lake(clean_root), _lake(flaky_root))
@@ -0,0 +1,76 @@
+"""
+LiquidityScreen 逐日筛选：第 t 日的可选掩码只由 t 之前的成交额决定，并随 Membership 作用于因子与持仓。
+"""
+import numpy as np
+import pandas as pd
+
+from core.universe import LiquidityScreen, Membership
+
+
+def _amount(seed: int = 0, t: int = 120, n: int = 8) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    amount = rng.lognormal(17, 1, (t, n))
+    amount[rng.random((t, n)) < 0.1] = np.nan  # 停牌
+    amount[:30, 0] = np.nan                    # 晚上市
+    return amount
+
+
+def test_eligibility_uses_only_past_amounts():
+    screen = LiquidityScreen(min_amount=2e7, top_n=3, min_days=5, window=20)
+    amount = _amount()
+    columns = pd.Index([f'c{j}' for j in range(amount.shape[1])])
+    eligible = screen.eligibility({'amount': amount}, columns)
+
+    for t in (0, 10, 50, 119):
+        future = amount.copy()
+        future[t:] = np.random.default_rng(t).lognormal(22, 1, future[t:].shape)
+        assert np.array_equal(screen.eligibility({'amount': future}, columns)[:t + 1], eligible[:t + 1])
+
+    # 逐行核对：前 window 日（不含当日）的日均成交额
+    for t in (25, 60, 119):
+        past = amount[max(t - 20, 0):t]
+        days = (~np.isnan(past)).sum(axis=0)
+        adv = np.nansum(past, axis=0) / np.maximum(days, 1)
+        ok = (days >= 5) & (adv >= 2e7)
+        expected = ok & (np.where(ok, adv, -np.inf) >= np.sort(np.where(ok, adv, -np.inf))[-3])
+        assert np.array_equal(eligible[t], expected)
+    assert eligible.sum(axis=1).max() <= 3
+    assert not eligible[:5].any()
+
+
+def test_liquidity_flips_over_time():
+    """前半段 A 活跃、后半段 B 活跃：全样本筛选只能二选一，逐日筛选各自在活跃期可选"""
+    amount = np.full((100, 2), 1e6)
+    amount[:50, 0] = amount[50:, 1] = 1e9
+    columns = pd.Index(['A', 'B'])
+    eligible = LiquidityScreen(top_n=1, window=10).eligibility({'amount': amount}, columns)
+    assert eligible[40].tolist() == [True, False]
+    assert eligible[90].tolist() == [False, True]
+    # 转换发生在成交额变化之后（不提前知道）
+    assert eligible[50].tolist() == [True, False]
+
+    static = LiquidityScreen(top_n=1, point_in_time=False)
+    assert static.eligibility({'amount': amount}, columns) is None
+    assert static.screen({'amount': amount}, columns).sum() == 1
+
+
+def test_membership_carries_eligibility():
+    index = pd.bdate_range('2024-01-01', periods=6)
+    columns = pd.Index(['A', 'B', 'C'])
+    eligible = np.ones((6, 3), dtype=bool)
+    eligible[2:4, 1] = False
+    membership = Membership(index, columns, [0, 0, 3], [5, 5, 5], eligible)
+
+    mask = membership.mask()
+    assert not mask[2:4, 1].any() and mask[4:, 1].all()
+    assert not mask[:3, 2].any()
+    assert membership.listed()[2:4, 1].all()  # 前向填充只看首末存储日期
+
+    factor = pd.DataFrame(1.0, index, columns)
+    assert membership.apply(factor).iloc[2:4, 1].isna().all()
+
+    assert np.array_equal(membership.slice(2, 5).mask(), mask[2:5])
+    assert np.array_equal(membership.take(np.array([False, True, True])).mask(), mask[:, 1:])
+    reindexed = membership.reindex(index[1:], pd.Index(['B', 'D']))
+    assert np.array_equal(reindexed.mask()[:, 0], mask[1:, 1])
+    assert not reindexed.mask()[:, 1].any()
@@ -49,8 +49,11 @@ class DataType(Enum):
     def __init__(self,dir_code):
         self.dir_code = dir_code
 
+from .profiler import profiler
+
 from .decorators import (
     log,
+    profiled,
 )
 
 from .tools import (
@@ -58,4 +61,4 @@ from .tools import (
     _batch_execute
 )
 
-__all__ = ['log','digest_logger', 'logger', 'error_logger','BatchExecuteCallBack','_batch_execute', 'Klt', 'DataType','log_retry_attempt']
\ No newline at end of file
+__all__ = ['log','profiled','profiler','digest_logger', 'logger', 'error_logger','BatchExecuteCallBack','_batch_execute', 'Klt', 'DataType','log_retry_attempt']
\ No newline at end of file
@@ -1,15 +1,30 @@
 from utils import digest_logger
 import time
 from functools import wraps
+from .profiler import profiler
 
 def log(func,log_args:bool=True):
     @wraps(func)
     def log_interceptor(*args, **kwargs):
         tic = time.time()
         try:
-            return func(*args, **kwargs)
+            with profiler.span(func.__qualname__):
+                return func(*args, **kwargs)
         finally:
             toc = time.time()
             if (log_args): digest_logger.info(f'{func.__name__},{toc-tic :.3f},args={args},kwargs={kwargs}')
             else:digest_logger.info(f'{func.__name__},{toc-tic :.3f}')
-    return log_interceptor
\ No newline at end of file
+    return log_interceptor
+
+def profiled(name:str=None):
+    """只计入 profiler 的轻量装饰器（不写 digest 日志），关闭时直接调用原函数"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+        @wraps(func)
+        def profile_interceptor(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with profiler.span(span_name):
+                return func(*args, **kwargs)
+        return profile_interceptor
+    return decorator
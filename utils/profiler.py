@@ -0,0 +1,236 @@
+"""
+热路径计时 (Profiler)
+
+嵌套 Span 计时 + 计数器（调用次数、读写字节数、处理行数），支持：
+  - 汇总表：按嵌套路径聚合 (e.g. "load > read")，含总耗时 / 自身耗时 / 计数器
+  - Chrome trace-event JSON 导出（chrome://tracing 或 https://ui.perfetto.dev 打开）
+
+默认关闭，关闭时 span() 返回共享的空对象，开销接近于零。
+开启方式：环境变量 PROFILE=1（可写在 .env 中），或代码中调用 profiler.enable()。
+设置 PROFILE_TRACE=trace.json 时，report() 会同时导出 trace 文件。
+
+用法:
+    from utils import profiler
+
+    with profiler.span('load'):
+        with profiler.span('read') as sp:
+            df = ...
+            sp.add(rows=len(df), bytes_read=nbytes)
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+COUNTER_KEYS = ('rows', 'bytes_read', 'bytes_written')
+MAX_TRACE_EVENTS = 1_000_000  # trace 事件上限，超出后只做汇总统计
+
+
+class _NullSpan:
+    """关闭状态下的空 Span，所有操作均为 no-op"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def add(self, **counters):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'path', 'counters', 'start', 'child_ns')
+
+    def __init__(self, profiler: 'Profiler', name: str, counters: Dict[str, float]):
+        self.profiler = profiler
+        self.name = name
+        self.path = name
+        self.counters = counters
+        self.start = 0
+        self.child_ns = 0
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        if stack:
+            self.path = f"{stack[-1].path} > {self.name}"
+        self.profiler._register(self.path)
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        duration = time.perf_counter_ns() - self.start
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_ns += duration
+        self.profiler._record(self, duration)
+        return False
+
+    def add(self, **counters):
+        """累加计数器，e.g. sp.add(rows=100, bytes_read=4096)"""
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+        self._stats: Dict[str, dict] = {}
+        self._events: List[dict] = []
+
+    # ------------------------------------------------------------------
+    # 开关
+    # ------------------------------------------------------------------
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._events.clear()
+            self._origin_ns = time.perf_counter_ns()
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+    def span(self, name: str, **counters):
+        """返回一个计时上下文；关闭状态下返回共享空对象"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, counters)
+
+    def add(self, **counters) -> None:
+        """向当前线程最内层的 Span 累加计数器"""
+        if not self.enabled:
+            return
+        stack = self._stack()
+        if stack:
+            stack[-1].add(**counters)
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _register(self, path: str) -> None:
+        # 进入时登记路径，保证汇总表中父节点排在子节点之前
+        if path not in self._stats:
+            with self._lock:
+                self._stats.setdefault(path, {'calls': 0, 'total_ns': 0, 'self_ns': 0, 'counters': {}})
+
+    def _record(self, span: _Span, duration_ns: int) -> None:
+        with self._lock:
+            stat = self._stats[span.path]
+            stat['calls'] += 1
+            stat['total_ns'] += duration_ns
+            stat['self_ns'] += duration_ns - span.child_ns
+            for key, value in span.counters.items():
+                stat['counters'][key] = stat['counters'].get(key, 0) + value
+
+            if len(self._events) < MAX_TRACE_EVENTS:
+                self._events.append({
+                    'name': span.name,
+                    'cat': span.path.split(' > ')[0],
+                    'ph': 'X',
+                    'ts': (span.start - self._origin_ns) / 1000,
+                    'dur': duration_ns / 1000,
+                    'pid': os.getpid(),
+                    'tid': threading.get_ident(),
+                    'args': dict(span.counters),
+                })
+
+    # ------------------------------------------------------------------
+    # 输出
+    # ------------------------------------------------------------------
+    def summary(self) -> List[dict]:
+        """按首次出现顺序返回每条路径的统计"""
+        with self._lock:
+            rows = []
+            for path, stat in self._stats.items():
+                if stat['calls'] == 0:
+                    continue
+                row = {
+                    'span': path,
+                    'calls': stat['calls'],
+                    'total_s': stat['total_ns'] / 1e9,
+                    'self_s': stat['self_ns'] / 1e9,
+                    'mean_ms': stat['total_ns'] / stat['calls'] / 1e6,
+                }
+                row.update({key: stat['counters'].get(key, 0) for key in COUNTER_KEYS})
+                rows.append(row)
+            return rows
+
+    def format_summary(self) -> str:
+        headers = ['Span', 'Calls', 'Total(s)', 'Self(s)', 'Mean(ms)', 'Rows', 'Read', 'Written']
+        lines = []
+        for row in self.summary():
+            depth = row['span'].count(' > ')
+            lines.append([
+                '  ' * depth + row['span'].split(' > ')[-1],
+                str(row['calls']),
+                f"{row['total_s']:.3f}",
+                f"{row['self_s']:.3f}",
+                f"{row['mean_ms']:.2f}",
+                str(int(row['rows'])) if row['rows'] else '',
+                _format_bytes(row['bytes_read']),
+                _format_bytes(row['bytes_written']),
+            ])
+        widths = [max(len(h), *(len(line[i]) for line in lines)) if lines else len(h)
+                  for i, h in enumerate(headers)]
+        fmt = lambda cells: '  '.join(c.ljust(w) if i == 0 else c.rjust(w)
+                                      for i, (c, w) in enumerate(zip(cells, widths)))
+        out = [fmt(headers), fmt(['-' * w for w in widths])]
+        out.extend(fmt(line) for line in lines)
+        return '\n'.join(out)
+
+    def print_summary(self) -> None:
+        print(f"\n{'=' * 68}\n  Profile Summary\n{'=' * 68}")
+        print(self.format_summary())
+        print()
+
+    def export_chrome_trace(self, path: str) -> None:
+        """导出 Chrome trace-event JSON"""
+        with self._lock:
+            payload = {'traceEvents': list(self._events), 'displayTimeUnit': 'ms'}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+
+    def report(self, trace_path: Optional[str] = None) -> None:
+        """
+        运行结束时调用：打印汇总表；若指定 trace_path（或环境变量 PROFILE_TRACE）则导出 trace。
+        关闭状态下什么都不做。
+        """
+        if not self.enabled:
+            return
+        self.print_summary()
+        trace_path = trace_path or os.getenv('PROFILE_TRACE')
+        if trace_path:
+            self.export_chrome_trace(trace_path)
+            print(f"[Profile] Chrome trace saved to: {trace_path}")
+
+
+def _format_bytes(num: float) -> str:
+    if not num:
+        return ''
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(num) < 1024:
+            return f"{num:.1f}{unit}" if unit != 'B' else f"{int(num)}B"
+        num /= 1024
+    return f"{num:.1f}TB"
+
+
+profiler = Profiler(enabled=os.getenv('PROFILE', '').lower() in ('1', 'true', 'yes', 'on'))
@@ -1,32 +1,47 @@
 """
 Walk-Forward Analysis (WFA) — 样本外测试工具
 
-策略:  锚定式（Anchored）
+策略:  锚定式（Anchored，默认）
        训练窗口从数据起点不断扩大，每年在全新的样本外数据上评估策略，
        将所有样本外收益拼接成最终的"真实"净值曲线。
+       滚动式（Rolling）：训练窗口为固定长度；测试期可按年 / 季 / 月步进。
+       CPCV：组合清洗交叉验证，输出多条完整样本外路径。
 
 用法:
     python wfa.py
+    python wfa.py --scheme rolling --freq Q --train-periods 12
+    python wfa.py --scheme cpcv --groups 6 --test-groups 2
+    python wfa.py --optimize --objective Sharpe       # 每个训练期样本内寻优
 """
 
 from __future__ import annotations
 
+import argparse
 from datetime import datetime
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import Callable, Dict, Optional, Sequence, Tuple
 
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 import pandas as pd
-import quantstats as qs
 from tabulate import tabulate
 
 import config
 from core.data import DataLoader
 from core.engine import RealWorldEngine
+from core.intermediates import IntermediateStore
+from core.metrics import METRICS, performance_stats, format_stats
+from core.resampling import PATH_METRICS, confidence_intervals, phase_returns, resample, summarize
+from core.returns import MarketReturns
+from core.shm import attach
 from core.strategies import CustomStrategy
+from core.validation import (
+    FREQS, SCHEMES, BacktestCache, cpcv_folds, cpcv_paths, evaluate_folds, expand_grid, fold_summary,
+    optimize_folds, walk_forward_folds,
+)
 from factors import Momentum_castle, Peak
 from logics import logic_factor_rotation
-from utils import logger
+from reports import ReportJob, generate_reports
+from utils import logger, profiler
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -35,110 +50,143 @@ from utils import logger
 
 def run_walk_forward(
     data_dict: Dict[str, pd.DataFrame],
-    strategy_factory: Callable[[], CustomStrategy],
+    strategy_factory: Callable[..., CustomStrategy],
     test_years: int = 1,
     warmup_bars: int = 60,
     test_start_year: Optional[int] = None,
+    market: Optional[MarketReturns] = None,
+    scheme: str = 'anchored',
+    freq: str = 'Y',
+    train_periods: Optional[int] = None,
+    workers: Optional[int] = None,
+    param_grid: Optional[Dict[str, Sequence]] = None,
+    objective: str = 'Sharpe',
 ) -> Tuple[pd.Series, pd.DataFrame]:
     """
-    锚定式 Walk-Forward Analysis.
+    Walk-Forward Analysis（锚定式 / 滚动式）.
 
     每个测试窗口的数据划分：
-      - 训练期  = [数据起点, 测试期第一天) —— 只用来"见证"数据，不参与收益
-      - 评估数据 = 最后 warmup_bars 根训练数据 + 完整测试期
-      - 只保留测试期的收益，warmup 部分仅用于因子预热
+      - 训练期  = anchored: [数据起点, 测试期第一天)；rolling: 测试期之前 train_periods 个周期
+      - 测试期  = test_years 个周期（freq='Y' 时为年，'Q' 季，'M' 月）
+      - 只保留测试期的收益
+
+    策略在全量历史上只计算一次（BacktestCache），每个窗口只切片并执行持仓逻辑，
+    窗口首日的昨日持仓与全量回测一致，因子不会因窗口截断而重新预热。
+
+    给出 param_grid 时在每个训练期上做样本内寻优：全部候选在训练期上批量回测，
+    objective 最高的参数组用于紧随其后的测试期（因子按参数值只在全量历史上计算一次）。
 
     Args:
-        data_dict:        DataLoader 返回的完整宽表数据字典
-        strategy_factory: 无参可调用，每次调用返回一个新的 CustomStrategy 实例
-        test_years:       每个测试窗口时长（年），默认 1
-        warmup_bars:      因子预热期 K 线数，需 >= 最大因子窗口（默认 60）
+        data_dict:        DataLoader 返回的完整宽表数据（或其 PanelWindow 窗口视图）
+        strategy_factory: 可调用，每次调用返回一个新的 CustomStrategy 实例
+                          （无参调用为默认参数；寻优时以关键字参数传入候选参数）
+        test_years:       每个测试窗口包含的周期数（freq='Y' 时即年数），默认 1
+        warmup_bars:      训练期最少 K 线数，不足的测试期跳过（默认 60）
         test_start_year:  第一个测试期的起始年份
                           （默认：数据起始年 + 3，确保有足够训练数据）
+        market:           全量数据上的 MarketReturns（可选，默认内部构建一次），
+                          每个窗口只切片视图，不再重复计算收益面板
+        scheme:           'anchored'（扩张训练窗口）或 'rolling'（固定长度训练窗口）
+        freq:             测试期步长：'Y' / 'Q' / 'M'
+        train_periods:    rolling 方案的训练期周期数
+        workers:          并行评估测试期的线程数（默认 CPU 核数）
+        param_grid:       可选，{参数名: 候选值列表}，每组参数以 strategy_factory(**params) 构造策略
+        objective:        样本内寻优的目标指标（performance_stats 的列，越大越好）
 
     Returns:
         oos_returns: 样本外日收益率 Series（按时间顺序拼接）
-        summary:     每个测试期的统计摘要 DataFrame
+        summary:     每个测试期的统计摘要 DataFrame（寻优时附带 Params 列）
     """
-    close     = data_dict['close']
-    all_dates = close.index
-
-    first_year = all_dates[0].year
-    last_year  = all_dates[-1].year
+    all_dates = data_dict['close'].index
 
     if test_start_year is None:
-        test_start_year = first_year + 3
+        test_start_year = all_dates[0].year + 3
 
-    engine   = RealWorldEngine()
-    all_oos: List[pd.Series] = []
-    rows:    List[dict]      = []
+    if market is None or not market.binds(data_dict):
+        market = MarketReturns.from_data(data_dict)
+
+    folds = walk_forward_folds(all_dates, scheme=scheme, freq=freq, test_periods=test_years,
+                               train_periods=train_periods, start=test_start_year)
+    valid = []
+    for fold in folds:
+        if len(fold.train) < warmup_bars:
+            logger.warning(
+                f"[WFA] Skip {fold.label}: 训练数据不足 "
+                f"({len(fold.train)} bars < warmup_bars={warmup_bars})"
+            )
+            continue
+        logger.info(
+            f"[WFA] 测试期 {fold.label}: "
+            f"训练 {all_dates[fold.train[0]].date()} ~ {all_dates[fold.train[-1]].date()}, "
+            f"测试 {len(fold.test)} 个交易日"
+        )
+        valid.append(fold)
 
-    test_year = test_start_year
-    while test_year <= last_year:
-        test_end_year = test_year + test_years - 1
+    if not valid:
+        raise ValueError(
+            "[WFA] 没有生成任何样本外结果，请检查 data_dict 的时间范围和 test_start_year。"
+        )
 
-        # 用布尔掩码定位训练期和测试期
-        train_mask = all_dates.year < test_year
-        test_mask  = (all_dates.year >= test_year) & (all_dates.year <= test_end_year)
+    # 策略只在全量历史上计算一次，各测试期共享
+    all_oos, summary = _evaluate(data_dict, strategy_factory, market, valid, workers, param_grid, objective)
+    return pd.concat(all_oos), summary
 
-        n_train = int(train_mask.sum())
-        n_test  = int(test_mask.sum())
 
-        if n_test == 0:
-            test_year += test_years
-            continue
+def run_cpcv(
+    data_dict: Dict[str, pd.DataFrame],
+    strategy_factory: Callable[..., CustomStrategy],
+    n_groups: int = 6,
+    n_test_groups: int = 2,
+    purge: int = 5,
+    embargo: float = 0.01,
+    market: Optional[MarketReturns] = None,
+    workers: Optional[int] = None,
+    param_grid: Optional[Dict[str, Sequence]] = None,
+    objective: str = 'Sharpe',
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    组合清洗交叉验证 (CPCV)：C(n_groups, n_test_groups) 个折拼成 C(n_groups-1, n_test_groups-1) 条完整路径。
 
-        if n_train < warmup_bars:
-            logger.warning(
-                f"[WFA] Skip {test_year}: 训练数据不足 "
-                f"({n_train} bars < warmup_bars={warmup_bars})"
-            )
-            test_year += test_years
-            continue
+    Args:
+        purge:      每个测试组之前从训练集去掉的 K 线数
+        embargo:    每个测试组之后从训练集去掉的比例（或 K 线数）
+        param_grid: 可选，每个折在训练集上寻优（见 run_walk_forward）
 
-        # 评估数据 = 最后 warmup_bars 根训练数据 + 完整测试期
-        # 用整数切片，避免任何 deprecated pandas API
-        warmup_start = n_train - warmup_bars
-        eval_end     = n_train + n_test
-        eval_data    = {k: v.iloc[warmup_start:eval_end] for k, v in data_dict.items()}
-        test_dates   = all_dates[test_mask]
+    Returns:
+        paths:   每条路径一列的日收益 DataFrame
+        summary: 每条路径的统计摘要
+    """
+    if market is None or not market.binds(data_dict):
+        market = MarketReturns.from_data(data_dict)
 
-        label = str(test_year) if test_years == 1 else f"{test_year}~{test_end_year}"
-        logger.info(
-            f"[WFA] 测试期 {label}: "
-            f"训练截至 {all_dates[n_train - 1].date()}, "
-            f"测试 {n_test} 个交易日"
-        )
+    folds      = cpcv_folds(len(data_dict['close']), n_groups, n_test_groups, purge, embargo)
+    results, _ = _evaluate(data_dict, strategy_factory, market, folds, workers, param_grid, objective)
+    paths      = cpcv_paths(folds, results)
 
-        strategy = strategy_factory()
-        try:
-            rets     = engine.run(strategy, **eval_data)
-            oos_rets = rets.loc[test_dates]
-            all_oos.append(oos_rets)
+    summary = performance_stats(paths)
+    summary.insert(0, 'Days', len(paths))
+    summary.insert(0, 'Period', summary.index)
+    return paths, summary.reset_index(drop=True)
 
-            rows.append({
-                'Period':    label,
-                'Days':      n_test,
-                'Total Ret': qs.stats.comp(oos_rets),
-                'CAGR':      qs.stats.cagr(oos_rets),
-                'Sharpe':    qs.stats.sharpe(oos_rets),
-                'Max DD':    qs.stats.max_drawdown(oos_rets),
-                'Win Rate':  (oos_rets > 0).mean(),
-            })
 
-        except Exception as e:
-            logger.error(f"[WFA] 测试期 {label} 失败: {e}", exc_info=True)
+def _evaluate(data_dict, strategy_factory, market, folds, workers, param_grid, objective):
+    """构建共享缓存并评估全部折：无参数网格时直接评估，否则逐折样本内寻优"""
+    if not param_grid:
+        cache   = BacktestCache(strategy_factory(), market, **data_dict)
+        results = evaluate_folds(cache, folds, workers=workers)
+        return results, fold_summary(folds, results)
 
-        test_year += test_years
+    cache = BacktestCache.from_grid(strategy_factory, expand_grid(param_grid), market, **data_dict)
+    results, chosen = optimize_folds(cache, folds, objective=objective, workers=workers)
+    summary = fold_summary(folds, results)
+    summary.insert(2, 'Params', [_format_params(cache.candidates[c]) for c in chosen])
+    for fold, c in zip(folds, chosen):
+        logger.info(f"[WFA] {fold.label}: 样本内最优 {objective} → {cache.candidates[c]}")
+    return results, summary
 
-    if not all_oos:
-        raise ValueError(
-            "[WFA] 没有生成任何样本外结果，请检查 data_dict 的时间范围和 test_start_year。"
-        )
 
-    oos_returns = pd.concat(all_oos)
-    summary     = pd.DataFrame(rows)
-    return oos_returns, summary
+def _format_params(params: Dict) -> str:
+    return ", ".join(f"{k}={v}" for k, v in params.items())
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -150,13 +198,14 @@ def print_summary(
     oos_rets: pd.Series,
     full_rets: pd.Series,
     strategy_name: str = "Strategy",
+    intervals: Optional[Dict[str, pd.DataFrame]] = None,
 ) -> None:
-    """打印逐期摘要，并与全量回测对比"""
-    disp = summary.copy()
-    for col in ['Total Ret', 'CAGR', 'Max DD', 'Win Rate']:
-        disp[col] = disp[col].map('{:.2%}'.format)
-    disp['Sharpe'] = disp['Sharpe'].map('{:.2f}'.format)
-    disp['Days']   = disp['Days'].map(str)
+    """打印逐期摘要，并与全量回测对比
+
+    Args:
+        intervals: 可选，{标签: confidence_intervals() 结果}，在对比行下方打印 Sharpe / MaxDD 置信区间
+    """
+    disp = format_stats(summary)
 
     print(f"\n{'='*68}")
     print(f"  Walk-Forward Analysis  ·  {strategy_name}")
@@ -170,15 +219,21 @@ def print_summary(
 
     # 汇总对比行
     full_oos = full_rets.reindex(oos_rets.index).fillna(0)
+    totals   = performance_stats(pd.DataFrame({
+        "OOS Total":             oos_rets.values,
+        "Full BT (same period)": full_oos.values,
+    }))
     print(f"\n{'─'*68}")
-    for label, rets in [("OOS Total", oos_rets), ("Full BT (same period)", full_oos)]:
+    for label, row in totals.iterrows():
         print(
             f"  {label:<24}"
-            f"  CAGR {qs.stats.cagr(rets):.2%}"
-            f"  Sharpe {qs.stats.sharpe(rets):.2f}"
-            f"  MaxDD {qs.stats.max_drawdown(rets):.2%}"
-            f"  WinRate {(rets > 0).mean():.1%}"
+            f"  CAGR {row['CAGR']:.2%}"
+            f"  Sharpe {row['Sharpe']:.2f}"
+            f"  MaxDD {row['Max DD']:.2%}"
+            f"  WinRate {row['Win Rate']:.1%}"
         )
+    if intervals:
+        print(f"\n{summarize(intervals)}")
     print()
 
 
@@ -236,67 +291,158 @@ def plot_wfa_results(
 # 3. 主程序
 # ─────────────────────────────────────────────────────────────────────────────
 
-def main():
-    # 1. 加载完整历史数据
-    loader    = DataLoader("2013-08-01", datetime.now().strftime("%Y-%m-%d"), auto_sync=True)
-    data_dict = loader.load(config.ETF_SYMBOLS)
-
-    # 2. 基准（等权组合，Open-to-Open）
-    benchmark_rets = data_dict['open'].pct_change().mean(axis=1).fillna(0)
-    benchmark_rets.name = "Equal_Weighted_Benchmark"
-
-    # 3. 被测策略（与 live.py 保持一致）
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="样本外验证：Walk-Forward（锚定 / 滚动）或 CPCV")
+    parser.add_argument('--scheme', choices=SCHEMES, default='anchored', help="验证方案（默认 anchored）")
+    parser.add_argument('--freq', choices=FREQS, default='Y', help="测试期步长：Y / Q / M（默认 Y）")
+    parser.add_argument('--test-periods', type=int, default=1, help="每个测试期包含的周期数（默认 1）")
+    parser.add_argument('--train-periods', type=int, default=None, help="rolling 方案的训练期周期数")
+    parser.add_argument('--groups', type=int, default=6, help="CPCV 分组数 N（默认 6）")
+    parser.add_argument('--test-groups', type=int, default=2, help="CPCV 每折测试组数 k（默认 2）")
+    parser.add_argument('--purge', type=int, default=5, help="CPCV 测试组之前去掉的 K 线数（默认 5）")
+    parser.add_argument('--embargo', type=float, default=0.01, help="CPCV 测试组之后去掉的比例（默认 0.01）")
+    parser.add_argument('--workers', type=int, default=None, help="并行评估的线程数（默认 CPU 核数）")
+    parser.add_argument('--optimize', action='store_true', help="在每个训练期上对 PARAM_GRID 做样本内寻优")
+    parser.add_argument('--objective', choices=METRICS, default='Sharpe', help="寻优目标指标（默认 Sharpe）")
+    parser.add_argument('--shm', default=None, metavar='NAME',
+                        help="挂载 data_server.py 发布的共享内存数据，不再自行加载")
+    return parser.parse_args(argv)
+
+
+def main(args: argparse.Namespace = None):
+    args = args or parse_args([])
+
+    # 1. 被测策略（与 live.py 保持一致）
     # ── 如需测试其他策略，修改这里即可 ──────────────────────────────
     STRATEGY_NAME = "Momentum_Peak_Castle"
 
-    def strategy_factory() -> CustomStrategy:
+    def strategy_factory(mom_window: int = 25, peak_window: int = 20, peak_weight: float = 1.0) -> CustomStrategy:
         return CustomStrategy(
             name=STRATEGY_NAME,
             factors={
-                "Mom_20": Momentum_castle(25),
-                "Peak_20": Peak(20),
+                "Mom_20": Momentum_castle(mom_window),
+                "Peak_20": Peak(peak_window),
             },
             logic_func=logic_factor_rotation,
             holding_period=1,
-            factor_weights={"Mom_20": 1.0, "Peak_20": 1.0},
+            factor_weights={"Mom_20": 1.0, "Peak_20": peak_weight},
             top_k=1,
             timing_period=0,
             stg_flag=["castle_stg1"],
         )
+
+    # --optimize 时每个训练期在该网格上寻优（参数名对应 strategy_factory 的关键字参数）
+    PARAM_GRID = {
+        "mom_window":  [20, 25, 30],
+        "peak_window": [10, 20, 30],
+        "peak_weight": [0.5, 1.0, 2.0],
+    }
+    param_grid = PARAM_GRID if args.optimize else None
     # ────────────────────────────────────────────────────────────────
 
-    # 4. 运行 WFA
-    # test_start_year=2016：确保第一个测试期之前有 ~2.5 年训练数据 (2013-08 ~ 2015-12)
-    oos_rets, summary = run_walk_forward(
-        data_dict        = data_dict,
-        strategy_factory = strategy_factory,
-        test_years       = 1,
-        warmup_bars      = 60,
-        test_start_year  = 2016,
-    )
+    # 2. 加载完整历史数据（--shm 时挂载数据服务已加载好的宽表）
+    if args.shm:
+        shared    = attach(args.shm)
+        data_dict = shared.data
+    else:
+        # 只读取策略与引擎用到的字段（参数网格不改变因子用到的字段）
+        loader    = DataLoader("2013-08-01", datetime.now().strftime("%Y-%m-%d"), auto_sync=True,
+                               fields=RealWorldEngine().fields(strategy_factory()))
+        data_dict = loader.load(config.ETF_SYMBOLS)
+
+    # 3. 基准（等权组合，Open-to-Open），收益面板与中间结果 / 因子面板在 WFA / 全量回测 / 基准之间共享
+    store          = IntermediateStore(data_dict)
+    market         = MarketReturns.from_data(data_dict, store)
+    benchmark_rets = market.benchmark()
+    data_dict      = {**data_dict, 'intermediates': store}
+
+    # 4. 运行 WFA / CPCV（因子只在全量历史上计算一次，所有折共享）
+    intervals = {}
+    if args.scheme == 'cpcv':
+        paths, summary = run_cpcv(
+            data_dict        = data_dict,
+            strategy_factory = strategy_factory,
+            n_groups         = args.groups,
+            n_test_groups    = args.test_groups,
+            purge            = args.purge,
+            embargo          = args.embargo,
+            market           = market,
+            workers          = args.workers,
+            param_grid       = param_grid,
+            objective        = args.objective,
+        )
+        # 样本外曲线取各路径均值；路径间的指标分布直接给出区间
+        oos_rets = paths.mean(axis=1)
+        intervals["CPCV Paths"] = confidence_intervals(performance_stats(paths)[PATH_METRICS])
+    else:
+        # test_start_year=2016：确保第一个测试期之前有 ~2.5 年训练数据 (2013-08 ~ 2015-12)
+        oos_rets, summary = run_walk_forward(
+            data_dict        = data_dict,
+            strategy_factory = strategy_factory,
+            test_years       = args.test_periods,
+            warmup_bars      = 60,
+            test_start_year  = 2016,
+            market           = market,
+            scheme           = args.scheme,
+            freq             = args.freq,
+            train_periods    = args.train_periods,
+            workers          = args.workers,
+            param_grid       = param_grid,
+            objective        = args.objective,
+        )
     oos_rets.index = pd.to_datetime(oos_rets.index)
 
-    # 5. 全量回测（用于对比，范围与 OOS 相同）
+    # 5. 全量回测（用于对比，范围与 OOS 相同）：因子取自共享的 store，逻辑函数只跑一次，
+    #    全量收益与各调仓相位的收益都由同一份原始权重回测得到
     engine    = RealWorldEngine()
-    full_rets = engine.run(strategy_factory(), **data_dict)
+    strategy  = strategy_factory()
+    raw       = strategy.generate_raw_weights(**data_dict)
+    phases    = phase_returns(strategy, market, engine, raw=raw) if strategy.holding_period > 1 else None
+    if strategy.phase_ensemble:
+        full_rets = phases.mean(axis=1, skipna=False)
+    else:
+        full_rets = engine.run_weights(strategy.apply_holding_period(raw), market)
     full_rets.index = pd.to_datetime(full_rets.index)
 
-    # 6. 打印摘要表格
-    print_summary(summary, oos_rets, full_rets, STRATEGY_NAME)
+    # 6. 稳健性检验（只在已有收益上重采样，不重算因子）
+    #    - 样本外路径：平稳块自助法（平均块长 20 天）
+    #    - 全量回测同期：随机起点 × 随机调仓相位；holding_period == 1 时只有一个相位，即只做随机起点
+    N_PATHS   = 2000
+    oos_ci    = confidence_intervals(resample(oos_rets, n_paths=N_PATHS, mean_block=20, seed=42))
+    if phases is not None:
+        phases.index = pd.to_datetime(phases.index)
+        start_label, start_rets = "Start × Phase (Full)", phases
+    else:
+        start_label, start_rets = "Random Start (Full)", full_rets
+    start_ci  = confidence_intervals(resample(
+        start_rets.reindex(oos_rets.index), n_paths=N_PATHS, mean_block=None,
+        random_start=True, min_length=252, seed=43,
+    ))
+
+    # 7. 打印摘要表格
+    print_summary(summary, oos_rets, full_rets, STRATEGY_NAME, intervals={
+        **intervals,
+        "Bootstrap (OOS)":        oos_ci,
+        start_label:              start_ci,
+    })
 
-    # 7. 绘制对比图
+    # 8. 绘制对比图
     plot_wfa_results(oos_rets, full_rets, benchmark_rets, STRATEGY_NAME)
 
-    # 8. 生成 QuantStats HTML 报告
+    # 9. 生成 QuantStats HTML 报告
     common_idx = oos_rets.index.intersection(benchmark_rets.index)
-    qs.reports.html(
-        oos_rets.loc[common_idx],
-        benchmark=benchmark_rets.loc[common_idx],
-        output="report_wfa.html",
-        title=f"WFA Out-of-Sample — {STRATEGY_NAME}",
-    )
-    logger.info("[WFA] HTML 报告已保存 → report_wfa.html")
+    generate_reports([ReportJob(
+        name      = STRATEGY_NAME,
+        returns   = oos_rets.loc[common_idx],
+        benchmark = benchmark_rets.loc[common_idx],
+        output    = "report_wfa.html",
+        title     = f"WFA Out-of-Sample — {STRATEGY_NAME}",
+    )], workers=1)
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main(parse_args())
+    finally:
+        # PROFILE=1 时打印热路径汇总，PROFILE_TRACE=xxx.json 时导出 Chrome trace
+        profiler.report()